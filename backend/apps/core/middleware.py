@@ -77,7 +77,8 @@ class AuditoriaMiddleware:
             if request.path.startswith('/api/auth/login/'):
                 return response
 
-            if response.status_code < 400:
+            # Las vistas pueden omitir el registro (p. ej. simulaciones) o dar su propia nota resumen.
+            if response.status_code < 400 and not getattr(response, 'omitir_auditoria', False):
                 accion = self._map_action(request)
                 usuario = request.user if request.user.is_authenticated else None
                 usuario_nombre = self._get_usuario_nombre(request, usuario)
@@ -90,7 +91,7 @@ class AuditoriaMiddleware:
                     accion=accion,
                     modelo=modelo,
                     objeto_id=objeto_id,
-                    notas=self._build_notas(request, response, accion, objeto_id),
+                    notas=getattr(response, 'auditoria_notas', None) or self._build_notas(request, response, accion, objeto_id),
                     ip_address=self._get_ip(request),
                 )
 
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "core",
+            "0019_alter_configuracionfacturacion_factus_documento_soporte_document_code_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersionConfiguracion",
+            fields=[
+                (
+                    "clave",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Versión de configuración",
+                "verbose_name_plural": "Versiones de configuración",
+                "db_table": "configuracion_version",
+            },
+        ),
+    ]
@@ -193,6 +193,25 @@ class ConfiguracionFacturacion(models.Model):
         return f"REM {self.prefijo_remision}-{self.numero_remision} | COT {self.prefijo_cotizacion}-{self.numero_cotizacion}"
 
 
+class VersionConfiguracion(models.Model):
+    """
+    Sello de versión por configuración (``facturacion``, ``empresa``). Lo sube
+    cada guardado y cada proceso lo consulta para invalidar su copia en memoria
+    (ver services.configuracion_cache).
+    """
+    clave = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Versión de configuración'
+        verbose_name_plural = 'Versiones de configuración'
+        db_table = 'configuracion_version'
+
+    def __str__(self):
+        return f"{self.clave} v{self.version}"
+
+
 class Impuesto(BaseModel):
     nombre = models.CharField(max_length=50)
     porcentaje = models.DecimalField(max_digits=5, decimal_places=2, default=0)
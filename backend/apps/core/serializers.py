@@ -25,6 +25,24 @@ class ConfiguracionFacturacionSerializer(serializers.ModelSerializer):
         model = ConfiguracionFacturacion
         fields = '__all__'
 
+    def to_representation(self, instance):
+        from apps.ventas.services.consecutivos import ultimos_consecutivos_cotizacion_remision
+
+        data = super().to_representation(instance)
+        # Cotizaciones y remisiones se numeran con los consecutivos: se muestra el siguiente número real.
+        # La vista los pasa en el contexto; si no, se leen una vez por árbol de serialización.
+        if 'consecutivos' not in self.context:
+            self.context['consecutivos'] = ultimos_consecutivos_cotizacion_remision()
+        consecutivos = self.context['consecutivos']
+        for tipo_comprobante, prefijo, campo in (
+            ('COTIZACION', instance.prefijo_cotizacion or 'COT', 'numero_cotizacion'),
+            ('REMISION', instance.prefijo_remision or 'REM', 'numero_remision'),
+        ):
+            ultimo_numero = consecutivos.get((tipo_comprobante, prefijo.strip()))
+            if ultimo_numero is not None:
+                data[campo] = max(int(data[campo] or 1), ultimo_numero + 1)
+        return data
+
 
 class ImpuestoSerializer(serializers.ModelSerializer):
     def _resolve_factus_tribute_id(self, nombre: str, porcentaje: Decimal) -> int:
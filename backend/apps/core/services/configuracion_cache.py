@@ -0,0 +1,173 @@
+"""Caché en proceso de las configuraciones singleton (facturación y empresa).
+
+Las rutas calientes (armado del payload de Factus, resolución del rango
+electrónico, numeración local) leen ``ConfiguracionFacturacion`` varias veces
+por emisión; aquí se carga una vez y se sirve como una vista inmutable
+(dataclass ``frozen`` con los mismos atributos que el modelo).
+
+Invalidación:
+- En el proceso que guarda, de inmediato y otra vez al confirmar (signals).
+- En los demás procesos, con el sello de ``VersionConfiguracion``: lo sube el
+  mismo guardado dentro de su transacción y cada proceso lo consulta como mucho
+  cada ``CONFIGURACION_CACHE_CHECK_INTERVAL`` segundos (una lectura por PK).
+
+Otros cachés en proceso reutilizan el sello con su propia clave
+(``bump_shared_version`` / ``get_shared_version``).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from typing import Any, Callable
+
+from decouple import config
+from django.db import connection, transaction
+from django.db.models import Model
+
+from apps.core.models import ConfiguracionEmpresa, ConfiguracionFacturacion, VersionConfiguracion
+
+CLAVE_FACTURACION = 'facturacion'
+CLAVE_EMPRESA = 'empresa'
+
+
+def _vista(model: type[Model]) -> type:
+    """Dataclass inmutable con un atributo por campo concreto del modelo (más ``pk``)."""
+    campos = [(field.attname, Any) for field in model._meta.concrete_fields]
+    pk_name = model._meta.pk.attname
+    return dataclasses.make_dataclass(
+        f'{model.__name__}View',
+        campos,
+        frozen=True,
+        namespace={'pk': property(lambda self: getattr(self, pk_name))},
+    )
+
+
+ConfiguracionFacturacionView = _vista(ConfiguracionFacturacion)
+ConfiguracionEmpresaView = _vista(ConfiguracionEmpresa)
+
+
+@dataclasses.dataclass(frozen=True)
+class NumeracionLocal:
+    prefijo_cotizacion: str
+    prefijo_remision: str
+    # Primer número si aún no hay consecutivo para el prefijo (``None`` sin configuración).
+    numero_cotizacion: int | None
+    numero_remision: int | None
+
+
+def _instantanea(view_cls: type, instancia: Model | None):
+    if instancia is None:
+        return None
+    # getattr (no values()) para conservar tipos como FieldFile en ``logo``.
+    return view_cls(**{field.name: getattr(instancia, field.name) for field in dataclasses.fields(view_cls)})
+
+
+def _cargar_facturacion():
+    return _instantanea(ConfiguracionFacturacionView, ConfiguracionFacturacion.objects.order_by('-id').first())
+
+
+def _cargar_empresa():
+    return _instantanea(ConfiguracionEmpresaView, ConfiguracionEmpresa.objects.order_by('id').first())
+
+
+_LOADERS: dict[str, Callable[[], Any]] = {
+    CLAVE_FACTURACION: _cargar_facturacion,
+    CLAVE_EMPRESA: _cargar_empresa,
+}
+
+_lock = threading.Lock()
+_local_version = 0
+_db_versions: dict[str, int] = {}
+_checked_at = float('-inf')
+# clave -> (versión local, versión en BD, valor)
+_entries: dict[str, tuple[int, int, Any]] = {}
+
+
+def _check_interval() -> float:
+    return config('CONFIGURACION_CACHE_CHECK_INTERVAL', default=5, cast=float)
+
+
+def _invalidate_local() -> None:
+    global _local_version, _checked_at
+    with _lock:
+        _local_version += 1
+        _checked_at = float('-inf')
+        _entries.clear()
+
+
+def clear_configuracion_cache() -> None:
+    _invalidate_local()
+
+
+def bump_shared_version(clave: str) -> None:
+    """Sube el sello compartido de ``clave`` dentro de la transacción actual (lo ven los demás procesos)."""
+    global _checked_at
+    tabla = connection.ops.quote_name(VersionConfiguracion._meta.db_table)
+    sql = f"""
+        INSERT INTO {tabla} AS v (clave, version, updated_at)
+        VALUES (%s, 1, NOW())
+        ON CONFLICT (clave) DO UPDATE SET version = v.version + 1, updated_at = NOW()
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [clave])
+    with _lock:
+        _checked_at = float('-inf')
+
+
+def get_shared_version(clave: str) -> int:
+    """Sello compartido de ``clave``; se re-lee de la BD como mucho una vez por intervalo."""
+    global _db_versions, _checked_at
+    now = time.monotonic()
+    with _lock:
+        if now - _checked_at <= _check_interval():
+            return _db_versions.get(clave, 0)
+    versiones = dict(VersionConfiguracion.objects.values_list('clave', 'version'))
+    with _lock:
+        _db_versions = versiones
+        _checked_at = now
+    return versiones.get(clave, 0)
+
+
+def bump_configuracion_version(clave: str) -> None:
+    """Sube el sello compartido (en la transacción actual) e invalida la copia local."""
+    bump_shared_version(clave)
+    # Se invalida ya y otra vez al confirmar: evita recachear la fila previa mientras la transacción sigue abierta.
+    _invalidate_local()
+    transaction.on_commit(_invalidate_local)
+
+
+def _get(clave: str):
+    db_version = get_shared_version(clave)
+    with _lock:
+        local_version = _local_version
+        entry = _entries.get(clave)
+        if entry is not None and entry[0] == local_version and entry[1] == db_version:
+            return entry[2]
+    valor = _LOADERS[clave]()
+    with _lock:
+        # Si alguien invalidó mientras se cargaba, no se guarda (la próxima lectura recarga).
+        if _local_version == local_version:
+            _entries[clave] = (local_version, db_version, valor)
+    return valor
+
+
+def get_configuracion_facturacion():
+    """Vista inmutable de la ``ConfiguracionFacturacion`` vigente (la de mayor id), o ``None``."""
+    return _get(CLAVE_FACTURACION)
+
+
+def get_configuracion_empresa():
+    """Vista inmutable de ``ConfiguracionEmpresa`` (la de menor id), o ``None``."""
+    return _get(CLAVE_EMPRESA)
+
+
+def get_numeracion_local() -> NumeracionLocal:
+    configuracion = get_configuracion_facturacion()
+    return NumeracionLocal(
+        prefijo_cotizacion=(getattr(configuracion, 'prefijo_cotizacion', None) or 'COT').strip(),
+        prefijo_remision=(getattr(configuracion, 'prefijo_remision', None) or 'REM').strip(),
+        numero_cotizacion=int(configuracion.numero_cotizacion or 1) if configuracion else None,
+        numero_remision=int(configuracion.numero_remision or 1) if configuracion else None,
+    )
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.models import ConfiguracionEmpresa, ConfiguracionFacturacion
+from apps.core.services.configuracion_cache import (
+    CLAVE_EMPRESA,
+    CLAVE_FACTURACION,
+    bump_configuracion_version,
+)
+
+
+@receiver(post_save, sender=ConfiguracionFacturacion)
+@receiver(post_delete, sender=ConfiguracionFacturacion)
+def invalidar_configuracion_facturacion(sender, **kwargs):
+    bump_configuracion_version(CLAVE_FACTURACION)
+
+
+@receiver(post_save, sender=ConfiguracionEmpresa)
+@receiver(post_delete, sender=ConfiguracionEmpresa)
+def invalidar_configuracion_empresa(sender, **kwargs):
+    bump_configuracion_version(CLAVE_EMPRESA)
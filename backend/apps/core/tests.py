@@ -1,5 +1,6 @@
 from decimal import Decimal
 from pathlib import Path
+import dataclasses
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
@@ -7,9 +8,10 @@ from django.test import TestCase
 from django.utils import timezone
 from rest_framework.test import APIClient
 
+from apps.core.services import configuracion_cache
 from apps.core.services.legacy_excel_importer import Dataset, FileReport, LegacyExcelImporter, to_decimal, to_dt
 from apps.inventario.models import Categoria, Producto
-from apps.core.models import Auditoria, ConfiguracionFacturacion
+from apps.core.models import Auditoria, ConfiguracionEmpresa, ConfiguracionFacturacion, VersionConfiguracion
 from apps.facturacion.models import FacturaElectronica, NotaCreditoElectronica
 from apps.ventas.models import Cliente, Venta
 
@@ -244,3 +246,63 @@ class ConfiguracionFacturacionHistoricoTests(TestCase):
         self.assertEqual(self.factura_electronica.cufe, 'CUFE-HIST-1')
         self.assertEqual(self.venta_factura.factura_electronica_uuid, 'UUID-HIST-1')
         self.assertEqual(self.venta_factura.factura_electronica_cufe, 'CUFE-HIST-1')
+
+
+class ConfiguracionCacheTests(TestCase):
+    def setUp(self):
+        configuracion_cache.clear_configuracion_cache()
+        self.cfg = ConfiguracionFacturacion.objects.create(prefijo_factura='FAC', numero_factura=1)
+        self.empresa = ConfiguracionEmpresa.objects.create(
+            tipo_identificacion='NIT',
+            identificacion='900123456',
+            dv='1',
+            tipo_persona='Persona jurídica',
+            razon_social='Empresa Cache',
+            regimen='RÉGIMEN COMÚN',
+            direccion='Calle 1',
+            ciudad='MAGDALENA',
+            municipio='SANTA MARTA',
+            telefono='3000000',
+        )
+
+    def test_lecturas_repetidas_no_consultan_la_bd(self):
+        primera = configuracion_cache.get_configuracion_facturacion()
+        configuracion_cache.get_configuracion_empresa()
+        with self.assertNumQueries(0):
+            segunda = configuracion_cache.get_configuracion_facturacion()
+            empresa = configuracion_cache.get_configuracion_empresa()
+            configuracion_cache.get_numeracion_local()
+        self.assertIs(primera, segunda)
+        self.assertEqual(segunda.pk, self.cfg.pk)
+        self.assertEqual(empresa.razon_social, 'Empresa Cache')
+
+    def test_vista_inmutable(self):
+        vista = configuracion_cache.get_configuracion_facturacion()
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            vista.prefijo_factura = 'OTRO'
+
+    def test_guardar_invalida_en_el_mismo_proceso(self):
+        self.assertEqual(configuracion_cache.get_configuracion_facturacion().prefijo_factura, 'FAC')
+        self.cfg.prefijo_factura = 'FCX'
+        self.cfg.save(update_fields=['prefijo_factura'])
+        self.assertEqual(configuracion_cache.get_configuracion_facturacion().prefijo_factura, 'FCX')
+
+    def test_otro_proceso_se_detecta_por_version(self):
+        self.assertEqual(configuracion_cache.get_configuracion_empresa().telefono, '3000000')
+        # Simula otro worker: cambia la fila y sube el sello sin pasar por las signals de este proceso.
+        ConfiguracionEmpresa.objects.filter(pk=self.empresa.pk).update(telefono='3111111')
+        VersionConfiguracion.objects.filter(clave=configuracion_cache.CLAVE_EMPRESA).update(version=999)
+        self.assertEqual(configuracion_cache.get_configuracion_empresa().telefono, '3000000')
+
+        configuracion_cache._checked_at = float('-inf')
+        self.assertEqual(configuracion_cache.get_configuracion_empresa().telefono, '3111111')
+
+    def test_listado_usa_la_configuracion_cacheada(self):
+        user = get_user_model().objects.create_user(username='cfg-cache', password='1234')
+        client = APIClient()
+        client.force_authenticate(user)
+        configuracion_cache.get_configuracion_empresa()
+        with self.assertNumQueries(0):
+            response = client.get('/api/configuracion-empresa/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['razon_social'], 'Empresa Cache')
@@ -25,7 +25,9 @@ from .serializers import (
     ImpuestoSerializer,
     AuditoriaSerializer,
 )
+from apps.core.services.configuracion_cache import get_configuracion_empresa, get_configuracion_facturacion
 from apps.facturacion.services.consecutivo_service import resolve_electronic_numbering_range_id
+from apps.ventas.services.consecutivos import ultimos_consecutivos_cotizacion_remision
 
 logger = logging.getLogger(__name__)
 TECHNICAL_DOCUMENT_CODES = (
@@ -49,23 +51,25 @@ class ConfiguracionEmpresaViewSet(viewsets.ModelViewSet):
         return [IsAuthenticated()]
 
     def list(self, request, *args, **kwargs):
-        configuracion, _ = ConfiguracionEmpresa.objects.get_or_create(
-            id=1,
-            defaults={
-                'tipo_identificacion': 'NIT',
-                'identificacion': '91068915',
-                'dv': '8',
-                'tipo_persona': 'Persona natural',
-                'razon_social': 'MOTOREPUESTOS LAS AFRICANAS',
-                'regimen': 'RÉGIMEN COMÚN',
-                'direccion': 'CALLE 6 # 12A-45 GAIRA',
-                'ciudad': 'MAGDALENA',
-                'municipio': 'SANTA MARTA',
-                'telefono': '54350548',
-                'sitio_web': '',
-                'correo': '',
-            },
-        )
+        configuracion = get_configuracion_empresa()
+        if configuracion is None:
+            configuracion, _ = ConfiguracionEmpresa.objects.get_or_create(
+                id=1,
+                defaults={
+                    'tipo_identificacion': 'NIT',
+                    'identificacion': '91068915',
+                    'dv': '8',
+                    'tipo_persona': 'Persona natural',
+                    'razon_social': 'MOTOREPUESTOS LAS AFRICANAS',
+                    'regimen': 'RÉGIMEN COMÚN',
+                    'direccion': 'CALLE 6 # 12A-45 GAIRA',
+                    'ciudad': 'MAGDALENA',
+                    'municipio': 'SANTA MARTA',
+                    'telefono': '54350548',
+                    'sitio_web': '',
+                    'correo': '',
+                },
+            )
         serializer = self.get_serializer([configuracion], many=True)
         return Response(serializer.data)
 
@@ -75,97 +79,105 @@ class ConfiguracionFacturacionViewSet(viewsets.ModelViewSet):
     serializer_class = ConfiguracionFacturacionSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_context(self):
+        # Consecutivos de cotización/remisión leídos una vez por request, no por cada serialización.
+        context = super().get_serializer_context()
+        context['consecutivos'] = ultimos_consecutivos_cotizacion_remision()
+        return context
+
     def list(self, request, *args, **kwargs):
-        configuracion, _ = ConfiguracionFacturacion.objects.get_or_create(
-            id=1,
-            defaults={
-                'prefijo_factura': 'FAC',
-                'numero_factura': 1,
-                'prefijo_remision': '',
-                'numero_remision': 1,
-                'prefijo_cotizacion': 'COT',
-                'numero_cotizacion': 1,
-                'resolucion': '',
-                'ambiente_factus': 'SANDBOX',
-                'factus_numbering_range_id_factura_venta': None,
-                'factus_numbering_range_id_nota_credito': None,
-                'factus_numbering_range_id_nota_debito': None,
-                'factus_numbering_range_id_documento_soporte': None,
-                'factus_numbering_range_id_nota_ajuste_documento_soporte': None,
-                'prefijo_factura_electronica': '',
-                'factus_factura_venta_document_code': '',
-                'factus_factura_venta_range_name': '',
-                'factus_factura_venta_range_prefix': '',
-                'factus_factura_venta_resolution_number': '',
-                'factus_factura_venta_range_from': None,
-                'factus_factura_venta_range_to': None,
-                'factus_factura_venta_valid_from': None,
-                'factus_factura_venta_valid_to': None,
-                'factus_factura_venta_environment': '',
-                'factus_factura_venta_current': None,
-                'factus_factura_venta_is_valid': False,
-                'factus_factura_venta_last_sync_at': None,
-                'factus_nota_credito_document_code': '',
-                'factus_nota_credito_range_name': '',
-                'factus_nota_credito_range_prefix': '',
-                'factus_nota_credito_resolution_number': '',
-                'factus_nota_credito_range_from': None,
-                'factus_nota_credito_range_to': None,
-                'factus_nota_credito_valid_from': None,
-                'factus_nota_credito_valid_to': None,
-                'factus_nota_credito_environment': '',
-                'factus_nota_credito_current': None,
-                'factus_nota_credito_is_valid': False,
-                'factus_nota_credito_last_sync_at': None,
-                'factus_nota_debito_document_code': '',
-                'factus_nota_debito_range_name': '',
-                'factus_nota_debito_range_prefix': '',
-                'factus_nota_debito_resolution_number': '',
-                'factus_nota_debito_range_from': None,
-                'factus_nota_debito_range_to': None,
-                'factus_nota_debito_valid_from': None,
-                'factus_nota_debito_valid_to': None,
-                'factus_nota_debito_environment': '',
-                'factus_nota_debito_current': None,
-                'factus_nota_debito_is_valid': False,
-                'factus_nota_debito_last_sync_at': None,
-                'factus_documento_soporte_document_code': '',
-                'factus_documento_soporte_range_name': '',
-                'factus_documento_soporte_range_prefix': '',
-                'factus_documento_soporte_resolution_number': '',
-                'factus_documento_soporte_range_from': None,
-                'factus_documento_soporte_range_to': None,
-                'factus_documento_soporte_valid_from': None,
-                'factus_documento_soporte_valid_to': None,
-                'factus_documento_soporte_environment': '',
-                'factus_documento_soporte_current': None,
-                'factus_documento_soporte_is_valid': False,
-                'factus_documento_soporte_last_sync_at': None,
-                'factus_nota_ajuste_documento_soporte_document_code': '',
-                'factus_nota_ajuste_documento_soporte_range_name': '',
-                'factus_nota_ajuste_documento_soporte_range_prefix': '',
-                'factus_nota_ajuste_documento_soporte_resolution_number': '',
-                'factus_nota_ajuste_documento_soporte_range_from': None,
-                'factus_nota_ajuste_documento_soporte_range_to': None,
-                'factus_nota_ajuste_documento_soporte_valid_from': None,
-                'factus_nota_ajuste_documento_soporte_valid_to': None,
-                'factus_nota_ajuste_documento_soporte_environment': '',
-                'factus_nota_ajuste_documento_soporte_current': None,
-                'factus_nota_ajuste_documento_soporte_is_valid': False,
-                'factus_nota_ajuste_documento_soporte_last_sync_at': None,
-                'modo_operacion_electronica': 'FACTUS_MANAGED',
-                'permitir_cache_metadatos_factus': True,
-                'notas_factura': '',
-                'plantilla_factura_carta': '',
-                'plantilla_factura_tirilla': '',
-                'plantilla_remision_carta': '',
-                'plantilla_remision_tirilla': '',
-                'plantilla_nota_credito_carta': '',
-                'plantilla_nota_credito_tirilla': '',
-                'redondeo_caja_efectivo': True,
-                'redondeo_caja_incremento': 100,
-            },
-        )
+        configuracion = get_configuracion_facturacion()
+        if configuracion is None:
+            configuracion, _ = ConfiguracionFacturacion.objects.get_or_create(
+                id=1,
+                defaults={
+                    'prefijo_factura': 'FAC',
+                    'numero_factura': 1,
+                    'prefijo_remision': '',
+                    'numero_remision': 1,
+                    'prefijo_cotizacion': 'COT',
+                    'numero_cotizacion': 1,
+                    'resolucion': '',
+                    'ambiente_factus': 'SANDBOX',
+                    'factus_numbering_range_id_factura_venta': None,
+                    'factus_numbering_range_id_nota_credito': None,
+                    'factus_numbering_range_id_nota_debito': None,
+                    'factus_numbering_range_id_documento_soporte': None,
+                    'factus_numbering_range_id_nota_ajuste_documento_soporte': None,
+                    'prefijo_factura_electronica': '',
+                    'factus_factura_venta_document_code': '',
+                    'factus_factura_venta_range_name': '',
+                    'factus_factura_venta_range_prefix': '',
+                    'factus_factura_venta_resolution_number': '',
+                    'factus_factura_venta_range_from': None,
+                    'factus_factura_venta_range_to': None,
+                    'factus_factura_venta_valid_from': None,
+                    'factus_factura_venta_valid_to': None,
+                    'factus_factura_venta_environment': '',
+                    'factus_factura_venta_current': None,
+                    'factus_factura_venta_is_valid': False,
+                    'factus_factura_venta_last_sync_at': None,
+                    'factus_nota_credito_document_code': '',
+                    'factus_nota_credito_range_name': '',
+                    'factus_nota_credito_range_prefix': '',
+                    'factus_nota_credito_resolution_number': '',
+                    'factus_nota_credito_range_from': None,
+                    'factus_nota_credito_range_to': None,
+                    'factus_nota_credito_valid_from': None,
+                    'factus_nota_credito_valid_to': None,
+                    'factus_nota_credito_environment': '',
+                    'factus_nota_credito_current': None,
+                    'factus_nota_credito_is_valid': False,
+                    'factus_nota_credito_last_sync_at': None,
+                    'factus_nota_debito_document_code': '',
+                    'factus_nota_debito_range_name': '',
+                    'factus_nota_debito_range_prefix': '',
+                    'factus_nota_debito_resolution_number': '',
+                    'factus_nota_debito_range_from': None,
+                    'factus_nota_debito_range_to': None,
+                    'factus_nota_debito_valid_from': None,
+                    'factus_nota_debito_valid_to': None,
+                    'factus_nota_debito_environment': '',
+                    'factus_nota_debito_current': None,
+                    'factus_nota_debito_is_valid': False,
+                    'factus_nota_debito_last_sync_at': None,
+                    'factus_documento_soporte_document_code': '',
+                    'factus_documento_soporte_range_name': '',
+                    'factus_documento_soporte_range_prefix': '',
+                    'factus_documento_soporte_resolution_number': '',
+                    'factus_documento_soporte_range_from': None,
+                    'factus_documento_soporte_range_to': None,
+                    'factus_documento_soporte_valid_from': None,
+                    'factus_documento_soporte_valid_to': None,
+                    'factus_documento_soporte_environment': '',
+                    'factus_documento_soporte_current': None,
+                    'factus_documento_soporte_is_valid': False,
+                    'factus_documento_soporte_last_sync_at': None,
+                    'factus_nota_ajuste_documento_soporte_document_code': '',
+                    'factus_nota_ajuste_documento_soporte_range_name': '',
+                    'factus_nota_ajuste_documento_soporte_range_prefix': '',
+                    'factus_nota_ajuste_documento_soporte_resolution_number': '',
+                    'factus_nota_ajuste_documento_soporte_range_from': None,
+                    'factus_nota_ajuste_documento_soporte_range_to': None,
+                    'factus_nota_ajuste_documento_soporte_valid_from': None,
+                    'factus_nota_ajuste_documento_soporte_valid_to': None,
+                    'factus_nota_ajuste_documento_soporte_environment': '',
+                    'factus_nota_ajuste_documento_soporte_current': None,
+                    'factus_nota_ajuste_documento_soporte_is_valid': False,
+                    'factus_nota_ajuste_documento_soporte_last_sync_at': None,
+                    'modo_operacion_electronica': 'FACTUS_MANAGED',
+                    'permitir_cache_metadatos_factus': True,
+                    'notas_factura': '',
+                    'plantilla_factura_carta': '',
+                    'plantilla_factura_tirilla': '',
+                    'plantilla_remision_carta': '',
+                    'plantilla_remision_tirilla': '',
+                    'plantilla_nota_credito_carta': '',
+                    'plantilla_nota_credito_tirilla': '',
+                    'redondeo_caja_efectivo': True,
+                    'redondeo_caja_incremento': 100,
+                },
+            )
         should_refresh = any(
             not getattr(configuracion, f'factus_{doc.lower()}_is_valid', False)
             for doc in ['factura_venta', 'nota_credito', 'nota_debito', 'documento_soporte', 'nota_ajuste_documento_soporte']
@@ -174,7 +186,7 @@ class ConfiguracionFacturacionViewSet(viewsets.ModelViewSet):
             try:
                 for document_code in TECHNICAL_DOCUMENT_CODES:
                     resolve_electronic_numbering_range_id(document_code, force_refresh=True)
-                configuracion.refresh_from_db()
+                configuracion = get_configuracion_facturacion() or configuracion
             except Exception as exc:
                 logger.warning(
                     'core.configuracion_facturacion.refresh_ranges_failed config_id=%s detail=%s',
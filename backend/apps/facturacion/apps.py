@@ -7,3 +7,6 @@ class FacturacionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.facturacion'
     verbose_name = 'Facturación electrónica'
+
+    def ready(self):
+        import apps.facturacion.signals  # noqa: F401
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.facturacion.services.factura_artifact_jobs import (
+    default_batch_size,
+    default_workers,
+    process_pending_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de artefactos post-emisión (QR, XML, PDF, ZIP de correo, PDF Carta y correo Factus).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesa los trabajos listos y termina.')
+        parser.add_argument('--workers', type=int, default=None, help='Descargas concurrentes por lote.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Trabajos reclamados por lote.')
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando la cola está vacía.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or default_workers()
+        batch_size = options['batch_size'] or default_batch_size()
+        once = options['once']
+        totals: dict[str, int] = {}
+
+        try:
+            while True:
+                summary = process_pending_jobs(limit=batch_size, workers=workers)
+                for key, value in summary.items():
+                    totals[key] = totals.get(key, 0) + value
+                if summary['claimed']:
+                    self.stdout.write(f'Lote procesado: {summary}')
+                    continue
+                if once:
+                    break
+                time.sleep(options['sleep'])
+                # Proceso de larga vida: descarta conexiones caídas o vencidas entre lotes.
+                close_old_connections()
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Procesamiento de artefactos finalizado: {totals}'))
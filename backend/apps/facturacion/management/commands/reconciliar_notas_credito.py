@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.facturacion.services.credit_note_reconciler import default_batch_size, reconcile_due_credit_notes
+
+
+class Command(BaseCommand):
+    help = 'Concilia en segundo plano notas crédito pendientes contra Factus (lotes con backoff).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Concilia las notas vencidas y termina.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Notas conciliadas por lote.')
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Segundos de espera cuando no hay notas por conciliar.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or default_batch_size()
+        once = options['once']
+        totals: dict[str, int] = {}
+
+        try:
+            while True:
+                summary = reconcile_due_credit_notes(limit=batch_size)
+                for key, value in summary.items():
+                    totals[key] = totals.get(key, 0) + value
+                if summary['claimed']:
+                    self.stdout.write(f'Lote conciliado: {summary}')
+                    continue
+                if once:
+                    break
+                time.sleep(options['sleep'])
+                # Proceso de larga vida: descarta conexiones caídas o vencidas entre lotes.
+                close_old_connections()
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Conciliación de notas crédito finalizada: {totals}'))
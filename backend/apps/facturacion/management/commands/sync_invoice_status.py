@@ -1,31 +1,71 @@
-from django.core.management.base import BaseCommand
+from datetime import datetime, time
+
+from decouple import config
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
 
 from apps.facturacion.models import FacturaElectronica
-from apps.facturacion.services import FacturaNoEncontrada, FactusConsultaError, sync_invoice_status
+from apps.facturacion.services import FactusConsultaError, sync_invoice_statuses
+
+ESTADOS_PENDIENTES = ['PENDIENTE_REINTENTO', 'ERROR_INTEGRACION', 'ERROR_PERSISTENCIA']
+
+
+def _parse_fecha(value: str) -> datetime:
+    try:
+        fecha = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as exc:
+        raise CommandError(f'Fecha inválida "{value}", use YYYY-MM-DD.') from exc
+    return timezone.make_aware(datetime.combine(fecha, time.min), timezone.get_current_timezone())
 
 
 class Command(BaseCommand):
-    help = 'Sincroniza estado DIAN de facturas pendientes contra Factus.'
+    help = 'Sincroniza estado DIAN de facturas pendientes contra Factus (listado por lotes y consultas concurrentes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=config('FACTUS_SYNC_CONCURRENCY', default=4, cast=int),
+            help='Consultas simultáneas a Factus (no debe superar FACTUS_HTTP_POOL_MAXSIZE).',
+        )
+        parser.add_argument('--limit', type=int, help='Máximo de facturas a sincronizar (las más antiguas primero).')
+        parser.add_argument('--since', help='Sólo facturas creadas desde esta fecha (YYYY-MM-DD).')
 
     def handle(self, *args, **options):
-        pendientes = FacturaElectronica.objects.filter(
-            estado_electronico__in=['PENDIENTE_REINTENTO', 'ERROR_INTEGRACION', 'ERROR_PERSISTENCIA']
-        ).values_list(
-            'number',
-            flat=True,
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency debe ser mayor o igual a 1.')
+        pendientes = (
+            FacturaElectronica.objects.filter(estado_electronico__in=ESTADOS_PENDIENTES)
+            .exclude(number__isnull=True)
+            .exclude(number='')
+            .order_by('created_at', 'id')
+        )
+        if options['since']:
+            pendientes = pendientes.filter(created_at__gte=_parse_fecha(options['since']))
+        if options['limit']:
+            pendientes = pendientes[: options['limit']]
+        facturas = list(pendientes)
+        self.stdout.write(f'Facturas pendientes: {len(facturas)} (concurrency={concurrency})')
+
+        paso = max(1, len(facturas) // 10)
+
+        def progreso(hechas: int, total: int) -> None:
+            if hechas % paso == 0 or hechas == total:
+                self.stdout.write(f'  detalle {hechas}/{total}')
+
+        try:
+            resumen = sync_invoice_statuses(facturas, concurrency=concurrency, progress=progreso)
+        except FactusConsultaError as exc:
+            raise CommandError(str(exc)) from exc
+
+        for number, error in resumen.errors:
+            self.stderr.write(self.style.WARNING(f'{number}: {error}'))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Sincronización finalizada. total={resumen.total} actualizadas={resumen.updated} '
+                f'sin_cambios={resumen.unchanged} no_encontradas={resumen.not_found} failed={resumen.failed} '
+                f'llamadas_listado={resumen.list_calls} llamadas_detalle={resumen.detail_calls} '
+                f'tiempo={resumen.elapsed_seconds:.1f}s ({resumen.per_second:.1f} facturas/s)'
+            )
         )
-        total = 0
-        ok = 0
-        failed = 0
-
-        for number in pendientes:
-            total += 1
-            try:
-                factura = sync_invoice_status(number)
-                ok += 1
-                self.stdout.write(self.style.SUCCESS(f'{number}: {factura.estado_electronico}'))
-            except (FacturaNoEncontrada, FactusConsultaError) as exc:
-                failed += 1
-                self.stderr.write(self.style.WARNING(f'{number}: {exc}'))
-
-        self.stdout.write(f'Sincronización finalizada. total={total} ok={ok} failed={failed}')
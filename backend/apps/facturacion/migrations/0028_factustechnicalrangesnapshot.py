@@ -0,0 +1,48 @@
+# Generated by Django 5.1.5 on 2026-10-17 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0027_facturaelectronica_factus_authorized_from_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FactusTechnicalRangeSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("environment", models.CharField(max_length=20)),
+                ("factus_id", models.PositiveIntegerField()),
+                (
+                    "document_code",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                ("prefix", models.CharField(blank=True, default="", max_length=20)),
+                ("is_associated_to_software", models.BooleanField(default=True)),
+                ("raw_payload", models.JSONField(blank=True, default=dict)),
+                ("synced_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Factus Technical Range Snapshot",
+                "verbose_name_plural": "Factus Technical Range Snapshots",
+                "db_table": "facturacion_factus_technical_range_snapshots",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("environment", "factus_id"),
+                        name="uq_factus_tech_range_env_id",
+                    )
+                ],
+            },
+        ),
+    ]
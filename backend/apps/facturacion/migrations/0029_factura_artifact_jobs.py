@@ -0,0 +1,108 @@
+# Generated by Django 5.1.5 on 2026-10-17 02:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0028_factustechnicalrangesnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FacturaArtifactJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("QR", "QR DIAN"),
+                            ("XML", "XML"),
+                            ("PDF", "PDF"),
+                            ("EMAIL_ZIP", "ZIP de correo"),
+                            ("PDF_UPLOAD", "Carga PDF personalizado"),
+                            ("EMAIL", "Envío de correo Factus"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "depends_on",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("QR", "QR DIAN"),
+                            ("XML", "XML"),
+                            ("PDF", "PDF"),
+                            ("EMAIL_ZIP", "ZIP de correo"),
+                            ("PDF_UPLOAD", "Carga PDF personalizado"),
+                            ("EMAIL", "Envío de correo Factus"),
+                        ],
+                        default="",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDIENTE", "Pendiente"),
+                            ("EN_PROCESO", "En proceso"),
+                            ("COMPLETADO", "Completado"),
+                            ("FALLIDO", "Fallido"),
+                        ],
+                        default="PENDIENTE",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "factura",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="artifact_jobs",
+                        to="facturacion.facturaelectronica",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trabajo de artefacto de factura",
+                "verbose_name_plural": "Trabajos de artefactos de factura",
+                "db_table": "facturacion_factura_artifact_jobs",
+                "ordering": ["next_attempt_at", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="fact_artjob_status_next_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("factura", "kind"),
+                        name="uniq_factura_artifact_job_kind",
+                    )
+                ],
+            },
+        ),
+    ]
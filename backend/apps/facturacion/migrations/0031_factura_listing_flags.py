@@ -0,0 +1,125 @@
+# Generated by Django 5.1.5 on 2026-10-17 03:15
+
+import re
+
+from django.db import migrations, models
+
+# Copia congelada de `apps.facturacion.services.public_invoice_url` a la fecha de
+# esta migración: el backfill no debe cambiar si ese servicio evoluciona.
+DOCUMENT_CONCILIATION_ERROR_CODE = "ERROR_CONCILIACION_DOCUMENTAL"
+URL_PATTERN = re.compile(r'https?://[^\s<>"]+')
+
+
+def _as_dict(value):
+    return value if isinstance(value, dict) else {}
+
+
+def _has_documental_inconsistency(factura):
+    codigo_error = str(factura.codigo_error or "").strip()
+    mensaje_error = str(factura.mensaje_error or "").strip()
+    return (
+        codigo_error == DOCUMENT_CONCILIATION_ERROR_CODE
+        or DOCUMENT_CONCILIATION_ERROR_CODE in mensaje_error
+    )
+
+
+def _resolve_public_url(factura, inconsistente):
+    status = str(factura.estado_electronico or "").strip()
+    if status not in {"ACEPTADA", "ACEPTADA_CON_OBSERVACIONES"} or inconsistente:
+        return ""
+    public_url = str(factura.public_url or "").strip()
+    if public_url:
+        return public_url
+    response_json = _as_dict(factura.response_json)
+    final_fields = _as_dict(response_json.get("final_fields", {}))
+    data = _as_dict(response_json.get("data", {}))
+    bill = _as_dict(data.get("bill", {}))
+    for candidate in (
+        final_fields.get("public_url", ""),
+        bill.get("public_url", ""),
+        data.get("public_url", ""),
+        response_json.get("public_url", ""),
+    ):
+        value = str(candidate or "").strip()
+        if value:
+            return value
+    for candidate in (
+        factura.qr_data,
+        final_fields.get("qr", ""),
+        bill.get("qr", ""),
+        data.get("qr", ""),
+    ):
+        match = URL_PATTERN.search(str(candidate or "").strip())
+        if match:
+            return match.group(0).strip()
+    return ""
+
+
+def refresh_listing_flags(factura):
+    factura.documento_inconsistente = _has_documental_inconsistency(factura)
+    factura.resolved_public_url = _resolve_public_url(
+        factura, factura.documento_inconsistente
+    )[:2048]
+    bill_errors = _as_dict(factura.response_json).get("bill_errors", [])
+    factura.bill_errors_count = len(bill_errors) if isinstance(bill_errors, list) else 0
+
+
+def backfill_listing_flags(apps, schema_editor):
+    Factura = apps.get_model("facturacion", "FacturaElectronica")
+    pending = []
+    for factura in Factura.objects.all().iterator(chunk_size=500):
+        refresh_listing_flags(factura)
+        pending.append(factura)
+        if len(pending) >= 500:
+            Factura.objects.bulk_update(
+                pending,
+                ["resolved_public_url", "documento_inconsistente", "bill_errors_count"],
+            )
+            pending = []
+    if pending:
+        Factura.objects.bulk_update(
+            pending,
+            ["resolved_public_url", "documento_inconsistente", "bill_errors_count"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0030_nota_credito_deferred_reconciliation"),
+        ("ventas", "0010_alter_venta_efectivo_recibido_alter_venta_cambio"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facturaelectronica",
+            name="bill_errors_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Cantidad de bill_errors Factus"
+            ),
+        ),
+        migrations.AddField(
+            model_name="facturaelectronica",
+            name="documento_inconsistente",
+            field=models.BooleanField(
+                default=False, verbose_name="Inconsistencia documental"
+            ),
+        ),
+        migrations.AddField(
+            model_name="facturaelectronica",
+            name="resolved_public_url",
+            field=models.URLField(
+                blank=True,
+                default="",
+                max_length=2048,
+                verbose_name="URL pública resuelta",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="facturaelectronica",
+            index=models.Index(
+                fields=["-created_at", "id"], name="fact_elec_created_id_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_listing_flags, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 """Modelos de facturación electrónica integrados con Factus."""
 
 from django.db import models
+from django.utils import timezone
 
 
 class FacturaElectronica(models.Model):
@@ -82,6 +83,10 @@ class FacturaElectronica(models.Model):
     correo_enviado_at = models.DateTimeField(null=True, blank=True, verbose_name='Fecha envío de correo')
     ultimo_error_correo = models.TextField(null=True, blank=True, verbose_name='Último error de correo')
     ultimo_error_pdf = models.TextField(null=True, blank=True, verbose_name='Último error PDF')
+    # Derivados precalculados en pre_save para que el listado no lea `response_json`.
+    resolved_public_url = models.URLField(max_length=2048, blank=True, default='', verbose_name='URL pública resuelta')
+    documento_inconsistente = models.BooleanField(default=False, verbose_name='Inconsistencia documental')
+    bill_errors_count = models.PositiveIntegerField(default=0, verbose_name='Cantidad de bill_errors Factus')
     codigo_error = models.CharField(max_length=50, null=True, blank=True, verbose_name='Código de error DIAN')
     mensaje_error = models.TextField(null=True, blank=True, verbose_name='Mensaje de error DIAN')
     observaciones_json = models.JSONField(default=list, blank=True, verbose_name='Observaciones Factus normalizadas')
@@ -112,8 +117,15 @@ class FacturaElectronica(models.Model):
             models.Index(fields=['estado_electronico', '-created_at']),
             models.Index(fields=['number', '-created_at']),
             models.Index(fields=['uuid']),
+            models.Index(fields=['-created_at', 'id'], name='fact_elec_created_id_idx'),
         ]
 
+    # Campos de los que se derivan `resolved_public_url`, `documento_inconsistente` y `bill_errors_count`.
+    LISTING_SOURCE_FIELDS = frozenset(
+        {'estado_electronico', 'status', 'codigo_error', 'mensaje_error', 'public_url', 'qr_data', 'response_json'}
+    )
+    LISTING_DERIVED_FIELDS = ('resolved_public_url', 'documento_inconsistente', 'bill_errors_count')
+
     def __str__(self) -> str:
         return f'{self.number} - {self.cufe}'
 
@@ -138,6 +150,9 @@ class FacturaElectronica(models.Model):
         else:
             self.estado_electronico = 'PENDIENTE_REINTENTO'
             self.status = self.estado_electronico
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.LISTING_SOURCE_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = {*update_fields, *self.LISTING_DERIVED_FIELDS}
         super().save(*args, **kwargs)
 
     @property
@@ -156,6 +171,66 @@ class FacturaElectronica(models.Model):
         }
 
 
+class FacturaArtifactJob(models.Model):
+    """Trabajo durable de post-emisión (XML/PDF/QR/ZIP/correo) procesado fuera del request."""
+
+    KIND_QR = 'QR'
+    KIND_XML = 'XML'
+    KIND_PDF = 'PDF'
+    KIND_EMAIL_ZIP = 'EMAIL_ZIP'
+    KIND_PDF_UPLOAD = 'PDF_UPLOAD'
+    KIND_EMAIL = 'EMAIL'
+    KIND_CHOICES = [
+        (KIND_QR, 'QR DIAN'),
+        (KIND_XML, 'XML'),
+        (KIND_PDF, 'PDF'),
+        (KIND_EMAIL_ZIP, 'ZIP de correo'),
+        (KIND_PDF_UPLOAD, 'Carga PDF personalizado'),
+        (KIND_EMAIL, 'Envío de correo Factus'),
+    ]
+    STATUS_PENDIENTE = 'PENDIENTE'
+    STATUS_EN_PROCESO = 'EN_PROCESO'
+    STATUS_COMPLETADO = 'COMPLETADO'
+    STATUS_FALLIDO = 'FALLIDO'
+    STATUS_CHOICES = [
+        (STATUS_PENDIENTE, 'Pendiente'),
+        (STATUS_EN_PROCESO, 'En proceso'),
+        (STATUS_COMPLETADO, 'Completado'),
+        (STATUS_FALLIDO, 'Fallido'),
+    ]
+
+    factura = models.ForeignKey(
+        FacturaElectronica,
+        on_delete=models.CASCADE,
+        related_name='artifact_jobs',
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    depends_on = models.CharField(max_length=20, choices=KIND_CHOICES, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDIENTE)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'facturacion_factura_artifact_jobs'
+        verbose_name = 'Trabajo de artefacto de factura'
+        verbose_name_plural = 'Trabajos de artefactos de factura'
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='fact_artjob_status_next_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['factura', 'kind'], name='uniq_factura_artifact_job_kind'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.factura_id} {self.kind} ({self.status})'
+
+
 class NotaCreditoElectronica(models.Model):
     """Representa una nota crédito electrónica emitida en Factus para una factura existente."""
     NOTE_TYPE_CHOICES = [
@@ -229,6 +304,17 @@ class NotaCreditoElectronica(models.Model):
     remote_identifier = models.CharField(max_length=150, blank=True, default='', db_index=True)
     last_remote_error = models.TextField(blank=True, default='')
     sync_metadata = models.JSONField(default=dict, blank=True)
+    # Conciliación diferida: el reconciliador en segundo plano consulta Factus
+    # cuando `next_sync_at` vence; null = no hay conciliación programada.
+    next_sync_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    sync_attempts = models.PositiveIntegerField(default=0)
+    requested_by = models.ForeignKey(
+        'usuarios.Usuario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notas_credito_solicitadas',
+    )
     deleted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -477,6 +563,29 @@ class FactusNumberingRange(models.Model):
         return f'{self.document} {self.prefix} ({self.resolution_number})'
 
 
+class FactusTechnicalRangeSnapshot(models.Model):
+    """Copia persistida de GET numbering-ranges (caché técnica, una fila por rango y ambiente)."""
+
+    environment = models.CharField(max_length=20)
+    factus_id = models.PositiveIntegerField()
+    document_code = models.CharField(max_length=50, blank=True, default='')
+    prefix = models.CharField(max_length=20, blank=True, default='')
+    is_associated_to_software = models.BooleanField(default=True)
+    raw_payload = models.JSONField(default=dict, blank=True)
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'facturacion_factus_technical_range_snapshots'
+        verbose_name = 'Factus Technical Range Snapshot'
+        verbose_name_plural = 'Factus Technical Range Snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['environment', 'factus_id'], name='uq_factus_tech_range_env_id'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.environment} #{self.factus_id} {self.prefix}'
+
+
 class RemisionNumeracion(models.Model):
     """Configuración local de numeración para remisiones (no depende de Factus)."""
 
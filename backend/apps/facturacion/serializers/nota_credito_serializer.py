@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from django.utils import timezone
 from rest_framework import serializers
 
 from apps.facturacion.models import NotaCreditoDetalle, NotaCreditoElectronica
@@ -67,6 +68,7 @@ class NotaCreditoListSerializer(serializers.ModelSerializer):
     request_numbering_range_id = serializers.SerializerMethodField()
     range_prefix = serializers.SerializerMethodField()
     range_resolution = serializers.SerializerMethodField()
+    sync_age_seconds = serializers.SerializerMethodField()
     detalles = NotaCreditoDetalleSerializer(many=True, read_only=True)
 
     def get_can_sync(self, obj: NotaCreditoElectronica) -> bool:
@@ -81,6 +83,14 @@ class NotaCreditoListSerializer(serializers.ModelSerializer):
             return 'Documento rechazado electrónicamente.'
         return ''
 
+    def get_sync_age_seconds(self, obj: NotaCreditoElectronica) -> int | None:
+        """Antigüedad del último dato confirmado con Factus (``None`` si nunca se sincronizó)."""
+        last_sync = obj.last_sync_at or obj.synchronized_at
+        if last_sync is None:
+            return None
+        now = self.context.get('now') or timezone.now()
+        return max(int((now - last_sync).total_seconds()), 0)
+
     def get_numero(self, obj: NotaCreditoElectronica) -> str:
         return str(obj.number or '').strip()
 
@@ -132,6 +142,8 @@ class NotaCreditoListSerializer(serializers.ModelSerializer):
             'remote_status_raw',
             'synchronized_at',
             'last_sync_at',
+            'sync_age_seconds',
+            'next_sync_at',
             'last_remote_error',
             'remote_identifier',
             'sync_metadata',
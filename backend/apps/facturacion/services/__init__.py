@@ -1,7 +1,12 @@
 """Servicios unificados de facturación electrónica Factus."""
 
 from .facturar_venta import facturar_venta
-from .sync_invoice_status import map_factus_status, sync_invoice_status
+from .sync_invoice_status import (
+    InvoiceStatusSyncSummary,
+    map_factus_status,
+    sync_invoice_status,
+    sync_invoice_statuses,
+)
 from .factus_client import (
     FactusAPIError,
     FactusAuthError,
@@ -16,12 +21,14 @@ from .emitir_nota_credito import emitir_nota_credito
 from .credit_note_workflow import (
     CreditNoteStateError,
     CreditNoteValidationError,
+    build_credit_note_result_meta,
     build_credit_preview,
     create_credit_note,
     sincronizar_nota_credito,
     sync_credit_note,
     sync_credit_note_with_effects,
 )
+from .credit_note_reconciler import reconcile_due_credit_notes
 from .support_document_payload_builder import build_support_document_payload
 from .emitir_documento_soporte import emitir_documento_soporte
 from .support_document_adjustment_payload_builder import build_adjustment_payload
@@ -78,6 +85,8 @@ __all__ = [
     'CreditNoteValidationError',
     'CreditNoteStateError',
     'build_credit_preview',
+    'build_credit_note_result_meta',
+    'reconcile_due_credit_notes',
     'create_credit_note',
     'sincronizar_nota_credito',
     'sync_credit_note',
@@ -89,6 +98,8 @@ __all__ = [
     'facturar_venta',
     'map_factus_status',
     'sync_invoice_status',
+    'sync_invoice_statuses',
+    'InvoiceStatusSyncSummary',
     'sync_numbering_ranges',
     'get_next_invoice_number',
     'DownloadResourceError',
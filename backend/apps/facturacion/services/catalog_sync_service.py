@@ -5,6 +5,7 @@ from __future__ import annotations
 from django.db import transaction
 
 from apps.facturacion.services.factus_client import FactusAPIError, FactusClient
+from apps.facturacion.services.factus_catalog_cache import invalidar_catalogos_factus
 from apps.facturacion.services.factus_catalog_lookup import _bootstrap_minimum_catalogs
 from apps.facturacion_electronica.catalogos.models import (
     DocumentoIdentificacionFactus,
@@ -71,6 +72,8 @@ class CatalogSyncService:
             deactivated = model.objects.exclude(factus_id__in=current_ids).filter(is_active=True).update(
                 is_active=False
             )
+            # El update masivo no dispara signals: se refresca la foto de catálogos explícitamente.
+            invalidar_catalogos_factus()
 
         return {'fetched': len(normalized), 'created': created, 'updated': updated, 'deactivated': deactivated}
 
@@ -2,21 +2,24 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
 import logging
+import threading
 from typing import Any
 
-from django.db import transaction
+from decouple import config
+from django.db import connection, transaction
 from django.utils import timezone
 
 from apps.core.models import ConfiguracionFacturacion
+from apps.core.services.configuracion_cache import get_configuracion_facturacion
 from apps.facturacion.constants import (
     LOCAL_TO_FACTUS_CODE,
     document_matches_local_code,
     normalize_local_document_code,
 )
-from apps.facturacion.models import ConfiguracionDIAN, FactusNumberingRange
+from apps.facturacion.models import ConfiguracionDIAN, FactusNumberingRange, FactusTechnicalRangeSnapshot
 from apps.facturacion.services.factus_client import FactusClient, FactusValidationError
 from apps.facturacion.services.factus_environment import resolve_factus_environment
 
@@ -207,7 +210,7 @@ def _merge_software_association(
     return merged
 
 
-def _get_configured_range_id(configuracion: ConfiguracionFacturacion | None, field_name: str) -> int:
+def _get_configured_range_id(configuracion, field_name: str) -> int:
     if not configuracion or not field_name:
         return 0
     return int(getattr(configuracion, field_name, 0) or 0)
@@ -278,6 +281,125 @@ def _fetch_factus_technical_ranges() -> list[TechnicalRange]:
     return ranges
 
 
+@dataclass(frozen=True)
+class _RangesSnapshot:
+    ranges: tuple[TechnicalRange, ...]
+    fetched_at: datetime
+
+
+_ranges_cache: dict[str, _RangesSnapshot] = {}
+_ranges_cache_lock = threading.Lock()
+_ranges_revalidating: set[str] = set()
+
+
+def _ranges_cache_ttl() -> timedelta:
+    return timedelta(seconds=config('FACTUS_NUMBERING_RANGES_CACHE_TTL', default=600, cast=int))
+
+
+def _ranges_stale_window() -> timedelta:
+    return timedelta(seconds=config('FACTUS_NUMBERING_RANGES_STALE_TTL', default=86400, cast=int))
+
+
+def invalidate_technical_ranges_cache() -> None:
+    """Descarta la copia en memoria; el snapshot persistido se revalida por TTL."""
+    with _ranges_cache_lock:
+        _ranges_cache.clear()
+
+
+def _persist_technical_ranges(snapshot: _RangesSnapshot, *, environment: str) -> None:
+    """Upsert por (ambiente, factus_id); no toca ``FactusNumberingRange`` ni otros ambientes."""
+    rows = {
+        item.factus_id: FactusTechnicalRangeSnapshot(
+            environment=environment,
+            factus_id=item.factus_id,
+            document_code=(item.document_code or item.factus_document_code)[:50],
+            prefix=item.prefix[:20],
+            is_associated_to_software=item.is_associated_to_software,
+            raw_payload=item.raw,
+            synced_at=snapshot.fetched_at,
+        )
+        for item in snapshot.ranges
+        if item.factus_id
+    }
+    with transaction.atomic():
+        FactusTechnicalRangeSnapshot.objects.bulk_create(
+            list(rows.values()),
+            update_conflicts=True,
+            unique_fields=['environment', 'factus_id'],
+            update_fields=['document_code', 'prefix', 'is_associated_to_software', 'raw_payload', 'synced_at'],
+        )
+        FactusTechnicalRangeSnapshot.objects.filter(environment=environment).exclude(factus_id__in=list(rows)).delete()
+
+
+def _load_persisted_technical_ranges(environment: str) -> _RangesSnapshot | None:
+    rows = list(FactusTechnicalRangeSnapshot.objects.filter(environment=environment).order_by('id'))
+    if not rows:
+        return None
+    ranges = tuple(
+        replace(
+            _normalize_technical_range(row.raw_payload or {}, environment=environment),
+            is_associated_to_software=row.is_associated_to_software,
+        )
+        for row in rows
+    )
+    return _RangesSnapshot(ranges=ranges, fetched_at=min(row.synced_at for row in rows))
+
+
+def _refresh_technical_ranges(environment: str) -> _RangesSnapshot:
+    snapshot = _RangesSnapshot(ranges=tuple(_fetch_factus_technical_ranges()), fetched_at=timezone.now())
+    _persist_technical_ranges(snapshot, environment=environment)
+    with _ranges_cache_lock:
+        _ranges_cache[environment] = snapshot
+    return snapshot
+
+
+def _revalidate_in_background(environment: str) -> None:
+    with _ranges_cache_lock:
+        if environment in _ranges_revalidating:
+            return
+        _ranges_revalidating.add(environment)
+
+    def _run() -> None:
+        try:
+            _refresh_technical_ranges(environment)
+        except Exception as exc:
+            logger.warning('facturacion.numbering_ranges.revalidate_failed environment=%s detail=%s', environment, exc)
+        finally:
+            with _ranges_cache_lock:
+                _ranges_revalidating.discard(environment)
+            connection.close()
+
+    threading.Thread(target=_run, name='factus-numbering-ranges-revalidate', daemon=True).start()
+
+
+def get_technical_ranges(*, force_refresh: bool = False) -> list[TechnicalRange]:
+    """Rangos técnicos de Factus con caché read-through (memoria -> BD -> Factus).
+
+    Dentro del TTL se sirven sin red; pasado el TTL y dentro de la ventana de
+    staleness se sirven igual mientras un hilo los revalida. ``force_refresh``
+    sólo debe usarse cuando Factus rechaza el rango enviado.
+    """
+    environment = resolve_factus_environment()
+    if not force_refresh:
+        now = timezone.now()
+        ttl = _ranges_cache_ttl()
+        snapshot = _ranges_cache.get(environment)
+        if snapshot is None or now - snapshot.fetched_at > ttl:
+            persisted = _load_persisted_technical_ranges(environment)
+            if persisted is not None and (snapshot is None or persisted.fetched_at > snapshot.fetched_at):
+                snapshot = persisted
+                with _ranges_cache_lock:
+                    _ranges_cache[environment] = snapshot
+        if snapshot is not None:
+            age = now - snapshot.fetched_at
+            if age <= ttl:
+                return list(snapshot.ranges)
+            if age <= ttl + _ranges_stale_window():
+                _revalidate_in_background(environment)
+                return list(snapshot.ranges)
+    return list(_refresh_technical_ranges(environment).ranges)
+
+
 def _pick_valid_range(
     *,
     ranges: list[TechnicalRange],
@@ -421,7 +543,7 @@ def resolve_electronic_numbering_range_id(document_code: str = 'FACTURA_VENTA',
     2) Auto-resolución desde rangos autorizados en Factus.
     3) Persistencia automática del id válido encontrado.
     """
-    configuracion = ConfiguracionFacturacion.objects.order_by('-id').first()
+    configuracion = get_configuracion_facturacion()
     field_name = _resolve_config_field(document_code)
     configured_id = _get_configured_range_id(configuracion, field_name)
     environment = resolve_factus_environment()
@@ -440,7 +562,22 @@ def resolve_electronic_numbering_range_id(document_code: str = 'FACTURA_VENTA',
             f'No se encontró en Factus un rango autorizado y vigente para {document_code} en el ambiente actual.'
         )
 
-    ranges = _fetch_factus_technical_ranges()
+    ranges = get_technical_ranges(force_refresh=force_refresh)
+    selected_id, discard_reasons = _pick_valid_range(
+        ranges=ranges,
+        document_code=document_code,
+        configured_id=configured_id,
+        environment=environment,
+    )
+    if selected_id <= 0 and not force_refresh:
+        # La copia en caché puede no incluir un rango recién autorizado en Factus.
+        ranges = get_technical_ranges(force_refresh=True)
+        selected_id, discard_reasons = _pick_valid_range(
+            ranges=ranges,
+            document_code=document_code,
+            configured_id=configured_id,
+            environment=environment,
+        )
     for item in ranges:
         logger.info(
             'facturacion.numbering_range.resolve.range_summary id=%s prefix=%s document=%s/%s resolution=%s start_date=%s end_date=%s from=%s to=%s current=%s active=%s expired=%s environment=%s associated_to_software=%s',
@@ -459,12 +596,6 @@ def resolve_electronic_numbering_range_id(document_code: str = 'FACTURA_VENTA',
             item.environment,
             item.is_associated_to_software,
         )
-    selected_id, discard_reasons = _pick_valid_range(
-        ranges=ranges,
-        document_code=document_code,
-        configured_id=configured_id,
-        environment=environment,
-    )
 
     logger.info(
         'facturacion.numbering_range.resolve.candidates document_code=%s environment=%s total=%s selected_id=%s discard_reasons=%s',
@@ -0,0 +1,180 @@
+"""Conciliación diferida de notas crédito pendientes contra Factus.
+
+Los requests nunca esperan a DIAN: dejan la nota en PENDIENTE con
+``next_sync_at`` y este reconciliador (comando ``reconciliar_notas_credito``)
+consulta Factus con backoff. Cada lote se resuelve con ``list_credit_notes``
+filtrado por el prefijo común de ``reference_code`` (paginado hasta encontrar
+todas las notas); la nota que no aparece se consulta individualmente.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any
+
+from decouple import config
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.facturacion.models import NotaCreditoElectronica
+from apps.facturacion.services.credit_note_workflow import (
+    RECONCILABLE_LOCAL_STATES,
+    _apply_business_effects_if_needed,
+    _exact_match_remote_candidate,
+    _list_candidates,
+    _reconcile_delay,
+    _update_note_from_remote,
+    max_reconcile_attempts,
+    reconcile_lease,
+    sincronizar_nota_credito,
+)
+from apps.facturacion.services.factus_client import FactusAPIError, FactusAuthError, FactusClient
+
+logger = logging.getLogger(__name__)
+
+# Prefijo mínimo para que el filtro por reference_code acote de verdad el listado.
+MIN_BATCH_REFERENCE_PREFIX = len('NC-')
+
+
+def default_batch_size() -> int:
+    return config('FACTUS_CREDIT_NOTE_RECONCILE_BATCH_SIZE', default=25, cast=int)
+
+
+def _max_list_pages() -> int:
+    return config('FACTUS_CREDIT_NOTE_RECONCILE_MAX_LIST_PAGES', default=5, cast=int)
+
+
+def claim_due_notes(limit: int) -> list[NotaCreditoElectronica]:
+    """Reclama notas vencidas; el lease evita que otro worker las tome a la vez.
+
+    También toma las pendientes sin conciliación programada (anteriores a la
+    conciliación diferida) mientras les queden intentos. Una nota recién creada
+    nace con ``next_sync_at`` a un lease de distancia, así que no se reclama
+    mientras su POST a Factus sigue en curso.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            NotaCreditoElectronica.objects.select_for_update(skip_locked=True)
+            .filter(estado_local__in=RECONCILABLE_LOCAL_STATES)
+            .filter(
+                Q(next_sync_at__lte=now)
+                | Q(next_sync_at__isnull=True, sync_attempts__lt=max_reconcile_attempts())
+            )
+            .order_by(F('next_sync_at').asc(nulls_first=True), 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        NotaCreditoElectronica.objects.filter(pk__in=ids).update(
+            next_sync_at=now + reconcile_lease(),
+            sync_attempts=F('sync_attempts') + 1,
+            updated_at=now,
+        )
+    return list(
+        NotaCreditoElectronica.objects.select_related('factura__venta__vendedor', 'requested_by')
+        .filter(pk__in=ids)
+        .order_by('next_sync_at', 'id')
+    )
+
+
+def _listed_page(response: dict[str, Any]) -> tuple[list[dict[str, Any]], int]:
+    data = response.get('data', response) if isinstance(response, dict) else {}
+    pagination = data.get('pagination') if isinstance(data, dict) else None
+    last_page = int((pagination or {}).get('last_page') or 1) if isinstance(pagination, dict) else 1
+    return _list_candidates(response), last_page
+
+
+def _fetch_batch_candidates(client: FactusClient, notas: list[NotaCreditoElectronica]) -> list[dict[str, Any]]:
+    references = {str(nota.reference_code or '') for nota in notas if nota.reference_code}
+    prefix = os.path.commonprefix(sorted(references)) if references else ''
+    if len(prefix) < MIN_BATCH_REFERENCE_PREFIX:
+        prefix = 'NC-'
+    candidates: list[dict[str, Any]] = []
+    pending = set(references)
+    page = last_page = 1
+    while pending and page <= min(last_page, _max_list_pages()):
+        try:
+            items, last_page = _listed_page(client.list_credit_notes(reference_code=prefix, page=page))
+        except (FactusAPIError, FactusAuthError) as exc:
+            logger.warning(
+                'facturacion.nota_credito.reconcile.batch_list_error prefix=%s page=%s error=%s',
+                prefix,
+                page,
+                str(exc),
+            )
+            break
+        candidates.extend(items)
+        pending.difference_update(str(item.get('reference_code') or '') for item in items)
+        page += 1
+    return candidates
+
+
+def _reschedule(nota: NotaCreditoElectronica, *, error: str = '') -> None:
+    if nota.estado_local not in RECONCILABLE_LOCAL_STATES or nota.sync_attempts >= max_reconcile_attempts():
+        nota.next_sync_at = None
+    else:
+        nota.next_sync_at = timezone.now() + _reconcile_delay(nota.sync_attempts)
+    update_fields = ['next_sync_at', 'updated_at']
+    if error:
+        nota.last_remote_error = error[:1000]
+        update_fields.append('last_remote_error')
+    nota.save(update_fields=update_fields)
+
+
+def _reconcile_note(client: FactusClient, nota: NotaCreditoElectronica, candidates: list[dict[str, Any]]) -> NotaCreditoElectronica:
+    matched = _exact_match_remote_candidate(
+        candidates,
+        reference_code=str(nota.reference_code or ''),
+        bill_number=str(nota.factura.number or ''),
+        number=str(nota.number or ''),
+    )
+    if not matched and not nota.number and nota.reference_code:
+        # Ausente del listado del lote: consulta individual por su reference_code.
+        matched = _exact_match_remote_candidate(
+            _list_candidates(client.list_credit_notes(reference_code=nota.reference_code)),
+            reference_code=str(nota.reference_code or ''),
+            bill_number=str(nota.factura.number or ''),
+        )
+    if matched:
+        nota = _update_note_from_remote(nota, {'data': {'credit_note': matched}})
+    elif nota.number:
+        nota = _update_note_from_remote(nota, client.get_credit_note(nota.number))
+    elif nota.sync_attempts >= max_reconcile_attempts():
+        # Último intento: conciliación completa (show/replay) para decidir PENDIENTE o CONFLICTO.
+        nota = sincronizar_nota_credito(nota.id)
+    if nota.estado_local == 'ACEPTADA':
+        _apply_business_effects_if_needed(nota, nota.requested_by or nota.factura.venta.vendedor)
+    return nota
+
+
+def reconcile_due_credit_notes(*, limit: int | None = None) -> dict[str, int]:
+    """Procesa un lote de notas vencidas; devuelve conteos por estado local resultante."""
+    notas = claim_due_notes(limit or default_batch_size())
+    summary: dict[str, int] = {'claimed': len(notas)}
+    if not notas:
+        return summary
+    client = FactusClient()
+    candidates = _fetch_batch_candidates(client, notas)
+    for nota in notas:
+        error = ''
+        try:
+            nota = _reconcile_note(client, nota, candidates)
+        except Exception as exc:
+            error = str(exc)
+            logger.warning(
+                'facturacion.nota_credito.reconcile.error nota_credito_id=%s reference_code=%s attempts=%s error=%s',
+                nota.id,
+                nota.reference_code,
+                nota.sync_attempts,
+                error,
+                exc_info=True,
+            )
+            nota.refresh_from_db()
+        if nota.estado_local in RECONCILABLE_LOCAL_STATES or error:
+            _reschedule(nota, error=error)
+        summary[nota.estado_local] = summary.get(nota.estado_local, 0) + 1
+    logger.info('facturacion.nota_credito.reconcile.batch summary=%s', summary)
+    return summary
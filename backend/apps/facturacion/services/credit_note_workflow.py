@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import logging
-import time
+from datetime import timedelta
 from decimal import Decimal
 from uuid import uuid4
 from typing import Any
 
+from decouple import config
 from django.db import transaction
 from django.utils import timezone
 
@@ -17,7 +18,8 @@ from apps.facturacion.services.factus_catalog_lookup import get_payment_method_c
 from apps.facturacion.services.consecutivo_service import resolve_electronic_numbering_range_id
 from apps.facturacion.services.document_totals import calculate_document_detail_totals, q_money, to_decimal
 from apps.facturacion.services.factus_payload_builder import build_invoice_payload
-from apps.inventario.models import MovimientoInventario, Producto
+from apps.inventario.models import MovimientoInventario
+from apps.inventario.services import StockPosting, post_stock_movements
 from apps.ventas.models import DetalleVenta
 
 logger = logging.getLogger(__name__)
@@ -27,8 +29,8 @@ ACTIVE_CREDIT_LOCAL_STATES = {'BORRADOR', 'PENDIENTE_ENVIO', 'PENDIENTE_DIAN', '
 APPLIED_EFFECTS_STATES = {'ACEPTADA'}
 ALLOWED_INVOICE_STATES = {'ACEPTADA', 'ACEPTADA_CON_OBSERVACIONES'}
 CREDIT_NOTE_CUSTOMIZATION_ID = 20
-SYNC_REFERENCE_POLL_ATTEMPTS = 5
-SYNC_REFERENCE_POLL_SLEEP_SECONDS = 0.7
+# Estados que el reconciliador en segundo plano sigue consultando en Factus.
+RECONCILABLE_LOCAL_STATES = {'PENDIENTE_ENVIO', 'PENDIENTE_DIAN'}
 CREDIT_NOTE_CONCEPT_CODE_MAP = {
     'ANULACION_TOTAL': 1,
     'DEVOLUCION_PARCIAL': 2,
@@ -207,27 +209,22 @@ def build_credit_preview(factura: FacturaElectronica, lines: list[dict[str, Any]
 
 
 def _apply_inventory_return(nota: NotaCreditoElectronica, user) -> None:
-    detalles = list(nota.detalles.select_related('producto'))
-    productos = {p.id: p for p in Producto.objects.select_for_update().filter(id__in=[d.producto_id for d in detalles])}
-    for d in detalles:
-        if not d.afecta_inventario:
-            continue
-        producto = productos[d.producto_id]
-        stock_anterior = producto.stock
-        stock_nuevo = stock_anterior + d.cantidad_a_acreditar
-        MovimientoInventario.objects.create(
-            producto=producto,
-            tipo='DEVOLUCION',
-            cantidad=d.cantidad_a_acreditar,
-            stock_anterior=stock_anterior,
-            stock_nuevo=stock_nuevo,
-            costo_unitario=d.precio_unitario,
-            usuario=user,
-            referencia=f'NC-{nota.number or nota.id}',
-            observaciones=f'Devolución por nota crédito {nota.number or nota.id}',
-        )
-        producto.stock = stock_nuevo
-        producto.save(update_fields=['stock', 'updated_at'])
+    referencia = f'NC-{nota.number or nota.id}'
+    post_stock_movements(
+        [
+            StockPosting(
+                producto_id=d.producto_id,
+                tipo='DEVOLUCION',
+                cantidad=d.cantidad_a_acreditar,
+                costo_unitario=d.precio_unitario,
+                referencia=referencia,
+                observaciones=f'Devolución por nota crédito {nota.number or nota.id}',
+            )
+            for d in nota.detalles.all()
+            if d.afecta_inventario
+        ],
+        usuario=user,
+    )
 
 
 def _resolve_bill_id_and_customer(factura: FacturaElectronica, client: FactusClient, *, local_customer: dict[str, Any]) -> tuple[int, dict[str, Any]]:
@@ -337,6 +334,9 @@ def _apply_business_effects_if_needed(nota: NotaCreditoElectronica, user) -> boo
         _refresh_invoice_credit_status(nota.factura)
         return False
     with transaction.atomic():
+        # Request y reconciliador pueden ver la misma nota ACEPTADA: el bloqueo de
+        # la fila serializa la verificación y el registro de la devolución.
+        NotaCreditoElectronica.objects.select_for_update().filter(pk=nota.pk).first()
         if not MovimientoInventario.objects.filter(referencia=f'NC-{nota.number or nota.id}', tipo='DEVOLUCION').exists():
             _apply_inventory_return(nota, user)
         _refresh_invoice_credit_status(nota.factura)
@@ -348,6 +348,38 @@ def _apply_business_effects_if_needed(nota: NotaCreditoElectronica, user) -> boo
     return True
 
 
+def _reconcile_delay(attempts: int) -> timedelta:
+    base = config('FACTUS_CREDIT_NOTE_RECONCILE_BASE_SECONDS', default=5, cast=int)
+    cap = config('FACTUS_CREDIT_NOTE_RECONCILE_MAX_SECONDS', default=300, cast=int)
+    return timedelta(seconds=min(base * (2 ** max(attempts, 0)), cap))
+
+
+def max_reconcile_attempts() -> int:
+    return config('FACTUS_CREDIT_NOTE_RECONCILE_MAX_ATTEMPTS', default=12, cast=int)
+
+
+def reconcile_lease() -> timedelta:
+    return timedelta(seconds=config('FACTUS_CREDIT_NOTE_RECONCILE_LEASE_SECONDS', default=120, cast=int))
+
+
+def _refresh_reconcile_schedule(nota: NotaCreditoElectronica, *, immediate: bool = False) -> None:
+    """Programa (o cancela) la conciliación diferida según el estado local; no guarda."""
+    if nota.estado_local not in RECONCILABLE_LOCAL_STATES:
+        nota.next_sync_at = None
+        return
+    if immediate:
+        nota.next_sync_at = timezone.now()
+    elif nota.next_sync_at is None:
+        nota.next_sync_at = timezone.now() + _reconcile_delay(nota.sync_attempts)
+
+
+def schedule_credit_note_reconciliation(nota: NotaCreditoElectronica, *, immediate: bool = False) -> NotaCreditoElectronica:
+    """Deja la nota en cola del reconciliador sin bloquear el request actual."""
+    _refresh_reconcile_schedule(nota, immediate=immediate)
+    nota.save(update_fields=['next_sync_at', 'updated_at'])
+    return nota
+
+
 def _update_note_from_remote(nota: NotaCreditoElectronica, remote: dict[str, Any]) -> NotaCreditoElectronica:
     fields = extract_credit_note_remote_fields(remote)
     estado_electronico, estado_raw = map_credit_note_status(remote)
@@ -410,7 +442,8 @@ def _update_note_from_remote(nota: NotaCreditoElectronica, remote: dict[str, Any
         }
     )
     nota.sync_metadata = sync_meta
-    nota.save(update_fields=['number', 'uuid', 'cufe', 'pdf_url', 'xml_url', 'public_url', 'reference_code', 'status_raw_factus', 'remote_status_raw', 'estado_electronico', 'status', 'response_json', 'synchronized_at', 'last_sync_at', 'remote_identifier', 'last_remote_error', 'sync_metadata', 'estado_local', 'updated_at'])
+    _refresh_reconcile_schedule(nota)
+    nota.save(update_fields=['number', 'uuid', 'cufe', 'pdf_url', 'xml_url', 'public_url', 'reference_code', 'status_raw_factus', 'remote_status_raw', 'estado_electronico', 'status', 'response_json', 'synchronized_at', 'last_sync_at', 'remote_identifier', 'last_remote_error', 'sync_metadata', 'estado_local', 'next_sync_at', 'updated_at'])
     return nota
 
 
@@ -485,63 +518,36 @@ def _list_candidates(remote_list: dict[str, Any]) -> list[dict[str, Any]]:
     return []
 
 
-def _poll_remote_credit_note_candidate(
+def _lookup_remote_credit_note_candidate(
     *,
     client: FactusClient,
     nota: NotaCreditoElectronica,
     reference_code: str,
     sync_meta: dict[str, Any],
-    attempts: int = SYNC_REFERENCE_POLL_ATTEMPTS,
-    sleep_seconds: float = SYNC_REFERENCE_POLL_SLEEP_SECONDS,
 ) -> tuple[dict[str, Any] | None, str]:
-    bill_number = str(nota.factura.number or '')
-    number = str(nota.number or '')
-    list_error = ''
-    for attempt in range(attempts):
-        logger.info(
-            'facturacion.nota_credito.sync.poll_by_reference_code nota_credito_id=%s reference_code=%s poll_attempt=%s total_attempts=%s',
+    """Una sola consulta por reference_code; los reintentos quedan al reconciliador."""
+    try:
+        remote_list = client.get_credit_note_by_reference_code(reference_code, bill_number=nota.factura.number or None)
+    except FactusAPIError as exc:
+        sync_meta['last_poll_error'] = str(exc)
+        logger.warning(
+            'facturacion.nota_credito.sync.lookup_error nota_credito_id=%s reference_code=%s status_code=%s error=%s',
             nota.id,
             reference_code,
-            attempt + 1,
-            attempts,
+            exc.status_code,
+            str(exc),
         )
-        try:
-            remote_list = client.get_credit_note_by_reference_code(reference_code, bill_number=nota.factura.number or None)
-            candidates = _list_candidates(remote_list)
-            logger.info(
-                'facturacion.nota_credito.sync.poll_response nota_credito_id=%s reference_code=%s poll_attempt=%s candidates=%s raw=%s',
-                nota.id,
-                reference_code,
-                attempt + 1,
-                len(candidates),
-                str(remote_list)[:1200],
-            )
-            sync_meta['last_lookup'] = 'list_credit_notes_polling'
-            sync_meta['last_lookup_result_count'] = len(candidates)
-            remote_candidate = _exact_match_remote_candidate(
-                candidates,
-                reference_code=reference_code,
-                bill_number=bill_number,
-                number=number,
-            )
-            if remote_candidate:
-                return remote_candidate, ''
-        except FactusAPIError as exc:
-            sync_meta['last_poll_error'] = str(exc)
-            logger.warning(
-                'facturacion.nota_credito.sync.poll_error nota_credito_id=%s reference_code=%s poll_attempt=%s status_code=%s error=%s',
-                nota.id,
-                reference_code,
-                attempt + 1,
-                exc.status_code,
-                str(exc),
-            )
-            if exc.status_code not in {404, 409}:
-                list_error = str(exc)
-                break
-        if attempt < attempts - 1:
-            time.sleep(sleep_seconds * (attempt + 1))
-    return None, list_error
+        return None, '' if exc.status_code in {404, 409} else str(exc)
+    candidates = _list_candidates(remote_list)
+    sync_meta['last_lookup'] = 'list_credit_notes'
+    sync_meta['last_lookup_result_count'] = len(candidates)
+    remote_candidate = _exact_match_remote_candidate(
+        candidates,
+        reference_code=reference_code,
+        bill_number=str(nota.factura.number or ''),
+        number=str(nota.number or ''),
+    )
+    return remote_candidate, ''
 
 
 def _try_reconcile_from_remote(factura: FacturaElectronica, *, reference_code: str, tipo_nota: str, number: str = '') -> NotaCreditoElectronica | None:
@@ -673,19 +679,6 @@ def sincronizar_nota_credito(nota_credito_id: int, *, user=None, force_retry: bo
                 if exc.status_code != 404:
                     raise
 
-        if reference_code and nota.estado_local in {'PENDIENTE_ENVIO', 'PENDIENTE_DIAN', 'CONFLICTO_FACTUS'}:
-            remote_candidate, poll_error = _poll_remote_credit_note_candidate(
-                client=client,
-                nota=nota,
-                reference_code=reference_code,
-                sync_meta=sync_meta,
-            )
-            if remote_candidate:
-                nota.sync_metadata = sync_meta
-                return _update_note_from_remote(nota, {'data': {'credit_note': remote_candidate}})
-            if poll_error:
-                list_error = poll_error
-
         if isinstance(nota.request_json, dict) and nota.request_json:
             try:
                 replay = client.create_and_validate_credit_note(nota.request_json)
@@ -698,13 +691,11 @@ def sincronizar_nota_credito(nota_credito_id: int, *, user=None, force_retry: bo
                 nota.sync_metadata = sync_meta
                 return _update_note_from_remote(nota, replay)
             except FactusPendingCreditNoteError:
-                remote_candidate, poll_error = _poll_remote_credit_note_candidate(
+                remote_candidate, poll_error = _lookup_remote_credit_note_candidate(
                     client=client,
                     nota=nota,
                     reference_code=reference_code,
                     sync_meta=sync_meta,
-                    attempts=SYNC_REFERENCE_POLL_ATTEMPTS + 1,
-                    sleep_seconds=0.8,
                 )
                 if remote_candidate:
                     nota.sync_metadata = sync_meta
@@ -714,11 +705,12 @@ def sincronizar_nota_credito(nota_credito_id: int, *, user=None, force_retry: bo
                 nota.estado_local = 'PENDIENTE_DIAN'
                 nota.codigo_error = 'FACTUS_409_PENDIENTE_DIAN'
                 nota.last_remote_error = 'Factus reporta nota pendiente por enviar/validar DIAN.'
-                nota.mensaje_error = 'Factus confirmó que la nota sigue en proceso DIAN. Reintente sincronización.'
+                nota.mensaje_error = 'Factus confirmó que la nota sigue en proceso DIAN. Se conciliará automáticamente.'
                 nota.synchronized_at = timezone.now()
                 nota.last_sync_at = nota.synchronized_at
                 nota.sync_metadata = sync_meta
-                nota.save(update_fields=['estado_local', 'codigo_error', 'last_remote_error', 'mensaje_error', 'synchronized_at', 'last_sync_at', 'sync_metadata', 'updated_at'])
+                _refresh_reconcile_schedule(nota)
+                nota.save(update_fields=['estado_local', 'codigo_error', 'last_remote_error', 'mensaje_error', 'synchronized_at', 'last_sync_at', 'sync_metadata', 'next_sync_at', 'updated_at'])
                 return nota
             except FactusAPIError as exc:
                 if exc.status_code not in {404, 409}:
@@ -753,21 +745,12 @@ def sincronizar_nota_credito(nota_credito_id: int, *, user=None, force_retry: bo
             nota.estado_local,
             nota.last_remote_error,
         )
-        nota.save(update_fields=['estado_local', 'codigo_error', 'mensaje_error', 'synchronized_at', 'last_sync_at', 'last_remote_error', 'sync_metadata', 'updated_at'])
+        _refresh_reconcile_schedule(nota)
+        nota.save(update_fields=['estado_local', 'codigo_error', 'mensaje_error', 'synchronized_at', 'last_sync_at', 'last_remote_error', 'sync_metadata', 'next_sync_at', 'updated_at'])
         return nota
 
 
-def _poll_note_until_stable(nota: NotaCreditoElectronica, *, attempts: int = 4, sleep_seconds: float = 1.2) -> NotaCreditoElectronica:
-    current = nota
-    for _ in range(attempts):
-        current = sync_credit_note(current)
-        if current.estado_local in {'ACEPTADA', 'RECHAZADA', 'ERROR_INTEGRACION', 'CONFLICTO_FACTUS'}:
-            return current
-        time.sleep(sleep_seconds)
-    return current
-
-
-def _build_result_meta(nota: NotaCreditoElectronica, *, business_effects_applied: bool = False, warnings: list[str] | None = None) -> dict[str, Any]:
+def build_credit_note_result_meta(nota: NotaCreditoElectronica, *, business_effects_applied: bool = False, warnings: list[str] | None = None) -> dict[str, Any]:
     result = 'error'
     http_status = 200
     if nota.estado_local == 'ACEPTADA':
@@ -813,9 +796,11 @@ def create_credit_note(*, factura: FacturaElectronica, motivo: str, lines: list[
     tipo_nota = 'TOTAL' if is_total else 'PARCIAL'
     existing_open = _find_existing_open_note(factura, tipo=tipo_nota)
     if existing_open:
-        synced = _poll_note_until_stable(existing_open, attempts=2, sleep_seconds=0.5)
-        effects = _apply_business_effects_if_needed(synced, user)
-        return synced, _build_result_meta(synced, business_effects_applied=effects, warnings=['Ya existe una nota abierta para esta factura.'])
+        # Sin consultas remotas en el request: el reconciliador la refresca en cuanto pueda.
+        if existing_open.estado_local in RECONCILABLE_LOCAL_STATES:
+            schedule_credit_note_reconciliation(existing_open, immediate=True)
+        effects = _apply_business_effects_if_needed(existing_open, user)
+        return existing_open, build_credit_note_result_meta(existing_open, business_effects_applied=effects, warnings=['Ya existe una nota abierta para esta factura.'])
 
     client = FactusClient()
     preview = build_credit_preview(factura, lines, is_total=is_total)
@@ -844,6 +829,9 @@ def create_credit_note(*, factura: FacturaElectronica, motivo: str, lines: list[
             response_json={},
             reference_code=reference_code,
             sync_metadata=range_trace,
+            requested_by=user if getattr(user, 'pk', None) else None,
+            # Fuera del alcance del reconciliador mientras el POST a Factus sigue en curso.
+            next_sync_at=timezone.now() + reconcile_lease(),
         )
         for line in preview['lineas']:
             detalle = DetalleVenta.objects.get(pk=line['detalle_venta_original_id'])
@@ -865,6 +853,8 @@ def create_credit_note(*, factura: FacturaElectronica, motivo: str, lines: list[
 
     try:
         response = client.create_and_validate_credit_note(payload)
+        # Con la respuesta en mano, la conciliación se programa según el estado remoto.
+        nota.next_sync_at = None
         nota = _update_note_from_remote(nota, response)
     except FactusPendingCreditNoteError:
         logger.warning(
@@ -874,20 +864,21 @@ def create_credit_note(*, factura: FacturaElectronica, motivo: str, lines: list[
             reference_code,
         )
         recovered = sincronizar_nota_credito(nota.id, user=user)
-        recovered = _poll_note_until_stable(recovered, attempts=4, sleep_seconds=0.8)
         if recovered:
             effects = _apply_business_effects_if_needed(recovered, user)
-            return recovered, _build_result_meta(recovered, business_effects_applied=effects, warnings=['Factus respondió 409 y se reconcilió nota existente.'])
-        return nota, _build_result_meta(nota, warnings=['No se creó una nueva nota por idempotencia ante 409.'])
+            return recovered, build_credit_note_result_meta(recovered, business_effects_applied=effects, warnings=['Factus respondió 409 y se reconcilió nota existente.'])
+        return nota, build_credit_note_result_meta(nota, warnings=['No se creó una nueva nota por idempotencia ante 409.'])
     except Exception as exc:
         nota.estado_local = 'ERROR_INTEGRACION'
         nota.mensaje_error = str(exc)
-        nota.save(update_fields=['estado_local', 'mensaje_error', 'updated_at'])
+        nota.next_sync_at = None
+        nota.save(update_fields=['estado_local', 'mensaje_error', 'next_sync_at', 'updated_at'])
         raise
 
-    nota = _poll_note_until_stable(nota)
+    # Si DIAN aún no confirma, la nota queda PENDIENTE y `_update_note_from_remote`
+    # la programó para el reconciliador; el cliente consulta el estado local.
     effects = _apply_business_effects_if_needed(nota, user)
-    return nota, _build_result_meta(nota, business_effects_applied=effects)
+    return nota, build_credit_note_result_meta(nota, business_effects_applied=effects)
 
 
 def sync_credit_note(nota: NotaCreditoElectronica) -> NotaCreditoElectronica:
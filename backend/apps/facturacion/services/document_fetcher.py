@@ -4,10 +4,9 @@ import logging
 
 from django.db import transaction
 
-from apps.facturacion.models import FacturaElectronica
-from apps.facturacion.services.download_invoice_files import download_pdf, download_xml
+from apps.facturacion.models import FacturaArtifactJob, FacturaElectronica
 from apps.facturacion.services.electronic_state_machine import extract_bill_errors as _extract_bill_errors
-from apps.facturacion.services.exceptions import DescargaFacturaError
+from apps.facturacion.services.factura_artifact_jobs import enqueue_invoice_artifacts
 from apps.facturacion.services.factus_client import FactusAPIError, FactusAuthError, FactusClient
 from apps.facturacion.services.generate_qr_dian import generate_qr_dian
 from apps.facturacion.services.persistence import assign_qr_image_fields, build_attempt_trace
@@ -111,24 +110,10 @@ def sync_existing_pending_invoice(
             qr_file = generate_qr_dian(locked.number, locked.cufe)
             locked.qr.save(qr_file.name, qr_file, save=False)
             locked.save(update_fields=['qr', 'updated_at'])
-        try:
-            if locked.xml_url:
-                download_xml(locked)
-        except DescargaFacturaError:
-            logger.warning(
-                'facturar_venta.pending_sync_xml_descarga_error venta_id=%s factura=%s',
-                venta.id,
-                locked.number,
-                exc_info=True,
-            )
-        try:
-            if locked.pdf_url:
-                download_pdf(locked)
-        except DescargaFacturaError:
-            logger.warning(
-                'facturar_venta.pending_sync_pdf_descarga_error venta_id=%s factura=%s',
-                venta.id,
-                locked.number,
-                exc_info=True,
-            )
+        kinds = []
+        if locked.xml_url:
+            kinds.append(FacturaArtifactJob.KIND_XML)
+        if locked.pdf_url:
+            kinds.append(FacturaArtifactJob.KIND_PDF)
+        enqueue_invoice_artifacts(locked, kinds)
         return locked
@@ -45,10 +45,55 @@ def _find_matching_range(factura: FacturaElectronica) -> RangoNumeracionDIAN | N
     return None
 
 
+class RangoNumeracionResolver:
+    """Resuelve rangos de numeración en memoria durante una pasada de serialización.
+
+    Carga la tabla de rangos (pequeña) una sola vez y responde los mismos
+    criterios que ``_find_matching_range``; se comparte vía contexto del
+    serializer para que un listado haga un número fijo de consultas.
+    """
+
+    def __init__(self) -> None:
+        self._by_factus_id: dict[int, RangoNumeracionDIAN] | None = None
+        self._by_prefijo_resolucion: dict[tuple[str, str], RangoNumeracionDIAN] = {}
+        self._selected: dict[str, RangoNumeracionDIAN | None] = {}
+
+    def _load(self) -> dict[int, RangoNumeracionDIAN]:
+        if self._by_factus_id is None:
+            self._by_factus_id = {}
+            # Orden descendente: el primero visto es el más reciente, igual que `.first()`.
+            for rango in RangoNumeracionDIAN.objects.order_by('-created_at'):
+                if rango.factus_range_id:
+                    self._by_factus_id.setdefault(rango.factus_range_id, rango)
+                self._by_prefijo_resolucion.setdefault((rango.prefijo, rango.resolucion), rango)
+        return self._by_factus_id
+
+    def match(self, factura: FacturaElectronica) -> RangoNumeracionDIAN | None:
+        by_factus_id = self._load()
+        range_id = factura.factus_numbering_range_id
+        if range_id and range_id in by_factus_id:
+            return by_factus_id[range_id]
+        prefijo = str(factura.factus_number_prefix or '').strip()
+        resolucion = str(factura.factus_resolution_number or '').strip()
+        if prefijo and resolucion:
+            return self._by_prefijo_resolucion.get((prefijo, resolucion))
+        return None
+
+    def selected(self, document_code: str) -> RangoNumeracionDIAN | None:
+        if document_code not in self._selected:
+            self._selected[document_code] = (
+                RangoNumeracionDIAN.objects.filter(document_code=document_code, is_selected_local=True)
+                .order_by('-created_at')
+                .first()
+            )
+        return self._selected[document_code]
+
+
 def build_document_print_context(
     factura: FacturaElectronica | None,
     *,
     pending_range: RangoNumeracionDIAN | None = None,
+    range_resolver: RangoNumeracionResolver | None = None,
 ) -> dict[str, Any]:
     """Construye un único contexto de presentación para carta/POS.
 
@@ -77,7 +122,7 @@ def build_document_print_context(
         }
 
     emitted = bool(str(factura.number or '').strip())
-    range_obj = _find_matching_range(factura)
+    range_obj = range_resolver.match(factura) if range_resolver else _find_matching_range(factura)
     if not range_obj and pending_range:
         range_obj = pending_range
 
@@ -7,6 +7,8 @@ from pathlib import Path
 import requests
 from django.conf import settings
 
+from apps.facturacion.services import factus_http
+
 
 class DownloadResourceError(Exception):
     """Error al resolver contenido binario de un documento electrónico."""
@@ -29,14 +31,14 @@ def read_local_media_file(relative_path: str) -> bytes:
 
 
 
-def download_remote_file(url: str, timeout: int = 45) -> bytes:
-    """Descarga contenido binario desde una URL remota."""
+def download_remote_file(url: str, timeout: float | None = None) -> bytes:
+    """Descarga contenido binario desde una URL remota usando el pool compartido."""
     resolved_url = str(url or '').strip()
     if not resolved_url:
         raise DownloadResourceError('No hay URL de descarga configurada para el recurso.')
 
     try:
-        response = requests.get(resolved_url, timeout=timeout)
+        response = factus_http.send('GET', resolved_url, timeout=timeout, timeout_kind='download')
         response.raise_for_status()
         return response.content
     except requests.RequestException as exc:
@@ -6,12 +6,14 @@ from decimal import Decimal
 from typing import Any
 
 from django.db import transaction
+from django.utils import timezone
 
 from apps.facturacion.models import DocumentoSoporteElectronico
 from apps.facturacion.services.facturar_venta import map_factus_status
 from apps.facturacion.services.factus_client import FactusAPIError, FactusClient, FactusValidationError
 from apps.facturacion.services.support_document_payload_builder import build_support_document_payload
-from apps.inventario.models import MovimientoInventario, Producto, Proveedor
+from apps.inventario.models import Producto, Proveedor
+from apps.inventario.services import StockPosting, aplicar_deltas_stock, post_stock_movements
 
 
 def _extract_support_document_data(response_json: dict[str, Any]) -> dict[str, str]:
@@ -36,6 +38,7 @@ def _afectar_inventario_desde_documento_soporte(
     items = payload_data.get('items') if isinstance(payload_data.get('items'), list) else []
     if not items:
         return
+    postings: list[StockPosting] = []
     for item in items:
         cantidad = Decimal(str(item.get('cantidad') or '0'))
         if cantidad <= 0:
@@ -70,23 +73,28 @@ def _afectar_inventario_desde_documento_soporte(
                     iva_porcentaje=iva_porcentaje,
                     iva_exento=iva_porcentaje == Decimal('0'),
                 )
-        stock_anterior = Decimal(str(producto.stock or '0'))
-        stock_nuevo = stock_anterior + cantidad
-        producto.stock = stock_nuevo
+        # Sólo costo y fecha de compra: el stock lo suma `post_stock_movements` en la base de datos.
         producto.precio_costo = costo_unitario
-        producto.save(update_fields=['stock', 'precio_costo', 'ultima_compra', 'updated_at'])
-        if user is not None:
-            MovimientoInventario.objects.create(
-                producto=producto,
+        producto.ultima_compra = timezone.now()
+        producto.save(update_fields=['precio_costo', 'ultima_compra', 'updated_at'], touch_ultima_compra=False)
+        postings.append(
+            StockPosting(
+                producto_id=producto.pk,
                 tipo='ENTRADA',
                 cantidad=cantidad,
-                stock_anterior=stock_anterior,
-                stock_nuevo=stock_nuevo,
                 costo_unitario=costo_unitario,
-                usuario=user,
                 referencia=f'DOC-SOP-{documento.number}',
                 observaciones='Entrada por emisión de documento soporte.',
             )
+        )
+    if user is not None:
+        post_stock_movements(postings, usuario=user)
+    else:
+        # Sin usuario no hay línea de Kardex que registrar; el stock igual se suma en la base.
+        deltas: dict[int, Decimal] = {}
+        for posting in postings:
+            deltas[posting.producto_id] = deltas.get(posting.producto_id, Decimal('0')) + posting.cantidad
+        aplicar_deltas_stock(deltas)
 
 
 def emitir_documento_soporte(data: dict[str, Any], *, user=None) -> DocumentoSoporteElectronico:
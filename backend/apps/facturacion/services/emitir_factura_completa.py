@@ -3,13 +3,10 @@
 from __future__ import annotations
 
 import logging
-from pathlib import Path
 from typing import Any
 
-from django.conf import settings
-
 from apps.facturacion.models import FacturaElectronica
-from apps.facturacion.services.download_invoice_files import download_xml
+from apps.facturacion.services.factura_artifact_jobs import enqueue_invoice_artifacts, post_emission_kinds
 from apps.facturacion.services.factus_client import FactusClient
 from apps.facturacion.services.facturar_venta import facturar_venta
 from apps.facturacion.services.persistence_safety import (
@@ -17,10 +14,6 @@ from apps.facturacion.services.persistence_safety import (
     normalize_qr_image_value,
     safe_assign_charfield,
 )
-from apps.facturacion.services.upload_custom_pdf_to_factus import (
-    send_invoice_email_via_factus,
-    upload_custom_pdf_to_factus,
-)
 from apps.usuarios.models import Usuario
 
 logger = logging.getLogger(__name__)
@@ -58,28 +51,8 @@ def emitir_factura_completa(venta_id: int, triggered_by: Usuario | None = None)
     except Exception as exc:
         warnings.append({'component': 'sincronizacion', 'message': str(exc)})
 
-    # 2) XML local.
-    try:
-        if factura.xml_url:
-            download_xml(factura)
-        elif factura.number:
-            xml_content = client.download_invoice_xml(factura.number)
-            xml_filename = f'{factura.number}.xml'
-            relative = Path('facturas/xml') / xml_filename
-            absolute = Path(settings.MEDIA_ROOT) / relative
-            absolute.parent.mkdir(parents=True, exist_ok=True)
-            absolute.write_bytes(xml_content)
-            factura.xml_local_path = str(relative)
-            factura.save(update_fields=['xml_local_path', 'updated_at'])
-    except Exception as exc:
-        warnings.append({'component': 'xml', 'message': str(exc)})
-
-    # 3-5) Flujo híbrido: PDF carta personalizado + correo Factus.
-    if not upload_custom_pdf_to_factus(factura):
-        warnings.append({'component': 'pdf_factus', 'message': factura.ultimo_error_pdf or 'Error cargando PDF personalizado.'})
-    if not send_invoice_email_via_factus(factura):
-        email = str(factura.venta.cliente.email or '').strip()
-        if email:
-            warnings.append({'component': 'correo', 'message': factura.ultimo_error_correo or 'Error enviando correo por Factus.'})
+    # 2-5) XML/PDF locales, PDF Carta personalizado y correo Factus quedan en
+    # la cola de artefactos; encolar de nuevo es idempotente.
+    enqueue_invoice_artifacts(factura, post_emission_kinds(factura))
 
     return {'factura': factura, 'warnings': warnings}
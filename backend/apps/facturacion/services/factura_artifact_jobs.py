@@ -0,0 +1,323 @@
+"""Cola durable (en PostgreSQL) de artefactos post-emisión de facturas.
+
+La emisión sólo registra trabajos ``FacturaArtifactJob`` dentro de su propia
+transacción; el hilo de ``queue_drainer`` del servicio web (o el comando
+``procesar_artefactos_facturas``) los reclama con ``SELECT ... FOR UPDATE SKIP
+LOCKED`` y descarga/publica en paralelo, con reintentos y backoff exponencial.
+No requiere broker externo.
+
+``FACTUS_ARTIFACT_INLINE=True`` procesa en cambio los trabajos de la factura en
+el mismo request, justo después del commit de la emisión.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from typing import Callable, Iterable
+
+from decouple import config
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from apps.facturacion.models import FacturaArtifactJob, FacturaElectronica
+from apps.facturacion.services.download_invoice_files import download_pdf, download_xml
+from apps.facturacion.services.exceptions import DescargaFacturaError
+from apps.facturacion.services.factura_assets_service import _extract_data, store_factura_email_zip
+from apps.facturacion.services.factus_client import FactusClient
+from apps.facturacion.services.generate_qr_dian import generate_qr_dian
+from apps.facturacion.services.queue_drainer import wake_queue_drainer
+from apps.facturacion.services.upload_custom_pdf_to_factus import (
+    send_invoice_email_via_factus,
+    upload_custom_pdf_to_factus,
+)
+
+logger = logging.getLogger(__name__)
+
+# El PDF personalizado reemplaza `pdf_local_path`, por eso espera la descarga del
+# PDF de Factus; el correo sale después de la carga para incluir el PDF Carta.
+KIND_DEPENDENCIES: dict[str, str] = {
+    FacturaArtifactJob.KIND_PDF_UPLOAD: FacturaArtifactJob.KIND_PDF,
+    FacturaArtifactJob.KIND_EMAIL: FacturaArtifactJob.KIND_PDF_UPLOAD,
+}
+ACTIVE_STATUSES = (FacturaArtifactJob.STATUS_PENDIENTE, FacturaArtifactJob.STATUS_EN_PROCESO)
+
+
+def _max_attempts() -> int:
+    return config('FACTUS_ARTIFACT_MAX_ATTEMPTS', default=6, cast=int)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    base = config('FACTUS_ARTIFACT_RETRY_BASE_SECONDS', default=30, cast=int)
+    cap = config('FACTUS_ARTIFACT_RETRY_MAX_SECONDS', default=3600, cast=int)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), cap))
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=config('FACTUS_ARTIFACT_LEASE_SECONDS', default=300, cast=int))
+
+
+def inline_enabled() -> bool:
+    return config('FACTUS_ARTIFACT_INLINE', default=False, cast=bool)
+
+
+def default_workers() -> int:
+    return config('FACTUS_ARTIFACT_WORKERS', default=4, cast=int)
+
+
+def default_batch_size() -> int:
+    return config('FACTUS_ARTIFACT_BATCH_SIZE', default=20, cast=int)
+
+
+def post_emission_kinds(factura: FacturaElectronica) -> list[str]:
+    """Artefactos que el flujo de emisión completo deja en cola.
+
+    El QR DIAN se genera localmente durante la emisión, no pasa por la cola.
+    """
+    kinds = [
+        FacturaArtifactJob.KIND_XML,
+        FacturaArtifactJob.KIND_PDF,
+        FacturaArtifactJob.KIND_PDF_UPLOAD,
+        FacturaArtifactJob.KIND_EMAIL,
+    ]
+    if not factura.send_email_enabled:
+        kinds.append(FacturaArtifactJob.KIND_EMAIL_ZIP)
+    return kinds
+
+
+def enqueue_invoice_artifacts(factura: FacturaElectronica, kinds: Iterable[str]) -> int:
+    """Registra (idempotente) los trabajos pedidos; se vuelven visibles al hacer commit.
+
+    Los trabajos COMPLETADO no se tocan (no se repiten cargas ni correos); sólo
+    un trabajo FALLIDO vuelve a PENDIENTE para un nuevo ciclo de reintentos.
+    """
+    requested = list(dict.fromkeys(kinds))
+    if not requested or not factura.pk:
+        return 0
+    now = timezone.now()
+    FacturaArtifactJob.objects.bulk_create(
+        [
+            FacturaArtifactJob(
+                factura_id=factura.pk,
+                kind=kind,
+                depends_on=KIND_DEPENDENCIES.get(kind, ''),
+                next_attempt_at=now,
+            )
+            for kind in requested
+        ],
+        ignore_conflicts=True,
+    )
+    FacturaArtifactJob.objects.filter(
+        factura_id=factura.pk,
+        kind__in=requested,
+        status=FacturaArtifactJob.STATUS_FALLIDO,
+    ).update(
+        status=FacturaArtifactJob.STATUS_PENDIENTE,
+        attempts=0,
+        next_attempt_at=now,
+        locked_at=None,
+        completed_at=None,
+        last_error='',
+        updated_at=now,
+    )
+    logger.info('factura_artifacts.enqueue factura_id=%s kinds=%s', factura.pk, ','.join(requested))
+    if inline_enabled():
+        transaction.on_commit(partial(process_factura_jobs, factura.pk))
+    else:
+        transaction.on_commit(wake_queue_drainer)
+    return len(requested)
+
+
+def claim_jobs(limit: int, *, factura_id: int | None = None) -> list[FacturaArtifactJob]:
+    """Reclama hasta ``limit`` trabajos listos sin bloquear a otros workers."""
+    now = timezone.now()
+    blocked_by_dependency = FacturaArtifactJob.objects.filter(
+        factura_id=OuterRef('factura_id'),
+        kind=OuterRef('depends_on'),
+        status__in=ACTIVE_STATUSES,
+    )
+    ready = FacturaArtifactJob.objects.select_for_update(skip_locked=True)
+    if factura_id is not None:
+        ready = ready.filter(factura_id=factura_id)
+    with transaction.atomic():
+        ids = list(
+            ready.filter(
+                Q(status=FacturaArtifactJob.STATUS_PENDIENTE, next_attempt_at__lte=now)
+                | Q(status=FacturaArtifactJob.STATUS_EN_PROCESO, locked_at__lt=now - _lease())
+            )
+            .filter(~Exists(blocked_by_dependency))
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        FacturaArtifactJob.objects.filter(pk__in=ids).update(
+            status=FacturaArtifactJob.STATUS_EN_PROCESO,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+    return list(FacturaArtifactJob.objects.filter(pk__in=ids).order_by('next_attempt_at', 'id'))
+
+
+def _touch_assets_sync(factura: FacturaElectronica) -> None:
+    FacturaElectronica.objects.filter(pk=factura.pk).update(last_assets_sync_at=timezone.now())
+
+
+def _handle_qr(factura: FacturaElectronica) -> None:
+    if factura.qr or not (factura.number and factura.cufe):
+        return
+    qr_file = generate_qr_dian(factura.number, factura.cufe)
+    factura.qr.save(qr_file.name, qr_file, save=False)
+    factura.save(update_fields=['qr', 'updated_at'])
+
+
+def _handle_xml(factura: FacturaElectronica) -> None:
+    if factura.xml_local_path:
+        return
+    download_xml(factura)
+    _touch_assets_sync(factura)
+
+
+def _handle_pdf(factura: FacturaElectronica) -> None:
+    if factura.pdf_local_path:
+        return
+    download_pdf(factura)
+    _touch_assets_sync(factura)
+
+
+def _handle_email_zip(factura: FacturaElectronica) -> None:
+    if factura.email_zip_local_path:
+        return
+    if not factura.number:
+        raise DescargaFacturaError('La factura no tiene número electrónico para descargar el ZIP del correo.')
+    payload = FactusClient().get_bill_email_content(factura.number)
+    data = _extract_data(payload)
+    if data.get('zip_base_64_encoded'):
+        store_factura_email_zip(factura, payload)
+    elif data.get('subject'):
+        factura.email_subject = str(data.get('subject') or '').strip()
+    factura.last_assets_sync_at = timezone.now()
+    factura.save(update_fields=['email_zip_local_path', 'email_subject', 'last_assets_sync_at', 'updated_at'])
+
+
+def _handle_pdf_upload(factura: FacturaElectronica) -> None:
+    if factura.pdf_uploaded_to_factus:
+        return
+    # Traza de la emisión: permite recuperar el número si aún no quedó persistido.
+    trace = factura.response_json if isinstance(factura.response_json, dict) else {}
+    response = trace.get('response')
+    if not upload_custom_pdf_to_factus(
+        factura,
+        fallback_response_payload=response if isinstance(response, dict) else None,
+    ):
+        raise DescargaFacturaError(factura.ultimo_error_pdf or 'No fue posible cargar el PDF personalizado en Factus.')
+
+
+def _handle_email(factura: FacturaElectronica) -> None:
+    if factura.correo_enviado or not str(getattr(factura.venta.cliente, 'email', '') or '').strip():
+        return
+    if not send_invoice_email_via_factus(factura):
+        raise DescargaFacturaError(factura.ultimo_error_correo or 'No fue posible enviar el correo por Factus.')
+
+
+HANDLERS: dict[str, Callable[[FacturaElectronica], None]] = {
+    FacturaArtifactJob.KIND_QR: _handle_qr,
+    FacturaArtifactJob.KIND_XML: _handle_xml,
+    FacturaArtifactJob.KIND_PDF: _handle_pdf,
+    FacturaArtifactJob.KIND_EMAIL_ZIP: _handle_email_zip,
+    FacturaArtifactJob.KIND_PDF_UPLOAD: _handle_pdf_upload,
+    FacturaArtifactJob.KIND_EMAIL: _handle_email,
+}
+
+
+def run_job(job: FacturaArtifactJob) -> str:
+    """Ejecuta un trabajo reclamado y deja registrado su resultado."""
+    # `locked_at` actúa como fencing token: si el lease venció y otro worker
+    # reclamó el trabajo, este resultado ya no se persiste.
+    claimed = FacturaArtifactJob.objects.filter(
+        pk=job.pk,
+        status=FacturaArtifactJob.STATUS_EN_PROCESO,
+        locked_at=job.locked_at,
+    )
+    now = timezone.now()
+    try:
+        factura = FacturaElectronica.objects.select_related('venta__cliente').get(pk=job.factura_id)
+        HANDLERS[job.kind](factura)
+    except Exception as exc:
+        error = str(exc)[:1000] or exc.__class__.__name__
+        if job.attempts >= _max_attempts():
+            status = FacturaArtifactJob.STATUS_FALLIDO
+            claimed.update(status=status, last_error=error, locked_at=None, updated_at=now)
+        else:
+            status = FacturaArtifactJob.STATUS_PENDIENTE
+            claimed.update(
+                status=status,
+                last_error=error,
+                locked_at=None,
+                next_attempt_at=now + _retry_delay(job.attempts),
+                updated_at=now,
+            )
+        logger.warning(
+            'factura_artifacts.job_error job_id=%s factura_id=%s kind=%s attempts=%s status=%s detail=%s',
+            job.pk,
+            job.factura_id,
+            job.kind,
+            job.attempts,
+            status,
+            error,
+            exc_info=True,
+        )
+        return status
+    claimed.update(
+        status=FacturaArtifactJob.STATUS_COMPLETADO,
+        last_error='',
+        locked_at=None,
+        completed_at=now,
+        updated_at=now,
+    )
+    logger.info('factura_artifacts.job_ok job_id=%s factura_id=%s kind=%s', job.pk, job.factura_id, job.kind)
+    return FacturaArtifactJob.STATUS_COMPLETADO
+
+
+def _run_job_in_thread(job: FacturaArtifactJob) -> str:
+    try:
+        return run_job(job)
+    finally:
+        connection.close()
+
+
+def process_pending_jobs(*, limit: int | None = None, workers: int | None = None) -> dict[str, int]:
+    """Reclama un lote y lo procesa concurrentemente; devuelve conteos por estado final."""
+    jobs = claim_jobs(limit or default_batch_size())
+    workers = workers or default_workers()
+    if workers <= 1 or len(jobs) <= 1:
+        results = [run_job(job) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs)), thread_name_prefix='factura-artifacts') as pool:
+            results = list(pool.map(_run_job_in_thread, jobs))
+    summary = {'claimed': len(jobs)}
+    for status in results:
+        summary[status] = summary.get(status, 0) + 1
+    return summary
+
+
+def process_factura_jobs(factura_id: int) -> dict[str, int]:
+    """Procesa en línea los trabajos listos de una factura, respetando dependencias.
+
+    Modo en línea (``FACTUS_ARTIFACT_INLINE``): un fallo deja el trabajo con
+    su backoff y bloquea a sus dependientes hasta el siguiente intento.
+    """
+    summary = {'claimed': 0}
+    for _ in range(len(HANDLERS)):
+        jobs = claim_jobs(len(HANDLERS), factura_id=factura_id)
+        if not jobs:
+            break
+        summary['claimed'] += len(jobs)
+        for job in jobs:
+            status = run_job(job)
+            summary[status] = summary.get(status, 0) + 1
+    return summary
@@ -9,15 +9,13 @@ from django.db import DataError, transaction
 from django.utils import timezone
 
 from apps.facturacion.exceptions import FacturaDuplicadaError, FacturaPersistenciaError
-from apps.facturacion.models import FacturaElectronica
+from apps.facturacion.models import FacturaArtifactJob, FacturaElectronica
 from apps.facturacion.services.document_fetcher import sync_existing_pending_invoice
-from apps.facturacion.services.download_invoice_files import download_pdf, download_xml
 from apps.facturacion.services.electronic_state_machine import (
     extract_bill_errors as _extract_bill_errors,
     map_factus_status,
 )
-from apps.facturacion.services.exceptions import DescargaFacturaError
-from apps.facturacion.services.factura_assets_service import sync_invoice_assets
+from apps.facturacion.services.factura_artifact_jobs import enqueue_invoice_artifacts, post_emission_kinds
 from apps.facturacion.services.factus_client import (
     FactusAPIError,
     FactusAuthError,
@@ -53,10 +51,6 @@ from apps.facturacion.services.totals import (
     sync_sale_totals_before_emit,
 )
 from apps.facturacion.services.result_types import FacturacionContext
-from apps.facturacion.services.upload_custom_pdf_to_factus import (
-    send_invoice_email_via_factus,
-    upload_custom_pdf_to_factus,
-)
 from apps.facturacion.services.validators import (
     has_definitive_electronic_identifiers,
     number_matches_active_range,
@@ -400,26 +394,12 @@ def _sync_existing_pending_invoice(
             qr_file = generate_qr_dian(locked.number, locked.cufe)
             locked.qr.save(qr_file.name, qr_file, save=False)
             locked.save(update_fields=['qr', 'updated_at'])
-        try:
-            if locked.xml_url:
-                download_xml(locked)
-        except DescargaFacturaError:
-            logger.warning(
-                'facturar_venta.pending_sync_xml_descarga_error venta_id=%s factura=%s',
-                venta.id,
-                locked.number,
-                exc_info=True,
-            )
-        try:
-            if locked.pdf_url:
-                download_pdf(locked)
-        except DescargaFacturaError:
-            logger.warning(
-                'facturar_venta.pending_sync_pdf_descarga_error venta_id=%s factura=%s',
-                venta.id,
-                locked.number,
-                exc_info=True,
-            )
+        kinds = []
+        if locked.xml_url:
+            kinds.append(FacturaArtifactJob.KIND_XML)
+        if locked.pdf_url:
+            kinds.append(FacturaArtifactJob.KIND_PDF)
+        enqueue_invoice_artifacts(locked, kinds)
         return locked
 
 
@@ -607,26 +587,17 @@ def facturar_venta(
                 factura_existente.uuid,
                 factura_existente.cufe,
             )
-            try:
-                if not factura_existente.xml_local_path:
-                    download_xml(factura_existente)
-            except DescargaFacturaError:
-                logger.warning(
-                    'facturar_venta.reutiliza_aceptada_xml_descarga_error venta_id=%s factura=%s',
-                    venta.id,
-                    factura_existente.number,
-                    exc_info=True,
-                )
-            try:
-                if not factura_existente.pdf_local_path:
-                    download_pdf(factura_existente)
-            except DescargaFacturaError:
-                logger.warning(
-                    'facturar_venta.reutiliza_aceptada_pdf_descarga_error venta_id=%s factura=%s',
-                    venta.id,
-                    factura_existente.number,
-                    exc_info=True,
-                )
+            enqueue_invoice_artifacts(
+                factura_existente,
+                [
+                    kind
+                    for kind, stored in (
+                        (FacturaArtifactJob.KIND_XML, factura_existente.xml_local_path),
+                        (FacturaArtifactJob.KIND_PDF, factura_existente.pdf_local_path),
+                    )
+                    if not stored
+                ],
+            )
             return factura_existente
         if (
             factura_existente
@@ -1099,10 +1070,6 @@ def facturar_venta(
                 ctx.factura.estado_electronico,
                 ctx.factura.reference_code,
             )
-            if ctx.factura.cufe and ctx.factura.number:
-                qr_file = generate_qr_dian(ctx.factura.number, ctx.factura.cufe)
-                ctx.factura.qr.save(qr_file.name, qr_file, save=False)
-                ctx.factura.save(update_fields=['qr', 'updated_at'])
     except (DataError, FacturaPersistenciaError) as exc:
         with transaction.atomic():
             factura = FacturaElectronica.objects.select_for_update().get(pk=factura.pk)
@@ -1129,14 +1096,13 @@ def facturar_venta(
             ctx.factura.pk,
         )
         return ctx.factura
-    try:
-        sync_invoice_assets(
-            ctx.factura,
-            include_email_content=not ctx.factura.send_email_enabled,
-            fallback_response_payload=response_json,
-        )
-    except DescargaFacturaError:
-        logger.warning('facturar_venta.assets_sync_error venta_id=%s factura=%s', ctx.venta.id, ctx.factura.number, exc_info=True)
+    # El QR es local y lo necesita el payload de la caja; XML, PDF, carga del PDF
+    # Carta y correo se procesan en segundo plano (`procesar_artefactos_facturas`).
+    if ctx.factura.cufe and ctx.factura.number and not ctx.factura.qr:
+        qr_file = generate_qr_dian(ctx.factura.number, ctx.factura.cufe)
+        ctx.factura.qr.save(qr_file.name, qr_file, save=False)
+        ctx.factura.save(update_fields=['qr', 'updated_at'])
+    enqueue_invoice_artifacts(ctx.factura, post_emission_kinds(ctx.factura))
     logger.info(
         'facturar_venta.emitida_ok venta_id=%s factura_id=%s numero=%s estado=%s',
         ctx.venta.id,
@@ -1144,7 +1110,5 @@ def facturar_venta(
         ctx.factura.number,
         ctx.factura.estado_electronico,
     )
-    upload_custom_pdf_to_factus(ctx.factura, fallback_response_payload=response_json)
-    send_invoice_email_via_factus(ctx.factura)
     logger.info('facturar_venta.fin_ok venta_id=%s factura=%s', ctx.venta.id, ctx.factura.number)
     return ctx.factura
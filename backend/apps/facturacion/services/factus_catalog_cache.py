@@ -0,0 +1,143 @@
+"""Foto en memoria de catálogos Factus, homologaciones e impuestos.
+
+El armado de payloads resuelve por documento varios ids de Factus (tributo del
+cliente, tipo de documento, municipio, medio de pago, unidad e impuesto de
+cada línea). Aquí se cargan todas las tablas una vez por proceso como dicts de
+sólo lectura con las claves ya normalizadas, así que resolverlos no consulta
+la BD.
+
+Invalidación: guardar o borrar cualquiera de esas filas (signals) y cada
+sincronización de catálogos suben el sello compartido ``catalogos_factus``;
+los demás procesos lo detectan como en ``apps.core.services.configuracion_cache``.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Mapping
+
+from django.db import transaction
+
+from apps.core.models import Impuesto
+from apps.core.services.configuracion_cache import bump_shared_version, get_shared_version
+from apps.facturacion_electronica.catalogos.models import (
+    DocumentoIdentificacionFactus,
+    MetodoPagoFactus,
+    MunicipioFactus,
+    TributoFactus,
+    UnidadMedidaFactus,
+)
+from apps.facturacion_electronica.models import (
+    HomologacionMedioPago,
+    HomologacionMunicipio,
+    HomologacionTributo,
+    HomologacionUnidadMedida,
+)
+
+CLAVE_CATALOGOS = 'catalogos_factus'
+
+MODELOS_CATALOGO = (
+    DocumentoIdentificacionFactus,
+    MetodoPagoFactus,
+    MunicipioFactus,
+    TributoFactus,
+    UnidadMedidaFactus,
+    HomologacionMedioPago,
+    HomologacionMunicipio,
+    HomologacionTributo,
+    HomologacionUnidadMedida,
+    Impuesto,
+)
+
+
+@dataclass(frozen=True)
+class CatalogosFactus:
+    # Catálogos activos: código -> factus_id (el de menor id si el código se repite).
+    municipios: Mapping[str, int]
+    tributos: Mapping[str, int]
+    unidades_medida: Mapping[str, int]
+    metodos_pago: frozenset[str]
+    # Documentos de identificación por código en mayúsculas (búsqueda sin distinguir mayúsculas).
+    documentos: Mapping[str, int]
+    primer_tributo_id: int | None
+    # Homologaciones activas por ``codigo_interno`` en mayúsculas.
+    homologacion_municipio: Mapping[str, int]
+    homologacion_tributo: Mapping[str, int]
+    homologacion_unidad_medida: Mapping[str, int]
+    homologacion_medio_pago: Mapping[str, str]
+    # Impuestos activos con tributo Factus: porcentaje -> factus_tribute_id (el de mayor id).
+    impuestos: Mapping[Decimal, int]
+
+
+def _por_codigo(model, *, clave=str) -> dict[str, int]:
+    resultado: dict[str, int] = {}
+    for codigo, factus_id in model.objects.filter(is_active=True).order_by('id').values_list('codigo', 'factus_id'):
+        resultado.setdefault(clave(codigo), factus_id)
+    return resultado
+
+
+def _homologaciones(model, field_name: str) -> dict:
+    return {
+        codigo.upper(): valor
+        for codigo, valor in model.objects.filter(is_active=True).values_list('codigo_interno', field_name)
+        if valor
+    }
+
+
+def _cargar() -> CatalogosFactus:
+    tributos = _por_codigo(TributoFactus)
+    impuestos = Impuesto.objects.filter(is_active=True, factus_tribute_id__isnull=False).order_by('id')
+    return CatalogosFactus(
+        municipios=MappingProxyType(_por_codigo(MunicipioFactus)),
+        tributos=MappingProxyType(tributos),
+        unidades_medida=MappingProxyType(_por_codigo(UnidadMedidaFactus)),
+        metodos_pago=frozenset(MetodoPagoFactus.objects.filter(is_active=True).values_list('codigo', flat=True)),
+        documentos=MappingProxyType(_por_codigo(DocumentoIdentificacionFactus, clave=str.upper)),
+        primer_tributo_id=min(tributos.values(), default=None),
+        homologacion_municipio=MappingProxyType(_homologaciones(HomologacionMunicipio, 'municipality_id')),
+        homologacion_tributo=MappingProxyType(_homologaciones(HomologacionTributo, 'tribute_id')),
+        homologacion_unidad_medida=MappingProxyType(_homologaciones(HomologacionUnidadMedida, 'unit_measure_id')),
+        homologacion_medio_pago=MappingProxyType(_homologaciones(HomologacionMedioPago, 'payment_method_code')),
+        impuestos=MappingProxyType(dict(impuestos.values_list('porcentaje', 'factus_tribute_id'))),
+    )
+
+
+_lock = threading.Lock()
+_local_version = 0
+# (versión local, versión compartida, foto)
+_entry: tuple[int, int, CatalogosFactus] | None = None
+
+
+def _invalidate_local() -> None:
+    global _local_version, _entry
+    with _lock:
+        _local_version += 1
+        _entry = None
+
+
+def clear_catalogos_factus_cache() -> None:
+    _invalidate_local()
+
+
+def invalidar_catalogos_factus() -> None:
+    """Descarta la foto aquí y en los demás procesos (el sello se sube en la transacción actual)."""
+    bump_shared_version(CLAVE_CATALOGOS)
+    _invalidate_local()
+    transaction.on_commit(_invalidate_local)
+
+
+def get_catalogos_factus() -> CatalogosFactus:
+    global _entry
+    db_version = get_shared_version(CLAVE_CATALOGOS)
+    with _lock:
+        local_version = _local_version
+        if _entry is not None and _entry[0] == local_version and _entry[1] == db_version:
+            return _entry[2]
+    catalogos = _cargar()
+    with _lock:
+        if _local_version == local_version:
+            _entry = (local_version, db_version, catalogos)
+    return catalogos
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import unicodedata
+from decimal import Decimal
 
+from apps.facturacion.services.factus_catalog_cache import get_catalogos_factus
 from apps.facturacion_electronica.catalogos.models import (
     DocumentoIdentificacionFactus,
     MetodoPagoFactus,
@@ -11,12 +13,6 @@ from apps.facturacion_electronica.catalogos.models import (
     TributoFactus,
     UnidadMedidaFactus,
 )
-from apps.facturacion_electronica.models import (
-    HomologacionMedioPago,
-    HomologacionMunicipio,
-    HomologacionTributo,
-    HomologacionUnidadMedida,
-)
 
 
 DOCUMENT_TYPE_ALIASES: dict[str, str] = {
@@ -91,73 +87,52 @@ def _bootstrap_minimum_catalogs() -> None:
     )
 
 
-def _homologacion_lookup(model, field_name: str, codigo: str):
+def _homologacion_lookup(homologaciones, codigo: str):
     normalized = _normalize_text(codigo)
     if not normalized:
         return None
-    return (
-        model.objects.filter(codigo_interno__iexact=normalized, is_active=True)
-        .values_list(field_name, flat=True)
-        .first()
-    )
+    return homologaciones.get(normalized)
 
 
 def get_municipality_id(codigo: str, default: int = 149) -> int:
-    by_homologacion = _homologacion_lookup(HomologacionMunicipio, 'municipality_id', codigo)
+    catalogos = get_catalogos_factus()
+    by_homologacion = _homologacion_lookup(catalogos.homologacion_municipio, codigo)
     if by_homologacion:
         return int(by_homologacion)
-    value = (
-        MunicipioFactus.objects.filter(codigo=str(codigo), is_active=True)
-        .values_list('factus_id', flat=True)
-        .first()
-    )
-    return int(value or default)
+    return int(catalogos.municipios.get(str(codigo)) or default)
 
 
 def get_tribute_id(codigo: str, default: int = 1) -> int:
-    by_homologacion = _homologacion_lookup(HomologacionTributo, 'tribute_id', codigo)
+    catalogos = get_catalogos_factus()
+    by_homologacion = _homologacion_lookup(catalogos.homologacion_tributo, codigo)
     if by_homologacion:
         return int(by_homologacion)
-    value = (
-        TributoFactus.objects.filter(codigo=str(codigo), is_active=True)
-        .values_list('factus_id', flat=True)
-        .first()
-    )
-    return int(value or default)
+    return int(catalogos.tributos.get(str(codigo)) or default)
 
 
 def get_first_active_tribute_id(default: int = 1) -> int:
-    value = (
-        TributoFactus.objects.filter(is_active=True)
-        .order_by('factus_id')
-        .values_list('factus_id', flat=True)
-        .first()
-    )
-    return int(value or default)
+    return int(get_catalogos_factus().primer_tributo_id or default)
 
 
 def get_payment_method_code(codigo: str, default: str = '10') -> str:
-    by_homologacion = _homologacion_lookup(HomologacionMedioPago, 'payment_method_code', codigo)
+    catalogos = get_catalogos_factus()
+    by_homologacion = _homologacion_lookup(catalogos.homologacion_medio_pago, codigo)
     if by_homologacion:
         return str(by_homologacion)
-    value = (
-        MetodoPagoFactus.objects.filter(codigo=str(codigo), is_active=True)
-        .values_list('codigo', flat=True)
-        .first()
-    )
-    return str(value or default)
+    return str(codigo) if str(codigo) in catalogos.metodos_pago else str(default)
 
 
 def get_unit_measure_id(codigo: str, default: int = 70) -> int:
-    by_homologacion = _homologacion_lookup(HomologacionUnidadMedida, 'unit_measure_id', codigo)
+    catalogos = get_catalogos_factus()
+    by_homologacion = _homologacion_lookup(catalogos.homologacion_unidad_medida, codigo)
     if by_homologacion:
         return int(by_homologacion)
-    value = (
-        UnidadMedidaFactus.objects.filter(codigo=str(codigo), is_active=True)
-        .values_list('factus_id', flat=True)
-        .first()
-    )
-    return int(value or default)
+    return int(catalogos.unidades_medida.get(str(codigo)) or default)
+
+
+def get_impuesto_tribute_id(porcentaje: Decimal) -> int | None:
+    """``factus_tribute_id`` del impuesto activo más reciente con ese porcentaje."""
+    return get_catalogos_factus().impuestos.get(Decimal(porcentaje))
 
 
 def get_document_type_id(codigo: str, default: int = 3, seed_if_missing: bool = False) -> int:
@@ -170,12 +145,9 @@ def get_document_type_id(codigo: str, default: int = 3, seed_if_missing: bool =
         if normalized not in candidates:
             candidates.insert(0, normalized)
 
+        documentos = get_catalogos_factus().documentos
         for candidate in candidates:
-            factus_id = (
-                DocumentoIdentificacionFactus.objects.filter(codigo__iexact=candidate, is_active=True)
-                .values_list('factus_id', flat=True)
-                .first()
-            )
+            factus_id = documentos.get(candidate.upper())
             if factus_id:
                 return int(factus_id)
         return 0
@@ -9,15 +9,12 @@ from urllib.parse import urlparse
 from typing import Any
 
 import requests
-from decouple import config
 from django.utils import timezone
 
 from apps.facturacion_electronica.models import FactusToken
-from apps.facturacion.services.factus_endpoints import get_endpoint, resolve_api_version
-from apps.facturacion.services.factus_environment import (
-    resolve_factus_base_url,
-    resolve_factus_environment,
-)
+from apps.facturacion.services import factus_http, factus_token_manager
+from apps.facturacion.services.factus_client_config import get_client_config
+from apps.facturacion.services.factus_environment import resolve_factus_base_url
 
 logger = logging.getLogger(__name__)
 
@@ -57,139 +54,18 @@ class FactusValidationError(Exception):
 
 class FactusClient:
     def __init__(self) -> None:
-        self.base_url = self._resolve_factus_base_url()
-        self.environment = resolve_factus_environment()
-        self.api_version = resolve_api_version()
-        self.auth_path = config('FACTUS_AUTH_PATH', default='/oauth/token')
-        self.refresh_token_path = config('FACTUS_REFRESH_TOKEN_PATH', default='/oauth/token')
-        self.invoice_path = config('FACTUS_INVOICE_PATH', default=get_endpoint('bill_validate', api_version=self.api_version))
-        self.bills_list_path = config('FACTUS_BILLS_LIST_PATH', default=get_endpoint('bill_list', api_version=self.api_version))
-        self.bill_show_path = config('FACTUS_BILL_SHOW_PATH', default=get_endpoint('bill_show', api_version=self.api_version))
-        self.bill_download_pdf_path = config('FACTUS_BILL_DOWNLOAD_PDF_PATH', default=get_endpoint('bill_download_pdf', api_version=self.api_version))
-        self.bill_download_xml_path = config('FACTUS_BILL_DOWNLOAD_XML_PATH', default=get_endpoint('bill_download_xml', api_version=self.api_version))
-        self.bill_email_content_path = config(
-            'FACTUS_BILL_EMAIL_CONTENT_PATH',
-            default=get_endpoint('bill_email_content', api_version=self.api_version),
-        )
-        self.bill_send_email_path = config('FACTUS_BILL_SEND_EMAIL_PATH', default=get_endpoint('bill_send_email', api_version=self.api_version))
-        self.bill_custom_pdf_upload_path = config(
-            'FACTUS_BILL_CUSTOM_PDF_UPLOAD_PATH',
-            default=get_endpoint('bill_custom_pdf_upload', api_version=self.api_version),
-        )
-        self.bill_delete_by_reference_path = config(
-            'FACTUS_BILL_DELETE_BY_REFERENCE_PATH',
-            default=get_endpoint('bill_delete_reference', api_version=self.api_version),
-        )
-        self.credit_note_path = config('FACTUS_CREDIT_NOTE_PATH', default=get_endpoint('credit_note_validate', api_version=self.api_version))
-        self.credit_notes_list_path = config('FACTUS_CREDIT_NOTES_LIST_PATH', default=get_endpoint('credit_note_list', api_version=self.api_version))
-        self.credit_note_show_path = config('FACTUS_CREDIT_NOTE_SHOW_PATH', default=get_endpoint('credit_note_show', api_version=self.api_version))
-        self.credit_note_download_pdf_path = config(
-            'FACTUS_CREDIT_NOTE_DOWNLOAD_PDF_PATH',
-            default=get_endpoint('credit_note_download_pdf', api_version=self.api_version),
-        )
-        self.credit_note_download_xml_path = config(
-            'FACTUS_CREDIT_NOTE_DOWNLOAD_XML_PATH',
-            default=get_endpoint('credit_note_download_xml', api_version=self.api_version),
-        )
-        self.credit_note_email_content_path = config(
-            'FACTUS_CREDIT_NOTE_EMAIL_CONTENT_PATH',
-            default=get_endpoint('credit_note_email_content', api_version=self.api_version),
-        )
-        self.credit_note_send_email_path = config(
-            'FACTUS_CREDIT_NOTE_SEND_EMAIL_PATH',
-            default=get_endpoint('credit_note_send_email', api_version=self.api_version),
-        )
-        self.credit_note_delete_by_reference_path = config(
-            'FACTUS_CREDIT_NOTE_DELETE_BY_REFERENCE_PATH',
-            default=get_endpoint('credit_note_delete_reference', api_version=self.api_version),
-        )
-        self.support_document_validate_path = config(
-            'FACTUS_SUPPORT_DOCUMENT_VALIDATE_PATH',
-            default=get_endpoint('support_document_validate', api_version=self.api_version),
-        )
-        self.support_documents_list_path = config('FACTUS_SUPPORT_DOCUMENTS_LIST_PATH', default=get_endpoint('support_document_list', api_version=self.api_version))
-        self.support_document_show_path = config('FACTUS_SUPPORT_DOCUMENT_SHOW_PATH', default=get_endpoint('support_document_show', api_version=self.api_version))
-        self.support_document_download_pdf_path = config(
-            'FACTUS_SUPPORT_DOCUMENT_DOWNLOAD_PDF_PATH',
-            default=get_endpoint('support_document_download_pdf', api_version=self.api_version),
-        )
-        self.support_document_download_xml_path = config(
-            'FACTUS_SUPPORT_DOCUMENT_DOWNLOAD_XML_PATH',
-            default=get_endpoint('support_document_download_xml', api_version=self.api_version),
-        )
-        self.support_document_delete_by_reference_path = config(
-            'FACTUS_SUPPORT_DOCUMENT_DELETE_BY_REFERENCE_PATH',
-            default=get_endpoint('support_document_delete_reference', api_version=self.api_version),
-        )
-        self.support_adjustment_note_validate_path = config(
-            'FACTUS_SUPPORT_ADJUSTMENT_NOTE_VALIDATE_PATH',
-            default=get_endpoint('support_adjustment_validate', api_version=self.api_version),
-        )
-        self.support_adjustment_notes_list_path = config(
-            'FACTUS_SUPPORT_ADJUSTMENT_NOTES_LIST_PATH',
-            default=get_endpoint('support_adjustment_list', api_version=self.api_version),
-        )
-        self.support_adjustment_note_show_path = config(
-            'FACTUS_SUPPORT_ADJUSTMENT_NOTE_SHOW_PATH',
-            default=get_endpoint('support_adjustment_show', api_version=self.api_version),
-        )
-        self.support_adjustment_note_download_pdf_path = config(
-            'FACTUS_SUPPORT_ADJUSTMENT_NOTE_DOWNLOAD_PDF_PATH',
-            default=get_endpoint('support_adjustment_download_pdf', api_version=self.api_version),
-        )
-        self.support_adjustment_note_download_xml_path = config(
-            'FACTUS_SUPPORT_ADJUSTMENT_NOTE_DOWNLOAD_XML_PATH',
-            default=get_endpoint('support_adjustment_download_xml', api_version=self.api_version),
-        )
-        self.support_adjustment_note_delete_by_reference_path = config(
-            'FACTUS_SUPPORT_ADJUSTMENT_NOTE_DELETE_BY_REFERENCE_PATH',
-            default=get_endpoint('support_adjustment_delete_reference', api_version=self.api_version),
-        )
-        self.numbering_ranges_path = config('FACTUS_NUMBERING_RANGES_PATH', default=get_endpoint('numbering_ranges', api_version=self.api_version))
-        self.numbering_range_show_path = config(
-            'FACTUS_NUMBERING_RANGE_SHOW_PATH',
-            default=get_endpoint('numbering_range_show', api_version=self.api_version),
-        )
-        self.numbering_range_create_path = config(
-            'FACTUS_NUMBERING_RANGE_CREATE_PATH',
-            default=get_endpoint('numbering_range_create', api_version=self.api_version),
-        )
-        self.numbering_range_delete_path = config(
-            'FACTUS_NUMBERING_RANGE_DELETE_PATH',
-            default=get_endpoint('numbering_range_delete', api_version=self.api_version),
-        )
-        self.numbering_range_update_path = config(
-            'FACTUS_NUMBERING_RANGE_UPDATE_PATH',
-            default=get_endpoint('numbering_range_update_current', api_version=self.api_version),
-        )
-        self.numbering_ranges_dian_path = config(
-            'FACTUS_NUMBERING_RANGES_DIAN_PATH',
-            default=get_endpoint('numbering_ranges_dian', api_version=self.api_version),
-        )
-        self.bill_events_path = config('FACTUS_BILL_EVENTS_PATH', default=get_endpoint('bill_events', api_version=self.api_version))
-        self.bill_tacit_acceptance_path = config(
-            'FACTUS_BILL_TACIT_ACCEPTANCE_PATH',
-            default=get_endpoint('bill_tacit_acceptance', api_version=self.api_version),
-        )
-        self.bill_email_template_path = config(
-            'FACTUS_BILL_EMAIL_TEMPLATE_PATH',
-            default=get_endpoint('bill_email_template', api_version=self.api_version),
-        )
-        self.company_show_path = config('FACTUS_COMPANY_SHOW_PATH', default=get_endpoint('company_show', api_version=self.api_version))
-        self.company_update_path = config('FACTUS_COMPANY_UPDATE_PATH', default=get_endpoint('company_update', api_version=self.api_version))
-        self.company_update_logo_path = config('FACTUS_COMPANY_UPDATE_LOGO_PATH', default=get_endpoint('company_update_logo', api_version=self.api_version))
-        self.tributes_path = config('FACTUS_TRIBUTES_PATH', default=get_endpoint('tributes_products', api_version=self.api_version))
-        self.measurement_units_path = config('FACTUS_MEASUREMENT_UNITS_PATH', default=get_endpoint('unit_measures', api_version=self.api_version))
-        self.countries_path = config('FACTUS_COUNTRIES_PATH', default=get_endpoint('countries', api_version=self.api_version))
-        self.municipalities_path = config('FACTUS_MUNICIPALITIES_PATH', default=get_endpoint('municipalities', api_version=self.api_version))
-        self.reference_tables_path = config('FACTUS_REFERENCE_TABLES_PATH', default=get_endpoint('reference_tables', api_version=self.api_version))
-        self.customers_lookup_path = config('FACTUS_CUSTOMERS_LOOKUP_PATH', default=get_endpoint('customers_lookup', api_version=self.api_version))
-        self.document_receptions_path = config('FACTUS_DOCUMENT_RECEPTIONS_PATH', default=get_endpoint('document_receptions', api_version=self.api_version))
-        self.subscriptions_path = config('FACTUS_SUBSCRIPTIONS_PATH', default=get_endpoint('subscriptions', api_version=self.api_version))
-        self.document_download_xml_attached_path = config(
-            'FACTUS_DOCUMENT_DOWNLOAD_XML_ATTACHED_PATH',
-            default=get_endpoint('document_download_xml_attached', api_version=self.api_version),
-        )
+        client_config = get_client_config()
+        self.base_url = client_config.base_url
+        self.environment = client_config.environment
+        self.api_version = client_config.api_version
+        self.auth_path = client_config.auth_path
+        self.refresh_token_path = client_config.refresh_token_path
+        for attr, path in client_config.paths.items():
+            setattr(self, attr, path)
+        self.client_id = client_config.client_id
+        self.client_secret = client_config.client_secret
+        self.username = client_config.username
+        self.password = client_config.password
 
         # Alias internos temporales para mantener compatibilidad en módulos/tests existentes.
         self.refresh_path = self.refresh_token_path
@@ -214,17 +90,6 @@ class FactusClient:
         self.invoice_email_content_path = self.bill_email_content_path
         self.invoice_email_template_path = self.bill_email_template_path
         self.invoice_custom_pdf_upload_path = self.bill_custom_pdf_upload_path
-        self.client_id = config('FACTUS_CLIENT_ID', default='')
-        self.client_secret = config('FACTUS_CLIENT_SECRET', default='')
-        self.username = config('FACTUS_USERNAME', default='')
-        self.password = config('FACTUS_PASSWORD', default='')
-        logger.info(
-            'factus.client.credit_note.endpoints environment=%s create=%s list=%s show=%s',
-            self.environment,
-            self.credit_note_path,
-            self.credit_notes_list_path,
-            self.credit_note_show_path,
-        )
 
     def _resolve_factus_base_url(self) -> str:
         return resolve_factus_base_url()
@@ -252,11 +117,12 @@ class FactusClient:
     def authenticate(self) -> FactusToken:
         auth_url = f'{self.base_url}{self.auth_path}'
         try:
-            response = requests.post(
+            response = factus_http.send(
+                'POST',
                 auth_url,
                 data=self._auth_payload(),
                 headers={'Accept': 'application/json'},
-                timeout=30,
+                timeout_kind='auth',
             )
             response.raise_for_status()
             payload = response.json()
@@ -302,11 +168,12 @@ class FactusClient:
 
         refresh_url = f'{self.base_url}{self.refresh_token_path}'
         try:
-            response = requests.post(
+            response = factus_http.send(
+                'POST',
                 refresh_url,
                 data=self._refresh_payload(refresh_token),
                 headers={'Accept': 'application/json'},
-                timeout=30,
+                timeout_kind='auth',
             )
             response.raise_for_status()
             payload = response.json()
@@ -343,18 +210,12 @@ class FactusClient:
         return new_token
 
     def get_valid_token(self) -> str:
-        token = (
-            FactusToken.objects.filter(is_active=True)
-            .order_by('-created_at')
-            .first()
-        )
-        if token is None:
-            token = self.authenticate()
-        elif token.expires_at <= timezone.now():
-            token = self.refresh(token)
-        return token.access_token
+        return factus_token_manager.get_access_token(self)
+
+    def reauthenticate(self, rejected_token: str) -> str:
+        return factus_token_manager.force_reauthenticate(self, rejected_token)
 
-    def request(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:
+    def request(self, method: str, path: str, *, timeout_kind: str = 'default', **kwargs: Any) -> dict[str, Any]:
         token = self.get_valid_token()
         url = f"{self.base_url}{path}"
         headers = kwargs.pop('headers', {})
@@ -362,11 +223,11 @@ class FactusClient:
         headers.setdefault('Accept', 'application/json')
 
         try:
-            response = requests.request(method=method, url=url, headers=headers, timeout=45, **kwargs)
+            response = factus_http.send(method, url, headers=headers, timeout_kind=timeout_kind, **kwargs)
             if response.status_code == 401:
-                token = self.authenticate().access_token
+                token = self.reauthenticate(token)
                 headers['Authorization'] = f'Bearer {token}'
-                response = requests.request(method=method, url=url, headers=headers, timeout=45, **kwargs)
+                response = factus_http.send(method, url, headers=headers, timeout_kind=timeout_kind, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.HTTPError as exc:
@@ -443,12 +304,12 @@ class FactusClient:
         }
         refreshed = False
         try:
-            response = requests.get(url, headers=headers, timeout=45)
+            response = factus_http.send('GET', url, headers=headers, timeout_kind='download')
             if response.status_code == 401:
                 refreshed = True
-                token = self.authenticate().access_token
+                token = self.reauthenticate(token)
                 headers['Authorization'] = f'Bearer {token}'
-                response = requests.get(url, headers=headers, timeout=45)
+                response = factus_http.send('GET', url, headers=headers, timeout_kind='download')
             response.raise_for_status()
             return response.content, refreshed
         except requests.HTTPError as exc:
@@ -467,7 +328,7 @@ class FactusClient:
     def create_and_validate_invoice(self, payload: dict[str, Any]) -> dict[str, Any]:
         if not payload.get('items'):
             raise FactusValidationError('La factura no contiene ítems para enviar a Factus.')
-        return self.request('POST', self.invoice_path, json=payload)
+        return self.request('POST', self.invoice_path, json=payload, timeout_kind='validate')
 
     def send_invoice(self, payload: dict[str, Any]) -> dict[str, Any]:
         """Alias legacy: usar create_and_validate_invoice."""
@@ -477,7 +338,7 @@ class FactusClient:
     def send_credit_note(self, payload: dict[str, Any]) -> dict[str, Any]:
         if not payload.get('items'):
             raise FactusValidationError('La nota crédito no contiene ítems para enviar a Factus.')
-        return self.request('POST', self.credit_note_path, json=payload)
+        return self.request('POST', self.credit_note_path, json=payload, timeout_kind='validate')
 
     def create_and_validate_credit_note(self, payload: dict[str, Any]) -> dict[str, Any]:
         logger.info(
@@ -582,7 +443,7 @@ class FactusClient:
             raise FactusValidationError('El documento soporte debe incluir provider para enviar a Factus.')
         if not payload.get('items'):
             raise FactusValidationError('El documento soporte no contiene ítems para enviar a Factus.')
-        return self.request('POST', self.support_document_validate_path, json=payload)
+        return self.request('POST', self.support_document_validate_path, json=payload, timeout_kind='validate')
 
     def create_and_validate_support_document(self, payload: dict[str, Any]) -> dict[str, Any]:
         try:
@@ -667,7 +528,7 @@ class FactusClient:
             payload.get('reference_support_document_number'),
             numbering_range_id,
         )
-        return self.request('POST', self.support_adjustment_note_validate_path, json=payload)
+        return self.request('POST', self.support_adjustment_note_validate_path, json=payload, timeout_kind='validate')
 
 
     def get_numbering_ranges(self) -> dict[str, Any]:
@@ -866,11 +727,11 @@ class FactusClient:
         }
         headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
         try:
-            response = requests.post(url, headers=headers, files=files, timeout=45)
+            response = factus_http.send('POST', url, headers=headers, files=files, timeout_kind='upload')
             if response.status_code == 401:
-                token = self.authenticate().access_token
+                token = self.reauthenticate(token)
                 headers['Authorization'] = f'Bearer {token}'
-                response = requests.post(url, headers=headers, files=files, timeout=45)
+                response = factus_http.send('POST', url, headers=headers, files=files, timeout_kind='upload')
             response.raise_for_status()
             return response.json()
         except requests.HTTPError as exc:
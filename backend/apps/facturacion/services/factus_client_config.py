@@ -0,0 +1,159 @@
+"""Configuración inmutable de endpoints/credenciales de Factus, memoizada por proceso."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from decouple import config
+
+from apps.facturacion.services.factus_endpoints import get_endpoint, resolve_api_version
+from apps.facturacion.services.factus_environment import (
+    resolve_factus_base_url,
+    resolve_factus_environment,
+)
+
+logger = logging.getLogger(__name__)
+
+# (atributo en FactusClient, variable de entorno, nombre en el registry de endpoints)
+ENDPOINT_SETTINGS: tuple[tuple[str, str, str], ...] = (
+    ('invoice_path', 'FACTUS_INVOICE_PATH', 'bill_validate'),
+    ('bills_list_path', 'FACTUS_BILLS_LIST_PATH', 'bill_list'),
+    ('bill_show_path', 'FACTUS_BILL_SHOW_PATH', 'bill_show'),
+    ('bill_download_pdf_path', 'FACTUS_BILL_DOWNLOAD_PDF_PATH', 'bill_download_pdf'),
+    ('bill_download_xml_path', 'FACTUS_BILL_DOWNLOAD_XML_PATH', 'bill_download_xml'),
+    ('bill_email_content_path', 'FACTUS_BILL_EMAIL_CONTENT_PATH', 'bill_email_content'),
+    ('bill_send_email_path', 'FACTUS_BILL_SEND_EMAIL_PATH', 'bill_send_email'),
+    ('bill_custom_pdf_upload_path', 'FACTUS_BILL_CUSTOM_PDF_UPLOAD_PATH', 'bill_custom_pdf_upload'),
+    ('bill_delete_by_reference_path', 'FACTUS_BILL_DELETE_BY_REFERENCE_PATH', 'bill_delete_reference'),
+    ('credit_note_path', 'FACTUS_CREDIT_NOTE_PATH', 'credit_note_validate'),
+    ('credit_notes_list_path', 'FACTUS_CREDIT_NOTES_LIST_PATH', 'credit_note_list'),
+    ('credit_note_show_path', 'FACTUS_CREDIT_NOTE_SHOW_PATH', 'credit_note_show'),
+    ('credit_note_download_pdf_path', 'FACTUS_CREDIT_NOTE_DOWNLOAD_PDF_PATH', 'credit_note_download_pdf'),
+    ('credit_note_download_xml_path', 'FACTUS_CREDIT_NOTE_DOWNLOAD_XML_PATH', 'credit_note_download_xml'),
+    ('credit_note_email_content_path', 'FACTUS_CREDIT_NOTE_EMAIL_CONTENT_PATH', 'credit_note_email_content'),
+    ('credit_note_send_email_path', 'FACTUS_CREDIT_NOTE_SEND_EMAIL_PATH', 'credit_note_send_email'),
+    ('credit_note_delete_by_reference_path', 'FACTUS_CREDIT_NOTE_DELETE_BY_REFERENCE_PATH', 'credit_note_delete_reference'),
+    ('support_document_validate_path', 'FACTUS_SUPPORT_DOCUMENT_VALIDATE_PATH', 'support_document_validate'),
+    ('support_documents_list_path', 'FACTUS_SUPPORT_DOCUMENTS_LIST_PATH', 'support_document_list'),
+    ('support_document_show_path', 'FACTUS_SUPPORT_DOCUMENT_SHOW_PATH', 'support_document_show'),
+    ('support_document_download_pdf_path', 'FACTUS_SUPPORT_DOCUMENT_DOWNLOAD_PDF_PATH', 'support_document_download_pdf'),
+    ('support_document_download_xml_path', 'FACTUS_SUPPORT_DOCUMENT_DOWNLOAD_XML_PATH', 'support_document_download_xml'),
+    (
+        'support_document_delete_by_reference_path',
+        'FACTUS_SUPPORT_DOCUMENT_DELETE_BY_REFERENCE_PATH',
+        'support_document_delete_reference',
+    ),
+    ('support_adjustment_note_validate_path', 'FACTUS_SUPPORT_ADJUSTMENT_NOTE_VALIDATE_PATH', 'support_adjustment_validate'),
+    ('support_adjustment_notes_list_path', 'FACTUS_SUPPORT_ADJUSTMENT_NOTES_LIST_PATH', 'support_adjustment_list'),
+    ('support_adjustment_note_show_path', 'FACTUS_SUPPORT_ADJUSTMENT_NOTE_SHOW_PATH', 'support_adjustment_show'),
+    (
+        'support_adjustment_note_download_pdf_path',
+        'FACTUS_SUPPORT_ADJUSTMENT_NOTE_DOWNLOAD_PDF_PATH',
+        'support_adjustment_download_pdf',
+    ),
+    (
+        'support_adjustment_note_download_xml_path',
+        'FACTUS_SUPPORT_ADJUSTMENT_NOTE_DOWNLOAD_XML_PATH',
+        'support_adjustment_download_xml',
+    ),
+    (
+        'support_adjustment_note_delete_by_reference_path',
+        'FACTUS_SUPPORT_ADJUSTMENT_NOTE_DELETE_BY_REFERENCE_PATH',
+        'support_adjustment_delete_reference',
+    ),
+    ('numbering_ranges_path', 'FACTUS_NUMBERING_RANGES_PATH', 'numbering_ranges'),
+    ('numbering_range_show_path', 'FACTUS_NUMBERING_RANGE_SHOW_PATH', 'numbering_range_show'),
+    ('numbering_range_create_path', 'FACTUS_NUMBERING_RANGE_CREATE_PATH', 'numbering_range_create'),
+    ('numbering_range_delete_path', 'FACTUS_NUMBERING_RANGE_DELETE_PATH', 'numbering_range_delete'),
+    ('numbering_range_update_path', 'FACTUS_NUMBERING_RANGE_UPDATE_PATH', 'numbering_range_update_current'),
+    ('numbering_ranges_dian_path', 'FACTUS_NUMBERING_RANGES_DIAN_PATH', 'numbering_ranges_dian'),
+    ('bill_events_path', 'FACTUS_BILL_EVENTS_PATH', 'bill_events'),
+    ('bill_tacit_acceptance_path', 'FACTUS_BILL_TACIT_ACCEPTANCE_PATH', 'bill_tacit_acceptance'),
+    ('bill_email_template_path', 'FACTUS_BILL_EMAIL_TEMPLATE_PATH', 'bill_email_template'),
+    ('company_show_path', 'FACTUS_COMPANY_SHOW_PATH', 'company_show'),
+    ('company_update_path', 'FACTUS_COMPANY_UPDATE_PATH', 'company_update'),
+    ('company_update_logo_path', 'FACTUS_COMPANY_UPDATE_LOGO_PATH', 'company_update_logo'),
+    ('tributes_path', 'FACTUS_TRIBUTES_PATH', 'tributes_products'),
+    ('measurement_units_path', 'FACTUS_MEASUREMENT_UNITS_PATH', 'unit_measures'),
+    ('countries_path', 'FACTUS_COUNTRIES_PATH', 'countries'),
+    ('municipalities_path', 'FACTUS_MUNICIPALITIES_PATH', 'municipalities'),
+    ('reference_tables_path', 'FACTUS_REFERENCE_TABLES_PATH', 'reference_tables'),
+    ('customers_lookup_path', 'FACTUS_CUSTOMERS_LOOKUP_PATH', 'customers_lookup'),
+    ('document_receptions_path', 'FACTUS_DOCUMENT_RECEPTIONS_PATH', 'document_receptions'),
+    ('subscriptions_path', 'FACTUS_SUBSCRIPTIONS_PATH', 'subscriptions'),
+    (
+        'document_download_xml_attached_path',
+        'FACTUS_DOCUMENT_DOWNLOAD_XML_ATTACHED_PATH',
+        'document_download_xml_attached',
+    ),
+)
+
+
+@dataclass(frozen=True)
+class FactusClientConfig:
+    base_url: str
+    environment: str
+    api_version: str
+    auth_path: str
+    refresh_token_path: str
+    paths: Mapping[str, str]
+    client_id: str
+    client_secret: str
+    username: str
+    password: str
+
+
+_cache: dict[tuple[str, str, str], FactusClientConfig] = {}
+_cache_lock = threading.Lock()
+
+
+def _build_client_config(*, base_url: str, environment: str, api_version: str) -> FactusClientConfig:
+    paths = {
+        attr: config(env_var, default=get_endpoint(endpoint_name, api_version=api_version))
+        for attr, env_var, endpoint_name in ENDPOINT_SETTINGS
+    }
+    built = FactusClientConfig(
+        base_url=base_url,
+        environment=environment,
+        api_version=api_version,
+        auth_path=config('FACTUS_AUTH_PATH', default='/oauth/token'),
+        refresh_token_path=config('FACTUS_REFRESH_TOKEN_PATH', default='/oauth/token'),
+        paths=MappingProxyType(paths),
+        client_id=config('FACTUS_CLIENT_ID', default=''),
+        client_secret=config('FACTUS_CLIENT_SECRET', default=''),
+        username=config('FACTUS_USERNAME', default=''),
+        password=config('FACTUS_PASSWORD', default=''),
+    )
+    logger.info(
+        'factus.client.credit_note.endpoints environment=%s create=%s list=%s show=%s',
+        environment,
+        paths['credit_note_path'],
+        paths['credit_notes_list_path'],
+        paths['credit_note_show_path'],
+    )
+    return built
+
+
+def get_client_config() -> FactusClientConfig:
+    """Devuelve la configuración memoizada para el entorno/versión vigentes."""
+    key = (resolve_factus_environment(), resolve_api_version(), resolve_factus_base_url())
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None:
+            environment, api_version, base_url = key
+            cached = _build_client_config(base_url=base_url, environment=environment, api_version=api_version)
+            _cache[key] = cached
+    return cached
+
+
+def invalidate_client_config() -> None:
+    """Descarta la configuración memoizada; se reconstruye en el próximo FactusClient()."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,126 @@
+"""Transporte HTTP compartido (pool keep-alive + reintentos) para Factus."""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any
+
+import requests
+from decouple import config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Timeouts (connect, read) en segundos por tipo de endpoint. Se pueden
+# sobreescribir con FACTUS_HTTP_TIMEOUT_<TIPO>="connect,read".
+DEFAULT_TIMEOUTS: dict[str, tuple[float, float]] = {
+    'auth': (5.0, 30.0),
+    'default': (5.0, 45.0),
+    'validate': (5.0, 90.0),
+    'download': (5.0, 60.0),
+    'upload': (5.0, 90.0),
+}
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _parse_timeout(raw: str, fallback: tuple[float, float]) -> tuple[float, float]:
+    parts = [part.strip() for part in str(raw or '').split(',') if part.strip()]
+    try:
+        if len(parts) == 1:
+            return (fallback[0], float(parts[0]))
+        if len(parts) >= 2:
+            return (float(parts[0]), float(parts[1]))
+    except ValueError:
+        pass
+    return fallback
+
+
+def resolve_timeout(kind: str = 'default') -> tuple[float, float]:
+    """Devuelve el timeout (connect, read) configurado para un tipo de endpoint."""
+    fallback = DEFAULT_TIMEOUTS.get(kind, DEFAULT_TIMEOUTS['default'])
+    raw = config(f'FACTUS_HTTP_TIMEOUT_{kind.upper()}', default='')
+    return _parse_timeout(raw, fallback)
+
+
+def _build_retry() -> Retry:
+    retries = config('FACTUS_HTTP_MAX_RETRIES', default=2, cast=int)
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=config('FACTUS_HTTP_BACKOFF_FACTOR', default=0.5, cast=float),
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+
+
+def build_session() -> requests.Session:
+    """Construye una sesión con pool de conexiones persistentes hacia Factus."""
+    adapter = HTTPAdapter(
+        pool_connections=config('FACTUS_HTTP_POOL_CONNECTIONS', default=4, cast=int),
+        pool_maxsize=config('FACTUS_HTTP_POOL_MAXSIZE', default=16, cast=int),
+        max_retries=_build_retry(),
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Sesión única por proceso compartida por todos los FactusClient."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def reset_session() -> None:
+    """Cierra el pool actual; la próxima llamada crea uno nuevo."""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
+
+def _reset_after_fork() -> None:
+    # Los workers de gunicorn no deben heredar sockets abiertos del master.
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def send(
+    method: str,
+    url: str,
+    *,
+    timeout_kind: str = 'default',
+    timeout: float | tuple[float, float] | None = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Ejecuta la petición usando el pool compartido.
+
+    Los reintentos con backoff sólo aplican a métodos idempotentes; los POST de
+    validación nunca se reenvían automáticamente.
+    """
+    return get_session().request(
+        method=method.upper(),
+        url=url,
+        timeout=timeout if timeout is not None else resolve_timeout(timeout_kind),
+        **kwargs,
+    )
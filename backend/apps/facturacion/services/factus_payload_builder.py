@@ -9,11 +9,12 @@ from typing import Any
 
 from django.conf import settings
 
-from apps.core.models import ConfiguracionFacturacion, Impuesto
+from apps.core.services.configuracion_cache import get_configuracion_facturacion
 from apps.facturacion.services.consecutivo_service import resolve_electronic_numbering_range_id
 from apps.facturacion.services.factus_catalog_lookup import (
     get_first_active_tribute_id,
     get_document_type_id,
+    get_impuesto_tribute_id,
     get_municipality_id,
     get_payment_method_code,
     get_tribute_id,
@@ -60,17 +61,12 @@ def _resolve_customer_tribute_id(tipo_documento: str) -> int:
 
 def _resolve_item_tribute_id(iva_porcentaje: Decimal) -> int:
     porcentaje = Decimal(iva_porcentaje or Decimal('0'))
-    impuesto = (
-        Impuesto.objects.filter(porcentaje=porcentaje, is_active=True)
-        .exclude(factus_tribute_id__isnull=True)
-        .order_by('-id')
-        .first()
-    )
-    if not impuesto or not impuesto.factus_tribute_id:
+    factus_tribute_id = get_impuesto_tribute_id(porcentaje)
+    if not factus_tribute_id:
         raise FactusValidationError(
             f'Falta homologación Factus para impuesto {porcentaje}% en Configuración > Impuestos.'
         )
-    return int(impuesto.factus_tribute_id)
+    return int(factus_tribute_id)
 
 
 def _resolve_excluded_item_tribute_id() -> int:
@@ -327,7 +323,7 @@ def build_invoice_payload(venta: Venta) -> dict:
         venta.id,
         numbering_range_id,
     )
-    configuracion = ConfiguracionFacturacion.objects.order_by('-id').first()
+    configuracion = get_configuracion_facturacion()
     detalles = list(venta.detalles.select_related('producto').all())
     items: list[dict[str, Any]] = []
     for detalle in detalles:
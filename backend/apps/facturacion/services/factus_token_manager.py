@@ -0,0 +1,117 @@
+"""Caché en memoria del token OAuth de Factus con refresh de vuelo único.
+
+El access token vive en memoria del proceso hasta ``expires_at`` menos un
+margen de seguridad. Sólo ante un miss se consulta ``FactusToken`` y, si el
+token venció, un único refresh se ejecuta a la vez: un lock de hilo dentro
+del proceso y un advisory lock de PostgreSQL entre workers de gunicorn.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterator
+
+from decouple import config
+from django.db import connection
+from django.utils import timezone
+
+from apps.facturacion_electronica.models import FactusToken
+
+if TYPE_CHECKING:
+    from apps.facturacion.services.factus_client import FactusClient
+
+logger = logging.getLogger(__name__)
+
+# Clave fija del advisory lock ('FACT' en ASCII) compartida por todos los workers.
+FACTUS_TOKEN_ADVISORY_LOCK_KEY = 0x46414354
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    access_token: str
+    expires_at: datetime
+
+
+_cached: CachedToken | None = None
+_refresh_lock = threading.Lock()
+
+
+def _safety_margin() -> timedelta:
+    return timedelta(seconds=config('FACTUS_TOKEN_SAFETY_MARGIN_SECONDS', default=30, cast=int))
+
+
+def _is_fresh(expires_at: datetime | None) -> bool:
+    if not isinstance(expires_at, datetime):
+        return False
+    return expires_at - _safety_margin() > timezone.now()
+
+
+def _remember(token: object) -> str:
+    global _cached
+    access_token = str(getattr(token, 'access_token', '') or '')
+    expires_at = getattr(token, 'expires_at', None)
+    if access_token and _is_fresh(expires_at):
+        _cached = CachedToken(access_token=access_token, expires_at=expires_at)
+    else:
+        _cached = None
+    return access_token
+
+
+def _load_active_token() -> FactusToken | None:
+    return FactusToken.objects.filter(is_active=True).order_by('-created_at').first()
+
+
+def clear_cache() -> None:
+    """Olvida el token en memoria (p. ej. al cambiar credenciales o entorno)."""
+    global _cached
+    _cached = None
+
+
+@contextmanager
+def _cross_worker_lock() -> Iterator[None]:
+    """Serializa el refresh entre workers con ``pg_advisory_lock``."""
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [FACTUS_TOKEN_ADVISORY_LOCK_KEY])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [FACTUS_TOKEN_ADVISORY_LOCK_KEY])
+
+
+def get_access_token(client: FactusClient) -> str:
+    """Devuelve un access token vigente haciendo a lo sumo un round trip OAuth."""
+    cached = _cached
+    if cached is not None and _is_fresh(cached.expires_at):
+        return cached.access_token
+
+    token = _load_active_token()
+    if token is not None and _is_fresh(token.expires_at):
+        return _remember(token)
+
+    with _refresh_lock, _cross_worker_lock():
+        # Otro hilo/worker pudo renovar mientras esperábamos el lock.
+        token = _load_active_token()
+        if token is not None and _is_fresh(token.expires_at):
+            return _remember(token)
+        logger.info('factus.token.refresh reason=%s', 'missing' if token is None else 'expired')
+        renewed = client.authenticate() if token is None else client.refresh(token)
+        return _remember(renewed)
+
+
+def force_reauthenticate(client: FactusClient, rejected_token: str) -> str:
+    """Reemplaza un token rechazado con 401 sin duplicar autenticaciones concurrentes."""
+    clear_cache()
+    with _refresh_lock, _cross_worker_lock():
+        token = _load_active_token()
+        if token is not None and token.access_token != rejected_token and _is_fresh(token.expires_at):
+            return _remember(token)
+        logger.info('factus.token.reauthenticate reason=unauthorized')
+        return _remember(client.authenticate())
@@ -66,3 +66,16 @@ def has_documental_inconsistency(factura: FacturaElectronica) -> bool:
 def can_expose_public_invoice_url(factura: FacturaElectronica) -> bool:
     status = str(factura.estado_electronico or '').strip()
     return status in {'ACEPTADA', 'ACEPTADA_CON_OBSERVACIONES'} and not has_documental_inconsistency(factura)
+
+
+def count_bill_errors(factura: FacturaElectronica) -> int:
+    response_json = factura.response_json if isinstance(factura.response_json, dict) else {}
+    bill_errors = response_json.get('bill_errors', [])
+    return len(bill_errors) if isinstance(bill_errors, list) else 0
+
+
+def refresh_listing_flags(factura: FacturaElectronica) -> None:
+    """Recalcula en memoria los derivados que consume el listado (no guarda)."""
+    factura.documento_inconsistente = has_documental_inconsistency(factura)
+    factura.resolved_public_url = resolve_public_invoice_url(factura)[:2048]
+    factura.bill_errors_count = count_bill_errors(factura)
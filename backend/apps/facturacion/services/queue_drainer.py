@@ -0,0 +1,80 @@
+"""Hilo de fondo que drena las colas de facturación dentro del servicio web.
+
+Drena los artefactos post-emisión y la conciliación diferida de notas crédito.
+Render despliega un solo servicio web con su propio disco: los artefactos que
+se descargan deben quedar en el ``MEDIA_ROOT`` de ese mismo proceso. Por eso
+``config.wsgi`` arranca aquí un hilo daemon por worker de gunicorn que reclama
+lotes de la cola (``SKIP LOCKED`` hace seguro tener varios) y duerme cuando no
+hay trabajo; la emisión lo despierta al hacer commit. Los comandos de gestión
+siguen disponibles para drenar a mano.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+
+from decouple import config
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_wake = threading.Event()
+_lock = threading.Lock()
+_started_pid: int | None = None
+
+
+def drainer_enabled() -> bool:
+    return config('FACTUS_BACKGROUND_DRAIN', default=True, cast=bool)
+
+
+def _interval() -> float:
+    return config('FACTUS_BACKGROUND_DRAIN_INTERVAL_SECONDS', default=5.0, cast=float)
+
+
+def drain_once() -> int:
+    """Procesa un lote de cada cola; devuelve cuántos elementos se reclamaron."""
+    from apps.facturacion.services.credit_note_reconciler import reconcile_due_credit_notes
+    from apps.facturacion.services.factura_artifact_jobs import process_pending_jobs
+
+    claimed = 0
+    for name, step in (('artefactos', process_pending_jobs), ('notas_credito', reconcile_due_credit_notes)):
+        try:
+            claimed += step()['claimed']
+        except Exception:
+            # Una cola con errores (p. ej. Factus caído) no detiene a la otra.
+            logger.exception('facturacion.queue_drainer.step_error step=%s', name)
+    return claimed
+
+
+def _run() -> None:
+    while True:
+        try:
+            claimed = drain_once()
+        finally:
+            # Hilo de larga vida: descarta conexiones caídas o vencidas entre lotes.
+            close_old_connections()
+        if claimed:
+            continue
+        _wake.wait(_interval())
+        _wake.clear()
+
+
+def start_queue_drainer() -> bool:
+    """Arranca el hilo una vez por proceso; devuelve si quedó corriendo."""
+    global _started_pid
+    if not drainer_enabled():
+        return False
+    with _lock:
+        if _started_pid == os.getpid():
+            return True
+        threading.Thread(target=_run, name='facturacion-queue-drainer', daemon=True).start()
+        _started_pid = os.getpid()
+    logger.info('facturacion.queue_drainer.started pid=%s', _started_pid)
+    return True
+
+
+def wake_queue_drainer() -> None:
+    """Pide al hilo un lote inmediato (no hace nada si el hilo no corre)."""
+    _wake.set()
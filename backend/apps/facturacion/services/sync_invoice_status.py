@@ -1,20 +1,26 @@
-"""Servicio para consultar y sincronizar el estado DIAN de una factura en Factus."""
+"""Servicio para consultar y sincronizar el estado DIAN de facturas en Factus (una o por lotes)."""
 
 from __future__ import annotations
 
 import logging
-from typing import Any
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
 
-from django.db import transaction
+from decouple import config
+from django.db import connections, transaction
 from django.utils import timezone
 
 from apps.facturacion.models import FacturaElectronica
-from apps.facturacion.services.electronic_state_machine import map_factus_status
+from apps.facturacion.services.electronic_state_machine import extract_bill_errors, map_factus_status
 from apps.facturacion.services.exceptions import FacturaNoEncontrada, FactusConsultaError
 from apps.facturacion.services.factus_client import FactusAPIError, FactusAuthError, FactusClient
 
 logger = logging.getLogger(__name__)
 
+
 def _extract_bill_data(response_json: dict[str, Any]) -> dict[str, str]:
     data = response_json.get('data', response_json)
     bill = data.get('bill', data)
@@ -31,6 +37,51 @@ def _extract_bill_data(response_json: dict[str, Any]) -> dict[str, str]:
     }
 
 
+REMOTE_NOT_FOUND_FIELDS = ['estado_electronico', 'codigo_error', 'mensaje_error', 'response_json', 'updated_at']
+BILL_DATA_FIELDS = [
+    'cufe',
+    'uuid',
+    'estado_electronico',
+    'estado_factus_raw',
+    'xml_url',
+    'pdf_url',
+    'codigo_error',
+    'mensaje_error',
+    'response_json',
+    'ultima_sincronizacion_at',
+    'updated_at',
+]
+
+
+def _apply_remote_not_found(factura: FacturaElectronica, detail: str) -> None:
+    factura.estado_electronico = factura.estado_electronico or 'PENDIENTE_REINTENTO'
+    factura.codigo_error = 'FACTUS_DOCUMENTO_NO_ENCONTRADO'
+    factura.mensaje_error = (
+        'Factus aún no reporta el documento para este número; intente sincronizar nuevamente en unos minutos.'
+    )
+    existing_response = factura.response_json if isinstance(factura.response_json, dict) else {}
+    factura.response_json = {
+        **existing_response,
+        'sync_estado': 'REMOTE_NOT_FOUND',
+        'sync_numero': factura.number,
+        'sync_error_detail': detail,
+    }
+
+
+def _apply_bill_data(factura: FacturaElectronica, response_json: dict[str, Any]) -> None:
+    payload = _extract_bill_data(response_json)
+    factura.cufe = payload['cufe'] or factura.cufe
+    factura.uuid = payload['uuid'] or factura.uuid
+    factura.estado_electronico = payload['status']
+    factura.estado_factus_raw = payload['estado_factus_raw']
+    factura.xml_url = payload['xml_url'] or factura.xml_url
+    factura.pdf_url = payload['pdf_url'] or factura.pdf_url
+    factura.codigo_error = payload['codigo_error'] or None
+    factura.mensaje_error = payload['mensaje_error'] or None
+    factura.response_json = response_json
+    factura.ultima_sincronizacion_at = timezone.now()
+
+
 def sync_invoice_status(numero_factura: str) -> FacturaElectronica:
     logger.info('consulta_factura numero=%s', numero_factura)
 
@@ -49,27 +100,8 @@ def sync_invoice_status(numero_factura: str) -> FacturaElectronica:
                 numero_factura,
             )
             with transaction.atomic():
-                factura.estado_electronico = factura.estado_electronico or 'PENDIENTE_REINTENTO'
-                factura.codigo_error = 'FACTUS_DOCUMENTO_NO_ENCONTRADO'
-                factura.mensaje_error = (
-                    'Factus aún no reporta el documento para este número; intente sincronizar nuevamente en unos minutos.'
-                )
-                existing_response = factura.response_json if isinstance(factura.response_json, dict) else {}
-                factura.response_json = {
-                    **existing_response,
-                    'sync_estado': 'REMOTE_NOT_FOUND',
-                    'sync_numero': numero_factura,
-                    'sync_error_detail': str(exc),
-                }
-                factura.save(
-                    update_fields=[
-                        'estado_electronico',
-                        'codigo_error',
-                        'mensaje_error',
-                        'response_json',
-                        'updated_at',
-                    ]
-                )
+                _apply_remote_not_found(factura, str(exc))
+                factura.save(update_fields=REMOTE_NOT_FOUND_FIELDS)
             return factura
         logger.exception('error_consulta_factura numero=%s', numero_factura)
         raise FactusConsultaError('No fue posible consultar el estado de la factura en Factus.') from exc
@@ -77,34 +109,225 @@ def sync_invoice_status(numero_factura: str) -> FacturaElectronica:
         logger.exception('error_consulta_factura numero=%s', numero_factura)
         raise FactusConsultaError('No fue posible consultar el estado de la factura en Factus.') from exc
 
-    payload = _extract_bill_data(response_json)
-
     with transaction.atomic():
-        factura.cufe = payload['cufe'] or factura.cufe
-        factura.uuid = payload['uuid'] or factura.uuid
-        factura.estado_electronico = payload['status']
-        factura.estado_factus_raw = payload['estado_factus_raw']
-        factura.xml_url = payload['xml_url'] or factura.xml_url
-        factura.pdf_url = payload['pdf_url'] or factura.pdf_url
-        factura.codigo_error = payload['codigo_error'] or None
-        factura.mensaje_error = payload['mensaje_error'] or None
-        factura.response_json = response_json
-        factura.ultima_sincronizacion_at = timezone.now()
-        factura.save(
-            update_fields=[
-                'cufe',
-                'uuid',
-                'estado_electronico',
-                'estado_factus_raw',
-                'xml_url',
-                'pdf_url',
-                'codigo_error',
-                'mensaje_error',
-                'response_json',
-                'ultima_sincronizacion_at',
-                'updated_at',
-            ]
-        )
+        _apply_bill_data(factura, response_json)
+        factura.save(update_fields=BILL_DATA_FIELDS)
 
     logger.info('sincronizacion_estado numero=%s estado=%s', factura.number, factura.estado_electronico)
     return factura
+
+
+# Estados del listado de Factus que indican factura validada (el detalle trae CUFE y URLs).
+_LISTED_VALIDATED_STATUSES = frozenset({'1', 'true', 'validated', 'issued'})
+_NUMBER_PREFIX_RE = re.compile(r'^(\D*)')
+# Resultados de detalle que se guardan juntos (una transacción corta por bloque).
+_SAVE_CHUNK_SIZE = 50
+
+
+@dataclass
+class InvoiceStatusSyncSummary:
+    total: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    not_found: int = 0
+    failed: int = 0
+    list_calls: int = 0
+    detail_calls: int = 0
+    elapsed_seconds: float = 0.0
+    errors: list[tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def per_second(self) -> float:
+        return self.total / self.elapsed_seconds if self.elapsed_seconds else float(self.total)
+
+
+def _listed_items(response_json: dict[str, Any]) -> tuple[list[dict[str, Any]], int]:
+    """Items y última página de una respuesta de ``list_invoices``."""
+    data = response_json.get('data', response_json) if isinstance(response_json, dict) else response_json
+    pagination: dict[str, Any] = {}
+    if isinstance(data, dict):
+        pagination = data.get('pagination') or {}
+        data = data.get('data', [])
+    items = [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+    return items, int(pagination.get('last_page') or 1)
+
+
+def _scan_listing(
+    client: FactusClient,
+    prefix: str,
+    numbers: set[str],
+    *,
+    max_pages: int,
+) -> tuple[dict[str, dict[str, Any]], int]:
+    """Pagina el listado del prefijo hasta ver todos los números.
+
+    Devuelve (items encontrados, llamadas hechas).
+    """
+    found: dict[str, dict[str, Any]] = {}
+    page = last_page = 1
+    try:
+        while page <= min(last_page, max_pages):
+            filters: dict[str, Any] = {'page': page}
+            if prefix:
+                filters['filter[prefix]'] = prefix
+            items, last_page = _listed_items(client.list_invoices(filters=filters))
+            for item in items:
+                number = str(item.get('number') or '').strip()
+                if number in numbers:
+                    found[number] = item
+            if len(found) == len(numbers):
+                return found, page
+            page += 1
+        return found, page - 1
+    finally:
+        # Igual que en ``_fetch_detail``: no dejar conexiones abiertas en el hilo del pool.
+        connections.close_all()
+
+
+def _needs_detail(item: dict[str, Any]) -> bool:
+    # Sólo validadas o con errores cambian de estado; el resto sigue pendiente en Factus.
+    status = str(item.get('status', '')).strip().lower()
+    return status in _LISTED_VALIDATED_STATUSES or bool(extract_bill_errors(item))
+
+
+def _fetch_detail(client: FactusClient, number: str) -> tuple[str, dict[str, Any] | None, Exception | None]:
+    try:
+        return number, client.get_invoice(number), None
+    except (FactusAPIError, FactusAuthError) as exc:
+        return number, None, exc
+    finally:
+        # Un reintento de autenticación puede abrir conexión a la BD en este hilo.
+        connections.close_all()
+
+
+def _save_results(results: list[tuple[int, dict[str, Any] | None, str]]) -> None:
+    """Guarda un bloque de detalles sobre las filas actuales bloqueadas.
+
+    Cada resultado es (pk, respuesta de ``get_invoice`` o ``None`` si Factus respondió 404,
+    detalle del 404). Se releen las filas para no pisar cambios hechos mientras se
+    consultaba Factus, y ``save(update_fields=...)`` sólo escribe las columnas de la
+    sincronización, ``status`` y (vía ``save``) los derivados del listado.
+    """
+    with transaction.atomic():
+        facturas = {
+            factura.pk: factura
+            for factura in FacturaElectronica.objects.select_for_update()
+            .filter(pk__in=[pk for pk, _, _ in results])
+            .order_by('pk')
+        }
+        for pk, response_json, detail in results:
+            factura = facturas.get(pk)
+            if factura is None:
+                continue
+            if response_json is not None:
+                _apply_bill_data(factura, response_json)
+                factura.save(update_fields=[*BILL_DATA_FIELDS, 'status'])
+            else:
+                _apply_remote_not_found(factura, detail)
+                factura.save(update_fields=[*REMOTE_NOT_FOUND_FIELDS, 'status'])
+
+
+def sync_invoice_statuses(
+    facturas: Iterable[FacturaElectronica],
+    *,
+    concurrency: int = 4,
+    max_list_pages: int | None = None,
+    client: FactusClient | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> InvoiceStatusSyncSummary:
+    """Sincroniza el estado de muchas facturas con un cliente compartido y un pool acotado de hilos.
+
+    Primero recorre ``list_invoices`` por prefijo (muchas facturas por llamada): las que
+    siguen pendientes allí no se consultan. Las validadas, con errores o no vistas en el
+    listado piden el detalle (``get_invoice``) en paralelo; sólo un 404 del detalle las
+    marca como no encontradas. Los resultados se guardan por bloques a medida que llegan,
+    así un fallo a mitad de la corrida conserva lo ya sincronizado.
+    """
+    started = time.monotonic()
+    summary = InvoiceStatusSyncSummary()
+    by_number = {factura.number: factura for factura in facturas if factura.number}
+    summary.total = len(by_number)
+    if not by_number:
+        return summary
+
+    max_list_pages = max_list_pages or config('FACTUS_SYNC_LIST_MAX_PAGES', default=20, cast=int)
+    client = client or FactusClient()
+    try:
+        # Token en memoria antes de abrir hilos: los workers sólo lo leen.
+        client.get_valid_token()
+    except (FactusAPIError, FactusAuthError) as exc:
+        raise FactusConsultaError('No fue posible autenticarse con Factus.') from exc
+
+    groups: dict[str, set[str]] = {}
+    for number, factura in by_number.items():
+        prefix = (factura.factus_number_prefix or _NUMBER_PREFIX_RE.match(number).group(1)).strip()
+        groups.setdefault(prefix, set()).add(number)
+
+    listed: dict[str, dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        scans = {
+            pool.submit(_scan_listing, client, prefix, numbers, max_pages=max_list_pages): prefix
+            for prefix, numbers in groups.items()
+        }
+        for future in as_completed(scans):
+            prefix = scans[future]
+            try:
+                found, calls = future.result()
+            except Exception as exc:
+                # Sin listado todas las del prefijo piden detalle.
+                logger.warning('sync_invoice_statuses.listado_fallido prefijo=%s detalle=%s', prefix, exc)
+                continue
+            summary.list_calls += calls
+            listed.update(found)
+
+        pending = []
+        for number in by_number:
+            if number in listed and not _needs_detail(listed[number]):
+                summary.unchanged += 1
+            else:
+                # Ausente del listado no basta para marcarla: lo confirma el detalle.
+                pending.append(number)
+
+        details = {pool.submit(_fetch_detail, client, number): number for number in pending}
+        to_save: list[tuple[int, dict[str, Any] | None, str]] = []
+        try:
+            for done, future in enumerate(as_completed(details), start=1):
+                number = details[future]
+                summary.detail_calls += 1
+                try:
+                    _, response_json, exc = future.result()
+                except Exception as unexpected:
+                    logger.exception('sync_invoice_statuses.detalle_inesperado numero=%s', number)
+                    response_json, exc = None, unexpected
+                factura = by_number[number]
+                if exc is None:
+                    to_save.append((factura.pk, response_json, ''))
+                    summary.updated += 1
+                elif getattr(exc, 'status_code', None) == 404:
+                    to_save.append((factura.pk, None, str(exc)))
+                    summary.not_found += 1
+                else:
+                    logger.warning('sync_invoice_statuses.detalle_fallido numero=%s detalle=%s', number, exc)
+                    summary.failed += 1
+                    summary.errors.append((number, str(exc)))
+                if len(to_save) >= _SAVE_CHUNK_SIZE:
+                    _save_results(to_save)
+                    to_save = []
+                if progress is not None:
+                    progress(done, len(details))
+        finally:
+            if to_save:
+                _save_results(to_save)
+
+    summary.elapsed_seconds = time.monotonic() - started
+    logger.info(
+        'sync_invoice_statuses total=%s updated=%s unchanged=%s not_found=%s failed=%s list_calls=%s detail_calls=%s',
+        summary.total,
+        summary.updated,
+        summary.unchanged,
+        summary.not_found,
+        summary.failed,
+        summary.list_calls,
+        summary.detail_calls,
+    )
+    return summary
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core.models import ConfiguracionFacturacion
+from apps.facturacion.models import FacturaElectronica
+from apps.facturacion.services import factus_token_manager
+from apps.facturacion.services.consecutivo_service import invalidate_technical_ranges_cache
+from apps.facturacion.services.factus_catalog_cache import MODELOS_CATALOGO, invalidar_catalogos_factus
+from apps.facturacion.services.factus_client_config import invalidate_client_config
+from apps.facturacion.services.public_invoice_url import refresh_listing_flags
+
+
+@receiver(post_save, sender=ConfiguracionFacturacion)
+def invalidar_configuracion_factus(sender, instance, update_fields=None, **kwargs):
+    """Reconstruye endpoints, token y rangos de Factus cuando cambia el ambiente configurado."""
+    if update_fields is not None and 'ambiente_factus' not in update_fields:
+        return
+    invalidate_client_config()
+    factus_token_manager.clear_cache()
+    invalidate_technical_ranges_cache()
+
+
+@receiver(pre_save, sender=FacturaElectronica)
+def precalcular_campos_listado(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Mantiene al día los derivados almacenados que usa el listado paginado."""
+    if raw:
+        return
+    if update_fields is not None and not sender.LISTING_SOURCE_FIELDS.intersection(update_fields):
+        return
+    refresh_listing_flags(instance)
+
+
+def invalidar_catalogos(sender, raw=False, **kwargs):
+    """Cualquier cambio en catálogos, homologaciones o impuestos descarta la foto en memoria."""
+    if raw:
+        return
+    invalidar_catalogos_factus()
+
+
+for _modelo in MODELOS_CATALOGO:
+    post_save.connect(invalidar_catalogos, sender=_modelo, dispatch_uid=f'invalidar_catalogos_{_modelo._meta.label_lower}')
+    post_delete.connect(invalidar_catalogos, sender=_modelo, dispatch_uid=f'invalidar_catalogos_borrado_{_modelo._meta.label_lower}')
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import tempfile
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
 from io import StringIO
@@ -13,13 +13,19 @@ from apps.facturacion.exceptions import DocumentoSoporteInvalido
 
 from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from django.db import DataError
+from django.db import DataError, connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APIClient
 
-from apps.facturacion.models import DocumentoSoporteElectronico, FacturaElectronica, NotaCreditoElectronica
-from apps.facturacion_electronica.catalogos.models import DocumentoIdentificacionFactus
+from apps.facturacion.models import (
+    DocumentoSoporteElectronico,
+    FacturaArtifactJob,
+    FacturaElectronica,
+    NotaCreditoElectronica,
+)
+from apps.facturacion_electronica.catalogos.models import DocumentoIdentificacionFactus, MunicipioFactus, TributoFactus
 from apps.facturacion.services.download_invoice_files import download_pdf, download_xml
 from apps.facturacion.services.electronic_document_service import DownloadedDocument, ElectronicDocumentFileService
 from apps.facturacion.services.electronic_state_machine import map_factus_status, resolve_actions
@@ -32,10 +38,19 @@ from apps.facturacion.services.facturar_venta import (
 )
 from apps.facturacion.services.upload_custom_pdf_to_factus import upload_custom_pdf_to_factus
 from apps.facturacion.services.factura_assets_service import sync_invoice_assets
+from apps.facturacion.services.factura_artifact_jobs import (
+    claim_jobs,
+    enqueue_invoice_artifacts,
+    process_pending_jobs,
+)
+from apps.facturacion.services.queue_drainer import drain_once
+from apps.facturacion.services.catalog_sync_service import CatalogSyncService
 from apps.facturacion.services.consecutivo_service import InvoiceSequence, resolve_numbering_range
+from apps.facturacion.services.factus_catalog_cache import clear_catalogos_factus_cache, get_catalogos_factus
 from apps.facturacion.services.factus_catalog_lookup import (
     get_municipality_id,
     get_payment_method_code,
+    get_tribute_id,
     get_unit_measure_id,
 )
 from apps.facturacion.services.factus_payload_builder import build_invoice_payload
@@ -47,6 +62,7 @@ from apps.facturacion.services.reconciliation import (
 from apps.facturacion.services.validators import to_bool
 from apps.facturacion.services.support_document_payload_builder import build_support_document_payload
 from apps.facturacion.services.exceptions import DescargaFacturaError
+from apps.facturacion.services.sync_invoice_status import sync_invoice_statuses
 from apps.facturacion.services.factus_client import (
     FactusAPIError,
     FactusClient,
@@ -62,6 +78,7 @@ from apps.facturacion.services.credit_note_workflow import (
     sincronizar_nota_credito,
 )
 from apps.facturacion.services.credit_note_service import build_credit_preview, create_credit_note
+from apps.facturacion.services.credit_note_reconciler import reconcile_due_credit_notes
 from apps.facturacion.services.invoice_email_delete_service import (
     delete_invoice_in_factus,
     get_invoice_email_content,
@@ -313,6 +330,7 @@ class FacturarVentaReferenceCodeTests(TestCase):
         self.assertIn('Posible colisión por reuse de reference_code', str(exc.exception))
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class FacturaHybridPdfFlowTests(TestCase):
     def setUp(self):
         User = get_user_model()
@@ -482,6 +500,224 @@ class FacturaAssetsSyncGuardTests(TestCase):
         self.assertEqual(self.factura.number, 'SETP-ASSET-2')
 
 
+class FacturaArtifactJobQueueTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='artifacts-user', password='1234')
+        self.cliente = Cliente.objects.create(numero_documento='9004', nombre='Cliente Artefactos')
+        self.venta = Venta.objects.create(
+            tipo_comprobante='FACTURA',
+            cliente=self.cliente,
+            vendedor=self.user,
+            subtotal=Decimal('10'),
+            descuento_porcentaje=Decimal('0'),
+            descuento_valor=Decimal('0'),
+            iva=Decimal('1.9'),
+            total=Decimal('11.9'),
+            medio_pago='EFECTIVO',
+            efectivo_recibido=Decimal('12'),
+            cambio=Decimal('0.1'),
+            estado='FACTURADA',
+            numero_comprobante='FAC-ART-1',
+        )
+        self.factura = FacturaElectronica.objects.create(
+            venta=self.venta,
+            number='SETP-ART-1',
+            reference_code='REF-ART-1',
+            cufe='CUFE-ART-1',
+            uuid='UUID-ART-1',
+            status='ACEPTADA',
+            estado_electronico='ACEPTADA',
+            response_json={'ok': True},
+        )
+
+    def test_enqueue_es_idempotente(self):
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML, FacturaArtifactJob.KIND_PDF])
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML, FacturaArtifactJob.KIND_PDF])
+
+        self.assertEqual(self.factura.artifact_jobs.count(), 2)
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_pdf')
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_xml')
+    def test_worker_descarga_y_marca_completado(self, mocked_xml, mocked_pdf):
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML, FacturaArtifactJob.KIND_PDF])
+
+        summary = process_pending_jobs(workers=1)
+
+        self.assertEqual(summary['claimed'], 2)
+        self.assertEqual(summary[FacturaArtifactJob.STATUS_COMPLETADO], 2)
+        mocked_xml.assert_called_once()
+        mocked_pdf.assert_called_once()
+        self.assertFalse(self.factura.artifact_jobs.exclude(status=FacturaArtifactJob.STATUS_COMPLETADO).exists())
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_xml')
+    def test_error_reprograma_con_backoff_y_luego_falla(self, mocked_xml):
+        mocked_xml.side_effect = DescargaFacturaError('timeout Factus')
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML])
+
+        with patch.dict(os.environ, {'FACTUS_ARTIFACT_MAX_ATTEMPTS': '2'}):
+            process_pending_jobs(workers=1)
+            job = self.factura.artifact_jobs.get()
+            self.assertEqual(job.status, FacturaArtifactJob.STATUS_PENDIENTE)
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.next_attempt_at, timezone.now())
+            self.assertIn('timeout Factus', job.last_error)
+
+            job.next_attempt_at = timezone.now() - timedelta(seconds=1)
+            job.save(update_fields=['next_attempt_at'])
+            process_pending_jobs(workers=1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, FacturaArtifactJob.STATUS_FALLIDO)
+        self.assertEqual(job.attempts, 2)
+
+    def test_carga_pdf_espera_descarga_del_pdf(self):
+        enqueue_invoice_artifacts(
+            self.factura,
+            [FacturaArtifactJob.KIND_PDF, FacturaArtifactJob.KIND_PDF_UPLOAD, FacturaArtifactJob.KIND_EMAIL],
+        )
+
+        claimed = claim_jobs(10)
+
+        self.assertEqual([job.kind for job in claimed], [FacturaArtifactJob.KIND_PDF])
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_xml')
+    def test_reencolar_no_repite_trabajos_completados(self, mocked_xml):
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML])
+        process_pending_jobs(workers=1)
+
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML])
+
+        self.assertEqual(self.factura.artifact_jobs.get().status, FacturaArtifactJob.STATUS_COMPLETADO)
+        self.assertEqual(process_pending_jobs(workers=1), {'claimed': 0})
+        mocked_xml.assert_called_once()
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.upload_custom_pdf_to_factus', return_value=True)
+    def test_carga_pdf_usa_respuesta_de_la_emision_como_respaldo(self, mocked_upload):
+        self.factura.response_json = {'response': {'data': {'bill': {'number': 'SETP-ART-1'}}}}
+        self.factura.save(update_fields=['response_json'])
+        FacturaArtifactJob.objects.create(
+            factura=self.factura,
+            kind=FacturaArtifactJob.KIND_PDF_UPLOAD,
+            next_attempt_at=timezone.now(),
+        )
+
+        process_pending_jobs(workers=1)
+
+        mocked_upload.assert_called_once()
+        self.assertEqual(
+            mocked_upload.call_args.kwargs['fallback_response_payload'],
+            {'data': {'bill': {'number': 'SETP-ART-1'}}},
+        )
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_pdf')
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_xml')
+    def test_modo_en_linea_procesa_al_hacer_commit(self, mocked_xml, mocked_pdf):
+        with patch.dict(os.environ, {'FACTUS_ARTIFACT_INLINE': 'True'}):
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML, FacturaArtifactJob.KIND_PDF])
+
+        mocked_xml.assert_called_once()
+        mocked_pdf.assert_called_once()
+        self.assertFalse(self.factura.artifact_jobs.exclude(status=FacturaArtifactJob.STATUS_COMPLETADO).exists())
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.wake_queue_drainer')
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_xml')
+    def test_commit_despierta_al_hilo_de_fondo(self, mocked_xml, mocked_wake):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML])
+
+        mocked_wake.assert_called_once()
+        mocked_xml.assert_not_called()
+        self.assertEqual(drain_once(), 1)
+        mocked_xml.assert_called_once()
+        self.assertEqual(self.factura.artifact_jobs.get().status, FacturaArtifactJob.STATUS_COMPLETADO)
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.download_xml')
+    def test_comando_once_procesa_cola(self, mocked_xml):
+        enqueue_invoice_artifacts(self.factura, [FacturaArtifactJob.KIND_XML])
+        out = StringIO()
+
+        call_command('procesar_artefactos_facturas', '--once', '--workers', '1', stdout=out)
+
+        mocked_xml.assert_called_once()
+        self.assertIn('Procesamiento de artefactos finalizado', out.getvalue())
+
+
+class FacturaElectronicaListadoPaginadoTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='listado-facturas', password='1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cliente = Cliente.objects.create(numero_documento='7101', nombre='Cliente Listado')
+        self.facturas = [self._factura(index) for index in range(3)]
+
+    def _factura(self, index: int) -> FacturaElectronica:
+        venta = Venta.objects.create(
+            tipo_comprobante='FACTURA',
+            numero_comprobante=f'FV-LIST-{index}',
+            cliente=self.cliente,
+            vendedor=self.user,
+            subtotal=Decimal('100'),
+            descuento_porcentaje=Decimal('0'),
+            descuento_valor=Decimal('0'),
+            iva=Decimal('19'),
+            total=Decimal('119'),
+            medio_pago='EFECTIVO',
+            efectivo_recibido=Decimal('119'),
+            cambio=Decimal('0'),
+            estado='FACTURADA',
+        )
+        return FacturaElectronica.objects.create(
+            venta=venta,
+            cufe=f'CUFE-LIST-{index}',
+            number=f'FV-LIST-{index}',
+            reference_code=f'REF-LIST-{index}',
+            estado_electronico='ACEPTADA',
+            qr_image_data='x' * 2048,
+            response_json={
+                'data': {'bill': {'public_url': f'https://factus.test/public/{index}'}},
+                'bill_errors': ['Regla FAJ43b', 'Regla FAD09e'],
+            },
+        )
+
+    def test_campos_derivados_se_almacenan_al_guardar(self):
+        factura = self.facturas[0]
+        self.assertEqual(factura.resolved_public_url, 'https://factus.test/public/0')
+        self.assertEqual(factura.bill_errors_count, 2)
+        self.assertFalse(factura.documento_inconsistente)
+
+        factura.codigo_error = 'ERROR_CONCILIACION_DOCUMENTAL'
+        factura.save(update_fields=['codigo_error', 'updated_at'])
+        factura.refresh_from_db()
+        self.assertTrue(factura.documento_inconsistente)
+        self.assertEqual(factura.resolved_public_url, '')
+
+    def test_listado_paginado_por_cursor_sin_columnas_pesadas(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/facturacion/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['numero'] for row in response.data['results']], ['FV-LIST-2', 'FV-LIST-1'])
+        self.assertEqual(response.data['results'][0]['bill_errors'], ['Regla FAJ43b', 'Regla FAD09e'])
+        self.assertEqual(response.data['results'][0]['bill_errors_count'], 2)
+        self.assertEqual(response.data['results'][0]['public_url'], 'https://factus.test/public/2')
+        self.assertEqual(len(queries), 1)
+        # Sólo se extrae la clave `bill_errors`; la columna completa no viaja.
+        self.assertNotRegex(queries[0]['sql'], r'"response_json"(?! ->)')
+        self.assertNotIn('qr_image_data', queries[0]['sql'])
+
+        siguiente = self.client.get(response.data['next'])
+        self.assertEqual([row['numero'] for row in siguiente.data['results']], ['FV-LIST-0'])
+        self.assertIsNone(siguiente.data['next'])
+
+    def test_listado_filtra_por_ventas(self):
+        venta_ids = f'{self.facturas[0].venta_id},{self.facturas[2].venta_id}'
+        response = self.client.get('/api/facturacion/', {'venta_id': venta_ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['numero'] for row in response.data['results']}, {'FV-LIST-0', 'FV-LIST-2'})
+
+
 class FacturaFilesEndpointsTests(TestCase):
     def setUp(self):
         self.tmpdir = tempfile.TemporaryDirectory()
@@ -552,10 +788,10 @@ class FacturaFilesEndpointsTests(TestCase):
     def test_list_endpoint(self):
         response = self.client.get('/api/facturacion/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['numero'], 'FV9999')
-        self.assertEqual(response.data[0]['cliente'], 'Cliente Endpoint')
-        self.assertEqual(response.data[0]['estado_dian'], 'ACEPTADA')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['numero'], 'FV9999')
+        self.assertEqual(response.data['results'][0]['cliente'], 'Cliente Endpoint')
+        self.assertEqual(response.data['results'][0]['estado_dian'], 'ACEPTADA')
 
     @patch('apps.facturacion.views.send_mail')
     def test_enviar_correo_endpoint(self, mocked_send_mail):
@@ -786,8 +1022,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
             total=Decimal('119'),
         )
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.send_invoice')
@@ -796,8 +1030,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         mocked_send_invoice,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         mocked_build_payload.return_value = {
             'numbering_range_id': 1,
@@ -832,8 +1064,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         self.assertEqual(factura.qr_image_url, '')
         self.assertTrue(factura.qr_image_data.startswith('data:image/png;base64,'))
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.create_and_validate_invoice')
@@ -844,8 +1074,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         mocked_create_validate,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         mocked_build_payload.return_value = {
             'numbering_range_id': 1,
@@ -890,8 +1118,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         self.assertEqual(factura.estado_electronico, 'ACEPTADA')
         self.assertEqual(factura.codigo_error, '')
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.create_and_validate_invoice')
@@ -902,8 +1128,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         mocked_create_validate,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         mocked_build_payload.return_value = {
             'numbering_range_id': 1,
@@ -949,8 +1173,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         self.assertEqual(factura.estado_electronico, 'RECHAZADA')
         self.assertEqual(factura.codigo_error, 'ERROR_CONCILIACION_DOCUMENTAL')
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.create_and_validate_invoice')
@@ -961,8 +1183,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         mocked_create_validate,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         mocked_build_payload.return_value = {
             'numbering_range_id': 1,
@@ -1006,8 +1226,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         self.assertEqual(factura.estado_electronico, 'ACEPTADA')
         self.assertEqual(factura.codigo_error, '')
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.create_and_validate_invoice')
@@ -1018,8 +1236,6 @@ class FacturarVentaPersistenciaCriticaTests(TestCase):
         mocked_create_validate,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         self.venta.subtotal = Decimal('0.00')
         self.venta.iva = Decimal('0.00')
@@ -1135,8 +1351,8 @@ class FacturaQRYPosEndpointsTests(TestCase):
         self.factura.save(update_fields=['codigo_error', 'mensaje_error', 'updated_at'])
         response = self.client.get('/api/facturacion/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data[0]['public_url'], '')
-        self.assertTrue(response.data[0]['documento_inconsistente'])
+        self.assertEqual(response.data['results'][0]['public_url'], '')
+        self.assertTrue(response.data['results'][0]['documento_inconsistente'])
 
     def test_pos_endpoint(self):
         response = self.client.get('/api/facturacion/FV5555/pos/')
@@ -1214,6 +1430,105 @@ class FactusCatalogLookupHomologationTests(TestCase):
         self.assertEqual(get_payment_method_code('efectivo', default=''), '10')
 
 
+class FactusCatalogCacheTests(TestCase):
+    def setUp(self):
+        from apps.facturacion_electronica.models import HomologacionMunicipio
+
+        clear_catalogos_factus_cache()
+        self.user = get_user_model().objects.create_user(username='catalog-cache', password='1234')
+        CatalogSyncService().ensure_minimum_catalogs()
+        HomologacionMunicipio.objects.create(codigo_interno='SANTA MARTA', municipality_id=149)
+        Impuesto.objects.create(nombre='IVA 19 cache', porcentaje=Decimal('19.00'), factus_tribute_id=1)
+        self.cliente = Cliente.objects.create(
+            numero_documento='900123456',
+            nombre='Cliente Catalogo',
+            tipo_documento='NIT',
+            ciudad='Santa Marta',
+        )
+        categoria = Categoria.objects.create(nombre='Catalogo Cache')
+        self.producto = Producto.objects.create(
+            codigo='CAT-001',
+            nombre='Producto catalogo',
+            categoria=categoria,
+            precio_costo=Decimal('1000.00'),
+            precio_venta=Decimal('1190.00'),
+            precio_venta_minimo=Decimal('1000.00'),
+            stock=Decimal('10.00'),
+            stock_minimo=Decimal('1.00'),
+            iva_porcentaje=Decimal('19.00'),
+        )
+
+    def _venta(self, numero: str) -> Venta:
+        venta = Venta.objects.create(
+            tipo_comprobante='FACTURA',
+            numero_comprobante=numero,
+            cliente=self.cliente,
+            vendedor=self.user,
+            subtotal=Decimal('2000.00'),
+            descuento_porcentaje=Decimal('0.00'),
+            descuento_valor=Decimal('0.00'),
+            iva=Decimal('380.00'),
+            total=Decimal('2380.00'),
+            medio_pago='EFECTIVO',
+            efectivo_recibido=Decimal('2380.00'),
+            cambio=Decimal('0.00'),
+            estado='FACTURADA',
+        )
+        for _ in range(2):
+            DetalleVenta.objects.create(
+                venta=venta,
+                producto=self.producto,
+                cantidad=Decimal('1.00'),
+                precio_unitario=Decimal('1190.00'),
+                descuento_unitario=Decimal('0.00'),
+                iva_porcentaje=Decimal('19.00'),
+                subtotal=Decimal('1000.00'),
+                total=Decimal('1190.00'),
+            )
+        return venta
+
+    @patch('apps.facturacion.services.factus_payload_builder.resolve_electronic_numbering_range_id', return_value=99)
+    def test_payload_no_consulta_catalogos(self, _mocked_range):
+        build_invoice_payload(self._venta('FAC-910001'))
+        venta = self._venta('FAC-910002')
+
+        with CaptureQueriesContext(connection) as ctx:
+            payload = build_invoice_payload(venta)
+
+        tablas = ('fe_catalogo', 'fe_homologacion', '"impuestos"', 'configuracion_version')
+        consultas = [q['sql'] for q in ctx.captured_queries if any(tabla in q['sql'] for tabla in tablas)]
+        self.assertEqual(consultas, [])
+        self.assertEqual(payload['customer']['municipality_id'], 149)
+        self.assertEqual(payload['customer']['identification_document_id'], 6)
+        self.assertEqual(payload['payment_method_code'], '10')
+        self.assertEqual([item['tribute_id'] for item in payload['items']], [1, 1])
+
+    def test_cambios_en_homologaciones_e_impuestos_invalidan_la_foto(self):
+        from apps.facturacion_electronica.models import HomologacionTributo
+
+        antes = get_catalogos_factus()
+        self.assertIs(get_catalogos_factus(), antes)
+        HomologacionTributo.objects.create(codigo_interno='iva', tribute_id=18)
+        self.assertEqual(get_tribute_id('IVA', default=0), 18)
+        Impuesto.objects.create(nombre='IVA 5', porcentaje=Decimal('5.00'), factus_tribute_id=1)
+        self.assertEqual(get_catalogos_factus().impuestos[Decimal('5')], 1)
+
+    def test_sincronizacion_refresca_desactivados(self):
+        MunicipioFactus.objects.create(factus_id=999, codigo='99999', nombre='Municipio Retirado')
+        self.assertEqual(get_municipality_id('99999', default=0), 999)
+
+        service = CatalogSyncService()
+        with patch.object(
+            service,
+            '_fetch_catalog',
+            return_value=[{'id': 149, 'code': '47001', 'name': 'Santa Marta'}],
+        ):
+            service.sync_municipalities()
+
+        self.assertEqual(get_municipality_id('99999', default=0), 0)
+        self.assertEqual(TributoFactus.objects.filter(is_active=True).count(), len(get_catalogos_factus().tributos))
+
+
 class SyncFactusCatalogsCommandTests(TestCase):
     def test_skip_remote_ensure_minimums_carga_catalogos_base(self):
         out = StringIO()
@@ -1397,20 +1712,8 @@ class SyncInvoiceStatusCommandTests(TestCase):
             estado='FACTURADA',
         )
 
-    @patch('apps.facturacion.management.commands.sync_invoice_status.sync_invoice_status')
-    def test_sync_invoice_status_incluye_en_proceso_y_pendiente(self, mocked_sync):
-        factura_en_proceso = FacturaElectronica.objects.create(
-            venta=self.venta,
-            cufe='CUFE-SYNC-1',
-            uuid='UUID-SYNC-1',
-            number='FV-SYNC-1',
-            reference_code='FV-SYNC-1',
-            status='EN_PROCESO',
-            xml_url='https://example.com/fv-sync-1.xml',
-            pdf_url='https://example.com/fv-sync-1.pdf',
-            response_json={'ok': True},
-        )
-        venta_2 = Venta.objects.create(
+    def _factura(self, number: str, **extra) -> FacturaElectronica:
+        venta = Venta.objects.create(
             tipo_comprobante='FACTURA',
             cliente=self.cliente,
             vendedor=self.user,
@@ -1424,24 +1727,138 @@ class SyncInvoiceStatusCommandTests(TestCase):
             cambio=Decimal('0'),
             estado='FACTURADA',
         )
-        factura_pendiente = FacturaElectronica.objects.create(
-            venta=venta_2,
-            cufe='CUFE-SYNC-2',
-            uuid='UUID-SYNC-2',
-            number='FV-SYNC-2',
-            reference_code='FV-SYNC-2',
-            status='PENDIENTE',
-            xml_url='https://example.com/fv-sync-2.xml',
-            pdf_url='https://example.com/fv-sync-2.pdf',
+        return FacturaElectronica.objects.create(
+            venta=venta,
+            number=number,
+            reference_code=number,
+            factus_number_prefix='FV',
             response_json={'ok': True},
+            **extra,
+        )
+
+    @staticmethod
+    def _listado(*items, last_page=1):
+        return {'data': {'data': list(items), 'pagination': {'current_page': 1, 'last_page': last_page}}}
+
+    @staticmethod
+    def _detalle(number: str) -> dict:
+        return {
+            'data': {
+                'bill': {
+                    'number': number,
+                    'cufe': f'CUFE-{number}',
+                    'status': 1,
+                    'xml_url': f'https://example.com/{number}.xml',
+                    'pdf_url': f'https://example.com/{number}.pdf',
+                }
+            }
+        }
+
+    @patch('apps.facturacion.services.sync_invoice_status.FactusClient')
+    def test_sync_invoice_status_incluye_en_proceso_y_pendiente(self, mocked_client_cls):
+        self._factura('FV-SYNC-1', status='EN_PROCESO')
+        self._factura('FV-SYNC-2', status='PENDIENTE')
+        client = mocked_client_cls.return_value
+        client.list_invoices.return_value = self._listado(
+            {'number': 'FV-SYNC-1', 'status': 1, 'errors': []},
+            {'number': 'FV-SYNC-2', 'status': 1, 'errors': []},
         )
-        mocked_sync.side_effect = [factura_en_proceso, factura_pendiente]
+        client.get_invoice.side_effect = self._detalle
 
         stdout = StringIO()
         call_command('sync_invoice_status', stdout=stdout)
 
-        called_numbers = [call.args[0] for call in mocked_sync.call_args_list]
-        self.assertCountEqual(called_numbers, ['FV-SYNC-1', 'FV-SYNC-2'])
+        mocked_client_cls.assert_called_once()
+        client.list_invoices.assert_called_once_with(filters={'page': 1, 'filter[prefix]': 'FV'})
+        self.assertCountEqual([call.args[0] for call in client.get_invoice.call_args_list], ['FV-SYNC-1', 'FV-SYNC-2'])
+        for number in ('FV-SYNC-1', 'FV-SYNC-2'):
+            factura = FacturaElectronica.objects.get(number=number)
+            self.assertEqual(factura.estado_electronico, 'ACEPTADA')
+            self.assertEqual(factura.status, 'ACEPTADA')
+            self.assertEqual(factura.cufe, f'CUFE-{number}')
+            self.assertIsNotNone(factura.ultima_sincronizacion_at)
+        self.assertIn('actualizadas=2', stdout.getvalue())
+
+    @patch('apps.facturacion.services.sync_invoice_status.FactusClient')
+    def test_listado_evita_consultas_de_detalle(self, mocked_client_cls):
+        self._factura('FV-SYNC-3')
+        self._factura('FV-SYNC-4')
+        self._factura('FV-SYNC-8')
+        client = mocked_client_cls.return_value
+        # FV-SYNC-3 sigue pendiente en Factus; FV-SYNC-4 y FV-SYNC-8 no aparecen en el listado.
+        client.list_invoices.return_value = self._listado({'number': 'FV-SYNC-3', 'status': 0, 'errors': []})
+
+        def detalle(number):
+            if number == 'FV-SYNC-4':
+                raise FactusAPIError('no existe', status_code=404)
+            return self._detalle(number)
+
+        client.get_invoice.side_effect = detalle
+
+        stdout = StringIO()
+        call_command('sync_invoice_status', '--concurrency', '2', stdout=stdout)
+
+        # La ausencia en el listado se confirma con el detalle antes de marcarla.
+        self.assertCountEqual([call.args[0] for call in client.get_invoice.call_args_list], ['FV-SYNC-4', 'FV-SYNC-8'])
+        no_encontrada = FacturaElectronica.objects.get(number='FV-SYNC-4')
+        self.assertEqual(no_encontrada.codigo_error, 'FACTUS_DOCUMENTO_NO_ENCONTRADO')
+        self.assertEqual(no_encontrada.response_json['sync_estado'], 'REMOTE_NOT_FOUND')
+        self.assertEqual(FacturaElectronica.objects.get(number='FV-SYNC-8').estado_electronico, 'ACEPTADA')
+        self.assertEqual(FacturaElectronica.objects.get(number='FV-SYNC-3').codigo_error, None)
+        self.assertIn('actualizadas=1 sin_cambios=1 no_encontradas=1', stdout.getvalue())
+
+    @patch('apps.facturacion.services.sync_invoice_status.FactusClient')
+    def test_error_inesperado_no_descarta_lo_sincronizado_ni_pisa_cambios(self, mocked_client_cls):
+        facturas = [self._factura('FV-SYNC-9'), self._factura('FV-SYNC-10'), self._factura('FV-SYNC-11')]
+        # Cambio concurrente después de leer las facturas a sincronizar.
+        FacturaElectronica.objects.filter(number='FV-SYNC-11').update(response_json={'ok': True, 'nota': 'local'})
+        client = mocked_client_cls.return_value
+        client.list_invoices.return_value = self._listado()
+
+        def detalle(number):
+            if number == 'FV-SYNC-10':
+                raise RuntimeError('respuesta corrupta')
+            if number == 'FV-SYNC-11':
+                raise FactusAPIError('no existe', status_code=404)
+            return self._detalle(number)
+
+        client.get_invoice.side_effect = detalle
+
+        resumen = sync_invoice_statuses(facturas, concurrency=2)
+
+        self.assertEqual((resumen.updated, resumen.not_found, resumen.failed), (1, 1, 1))
+        self.assertEqual(resumen.errors, [('FV-SYNC-10', 'respuesta corrupta')])
+        self.assertEqual(FacturaElectronica.objects.get(number='FV-SYNC-9').cufe, 'CUFE-FV-SYNC-9')
+        self.assertEqual(FacturaElectronica.objects.get(number='FV-SYNC-10').cufe, facturas[1].cufe)
+        no_encontrada = FacturaElectronica.objects.get(number='FV-SYNC-11')
+        self.assertEqual(no_encontrada.response_json['nota'], 'local')
+        self.assertEqual(no_encontrada.response_json['sync_estado'], 'REMOTE_NOT_FOUND')
+
+    @patch('apps.facturacion.services.sync_invoice_status.FactusClient')
+    def test_limit_since_y_errores_de_detalle(self, mocked_client_cls):
+        vieja = self._factura('FV-SYNC-5')
+        FacturaElectronica.objects.filter(pk=vieja.pk).update(created_at=timezone.now() - timedelta(days=10))
+        self._factura('FV-SYNC-6')
+        self._factura('FV-SYNC-7')
+        client = mocked_client_cls.return_value
+        client.list_invoices.side_effect = FactusAPIError('listado no disponible')
+        client.get_invoice.side_effect = FactusAPIError('timeout', status_code=503)
+
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            'sync_invoice_status',
+            '--since',
+            (timezone.localdate() - timedelta(days=1)).isoformat(),
+            '--limit',
+            '1',
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+        self.assertEqual([call.args[0] for call in client.get_invoice.call_args_list], ['FV-SYNC-6'])
+        self.assertIn('FV-SYNC-6: timeout', stderr.getvalue())
+        self.assertIn('total=1 actualizadas=0 sin_cambios=0 no_encontradas=0 failed=1', stdout.getvalue())
 
 
 class NotasCreditoResourceEndpointsTests(TestCase):
@@ -1491,9 +1908,9 @@ class NotasCreditoResourceEndpointsTests(TestCase):
     def test_list_endpoint(self):
         response = self.client.get('/api/notas-credito/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['numero'], 'NC-001')
-        self.assertEqual(response.data[0]['estado'], 'ACEPTADA')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['numero'], 'NC-001')
+        self.assertEqual(response.data['results'][0]['estado'], 'ACEPTADA')
 
     @patch('apps.facturacion.views.emitir_nota_credito')
     def test_create_endpoint(self, mocked_emitir):
@@ -1613,6 +2030,116 @@ class NumberingRangeResolutionTests(TestCase):
         self.assertFalse(rango.is_selected_local)
 
 
+@override_settings(FACTUS_ENV='sandbox')
+class TechnicalRangesCacheTests(TestCase):
+    def setUp(self):
+        from apps.facturacion.services.consecutivo_service import invalidate_technical_ranges_cache
+
+        invalidate_technical_ranges_cache()
+        self.addCleanup(invalidate_technical_ranges_cache)
+
+    def _ranges(self):
+        from apps.facturacion.services.consecutivo_service import _normalize_technical_range
+
+        return [
+            _normalize_technical_range(
+                {
+                    'id': 8,
+                    'document': 'Factura de Venta',
+                    'prefix': 'SETP',
+                    'from': 1,
+                    'to': 999999,
+                    'resolution_number': '18760000001',
+                    'start_date': '2020-01-01',
+                    'end_date': '2099-12-31',
+                },
+                environment='SANDBOX',
+            )
+        ]
+
+    def test_dentro_del_ttl_no_consulta_factus(self):
+        from apps.facturacion.services import consecutivo_service
+
+        with patch.object(consecutivo_service, '_fetch_factus_technical_ranges', return_value=self._ranges()) as mocked_fetch:
+            first = consecutivo_service.get_technical_ranges()
+            second = consecutivo_service.get_technical_ranges()
+
+        mocked_fetch.assert_called_once()
+        self.assertEqual([item.factus_id for item in second], [8])
+        self.assertEqual(first[0].prefix, second[0].prefix)
+
+    def test_snapshot_persistido_evita_llamada_remota_en_proceso_nuevo(self):
+        from apps.facturacion.models import FactusTechnicalRangeSnapshot
+        from apps.facturacion.services import consecutivo_service
+
+        with patch.object(consecutivo_service, '_fetch_factus_technical_ranges', return_value=self._ranges()):
+            consecutivo_service.get_technical_ranges()
+        self.assertEqual(FactusTechnicalRangeSnapshot.objects.filter(factus_id=8, environment='SANDBOX').count(), 1)
+
+        consecutivo_service.invalidate_technical_ranges_cache()
+        with patch.object(consecutivo_service, '_fetch_factus_technical_ranges') as mocked_fetch:
+            ranges = consecutivo_service.get_technical_ranges()
+
+        mocked_fetch.assert_not_called()
+        self.assertEqual(ranges[0].factus_id, 8)
+        self.assertEqual(ranges[0].document_code, 'FACTURA_VENTA')
+
+    def test_snapshot_vencido_se_sirve_mientras_se_revalida(self):
+        from apps.facturacion.services import consecutivo_service
+
+        with patch.object(consecutivo_service, '_fetch_factus_technical_ranges', return_value=self._ranges()):
+            consecutivo_service.get_technical_ranges()
+
+        with patch.dict(os.environ, {'FACTUS_NUMBERING_RANGES_CACHE_TTL': '0'}, clear=False):
+            with patch.object(consecutivo_service, '_revalidate_in_background') as mocked_revalidate:
+                with patch.object(consecutivo_service, '_fetch_factus_technical_ranges') as mocked_fetch:
+                    ranges = consecutivo_service.get_technical_ranges()
+
+        self.assertEqual([item.factus_id for item in ranges], [8])
+        mocked_revalidate.assert_called_once_with('SANDBOX')
+        mocked_fetch.assert_not_called()
+
+    def test_snapshot_no_toca_rangos_locales_ni_otros_ambientes(self):
+        from apps.facturacion.models import FactusNumberingRange, FactusTechnicalRangeSnapshot
+        from apps.facturacion.services import consecutivo_service
+
+        rango = FactusNumberingRange.objects.create(
+            document='FACTURA_VENTA',
+            prefix='SETP',
+            resolution_number='18760000001',
+            from_number=1234,
+            to_number=999999,
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date() + timedelta(days=30),
+        )
+        FactusTechnicalRangeSnapshot.objects.create(
+            environment='PRODUCTION',
+            factus_id=77,
+            raw_payload={'id': 77},
+            synced_at=timezone.now(),
+        )
+
+        with patch.object(consecutivo_service, '_fetch_factus_technical_ranges', return_value=self._ranges()):
+            consecutivo_service.get_technical_ranges(force_refresh=True)
+            consecutivo_service.get_technical_ranges(force_refresh=True)
+
+        rango.refresh_from_db()
+        self.assertEqual(rango.from_number, 1234)
+        self.assertEqual(
+            sorted(FactusTechnicalRangeSnapshot.objects.values_list('environment', 'factus_id')),
+            [('PRODUCTION', 77), ('SANDBOX', 8)],
+        )
+
+    def test_force_refresh_siempre_consulta_factus(self):
+        from apps.facturacion.services import consecutivo_service
+
+        with patch.object(consecutivo_service, '_fetch_factus_technical_ranges', return_value=self._ranges()) as mocked_fetch:
+            consecutivo_service.get_technical_ranges()
+            consecutivo_service.get_technical_ranges(force_refresh=True)
+
+        self.assertEqual(mocked_fetch.call_count, 2)
+
+
 class ConfiguracionDianRangosEndpointsTests(TestCase):
     def setUp(self):
         User = get_user_model()
@@ -2491,10 +3018,8 @@ class ElectronicStateMachineTests(TestCase):
         self.assertIn('sincronizar_factus', acciones)
         self.assertIn('reparar_persistencia', acciones)
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.send_invoice')
-    def test_no_duplicacion_al_reintentar(self, mocked_send_invoice, _mocked_pdf, _mocked_xml):
+    def test_no_duplicacion_al_reintentar(self, mocked_send_invoice):
         FacturaElectronica.objects.create(
             venta=self.venta,
             cufe='CUFE-EXISTENTE',
@@ -2536,8 +3061,6 @@ class FacturarVentaPersistenciaQrTests(TestCase):
         self.assertEqual(url, '')
         self.assertTrue(data.startswith('data:image/png;base64,'))
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.send_invoice')
@@ -2546,8 +3069,6 @@ class FacturarVentaPersistenciaQrTests(TestCase):
         mocked_send_invoice,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         mocked_resolve_range.return_value = MagicMock(prefijo='FAC', factus_range_id=55)
         mocked_build_payload.return_value = {
@@ -2575,8 +3096,6 @@ class FacturarVentaPersistenciaQrTests(TestCase):
         self.assertTrue((factura.qr_image_data or '').startswith('data:image/png;base64,'))
         self.assertGreater(len(factura.qr_image_data or ''), 2048)
 
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.resolve_numbering_range')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.send_invoice')
@@ -2587,8 +3106,6 @@ class FacturarVentaPersistenciaQrTests(TestCase):
         mocked_send_invoice,
         mocked_build_payload,
         mocked_resolve_range,
-        _mocked_pdf,
-        _mocked_xml,
     ):
         mocked_resolve_range.return_value = MagicMock(prefijo='FAC', factus_range_id=55)
         mocked_build_payload.return_value = {
@@ -2689,10 +3206,6 @@ class FacturarVentaRangosHistoricosTests(TestCase):
         self.assertEqual(venta.factura_electronica_cufe, 'CUFE-HIST-9001')
         mocked_create.assert_not_called()
 
-    @patch('apps.facturacion.services.facturar_venta.send_invoice_email_via_factus')
-    @patch('apps.facturacion.services.facturar_venta.upload_custom_pdf_to_factus')
-    @patch('apps.facturacion.services.facturar_venta.download_xml')
-    @patch('apps.facturacion.services.facturar_venta.download_pdf')
     @patch('apps.facturacion.services.facturar_venta.FactusClient.create_and_validate_invoice')
     @patch('apps.facturacion.services.facturar_venta.build_invoice_payload')
     @patch('apps.facturacion.services.facturar_venta.get_next_invoice_sequence')
@@ -2703,10 +3216,6 @@ class FacturarVentaRangosHistoricosTests(TestCase):
         mocked_next_sequence,
         mocked_build_payload,
         mocked_create_validate,
-        _mocked_pdf,
-        _mocked_xml,
-        _mocked_upload_pdf,
-        _mocked_send_email,
     ):
         venta_historica = self._crear_venta(numero='FAC-1', estado='FACTURADA')
         factura_historica = FacturaElectronica.objects.create(
@@ -3362,6 +3871,30 @@ class CreditNoteWorkflowHardeningTests(TestCase):
         self.assertTrue(meta['business_effects_applied'])
         self.assertEqual(MovimientoInventario.objects.filter(tipo='DEVOLUCION').count(), 1)
 
+    @patch('apps.facturacion.services.credit_note_workflow.FactusClient.list_credit_notes')
+    @patch('apps.facturacion.services.credit_note_workflow.FactusClient.create_and_validate_credit_note')
+    def test_hilo_de_fondo_no_toma_la_nota_con_post_en_curso(self, mocked_create, mocked_list):
+        aceptada = {'number': 'NC-RACE', 'cufe': 'CUFE-RACE', 'bill_number': 'FV-WF', 'status': 'accepted'}
+        reclamadas = []
+
+        def post_en_curso(payload):
+            # El hilo de fondo corre entre el commit de la nota y la respuesta de Factus,
+            # y Factus ya lista la nota como aceptada.
+            aceptada['reference_code'] = payload['reference_code']
+            mocked_list.return_value = {'data': {'credit_notes': [aceptada]}}
+            reclamadas.append(drain_once())
+            return {'data': {'credit_note': aceptada}}
+
+        mocked_create.side_effect = post_en_curso
+
+        nota, meta = create_credit_note(factura=self.factura, motivo='x', lines=self._lines(), is_total=False, user=self.user)
+
+        self.assertEqual(reclamadas, [0])
+        self.assertEqual(nota.estado_local, 'ACEPTADA')
+        self.assertIsNone(nota.next_sync_at)
+        self.assertTrue(meta['business_effects_applied'])
+        self.assertEqual(MovimientoInventario.objects.filter(tipo='DEVOLUCION').count(), 1)
+
     @patch('apps.facturacion.services.credit_note_workflow.FactusClient.create_and_validate_credit_note')
     @patch('apps.facturacion.services.credit_note_workflow.FactusClient.list_credit_notes')
     def test_409_reconciliacion_exacta_no_duplica(self, mocked_list, mocked_create):
@@ -3624,7 +4157,7 @@ class CreditNoteWorkflowHardeningTests(TestCase):
         )
         response = self.client.get('/api/notas-credito/')
         self.assertEqual(response.status_code, 200)
-        result = next(item for item in response.data if item['id'] == nota.id)
+        result = next(item for item in response.data['results'] if item['id'] == nota.id)
         self.assertEqual(result['numero'], '')
         self.assertIn('request_numbering_range_id', result)
         self.assertIn('range_prefix', result)
@@ -3632,6 +4165,185 @@ class CreditNoteWorkflowHardeningTests(TestCase):
         self.assertEqual(result['factura_asociada'], self.factura.number)
 
 
+class CreditNoteDeferredReconciliationTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='reconcile-user', password='1234')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.cliente = Cliente.objects.create(numero_documento='9005', nombre='Cliente Conciliación')
+        self.venta = Venta.objects.create(
+            tipo_comprobante='FACTURA',
+            cliente=self.cliente,
+            vendedor=self.user,
+            subtotal=Decimal('10'),
+            descuento_porcentaje=Decimal('0'),
+            descuento_valor=Decimal('0'),
+            iva=Decimal('1.9'),
+            total=Decimal('11.9'),
+            medio_pago='EFECTIVO',
+            efectivo_recibido=Decimal('12'),
+            cambio=Decimal('0.1'),
+            estado='FACTURADA',
+            numero_comprobante='FAC-REC-1',
+        )
+        self.factura = FacturaElectronica.objects.create(
+            venta=self.venta,
+            number='FV-REC-1',
+            reference_code='REF-REC-1',
+            cufe='CUFE-REC-1',
+            status='ACEPTADA',
+            estado_electronico='ACEPTADA',
+            emitida_en_factus=True,
+            response_json={'ok': True},
+        )
+
+    def _nota(self, *, reference_code: str, tipo_nota: str = 'PARCIAL') -> NotaCreditoElectronica:
+        return NotaCreditoElectronica.objects.create(
+            factura=self.factura,
+            venta_origen=self.venta,
+            tipo_nota=tipo_nota,
+            estado_local='PENDIENTE_DIAN',
+            estado_electronico='PENDIENTE_DIAN',
+            status='PENDIENTE_DIAN',
+            reference_code=reference_code,
+            request_json={},
+            response_json={},
+            next_sync_at=timezone.now() - timedelta(seconds=1),
+        )
+
+    @patch('apps.facturacion.services.credit_note_reconciler.FactusClient')
+    def test_lote_concilia_varias_notas_con_un_solo_listado(self, mocked_client_cls):
+        aceptada = self._nota(reference_code='NC-77-PARCIAL-AAA')
+        pendiente = self._nota(reference_code='NC-77-TOTAL-BBB', tipo_nota='TOTAL')
+        client = mocked_client_cls.return_value
+        client.list_credit_notes.return_value = {
+            'data': {
+                'credit_notes': [
+                    {'number': 'NC-900', 'cufe': 'CUFE-NC-900', 'reference_code': 'NC-77-PARCIAL-AAA', 'status': 'accepted'},
+                    {'reference_code': 'NC-77-TOTAL-BBB', 'status': 'pending'},
+                ]
+            }
+        }
+
+        summary = reconcile_due_credit_notes()
+
+        client.list_credit_notes.assert_called_once_with(reference_code='NC-77-', page=1)
+        self.assertEqual(summary['claimed'], 2)
+        aceptada.refresh_from_db()
+        pendiente.refresh_from_db()
+        self.assertEqual(aceptada.estado_local, 'ACEPTADA')
+        self.assertIsNone(aceptada.next_sync_at)
+        self.assertEqual(pendiente.estado_local, 'PENDIENTE_DIAN')
+        self.assertEqual(pendiente.sync_attempts, 1)
+        self.assertGreater(pendiente.next_sync_at, timezone.now())
+
+    @patch('apps.facturacion.services.credit_note_reconciler.FactusClient')
+    def test_lote_pagina_el_listado_y_consulta_individualmente_las_ausentes(self, mocked_client_cls):
+        en_segunda_pagina = self._nota(reference_code='NC-77-PARCIAL-GGG')
+        ausente = self._nota(reference_code='NC-78-TOTAL-HHH', tipo_nota='TOTAL')
+        client = mocked_client_cls.return_value
+
+        def list_credit_notes(reference_code, page=1):
+            if reference_code == 'NC-78-TOTAL-HHH':
+                return {'data': {'data': [{'number': 'NC-902', 'reference_code': 'NC-78-TOTAL-HHH', 'status': 'accepted'}]}}
+            pages = {
+                1: [{'number': 'NC-1', 'reference_code': 'NC-10-OTRA', 'status': 'accepted'}],
+                2: [{'number': 'NC-901', 'reference_code': 'NC-77-PARCIAL-GGG', 'status': 'accepted'}],
+            }
+            return {'data': {'data': pages.get(page, []), 'pagination': {'last_page': 3}}}
+
+        client.list_credit_notes.side_effect = list_credit_notes
+
+        with patch.dict(os.environ, {'FACTUS_CREDIT_NOTE_RECONCILE_MAX_LIST_PAGES': '2'}):
+            reconcile_due_credit_notes()
+
+        self.assertEqual(
+            [c.kwargs for c in client.list_credit_notes.call_args_list],
+            [
+                {'reference_code': 'NC-7', 'page': 1},
+                {'reference_code': 'NC-7', 'page': 2},
+                {'reference_code': 'NC-78-TOTAL-HHH'},
+            ],
+        )
+        en_segunda_pagina.refresh_from_db()
+        ausente.refresh_from_db()
+        self.assertEqual(en_segunda_pagina.number, 'NC-901')
+        self.assertEqual(ausente.number, 'NC-902')
+
+    @patch('apps.facturacion.services.credit_note_reconciler.FactusClient')
+    def test_no_reclama_notas_no_vencidas(self, mocked_client_cls):
+        nota = self._nota(reference_code='NC-77-PARCIAL-CCC')
+        nota.next_sync_at = timezone.now() + timedelta(minutes=5)
+        nota.save(update_fields=['next_sync_at'])
+
+        summary = reconcile_due_credit_notes()
+
+        self.assertEqual(summary, {'claimed': 0})
+        mocked_client_cls.assert_not_called()
+
+    @patch('apps.facturacion.services.credit_note_workflow.FactusClient')
+    def test_endpoint_estado_es_local(self, mocked_client_cls):
+        nota = self._nota(reference_code='NC-77-PARCIAL-DDD')
+
+        response = self.api.get(f'/api/notas-credito/{nota.id}/estado/')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['estado_local'], 'PENDIENTE_DIAN')
+        self.assertTrue(response.data['reconciliation_pending'])
+        mocked_client_cls.assert_not_called()
+
+    @patch('apps.facturacion.services.credit_note_reconciler.FactusClient')
+    @patch('apps.facturacion.services.credit_note_workflow.FactusClient')
+    def test_listado_es_local_paginado_y_reporta_antiguedad(self, mocked_workflow_client, mocked_reconciler_client):
+        sincronizada = self._nota(reference_code='NC-77-PARCIAL-EEE')
+        sincronizada.last_sync_at = timezone.now() - timedelta(minutes=2)
+        sincronizada.save(update_fields=['last_sync_at'])
+        legacy = self._nota(reference_code='NC-77-TOTAL-FFF', tipo_nota='TOTAL')
+        NotaCreditoElectronica.objects.filter(pk=legacy.pk).update(next_sync_at=None)
+
+        response = self.api.get('/api/notas-credito/', {'estado': 'pendiente_dian'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        rows = {row['id']: row for row in response.data['results']}
+        self.assertGreaterEqual(rows[sincronizada.id]['sync_age_seconds'], 120)
+        self.assertIsNone(rows[legacy.id]['sync_age_seconds'])
+        mocked_workflow_client.assert_not_called()
+        mocked_reconciler_client.assert_not_called()
+        legacy.refresh_from_db()
+        self.assertIsNone(legacy.next_sync_at)
+
+    @patch('apps.facturacion.services.credit_note_reconciler.FactusClient')
+    def test_reconciliador_toma_notas_sin_conciliacion_programada(self, mocked_client_cls):
+        legacy = self._nota(reference_code='NC-77-TOTAL-III', tipo_nota='TOTAL')
+        agotada = self._nota(reference_code='NC-77-PARCIAL-JJJ')
+        NotaCreditoElectronica.objects.filter(pk=legacy.pk).update(next_sync_at=None)
+        NotaCreditoElectronica.objects.filter(pk=agotada.pk).update(next_sync_at=None, sync_attempts=99)
+        mocked_client_cls.return_value.list_credit_notes.return_value = {'data': {'data': []}}
+
+        summary = reconcile_due_credit_notes()
+
+        self.assertEqual(summary['claimed'], 1)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.sync_attempts, 1)
+        self.assertIsNotNone(legacy.next_sync_at)
+
+    @patch('apps.facturacion.services.factura_artifact_jobs.process_pending_jobs', side_effect=RuntimeError('cola caída'))
+    @patch('apps.facturacion.services.credit_note_reconciler.FactusClient')
+    def test_hilo_de_fondo_concilia_aunque_falle_la_cola_de_artefactos(self, mocked_client_cls, _mocked_jobs):
+        nota = self._nota(reference_code='NC-77-PARCIAL-KKK')
+        mocked_client_cls.return_value.list_credit_notes.return_value = {
+            'data': {'data': [{'number': 'NC-903', 'reference_code': 'NC-77-PARCIAL-KKK', 'status': 'accepted'}]}
+        }
+
+        self.assertEqual(drain_once(), 1)
+
+        nota.refresh_from_db()
+        self.assertEqual(nota.number, 'NC-903')
+        self.assertEqual(nota.estado_local, 'ACEPTADA')
+
+
 class CreditNoteEndpointsTests(TestCase):
     def setUp(self):
         User = get_user_model()
@@ -3878,7 +4590,7 @@ class ElectronicDocumentFileServiceTests(TestCase):
 
 
 class FactusClientReauthTests(TestCase):
-    @patch('apps.facturacion.services.factus_client.requests.request')
+    @patch('apps.facturacion.services.factus_client.factus_http.send')
     def test_request_reautentica_si_expira_token(self, mocked_request):
         response_401 = MagicMock()
         response_401.status_code = 401
@@ -3899,6 +4611,127 @@ class FactusClientReauthTests(TestCase):
         self.assertEqual(payload, {'ok': True})
 
 
+class FactusTokenManagerTests(TestCase):
+    def setUp(self):
+        from apps.facturacion.services import factus_token_manager
+
+        factus_token_manager.clear_cache()
+        self.addCleanup(factus_token_manager.clear_cache)
+
+    def _token(self, access_token, *, minutes):
+        from apps.facturacion_electronica.models import FactusToken
+
+        return FactusToken.objects.create(
+            access_token=access_token,
+            refresh_token='refresh',
+            expires_at=timezone.now() + timedelta(minutes=minutes),
+        )
+
+    def test_token_vigente_se_sirve_desde_memoria_sin_consultar_bd(self):
+        self._token('tok-db', minutes=30)
+        client = FactusClient()
+
+        self.assertEqual(client.get_valid_token(), 'tok-db')
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get_valid_token(), 'tok-db')
+
+    def test_token_vencido_se_refresca_una_sola_vez(self):
+        expired = self._token('tok-old', minutes=-1)
+        client = FactusClient()
+
+        def _fake_refresh(token):
+            self.assertEqual(token.pk, expired.pk)
+            return self._token('tok-new', minutes=30)
+
+        with patch.object(client, 'refresh', side_effect=_fake_refresh) as mocked_refresh:
+            self.assertEqual(client.get_valid_token(), 'tok-new')
+            self.assertEqual(client.get_valid_token(), 'tok-new')
+
+        mocked_refresh.assert_called_once()
+
+    def test_reautenticacion_por_401_reutiliza_token_renovado_por_otro_worker(self):
+        self._token('tok-rotado', minutes=30)
+        client = FactusClient()
+
+        with patch.object(client, 'authenticate') as mocked_auth:
+            self.assertEqual(client.reauthenticate('tok-rechazado'), 'tok-rotado')
+
+        mocked_auth.assert_not_called()
+
+
+class FactusClientConfigCacheTests(TestCase):
+    def setUp(self):
+        from apps.facturacion.services.factus_client_config import invalidate_client_config
+
+        invalidate_client_config()
+        self.addCleanup(invalidate_client_config)
+
+    def test_construccion_reutiliza_configuracion_memoizada(self):
+        from apps.facturacion.services import factus_client_config
+
+        with patch.object(
+            factus_client_config,
+            '_build_client_config',
+            wraps=factus_client_config._build_client_config,
+        ) as mocked_build:
+            first = FactusClient()
+            second = FactusClient()
+
+        mocked_build.assert_called_once()
+        self.assertEqual(first.invoice_path, second.invoice_path)
+        self.assertEqual(second.credit_note_list_path, second.credit_notes_list_path)
+
+    def test_cambio_de_ambiente_factus_invalida_configuracion(self):
+        from apps.core.models import ConfiguracionFacturacion
+        from apps.facturacion.services import factus_client_config
+
+        configuracion = ConfiguracionFacturacion.objects.create()
+        FactusClient()
+        self.assertTrue(factus_client_config._cache)
+
+        configuracion.numero_remision = 9
+        configuracion.save(update_fields=['numero_remision'])
+        self.assertTrue(factus_client_config._cache)
+
+        configuracion.ambiente_factus = 'PRODUCTION'
+        configuracion.save(update_fields=['ambiente_factus'])
+        self.assertFalse(factus_client_config._cache)
+
+
+class FactusHttpTransportTests(TestCase):
+    def tearDown(self):
+        from apps.facturacion.services import factus_http
+
+        factus_http.reset_session()
+
+    def test_sesion_compartida_con_pool_y_reintentos_solo_idempotentes(self):
+        from apps.facturacion.services import factus_http
+
+        session = factus_http.get_session()
+        self.assertIs(session, factus_http.get_session())
+        adapter = session.get_adapter('https://api-sandbox.factus.com.co')
+        retry = adapter.max_retries
+        self.assertTrue(retry.is_retry('GET', 503))
+        self.assertFalse(retry.is_retry('POST', 503))
+
+    def test_timeout_por_tipo_de_endpoint_configurable(self):
+        from apps.facturacion.services import factus_http
+
+        self.assertEqual(factus_http.resolve_timeout('validate'), factus_http.DEFAULT_TIMEOUTS['validate'])
+        with patch('apps.facturacion.services.factus_http.config', return_value='3,20'):
+            self.assertEqual(factus_http.resolve_timeout('download'), (3.0, 20.0))
+
+    @patch('apps.facturacion.services.factus_http.send')
+    def test_download_remote_file_usa_transporte_compartido(self, mocked_send):
+        from apps.facturacion.services.download_resource_files import download_remote_file
+
+        mocked_send.return_value = MagicMock(status_code=200, content=b'%PDF')
+        self.assertEqual(download_remote_file('https://example.test/doc.pdf'), b'%PDF')
+        mocked_send.assert_called_once_with(
+            'GET', 'https://example.test/doc.pdf', timeout=None, timeout_kind='download'
+        )
+
+
 class FactusHybridEndpointRegistryTests(TestCase):
     def test_registry_resuelve_hibrido_v1_v2_y_fallbacks(self):
         from apps.facturacion.services.factus_endpoints import get_endpoint
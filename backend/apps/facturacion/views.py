@@ -8,9 +8,11 @@ from django.conf import settings
 from django.core.mail import send_mail
 from django.http import HttpResponse
 from django.db import transaction
+from django.db.models.fields.json import KeyTransform
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
@@ -58,10 +60,10 @@ from apps.facturacion.services import (
     emitir_documento_soporte,
     emitir_nota_ajuste_documento_soporte,
     read_local_media_file,
-    resolve_public_invoice_url,
     sync_numbering_ranges,
     sync_invoice_status,
     emitir_factura_completa,
+    build_credit_note_result_meta,
     build_credit_preview,
     create_credit_note,
     sincronizar_nota_credito,
@@ -87,7 +89,6 @@ from apps.facturacion.services.factus_client import FactusClient
 from apps.facturacion.services.factus_environment import resolve_factus_environment
 from apps.facturacion.services.numbering_range_admin_service import get_authorized_software_range_ids
 from apps.facturacion.services.electronic_state_machine import map_factus_status, resolve_actions
-from apps.facturacion.services.public_invoice_url import has_documental_inconsistency
 
 logger = logging.getLogger(__name__)
 
@@ -131,70 +132,128 @@ def _credit_note_api_payload(nota, meta: dict) -> dict:
     return payload
 
 
+class FacturaElectronicaCursorPagination(CursorPagination):
+    """Paginación keyset sobre (-created_at, id): costo constante sin importar la página."""
+
+    ordering = ('-created_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+# Columnas que usa el listado; `response_json` (sólo se extrae `bill_errors`) y el QR base64 quedan fuera.
+FACTURA_LIST_FIELDS = (
+    'id',
+    'venta_id',
+    'number',
+    'reference_code',
+    'cufe',
+    'uuid',
+    'estado_electronico',
+    'codigo_error',
+    'mensaje_error',
+    'observaciones_json',
+    'resolved_public_url',
+    'documento_inconsistente',
+    'bill_errors_count',
+    'qr_data',
+    'qr_image_url',
+    'qr',
+    'xml_url',
+    'pdf_url',
+    'xml_local_path',
+    'pdf_local_path',
+    'email_subject',
+    'email_zip_local_path',
+    'send_email_enabled',
+    'last_assets_sync_at',
+    'pdf_uploaded_to_factus',
+    'pdf_uploaded_at',
+    'correo_enviado',
+    'correo_enviado_at',
+    'ultimo_error_correo',
+    'ultimo_error_pdf',
+    'created_at',
+    'venta__fecha',
+    'venta__total',
+    'venta__estado',
+    'venta__cliente__nombre',
+)
+
+
+def _factura_list_item(factura: FacturaElectronica) -> dict:
+    return {
+        'id': factura.id,
+        'venta_id': factura.venta_id,
+        'numero': factura.number,
+        'reference_code': factura.reference_code,
+        'cufe': factura.cufe,
+        'uuid': factura.uuid,
+        'cliente': factura.venta.cliente.nombre,
+        'fecha': factura.venta.fecha,
+        'total': factura.venta.total,
+        'estado': factura.estado_electronico,
+        'estado_dian': factura.estado_electronico,
+        'status': factura.estado_electronico,
+        'estado_local': factura.venta.estado,
+        'estado_electronico': factura.estado_electronico,
+        'acciones_sugeridas': resolve_actions(factura.estado_electronico),
+        'codigo_error': factura.codigo_error,
+        'observaciones': factura.mensaje_error,
+        'observaciones_json': factura.observaciones_json,
+        'bill_errors': factura.bill_errors_json if isinstance(factura.bill_errors_json, list) else [],
+        'bill_errors_count': factura.bill_errors_count,
+        'public_url': factura.resolved_public_url,
+        'factus_public_url': factura.resolved_public_url,
+        'documento_inconsistente': factura.documento_inconsistente,
+        'mensaje_inconsistencia_documental': factura.mensaje_error if factura.documento_inconsistente else '',
+        'qr_factus': factura.qr_data,
+        'qr_image': factura.qr_image_url or (factura.qr.url if factura.qr else ''),
+        'xml_url': factura.xml_url,
+        'pdf_url': factura.pdf_url,
+        'xml_local_path': factura.xml_local_path,
+        'pdf_local_path': factura.pdf_local_path,
+        'email_subject': factura.email_subject,
+        'email_zip_local_path': factura.email_zip_local_path,
+        'send_email_enabled': factura.send_email_enabled,
+        'last_assets_sync_at': factura.last_assets_sync_at,
+        'can_sync_assets': bool(factura.number and (not factura.pdf_local_path or not factura.xml_local_path)),
+        'pdf_uploaded_to_factus': factura.pdf_uploaded_to_factus,
+        'pdf_uploaded_at': factura.pdf_uploaded_at,
+        'correo_enviado': factura.correo_enviado,
+        'correo_enviado_at': factura.correo_enviado_at,
+        'ultimo_error_correo': factura.ultimo_error_correo,
+        'ultimo_error_pdf': factura.ultimo_error_pdf,
+    }
+
+
 class FacturaElectronicaViewSet(viewsets.GenericViewSet):
     """ViewSet para consultar y sincronizar estado DIAN de facturas electrónicas."""
 
     permission_classes = [IsAuthenticated]
     serializer_class = FacturaEstadoSerializer
+    pagination_class = FacturaElectronicaCursorPagination
+    ordering = FacturaElectronicaCursorPagination.ordering
 
     def list(self, request):
-        facturas = FacturaElectronica.objects.select_related('venta__cliente')
+        """Listado paginado por cursor; el detalle completo queda en `retrieve`."""
+        facturas = (
+            FacturaElectronica.objects.select_related('venta__cliente')
+            .only(*FACTURA_LIST_FIELDS)
+            .annotate(bill_errors_json=KeyTransform('bill_errors', 'response_json'))
+        )
         estado_electronico = str(request.query_params.get('estado_electronico', '')).strip()
         if estado_electronico:
             facturas = facturas.filter(estado_electronico=estado_electronico)
-        facturas = facturas.order_by('-created_at')
-        data = [
-            {
-                'id': factura.id,
-                'venta_id': factura.venta_id,
-                'numero': factura.number,
-                'reference_code': factura.reference_code,
-                'cufe': factura.cufe,
-                'uuid': factura.uuid,
-                'cliente': factura.venta.cliente.nombre,
-                'fecha': factura.venta.fecha,
-                'total': factura.venta.total,
-                'estado': factura.estado_electronico,
-                'estado_dian': factura.estado_electronico,
-                'status': factura.estado_electronico,
-                'estado_local': factura.venta.estado,
-                'estado_electronico': factura.estado_electronico,
-                'acciones_sugeridas': resolve_actions(factura.estado_electronico),
-                'codigo_error': factura.codigo_error,
-                'observaciones': factura.mensaje_error,
-                'observaciones_json': factura.observaciones_json,
-                'bill_errors': (
-                    factura.response_json.get('bill_errors', [])
-                    if isinstance(factura.response_json, dict)
-                    else []
-                ),
-                'public_url': resolve_public_invoice_url(factura),
-                'factus_public_url': resolve_public_invoice_url(factura),
-                'documento_inconsistente': has_documental_inconsistency(factura),
-                'mensaje_inconsistencia_documental': (
-                    factura.mensaje_error if has_documental_inconsistency(factura) else ''
-                ),
-                'qr_factus': factura.qr_data,
-                'qr_image': factura.qr_image_url or factura.qr_image_data,
-                'xml_url': factura.xml_url,
-                'pdf_url': factura.pdf_url,
-                'xml_local_path': factura.xml_local_path,
-                'pdf_local_path': factura.pdf_local_path,
-                'email_subject': factura.email_subject,
-                'email_zip_local_path': factura.email_zip_local_path,
-                'send_email_enabled': factura.send_email_enabled,
-                'last_assets_sync_at': factura.last_assets_sync_at,
-                'can_sync_assets': bool(factura.number and (not factura.pdf_local_path or not factura.xml_local_path)),
-                'pdf_uploaded_to_factus': factura.pdf_uploaded_to_factus,
-                'pdf_uploaded_at': factura.pdf_uploaded_at,
-                'correo_enviado': factura.correo_enviado,
-                'correo_enviado_at': factura.correo_enviado_at,
-                'ultimo_error_correo': factura.ultimo_error_correo,
-                'ultimo_error_pdf': factura.ultimo_error_pdf,
-            }
-            for factura in facturas
+        venta_ids = [
+            int(value)
+            for value in str(request.query_params.get('venta_id', '')).split(',')
+            if value.strip().isdigit()
         ]
-        return Response(data)
+        if venta_ids:
+            facturas = facturas.filter(venta_id__in=venta_ids)
+        page = self.paginate_queryset(facturas)
+        return self.get_paginated_response([_factura_list_item(factura) for factura in page])
 
     def retrieve(self, request, pk=None):
         factura = (
@@ -1306,33 +1365,41 @@ class NotasCreditoViewSet(viewsets.GenericViewSet):
             return NotaCreditoCreateSerializer
         return NotaCreditoListSerializer
 
-    def _auto_sync_if_needed(self, nota: NotaCreditoElectronica, *, user) -> NotaCreditoElectronica:
-        if nota.estado_local not in {'PENDIENTE_ENVIO', 'PENDIENTE_DIAN', 'CONFLICTO_FACTUS'}:
-            return nota
-        last_sync = nota.last_sync_at or nota.synchronized_at
-        if last_sync and (timezone.now() - last_sync).total_seconds() < 30:
-            return nota
-        try:
-            nota, _ = sync_credit_note_with_effects(nota, user=user)
-            return nota
-        except Exception:
-            return nota
+    def get_serializer_context(self):
+        # Un único "ahora" por request para que `sync_age_seconds` sea coherente entre filas.
+        context = super().get_serializer_context()
+        context['now'] = timezone.now()
+        return context
 
     def list(self, request):
-        queryset = NotaCreditoElectronica.objects.select_related('factura').order_by('-created_at')
+        """Listado local y paginado; el refresco contra Factus lo hace `reconciliar_notas_credito`."""
+        queryset = (
+            NotaCreditoElectronica.objects.select_related('factura')
+            .prefetch_related('detalles__producto')
+            .order_by('-created_at', '-id')
+        )
         factura_id = request.query_params.get('factura_id')
         if factura_id:
             queryset = queryset.filter(factura_id=factura_id)
-        notes = [self._auto_sync_if_needed(nota, user=request.user) for nota in queryset]
-        serializer = self.get_serializer(notes, many=True)
+        estado = str(request.query_params.get('estado') or '').strip().upper()
+        if estado:
+            queryset = queryset.filter(estado_local=estado)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     def retrieve(self, request, pk=None):
-        nota = NotaCreditoElectronica.objects.select_related('factura').prefetch_related('detalles').filter(pk=pk).first()
+        nota = (
+            NotaCreditoElectronica.objects.select_related('factura')
+            .prefetch_related('detalles__producto')
+            .filter(pk=pk)
+            .first()
+        )
         if nota is None:
             return Response({'detail': 'Nota crédito no encontrada.'}, status=status.HTTP_404_NOT_FOUND)
-        nota = self._auto_sync_if_needed(nota, user=request.user)
-        return Response(NotaCreditoListSerializer(nota).data)
+        return Response(NotaCreditoListSerializer(nota, context=self.get_serializer_context()).data)
 
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -1437,6 +1504,23 @@ class NotasCreditoViewSet(viewsets.GenericViewSet):
             return Response({'detail': 'Error interno al sincronizar la nota crédito.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(_credit_note_api_payload(nota, meta), status=_credit_note_http_status(meta))
 
+    @action(detail=True, methods=['get'], url_path='estado')
+    def estado(self, request, pk=None):
+        """Estado local barato para que el cliente haga polling mientras concilia el worker."""
+        nota = NotaCreditoElectronica.objects.select_related('factura').filter(pk=pk).first()
+        if nota is None:
+            return Response({'detail': 'Nota crédito no encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+        meta = build_credit_note_result_meta(nota)
+        payload = _credit_note_api_payload(nota, meta)
+        payload.update(
+            {
+                'reconciliation_pending': nota.next_sync_at is not None,
+                'next_sync_at': nota.next_sync_at,
+                'sync_attempts': nota.sync_attempts,
+            }
+        )
+        return Response(payload, status=_credit_note_http_status(meta))
+
     @action(detail=True, methods=['get'], url_path='estado-remoto')
     def estado_remoto(self, request, pk=None):
         nota = NotaCreditoElectronica.objects.filter(pk=pk).first()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventario.services.reorden import refrescar_velocidades
+
+
+class Command(BaseCommand):
+    help = 'Actualiza la velocidad de salida por producto (ventanas de 7/30/90 días) para el punto de reorden.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Recalcula todos los productos en lugar de sólo los que cambiaron.',
+        )
+
+    def handle(self, *args, **options):
+        total = refrescar_velocidades(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(f'Velocidades actualizadas: {total} productos.'))
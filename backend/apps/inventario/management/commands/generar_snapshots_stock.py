@@ -0,0 +1,48 @@
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.inventario.services.stock_snapshots import generar_snapshot
+
+
+def _parse_fecha(value: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as exc:
+        raise CommandError(f'Fecha inválida "{value}", use YYYY-MM-DD.') from exc
+
+
+class Command(BaseCommand):
+    help = 'Genera fotos de stock por producto al cierre del día (por defecto, ayer).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha de corte YYYY-MM-DD.')
+        parser.add_argument('--desde', help='Inicio del rango a generar (YYYY-MM-DD).')
+        parser.add_argument('--hasta', help='Fin del rango a generar (YYYY-MM-DD); por defecto ayer.')
+        parser.add_argument(
+            '--mensual',
+            action='store_true',
+            help='Dentro del rango, sólo genera el último día de cada mes.',
+        )
+
+    def handle(self, *args, **options):
+        ayer = timezone.localdate() - timedelta(days=1)
+        if options['fecha']:
+            fechas = [_parse_fecha(options['fecha'])]
+        elif options['desde']:
+            desde = _parse_fecha(options['desde'])
+            hasta = _parse_fecha(options['hasta']) if options['hasta'] else ayer
+            if desde > hasta:
+                raise CommandError('--desde debe ser anterior o igual a --hasta.')
+            fechas = [desde + timedelta(days=offset) for offset in range((hasta - desde).days + 1)]
+            if options['mensual']:
+                fechas = [fecha for fecha in fechas if (fecha + timedelta(days=1)).day == 1 or fecha == hasta]
+        else:
+            fechas = [ayer]
+
+        # En orden cronológico: cada foto parte de la anterior más los movimientos del periodo.
+        for fecha in fechas:
+            filas = generar_snapshot(fecha)
+            self.stdout.write(f'{fecha}: {filas} productos')
+        self.stdout.write(self.style.SUCCESS(f'Snapshots de stock generados: {len(fechas)} fechas.'))
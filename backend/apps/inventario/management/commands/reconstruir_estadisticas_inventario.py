@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventario.services.inventory_stats import reconstruir_estadisticas_inventario
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero el resumen materializado de inventario por categoría.'
+
+    def handle(self, *args, **options):
+        categorias = reconstruir_estadisticas_inventario()
+        self.stdout.write(self.style.SUCCESS(f'Resumen de inventario reconstruido: {categorias} categorías.'))
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.5 on 2026-10-17 03:33
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Copia congelada de `apps.inventario.services.producto_search` a la fecha de
+# esta migración: el backfill no debe cambiar si ese servicio evoluciona.
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_search_terms(text):
+    folded = (
+        unicodedata.normalize("NFKD", str(text or ""))
+        .encode("ascii", "ignore")
+        .decode("ascii")
+    )
+    return TOKEN_RE.findall(folded.lower())
+
+
+def refresh_search_text(producto):
+    codigo_tokens = normalize_search_terms(producto.codigo)
+    parts = [*codigo_tokens, "".join(codigo_tokens)]
+    parts += normalize_search_terms(producto.nombre)
+    parts += normalize_search_terms(producto.descripcion)
+    producto.search_text = " ".join(parts)
+
+
+def backfill_search_text(apps, schema_editor):
+    Producto = apps.get_model("inventario", "Producto")
+    pending = []
+    for producto in Producto.objects.only("codigo", "nombre", "descripcion").iterator(
+        chunk_size=500
+    ):
+        refresh_search_text(producto)
+        pending.append(producto)
+        if len(pending) >= 500:
+            Producto.objects.bulk_update(pending, ["search_text"])
+            pending = []
+    if pending:
+        Producto.objects.bulk_update(pending, ["search_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0008_producto_ultima_compra"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="producto",
+            name="search_text",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="Texto de búsqueda"
+            ),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="producto",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    "search_text", config="simple"
+                ),
+                name="producto_search_gin",
+            ),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.1.5 on 2026-10-17 03:38
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Round
+
+
+# Copia congelada de `apps.inventario.services.inventory_stats` a la fecha de
+# esta migración: el backfill no debe cambiar si ese servicio evoluciona.
+def backfill_resumen(apps, schema_editor):
+    Producto = apps.get_model("inventario", "Producto")
+    ResumenInventarioCategoria = apps.get_model(
+        "inventario", "ResumenInventarioCategoria"
+    )
+    filas = (
+        Producto.objects.filter(is_active=True, categoria__isnull=False)
+        .order_by()
+        .values("categoria_id")
+        .annotate(
+            total_productos=Count("id"),
+            stock_bajo=Count("id", filter=Q(stock__lte=F("stock_minimo"))),
+            agotados=Count("id", filter=Q(stock__lte=0)),
+            valor_inventario=Sum(
+                ExpressionWrapper(
+                    Round(F("precio_costo") * F("stock"), 2),
+                    output_field=DecimalField(max_digits=18, decimal_places=2),
+                )
+            ),
+        )
+    )
+    ResumenInventarioCategoria.objects.all().delete()
+    ResumenInventarioCategoria.objects.bulk_create(
+        [
+            ResumenInventarioCategoria(
+                categoria_id=fila["categoria_id"],
+                total_productos=fila["total_productos"],
+                stock_bajo=fila["stock_bajo"],
+                agotados=fila["agotados"],
+                valor_inventario=fila["valor_inventario"] or Decimal("0"),
+            )
+            for fila in filas
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0009_producto_search_text"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenInventarioCategoria",
+            fields=[
+                (
+                    "categoria",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="resumen_inventario",
+                        serialize=False,
+                        to="inventario.categoria",
+                        verbose_name="Categoría",
+                    ),
+                ),
+                (
+                    "total_productos",
+                    models.IntegerField(default=0, verbose_name="Productos activos"),
+                ),
+                (
+                    "stock_bajo",
+                    models.IntegerField(
+                        default=0, verbose_name="Productos con stock bajo"
+                    ),
+                ),
+                (
+                    "agotados",
+                    models.IntegerField(default=0, verbose_name="Productos agotados"),
+                ),
+                (
+                    "valor_inventario",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=18,
+                        verbose_name="Valor del inventario",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Fecha de actualización"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumen de inventario por categoría",
+                "verbose_name_plural": "Resúmenes de inventario por categoría",
+                "db_table": "resumen_inventario_categoria",
+            },
+        ),
+        migrations.RunPython(backfill_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.5 on 2026-10-17 03:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0010_resumen_inventario_categoria"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotStockProducto",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField(verbose_name="Fecha de corte")),
+                (
+                    "stock",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="Stock al cierre"
+                    ),
+                ),
+                (
+                    "costo_unitario",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=12,
+                        verbose_name="Costo unitario al cierre",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "producto",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots_stock",
+                        to="inventario.producto",
+                        verbose_name="Producto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Snapshot de stock",
+                "verbose_name_plural": "Snapshots de stock",
+                "db_table": "snapshots_stock_producto",
+                "ordering": ["-fecha", "producto"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("fecha", "producto"),
+                        name="uq_snapshot_stock_fecha_producto",
+                    )
+                ],
+            },
+        ),
+    ]
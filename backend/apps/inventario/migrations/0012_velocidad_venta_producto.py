@@ -0,0 +1,82 @@
+# Generated by Django 5.1.5 on 2026-10-17 03:54
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0011_snapshot_stock_producto"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VelocidadVentaProducto",
+            fields=[
+                (
+                    "producto",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="velocidad_venta",
+                        serialize=False,
+                        to="inventario.producto",
+                        verbose_name="Producto",
+                    ),
+                ),
+                (
+                    "vendido_7d",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=14,
+                        verbose_name="Unidades últimos 7 días",
+                    ),
+                ),
+                (
+                    "vendido_30d",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=14,
+                        verbose_name="Unidades últimos 30 días",
+                    ),
+                ),
+                (
+                    "vendido_90d",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=14,
+                        verbose_name="Unidades últimos 90 días",
+                    ),
+                ),
+                (
+                    "velocidad_diaria",
+                    models.DecimalField(
+                        decimal_places=4,
+                        default=Decimal("0.0000"),
+                        max_digits=14,
+                        verbose_name="Unidades por día",
+                    ),
+                ),
+                (
+                    "ultima_salida",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Última salida"
+                    ),
+                ),
+                (
+                    "calculado_at",
+                    models.DateTimeField(db_index=True, verbose_name="Calculado hasta"),
+                ),
+            ],
+            options={
+                "verbose_name": "Velocidad de venta",
+                "verbose_name_plural": "Velocidades de venta",
+                "db_table": "velocidad_venta_producto",
+            },
+        ),
+    ]
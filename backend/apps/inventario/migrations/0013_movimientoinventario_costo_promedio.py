@@ -0,0 +1,67 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 2000
+COSTED_TYPES = {"ENTRADA", "AJUSTE"}
+EXP = Decimal("0.0001")
+
+
+def calcular_costo_promedio(apps, schema_editor):
+    """Recorre el Kardex de cada producto y guarda el costo promedio ponderado por movimiento.
+
+    Copia congelada de ``siguiente_costo_promedio``: el stock previo al Kardex
+    parte del ``precio_costo`` del producto.
+    """
+    MovimientoInventario = apps.get_model("inventario", "MovimientoInventario")
+    Producto = apps.get_model("inventario", "Producto")
+
+    precios = dict(Producto.objects.values_list("pk", "precio_costo"))
+    producto_actual = None
+    costo = Decimal("0")
+    pendientes = []
+    filas = (
+        MovimientoInventario.objects.order_by("producto_id", "created_at", "id")
+        .only("id", "producto_id", "tipo", "cantidad", "stock_anterior", "costo_unitario")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for movimiento in filas:
+        if movimiento.producto_id != producto_actual:
+            producto_actual = movimiento.producto_id
+            costo = Decimal(precios.get(producto_actual) or 0)
+        if movimiento.tipo in COSTED_TYPES and movimiento.cantidad > 0 and movimiento.costo_unitario:
+            previo = max(Decimal(movimiento.stock_anterior or 0), Decimal("0"))
+            costo = (previo * costo + movimiento.cantidad * movimiento.costo_unitario) / (previo + movimiento.cantidad)
+        costo = costo.quantize(EXP)
+        movimiento.costo_promedio = costo
+        pendientes.append(movimiento)
+        if len(pendientes) >= CHUNK_SIZE:
+            MovimientoInventario.objects.bulk_update(pendientes, ["costo_promedio"])
+            pendientes = []
+    if pendientes:
+        MovimientoInventario.objects.bulk_update(pendientes, ["costo_promedio"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0012_velocidad_venta_producto"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movimientoinventario",
+            name="costo_promedio",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=4,
+                help_text="Costo promedio ponderado del producto después del movimiento",
+                max_digits=14,
+                null=True,
+                verbose_name="Costo promedio",
+            ),
+        ),
+        migrations.RunPython(calcular_costo_promedio, migrations.RunPython.noop),
+    ]
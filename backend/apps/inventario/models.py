@@ -1,4 +1,6 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from apps.core.models import BaseModel
@@ -197,6 +199,18 @@ class Producto(BaseModel):
         verbose_name='Es servicio',
         help_text='Marca si es un servicio en lugar de producto físico'
     )
+
+    # Búsqueda (derivado de codigo/nombre/descripcion, ver services.producto_search)
+    search_text = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Texto de búsqueda'
+    )
+
+    SEARCH_SOURCE_FIELDS = frozenset({'codigo', 'nombre', 'descripcion'})
+    # Campos que alimentan ResumenInventarioCategoria (ver services.inventory_stats).
+    STATS_SOURCE_FIELDS = frozenset({'is_active', 'categoria', 'categoria_id', 'stock', 'stock_minimo', 'precio_costo'})
     
     class Meta:
         db_table = 'productos'
@@ -208,19 +222,33 @@ class Producto(BaseModel):
             models.Index(fields=['nombre']),
             models.Index(fields=['categoria', 'is_active']),
             models.Index(fields=['stock']),
+            GinIndex(SearchVector('search_text', config='simple'), name='producto_search_gin'),
         ]
     
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
 
     def save(self, *args, **kwargs):
+        # Transacción propia para que el bloqueo de la fila previa dure hasta el UPDATE.
+        with transaction.atomic():
+            self._save(*args, **kwargs)
+
+    def _save(self, *args, **kwargs):
         touch_ultima_compra = kwargs.pop('touch_ultima_compra', True)
         update_fields = kwargs.get('update_fields')
 
+        previous = None
         if self.pk:
+            previous_qs = Producto.objects.filter(pk=self.pk)
+            if update_fields is None or self.STATS_SOURCE_FIELDS.intersection(update_fields):
+                # Fila previa bloqueada: el delta del resumen no puede mezclar ediciones concurrentes.
+                previous_qs = previous_qs.select_for_update()
             previous = (
-                Producto.objects.filter(pk=self.pk)
-                .only('stock', 'precio_venta', 'precio_costo', 'ultima_compra')
+                previous_qs
+                .only(
+                    'stock', 'precio_venta', 'precio_costo', 'ultima_compra',
+                    'stock_minimo', 'categoria', 'is_active',
+                )
                 .first()
             )
 
@@ -239,6 +267,11 @@ class Producto(BaseModel):
         elif self.ultima_compra is None:
             self.ultima_compra = timezone.now()
 
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.SEARCH_SOURCE_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        # Fila previa para el resumen incremental de inventario (signal post_save).
+        self._stats_previous = previous
         super().save(*args, **kwargs)
     
     @property
@@ -303,6 +336,14 @@ class MovimientoInventario(BaseModel):
         decimal_places=2,
         verbose_name='Costo unitario'
     )
+    costo_promedio = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        verbose_name='Costo promedio',
+        help_text='Costo promedio ponderado del producto después del movimiento'
+    )
     usuario = models.ForeignKey(
         'usuarios.Usuario',
         on_delete=models.PROTECT,
@@ -334,6 +375,150 @@ class MovimientoInventario(BaseModel):
         return f"{self.get_tipo_display()} - {self.producto.codigo} ({self.cantidad})"
 
 
+class ResumenInventarioCategoria(models.Model):
+    """
+    Estadísticas materializadas del inventario activo por categoría.
+    Se mantienen de forma incremental (ver services.inventory_stats) y se
+    reconstruyen con ``reconstruir_estadisticas_inventario``.
+    """
+    categoria = models.OneToOneField(
+        Categoria,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen_inventario',
+        verbose_name='Categoría'
+    )
+    total_productos = models.IntegerField(
+        default=0,
+        verbose_name='Productos activos'
+    )
+    stock_bajo = models.IntegerField(
+        default=0,
+        verbose_name='Productos con stock bajo'
+    )
+    agotados = models.IntegerField(
+        default=0,
+        verbose_name='Productos agotados'
+    )
+    valor_inventario = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Valor del inventario'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de actualización'
+    )
+
+    class Meta:
+        db_table = 'resumen_inventario_categoria'
+        verbose_name = 'Resumen de inventario por categoría'
+        verbose_name_plural = 'Resúmenes de inventario por categoría'
+
+    def __str__(self):
+        return f"{self.categoria_id}: {self.total_productos} productos"
+
+
+class SnapshotStockProducto(models.Model):
+    """
+    Foto del stock y costo de un producto al cierre de ``fecha`` (hora local).
+    La genera ``generar_snapshots_stock``; la valoración histórica parte de la
+    foto más reciente y suma los movimientos posteriores.
+    """
+    fecha = models.DateField(
+        verbose_name='Fecha de corte'
+    )
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='snapshots_stock',
+        verbose_name='Producto'
+    )
+    stock = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name='Stock al cierre'
+    )
+    costo_unitario = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name='Costo unitario al cierre'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+
+    class Meta:
+        db_table = 'snapshots_stock_producto'
+        verbose_name = 'Snapshot de stock'
+        verbose_name_plural = 'Snapshots de stock'
+        ordering = ['-fecha', 'producto']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='uq_snapshot_stock_fecha_producto'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.producto_id}: {self.stock}"
+
+
+class VelocidadVentaProducto(models.Model):
+    """
+    Unidades despachadas por producto en ventanas móviles de 7/30/90 días.
+    La refresca ``actualizar_velocidad_ventas`` (ver services.reorden) y
+    alimenta el punto de reorden y las sugerencias de compra.
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='velocidad_venta',
+        verbose_name='Producto'
+    )
+    vendido_7d = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Unidades últimos 7 días'
+    )
+    vendido_30d = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Unidades últimos 30 días'
+    )
+    vendido_90d = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Unidades últimos 90 días'
+    )
+    velocidad_diaria = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=Decimal('0.0000'),
+        verbose_name='Unidades por día'
+    )
+    ultima_salida = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Última salida'
+    )
+    calculado_at = models.DateTimeField(
+        db_index=True,
+        verbose_name='Calculado hasta'
+    )
+
+    class Meta:
+        db_table = 'velocidad_venta_producto'
+        verbose_name = 'Velocidad de venta'
+        verbose_name_plural = 'Velocidades de venta'
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.velocidad_diaria}/día"
+
+
 class ProductoFavorito(BaseModel):
     """Productos favoritos por usuario para consulta rápida."""
     usuario = models.ForeignKey(
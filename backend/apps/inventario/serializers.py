@@ -22,8 +22,11 @@ class CategoriaSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
     
     def get_total_productos(self, obj):
-        """Cuenta cuántos productos tiene esta categoría"""
-        return obj.productos.filter(is_active=True).count()
+        """Cuenta cuántos productos tiene esta categoría (anotado por el viewset)."""
+        total = getattr(obj, 'total_productos', None)
+        if total is None:
+            return obj.productos.filter(is_active=True).count()
+        return total
 
 
 class ProveedorSerializer(serializers.ModelSerializer):
@@ -52,7 +55,10 @@ class ProveedorSerializer(serializers.ModelSerializer):
         }
     
     def get_total_productos(self, obj):
-        return obj.productos.filter(is_active=True).count()
+        total = getattr(obj, 'total_productos', None)
+        if total is None:
+            return obj.productos.filter(is_active=True).count()
+        return total
 
 
 class ProductoListSerializer(serializers.ModelSerializer):
@@ -251,6 +257,38 @@ class MovimientoInventarioSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'stock_anterior', 'stock_nuevo']
 
 
+class KardexMovimientoSerializer(serializers.ModelSerializer):
+    """Línea de Kardex; ``saldo``/``valor_movimiento``/``saldo_valorizado``/``costo_promedio_linea`` vienen anotados."""
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+    usuario_nombre = serializers.CharField(source='usuario.username', read_only=True)
+    saldo = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    valor_movimiento = serializers.DecimalField(max_digits=18, decimal_places=2, read_only=True)
+    saldo_valorizado = serializers.DecimalField(max_digits=18, decimal_places=2, read_only=True)
+    costo_promedio = serializers.DecimalField(
+        source='costo_promedio_linea', max_digits=18, decimal_places=2, read_only=True
+    )
+
+    class Meta:
+        model = MovimientoInventario
+        fields = [
+            'id',
+            'created_at',
+            'tipo',
+            'tipo_display',
+            'referencia',
+            'usuario_nombre',
+            'cantidad',
+            'costo_unitario',
+            'valor_movimiento',
+            'stock_anterior',
+            'saldo',
+            'saldo_valorizado',
+            'costo_promedio',
+            'observaciones',
+        ]
+        read_only_fields = fields
+
+
 class ProductoFavoritoSerializer(serializers.ModelSerializer):
     producto_codigo = serializers.CharField(source='producto.codigo', read_only=True)
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
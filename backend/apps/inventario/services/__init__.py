@@ -0,0 +1,67 @@
+from .barcode_cache import (
+    bump_catalog_version,
+    bump_stock_version,
+    clear_barcode_cache,
+    get_producto_payload_by_codigo,
+)
+from .conteo_fisico import ConteoFisicoError, aplicar_conteo_fisico, leer_archivo_conteo, lineas_desde_items
+from .inventory_stats import (
+    aplicar_contribuciones,
+    obtener_estadisticas_inventario,
+    reconstruir_estadisticas_inventario,
+)
+from .kardex import KARDEX_ORDERING, kardex_queryset, stream_kardex_csv, write_kardex_xlsx
+from .producto_search import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    SEARCH_ORDERING,
+    normalize_search_terms,
+    refresh_search_text,
+    search_productos,
+    search_productos_top,
+)
+from .reorden import con_punto_reorden, refrescar_velocidades, sugerencias_reorden
+from .stock_snapshots import generar_snapshot, resumen_por_categoria, stock_en_fecha
+from .stock_ledger import (
+    StockInsuficienteError,
+    StockPosting,
+    StockPostingResult,
+    aplicar_deltas_stock,
+    post_stock_movements,
+)
+
+__all__ = [
+    'KARDEX_ORDERING',
+    'DEFAULT_SEARCH_LIMIT',
+    'MAX_SEARCH_LIMIT',
+    'SEARCH_ORDERING',
+    'ConteoFisicoError',
+    'StockInsuficienteError',
+    'StockPosting',
+    'StockPostingResult',
+    'aplicar_conteo_fisico',
+    'aplicar_contribuciones',
+    'aplicar_deltas_stock',
+    'bump_catalog_version',
+    'bump_stock_version',
+    'clear_barcode_cache',
+    'con_punto_reorden',
+    'generar_snapshot',
+    'get_producto_payload_by_codigo',
+    'kardex_queryset',
+    'leer_archivo_conteo',
+    'lineas_desde_items',
+    'normalize_search_terms',
+    'obtener_estadisticas_inventario',
+    'post_stock_movements',
+    'reconstruir_estadisticas_inventario',
+    'refrescar_velocidades',
+    'resumen_por_categoria',
+    'refresh_search_text',
+    'search_productos',
+    'search_productos_top',
+    'stock_en_fecha',
+    'stream_kardex_csv',
+    'sugerencias_reorden',
+    'write_kardex_xlsx',
+]
@@ -0,0 +1,176 @@
+"""Caché en proceso para la búsqueda por código de barras.
+
+``buscar_por_codigo`` se invoca una vez por ítem escaneado en caja. Se guarda el
+payload serializado por ``codigo`` en un LRU local; se invalida con sellos de
+versión que suben los signals de Producto/Categoria/Proveedor y los movimientos
+de inventario. El stock se superpone desde la base de datos cuando su sello
+cambió o supera ``INVENTARIO_BARCODE_STOCK_TTL`` segundos.
+
+Los cambios de catálogo (nombre, precio, categoría...) suben además el sello
+compartido ``catalogo_inventario`` (ver ``apps.core.services.configuracion_cache``),
+así que los demás procesos descartan sus payloads en cuanto lo detectan;
+``INVENTARIO_BARCODE_CACHE_TTL`` queda sólo como tope de antigüedad.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Iterable
+
+from decouple import config
+from django.db import transaction
+
+from apps.core.services.configuracion_cache import bump_shared_version, get_shared_version
+from apps.inventario.models import Producto
+
+CLAVE_CATALOGO = 'catalogo_inventario'
+
+
+@dataclass
+class _Entry:
+    producto_id: int
+    payload: dict[str, Any]
+    catalog_version: int
+    shared_version: int
+    stock_version: int
+    cached_at: float
+    stock_checked_at: float
+
+
+_lock = threading.Lock()
+_entries: OrderedDict[str, _Entry] = OrderedDict()
+_catalog_version = 0
+_stock_versions: dict[int, int] = {}
+
+
+def _max_size() -> int:
+    return config('INVENTARIO_BARCODE_CACHE_SIZE', default=2048, cast=int)
+
+
+def _catalog_ttl() -> float:
+    return config('INVENTARIO_BARCODE_CACHE_TTL', default=300, cast=float)
+
+
+def _stock_ttl() -> float:
+    return config('INVENTARIO_BARCODE_STOCK_TTL', default=5, cast=float)
+
+
+def _bump_catalog() -> None:
+    global _catalog_version
+    with _lock:
+        _catalog_version += 1
+
+
+def _bump_stock(producto_ids: tuple[int, ...]) -> None:
+    with _lock:
+        for producto_id in producto_ids:
+            _stock_versions[producto_id] = _stock_versions.get(producto_id, 0) + 1
+
+
+def bump_catalog_version() -> None:
+    """Invalida todos los payloads (cambio de producto, categoría o proveedor)."""
+    # Se sube ya y otra vez al confirmar: evita recachear la fila previa mientras la transacción sigue abierta.
+    bump_shared_version(CLAVE_CATALOGO)
+    _bump_catalog()
+    transaction.on_commit(_bump_catalog)
+
+
+def bump_stock_version(producto_ids: Iterable[int]) -> None:
+    """Fuerza la superposición de stock fresco en la próxima lectura de esos productos."""
+    producto_ids = tuple(set(producto_ids))
+    if not producto_ids:
+        return
+    _bump_stock(producto_ids)
+    transaction.on_commit(lambda: _bump_stock(producto_ids))
+
+
+def clear_barcode_cache() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def _serialize(producto: Producto) -> dict[str, Any]:
+    from apps.inventario.serializers import ProductoDetailSerializer
+
+    return dict(ProductoDetailSerializer(producto).data)
+
+
+def _overlay_stock(payload: dict[str, Any], stock: Decimal, updated_at) -> None:
+    from apps.inventario.serializers import ProductoDetailSerializer
+
+    serializer = ProductoDetailSerializer()
+    payload['stock'] = serializer.fields['stock'].to_representation(stock)
+    payload['stock_bajo'] = stock <= Decimal(str(payload['stock_minimo']))
+    payload['valor_inventario'] = serializer._format_decimal(Decimal(str(payload['precio_costo'])) * stock)
+    payload['updated_at'] = serializer.fields['updated_at'].to_representation(updated_at)
+
+
+def _load(codigo: str, shared_version: int) -> dict[str, Any] | None:
+    with _lock:
+        catalog_version = _catalog_version
+    producto = (
+        Producto.objects.select_related('categoria', 'proveedor')
+        .filter(codigo=codigo, is_active=True)
+        .first()
+    )
+    if producto is None:
+        return None
+    with _lock:
+        stock_version = _stock_versions.get(producto.id, 0)
+    payload = _serialize(producto)
+    now = time.monotonic()
+    with _lock:
+        _entries[codigo] = _Entry(
+            producto_id=producto.id,
+            payload=payload,
+            catalog_version=catalog_version,
+            shared_version=shared_version,
+            stock_version=stock_version,
+            cached_at=now,
+            stock_checked_at=now,
+        )
+        _entries.move_to_end(codigo)
+        while len(_entries) > _max_size():
+            _entries.popitem(last=False)
+    return dict(payload)
+
+
+def get_producto_payload_by_codigo(codigo: str) -> dict[str, Any] | None:
+    """Payload de ``ProductoDetailSerializer`` del producto activo con ese código, o ``None``."""
+    shared_version = get_shared_version(CLAVE_CATALOGO)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(codigo)
+        if entry is not None and (
+            entry.catalog_version != _catalog_version
+            or entry.shared_version != shared_version
+            or now - entry.cached_at > _catalog_ttl()
+        ):
+            del _entries[codigo]
+            entry = None
+        if entry is not None:
+            _entries.move_to_end(codigo)
+            stock_version = _stock_versions.get(entry.producto_id, 0)
+            if entry.stock_version == stock_version and now - entry.stock_checked_at <= _stock_ttl():
+                return dict(entry.payload)
+
+    if entry is None:
+        return _load(codigo, shared_version)
+
+    row = Producto.objects.filter(pk=entry.producto_id, is_active=True).values_list('stock', 'updated_at').first()
+    if row is None:
+        with _lock:
+            _entries.pop(codigo, None)
+        return _load(codigo, shared_version)
+    payload = dict(entry.payload)
+    _overlay_stock(payload, *row)
+    with _lock:
+        if _entries.get(codigo) is entry:
+            entry.payload = payload
+            entry.stock_version = stock_version
+            entry.stock_checked_at = now
+    return dict(payload)
@@ -0,0 +1,206 @@
+"""Conteo físico masivo: ajusta el stock de muchos productos en una sola operación.
+
+Recibe pares ``(codigo, cantidad contada)`` (JSON, CSV o XLSX), lee el stock
+actual de todos los códigos en una consulta (bloqueando las filas si se aplica)
+y registra los ``AJUSTE`` con ``post_stock_movements``: un UPDATE, un upsert de
+estadísticas y un INSERT en bloque, sin importar cuántas líneas traiga.
+Devuelve un informe de conciliación; en modo ``dry_run`` no escribe nada.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable
+
+from django.db import transaction
+from openpyxl import load_workbook
+
+from apps.inventario.models import Producto
+from apps.inventario.services.stock_ledger import StockPosting, post_stock_movements
+
+CONTEO_REFERENCIA = 'Conteo físico'
+CODIGO_COLUMNAS = ('codigo', 'código', 'sku')
+CANTIDAD_COLUMNAS = ('cantidad', 'conteo', 'cantidad_contada', 'stock')
+
+_ZERO = Decimal('0')
+
+
+class ConteoFisicoError(ValueError):
+    """El archivo o el cuerpo del conteo no tiene un formato utilizable."""
+
+
+@dataclass(frozen=True)
+class LineaConteo:
+    fila: int
+    codigo: str
+    cantidad: Any
+
+
+def _columna(encabezados: list[str], opciones: tuple[str, ...]) -> int:
+    normalizados = [str(valor or '').strip().lower() for valor in encabezados]
+    for opcion in opciones:
+        if opcion in normalizados:
+            return normalizados.index(opcion)
+    raise ConteoFisicoError(f'Falta la columna {opciones[0]!r} en el encabezado')
+
+
+def _lineas_de_tabla(filas: Iterable[tuple]) -> list[LineaConteo]:
+    filas = iter(filas)
+    encabezados = list(next(filas, None) or [])
+    if not encabezados:
+        raise ConteoFisicoError('El archivo está vacío')
+    col_codigo = _columna(encabezados, CODIGO_COLUMNAS)
+    col_cantidad = _columna(encabezados, CANTIDAD_COLUMNAS)
+    lineas = []
+    for numero, fila in enumerate(filas, start=2):
+        fila = list(fila)
+        if not any(valor not in (None, '') for valor in fila):
+            continue
+        codigo = fila[col_codigo] if col_codigo < len(fila) else None
+        cantidad = fila[col_cantidad] if col_cantidad < len(fila) else None
+        lineas.append(LineaConteo(fila=numero, codigo=str(codigo or '').strip(), cantidad=cantidad))
+    return lineas
+
+
+def leer_archivo_conteo(archivo) -> list[LineaConteo]:
+    """Lee un ``.csv`` (coma o punto y coma) o ``.xlsx`` con columnas ``codigo`` y ``cantidad``."""
+    nombre = (getattr(archivo, 'name', '') or '').lower()
+    if nombre.endswith('.xlsx'):
+        try:
+            workbook = load_workbook(archivo, read_only=True, data_only=True)
+        except Exception as exc:  # openpyxl lanza varios tipos según el daño del archivo
+            raise ConteoFisicoError('No se pudo leer el archivo XLSX') from exc
+        try:
+            return _lineas_de_tabla(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    if nombre.endswith('.csv'):
+        try:
+            texto = archivo.read().decode('utf-8-sig')
+        except UnicodeDecodeError as exc:
+            raise ConteoFisicoError('El CSV debe estar en UTF-8') from exc
+        try:
+            dialecto = csv.Sniffer().sniff(texto[:2048], delimiters=',;')
+        except csv.Error:
+            dialecto = csv.excel
+        return _lineas_de_tabla(csv.reader(io.StringIO(texto), dialecto))
+    raise ConteoFisicoError('Formato no soportado: use un archivo .csv o .xlsx')
+
+
+def lineas_desde_items(items) -> list[LineaConteo]:
+    """Convierte ``[{"codigo": ..., "cantidad": ...}, ...]`` en líneas (la fila es la posición, desde 1)."""
+    if not isinstance(items, list):
+        raise ConteoFisicoError('Debe enviar una lista de items con codigo y cantidad')
+    lineas = []
+    for numero, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise ConteoFisicoError(f'El item {numero} debe ser un objeto con codigo y cantidad')
+        lineas.append(
+            LineaConteo(fila=numero, codigo=str(item.get('codigo') or '').strip(), cantidad=item.get('cantidad'))
+        )
+    return lineas
+
+
+def _validar(lineas: list[LineaConteo]) -> tuple[dict[str, Decimal], list[dict[str, Any]]]:
+    """Cantidades por código (las repetidas se suman, p. ej. conteos por ubicación) y errores por fila."""
+    contado: dict[str, Decimal] = {}
+    errores = []
+    for linea in lineas:
+        if not linea.codigo:
+            errores.append({'fila': linea.fila, 'codigo': '', 'error': 'Código vacío'})
+            continue
+        try:
+            cantidad = Decimal(str(linea.cantidad).strip().replace(',', '.'))
+        except (InvalidOperation, TypeError, ValueError):
+            cantidad = None
+        if cantidad is None or not cantidad.is_finite():
+            errores.append({'fila': linea.fila, 'codigo': linea.codigo, 'error': 'Cantidad inválida'})
+            continue
+        if cantidad < 0:
+            errores.append({'fila': linea.fila, 'codigo': linea.codigo, 'error': 'La cantidad no puede ser negativa'})
+            continue
+        contado[linea.codigo] = contado.get(linea.codigo, _ZERO) + cantidad
+    return contado, errores
+
+
+def aplicar_conteo_fisico(
+    lineas: list[LineaConteo],
+    *,
+    usuario,
+    dry_run: bool = False,
+    observaciones: str = '',
+) -> dict[str, Any]:
+    """Concilia el conteo contra el stock actual y, salvo ``dry_run`` o errores, registra los ajustes.
+
+    Si hay errores no se aplica nada (``aplicado`` queda en ``False``).
+    """
+    contado, errores = _validar(lineas)
+    with transaction.atomic():
+        productos = Producto.objects.filter(codigo__in=list(contado), is_active=True).order_by('id')
+        if not dry_run:
+            # Bloquea las filas: la diferencia se calcula y se aplica sobre el mismo stock.
+            productos = productos.select_for_update()
+        encontrados = {
+            row['codigo']: row
+            for row in productos.values('id', 'codigo', 'nombre', 'stock', 'precio_costo', 'unidad_medida')
+        }
+
+        detalle = []
+        postings = []
+        for codigo, cantidad in contado.items():
+            producto = encontrados.get(codigo)
+            if producto is None:
+                errores.append({'fila': None, 'codigo': codigo, 'error': 'Producto no encontrado o inactivo'})
+                continue
+            if producto['unidad_medida'] == 'N/A' and cantidad != cantidad.quantize(Decimal('1')):
+                errores.append({'fila': None, 'codigo': codigo, 'error': 'Para unidad N/A solo se permiten enteros'})
+                continue
+            diferencia = cantidad - producto['stock']
+            detalle.append(
+                {
+                    'producto_id': producto['id'],
+                    'codigo': codigo,
+                    'nombre': producto['nombre'],
+                    'stock_sistema': producto['stock'],
+                    'stock_contado': cantidad,
+                    'diferencia': diferencia,
+                    'valor_diferencia': diferencia * producto['precio_costo'],
+                }
+            )
+            if diferencia:
+                postings.append(
+                    StockPosting(
+                        producto_id=producto['id'],
+                        tipo='AJUSTE',
+                        cantidad=diferencia,
+                        costo_unitario=producto['precio_costo'],
+                        referencia=CONTEO_REFERENCIA,
+                        observaciones=observaciones or f'Conteo físico: {producto["stock"]} -> {cantidad}',
+                    )
+                )
+
+        aplicado = not dry_run and not errores
+        if aplicado and postings:
+            post_stock_movements(postings, usuario=usuario)
+
+    detalle.sort(key=lambda item: item['codigo'])
+    errores.sort(key=lambda item: (item['fila'] is None, item['fila'] or 0, item['codigo']))
+    return {
+        'dry_run': dry_run,
+        'aplicado': aplicado,
+        'resumen': {
+            'lineas': len(lineas),
+            'productos': len(detalle),
+            'ajustados': sum(1 for item in detalle if item['diferencia']),
+            'sin_diferencia': sum(1 for item in detalle if not item['diferencia']),
+            'sobrante': sum((item['diferencia'] for item in detalle if item['diferencia'] > 0), _ZERO),
+            'faltante': sum((-item['diferencia'] for item in detalle if item['diferencia'] < 0), _ZERO),
+            'valor_diferencia': sum((item['valor_diferencia'] for item in detalle), _ZERO),
+            'errores': len(errores),
+        },
+        'detalle': detalle,
+        'errores': errores,
+    }
@@ -0,0 +1,192 @@
+"""Estadísticas materializadas del inventario por categoría.
+
+``ResumenInventarioCategoria`` guarda, por categoría, lo que antes calculaba
+``ProductoViewSet.estadisticas`` con cuatro barridos de productos activos. Las
+rutas de escritura (``post_stock_movements`` y ``Producto.save``) calculan,
+con la fila del producto bloqueada, la diferencia entre la contribución previa
+y la nueva de cada producto; se aplica con un único ``INSERT ... ON CONFLICT
+DO UPDATE`` aditivo después del commit, para que la fila de la categoría no
+quede bloqueada durante la venta. El valor de cada producto se redondea a
+centavos (la precisión de la columna) igual que en la reconstrucción, así que
+ambos caminos suman lo mismo. El comando ``reconstruir_estadisticas_inventario``
+recalcula todo desde cero.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from functools import partial
+from typing import Any, Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from apps.inventario.models import Producto, ResumenInventarioCategoria
+
+STATS_SOURCE_FIELDS = Producto.STATS_SOURCE_FIELDS
+
+_ZERO = Decimal('0')
+_CENTAVO = Decimal('0.01')
+
+
+@dataclass(frozen=True)
+class Contribucion:
+    categoria_id: int
+    total_productos: int
+    stock_bajo: int
+    agotados: int
+    valor_inventario: Decimal
+
+
+def contribucion_producto(*, is_active, categoria_id, stock, stock_minimo, precio_costo) -> Contribucion | None:
+    """Aporte de un producto a su categoría (``None`` si está inactivo o sin categoría)."""
+    if not is_active or categoria_id is None:
+        return None
+    stock = Decimal(stock or 0)
+    return Contribucion(
+        categoria_id=categoria_id,
+        total_productos=1,
+        stock_bajo=int(stock <= Decimal(stock_minimo or 0)),
+        agotados=int(stock <= 0),
+        valor_inventario=(Decimal(precio_costo or 0) * stock).quantize(_CENTAVO, rounding=ROUND_HALF_UP),
+    )
+
+
+def contribucion_de(producto) -> Contribucion | None:
+    if producto is None:
+        return None
+    return contribucion_producto(
+        is_active=producto.is_active,
+        categoria_id=producto.categoria_id,
+        stock=producto.stock,
+        stock_minimo=producto.stock_minimo,
+        precio_costo=producto.precio_costo,
+    )
+
+
+def contribucion_guardada(producto, previous, update_fields=None) -> Contribucion | None:
+    """Aporte tal como quedó en la base tras ``save``: con ``update_fields`` el resto sigue como ``previous``."""
+    if previous is None or update_fields is None:
+        return contribucion_de(producto)
+    update_fields = set(update_fields)
+
+    def campo(nombre, *alias):
+        fuente = producto if update_fields.intersection((nombre, *alias)) else previous
+        return getattr(fuente, nombre)
+
+    return contribucion_producto(
+        is_active=campo('is_active'),
+        categoria_id=campo('categoria_id', 'categoria'),
+        stock=campo('stock'),
+        stock_minimo=campo('stock_minimo'),
+        precio_costo=campo('precio_costo'),
+    )
+
+
+def aplicar_contribuciones(cambios: Iterable[tuple[Contribucion | None, Contribucion | None]]) -> None:
+    """Suma ``nueva - anterior`` por categoría en una sola sentencia al confirmar (omite si no hay cambio neto)."""
+    deltas: dict[int, list[Any]] = {}
+    for anterior, nueva in cambios:
+        for contribucion, signo in ((anterior, -1), (nueva, 1)):
+            if contribucion is None:
+                continue
+            acumulado = deltas.setdefault(contribucion.categoria_id, [0, 0, 0, _ZERO])
+            acumulado[0] += signo * contribucion.total_productos
+            acumulado[1] += signo * contribucion.stock_bajo
+            acumulado[2] += signo * contribucion.agotados
+            acumulado[3] += signo * contribucion.valor_inventario
+    filas = [(categoria_id, *valores) for categoria_id, valores in sorted(deltas.items()) if any(valores)]
+    if filas:
+        transaction.on_commit(partial(_sumar_al_resumen, filas))
+
+
+def _sumar_al_resumen(filas: list[tuple]) -> None:
+    table = connection.ops.quote_name(ResumenInventarioCategoria._meta.db_table)
+    values_sql = ', '.join(['(%s, %s, %s, %s, %s::numeric, %s)'] * len(filas))
+    now = timezone.now()
+    params: list = []
+    for fila in filas:
+        params.extend([*fila, now])
+    sql = f"""
+        INSERT INTO {table} AS r
+            (categoria_id, total_productos, stock_bajo, agotados, valor_inventario, updated_at)
+        VALUES {values_sql}
+        ON CONFLICT (categoria_id) DO UPDATE SET
+            total_productos = r.total_productos + EXCLUDED.total_productos,
+            stock_bajo = r.stock_bajo + EXCLUDED.stock_bajo,
+            agotados = r.agotados + EXCLUDED.agotados,
+            valor_inventario = r.valor_inventario + EXCLUDED.valor_inventario,
+            updated_at = EXCLUDED.updated_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def calcular_resumen(producto_model=Producto) -> list[dict[str, Any]]:
+    """Agregado completo por categoría desde productos (acepta el modelo histórico en migraciones)."""
+    return list(
+        producto_model.objects.filter(is_active=True, categoria__isnull=False)
+        .order_by()
+        .values('categoria_id')
+        .annotate(
+            total_productos=Count('id'),
+            stock_bajo=Count('id', filter=Q(stock__lte=F('stock_minimo'))),
+            agotados=Count('id', filter=Q(stock__lte=0)),
+            valor_inventario=Sum(
+                ExpressionWrapper(
+                    Round(F('precio_costo') * F('stock'), 2),
+                    output_field=DecimalField(max_digits=18, decimal_places=2),
+                )
+            ),
+        )
+    )
+
+
+def reconstruir_estadisticas_inventario(producto_model=Producto, resumen_model=ResumenInventarioCategoria) -> int:
+    """Reemplaza el resumen con el agregado actual; devuelve las categorías escritas."""
+    filas = calcular_resumen(producto_model)
+    with transaction.atomic():
+        resumen_model.objects.all().delete()
+        resumen_model.objects.bulk_create(
+            [
+                resumen_model(
+                    categoria_id=fila['categoria_id'],
+                    total_productos=fila['total_productos'],
+                    stock_bajo=fila['stock_bajo'],
+                    agotados=fila['agotados'],
+                    valor_inventario=fila['valor_inventario'] or _ZERO,
+                )
+                for fila in filas
+            ]
+        )
+    return len(filas)
+
+
+def obtener_estadisticas_inventario() -> dict[str, Any]:
+    """Totales y desglose por categoría leyendo sólo el resumen materializado."""
+    filas = list(
+        ResumenInventarioCategoria.objects.select_related('categoria')
+        .filter(total_productos__gt=0)
+        .order_by('categoria__nombre')
+    )
+    por_categoria = [
+        {
+            'categoria_id': fila.categoria_id,
+            'categoria_nombre': fila.categoria.nombre,
+            'total': fila.total_productos,
+            'stock_bajo': fila.stock_bajo,
+            'agotados': fila.agotados,
+            'valor_inventario': fila.valor_inventario,
+        }
+        for fila in filas
+    ]
+    return {
+        'total': sum(fila['total'] for fila in por_categoria),
+        'stock_bajo': sum(fila['stock_bajo'] for fila in por_categoria),
+        'agotados': sum(fila['agotados'] for fila in por_categoria),
+        'valor_inventario': sum((fila['valor_inventario'] for fila in por_categoria), _ZERO),
+        'por_categoria': por_categoria,
+    }
@@ -0,0 +1,86 @@
+"""Búsqueda de productos para la caja con texto completo de Postgres.
+
+``Producto.search_text`` guarda código, nombre y descripción ya normalizados
+(minúsculas, sin tildes, tokens alfanuméricos) y el índice GIN
+``producto_search_gin`` indexa ``to_tsvector('simple', search_text)``. Las
+búsquedas usan la misma expresión, con prefijo por término (``term:*``), y se
+ordenan por coincidencia de código, prefijo de nombre y ``ts_rank``.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Case, IntegerField, QuerySet, When
+
+from apps.inventario.models import Producto
+
+SEARCH_CONFIG = 'simple'
+SEARCH_ORDERING = ('-search_priority', '-search_rank', 'nombre')
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_search_terms(text) -> list[str]:
+    """Tokens en minúscula y sin tildes: ``'Bujía NGK-C7'`` -> ``['bujia', 'ngk', 'c7']``."""
+    folded = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode('ascii')
+    return _TOKEN_RE.findall(folded.lower())
+
+
+def build_search_text(producto: Producto) -> str:
+    codigo_tokens = normalize_search_terms(producto.codigo)
+    # El código compacto permite encontrar "ngkc7" aunque se haya guardado "NGK-C7".
+    parts = [*codigo_tokens, ''.join(codigo_tokens)]
+    parts += normalize_search_terms(producto.nombre)
+    parts += normalize_search_terms(producto.descripcion)
+    return ' '.join(parts)
+
+
+def refresh_search_text(producto: Producto) -> None:
+    """Recalcula en memoria ``search_text`` (no guarda)."""
+    producto.search_text = build_search_text(producto)
+
+
+def search_vector() -> SearchVector:
+    # Debe coincidir con la expresión del índice para que Postgres lo use.
+    return SearchVector('search_text', config=SEARCH_CONFIG)
+
+
+def search_productos(queryset: QuerySet, term: str) -> QuerySet:
+    """Filtra por prefijo de cada término y anota ``search_priority``/``search_rank``.
+
+    Sin tokens alfanuméricos devuelve el queryset intacto (igual que ``SearchFilter``).
+    """
+    tokens = normalize_search_terms(term)
+    if not tokens:
+        return queryset
+    query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=SEARCH_CONFIG)
+    raw = str(term).strip()
+    return (
+        queryset.alias(search_document=search_vector())
+        .filter(search_document=query)
+        .annotate(
+            search_rank=SearchRank(search_vector(), query),
+            search_priority=Case(
+                When(codigo__iexact=raw, then=3),
+                When(codigo__istartswith=raw, then=2),
+                When(nombre__istartswith=raw, then=1),
+                default=0,
+                output_field=IntegerField(),
+            ),
+        )
+    )
+
+
+def search_productos_top(term: str, *, limit: int = DEFAULT_SEARCH_LIMIT, queryset: QuerySet | None = None) -> QuerySet:
+    """Mejores ``limit`` coincidencias activas (tope ``MAX_SEARCH_LIMIT``) para el type-ahead."""
+    if queryset is None:
+        queryset = Producto.objects.filter(is_active=True).select_related('categoria', 'proveedor')
+    if not normalize_search_terms(term):
+        return queryset.none()
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    return search_productos(queryset, term).order_by(*SEARCH_ORDERING)[:limit]
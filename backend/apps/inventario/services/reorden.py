@@ -0,0 +1,225 @@
+"""Punto de reorden y sugerencias de compra a partir de la velocidad de salida.
+
+``VelocidadVentaProducto`` guarda, por producto, las unidades despachadas en
+ventanas móviles de 7/30/90 días, calculadas con una sola consulta agrupada
+sobre ``MovimientoInventario``. Cada ``DetalleVenta`` que afecta inventario ya
+genera su ``SALIDA`` al cobrarse (y su ``DEVOLUCION`` al anularse), igual que
+los repuestos de taller, así que el libro de movimientos cubre ventas y taller
+sin contar dos veces. El refresco es incremental: sólo se recalculan los
+productos con salidas nuevas y los que aún tienen ventas dentro de la ventana.
+
+Punto de reorden = ``stock_minimo`` (colchón) + velocidad × días de entrega.
+Cantidad sugerida = punto de reorden + velocidad × días de cobertura - stock.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import ROUND_CEILING, Decimal
+from typing import Any
+
+from decouple import config
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Q, QuerySet, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.inventario.models import MovimientoInventario, Producto, VelocidadVentaProducto
+
+TIPOS_DEMANDA = ('SALIDA', 'DEVOLUCION')
+VENTANAS = (7, 30, 90)
+
+_ZERO = Decimal('0')
+_CANTIDAD = DecimalField(max_digits=14, decimal_places=4)
+
+
+def dias_entrega_default() -> int:
+    return config('INVENTARIO_REORDEN_DIAS_ENTREGA', default=7, cast=int)
+
+
+def dias_cobertura_default() -> int:
+    return config('INVENTARIO_REORDEN_DIAS_COBERTURA', default=30, cast=int)
+
+
+def _velocidad(vendido_30d: Decimal, vendido_90d: Decimal) -> Decimal:
+    # 30 días sigue la tendencia; para productos lentos se usa el promedio de 90.
+    if vendido_30d > 0:
+        velocidad = vendido_30d / 30
+    else:
+        velocidad = max(vendido_90d, _ZERO) / 90
+    return velocidad.quantize(Decimal('0.0001'))
+
+
+def _calcular(ahora, producto_ids: set[int] | None) -> dict[int, dict[str, Any]]:
+    """Ventanas por producto en una consulta agrupada (``None`` = todos los que tuvieron salidas)."""
+    queryset = MovimientoInventario.objects.filter(
+        tipo__in=TIPOS_DEMANDA,
+        created_at__gt=ahora - timedelta(days=max(VENTANAS)),
+        created_at__lte=ahora,
+    )
+    if producto_ids is not None:
+        queryset = queryset.filter(producto_id__in=list(producto_ids))
+    ventanas = {
+        f'vendido_{dias}d': Coalesce(
+            Sum(-F('cantidad'), filter=Q(created_at__gt=ahora - timedelta(days=dias))),
+            Value(_ZERO),
+            output_field=_CANTIDAD,
+        )
+        for dias in VENTANAS
+    }
+    filas = (
+        queryset.order_by()
+        .values('producto_id')
+        .annotate(**ventanas, ultima_salida=Max('created_at', filter=Q(tipo='SALIDA')))
+    )
+    return {fila.pop('producto_id'): fila for fila in filas}
+
+
+def refrescar_velocidades(*, ahora=None, completo: bool = False) -> int:
+    """Recalcula las velocidades; devuelve cuántos productos se escribieron.
+
+    Sin ``completo`` parte del último cálculo: productos con salidas/devoluciones
+    posteriores más los que todavía tienen unidades dentro de alguna ventana.
+    """
+    ahora = ahora or timezone.now()
+    ultimo = None if completo else VelocidadVentaProducto.objects.aggregate(ultimo=Max('calculado_at'))['ultimo']
+
+    if ultimo is None:
+        producto_ids = None
+    else:
+        producto_ids = set(
+            MovimientoInventario.objects.filter(tipo__in=TIPOS_DEMANDA, created_at__gt=ultimo)
+            .values_list('producto_id', flat=True)
+            .distinct()
+        )
+        producto_ids.update(
+            VelocidadVentaProducto.objects.filter(
+                ~Q(vendido_90d=0) | ~Q(vendido_30d=0) | ~Q(vendido_7d=0)
+            ).values_list('producto_id', flat=True)
+        )
+    calculado = _calcular(ahora, producto_ids)
+
+    vacio = {f'vendido_{dias}d': _ZERO for dias in VENTANAS}
+    filas = []
+    for producto_id in sorted(calculado if producto_ids is None else producto_ids):
+        datos = calculado.get(producto_id, vacio)
+        filas.append(
+            VelocidadVentaProducto(
+                producto_id=producto_id,
+                vendido_7d=datos['vendido_7d'],
+                vendido_30d=datos['vendido_30d'],
+                vendido_90d=datos['vendido_90d'],
+                velocidad_diaria=_velocidad(datos['vendido_30d'], datos['vendido_90d']),
+                ultima_salida=datos.get('ultima_salida'),
+                calculado_at=ahora,
+            )
+        )
+
+    with transaction.atomic():
+        if producto_ids is None:
+            VelocidadVentaProducto.objects.exclude(producto_id__in=list(calculado)).delete()
+        else:
+            # Conserva la última salida conocida de los que salieron de la ventana.
+            previas = dict(
+                VelocidadVentaProducto.objects.filter(producto_id__in=list(producto_ids))
+                .values_list('producto_id', 'ultima_salida')
+            )
+            for fila in filas:
+                fila.ultima_salida = fila.ultima_salida or previas.get(fila.producto_id)
+        VelocidadVentaProducto.objects.bulk_create(
+            filas,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['producto'],
+            update_fields=['vendido_7d', 'vendido_30d', 'vendido_90d', 'velocidad_diaria', 'ultima_salida', 'calculado_at'],
+        )
+    return len(filas)
+
+
+def con_punto_reorden(queryset: QuerySet, *, dias_entrega: int | None = None) -> QuerySet:
+    """Anota ``velocidad_diaria`` y ``punto_reorden`` (sin velocidad calculada, cuenta como 0)."""
+    dias_entrega = dias_entrega_default() if dias_entrega is None else dias_entrega
+    return queryset.annotate(
+        velocidad_diaria=Coalesce(F('velocidad_venta__velocidad_diaria'), Value(_ZERO), output_field=_CANTIDAD),
+    ).annotate(
+        punto_reorden=ExpressionWrapper(
+            F('stock_minimo') + F('velocidad_diaria') * Value(dias_entrega),
+            output_field=_CANTIDAD,
+        ),
+    )
+
+
+def _redondear(cantidad: Decimal, unidad_medida: str) -> Decimal:
+    paso = Decimal('1') if unidad_medida == 'N/A' else Decimal('0.01')
+    return cantidad.quantize(paso, rounding=ROUND_CEILING)
+
+
+def sugerencias_reorden(
+    *,
+    proveedor_id: int | None = None,
+    dias_entrega: int | None = None,
+    dias_cobertura: int | None = None,
+) -> list[dict[str, Any]]:
+    """Productos en o bajo su punto de reorden, agrupados por proveedor, en una sola consulta."""
+    dias_entrega = dias_entrega_default() if dias_entrega is None else dias_entrega
+    dias_cobertura = dias_cobertura_default() if dias_cobertura is None else dias_cobertura
+    queryset = Producto.objects.filter(is_active=True, es_servicio=False)
+    if proveedor_id is not None:
+        queryset = queryset.filter(proveedor_id=proveedor_id)
+    filas = (
+        con_punto_reorden(queryset, dias_entrega=dias_entrega)
+        .filter(stock__lte=F('punto_reorden'))
+        .order_by('proveedor__nombre', 'nombre')
+        .values(
+            'id',
+            'codigo',
+            'nombre',
+            'unidad_medida',
+            'stock',
+            'stock_minimo',
+            'precio_costo',
+            'proveedor_id',
+            'proveedor__nombre',
+            'velocidad_diaria',
+            'punto_reorden',
+            'velocidad_venta__vendido_30d',
+        )
+    )
+
+    grupos: dict[int | None, dict[str, Any]] = {}
+    for fila in filas:
+        velocidad = fila['velocidad_diaria']
+        cantidad = _redondear(fila['punto_reorden'] + velocidad * dias_cobertura - fila['stock'], fila['unidad_medida'])
+        if cantidad <= 0:
+            continue
+        grupo = grupos.setdefault(
+            fila['proveedor_id'],
+            {
+                'proveedor_id': fila['proveedor_id'],
+                'proveedor_nombre': fila['proveedor__nombre'] or 'Sin proveedor',
+                'total_productos': 0,
+                'valor_estimado': _ZERO,
+                'productos': [],
+            },
+        )
+        valor = cantidad * fila['precio_costo']
+        grupo['total_productos'] += 1
+        grupo['valor_estimado'] += valor
+        grupo['productos'].append(
+            {
+                'producto_id': fila['id'],
+                'codigo': fila['codigo'],
+                'nombre': fila['nombre'],
+                'stock': fila['stock'],
+                'stock_minimo': fila['stock_minimo'],
+                'vendido_30d': fila['velocidad_venta__vendido_30d'] or _ZERO,
+                'velocidad_diaria': velocidad,
+                'dias_inventario': (fila['stock'] / velocidad).quantize(Decimal('0.1')) if velocidad > 0 else None,
+                'punto_reorden': fila['punto_reorden'].quantize(Decimal('0.01')),
+                'cantidad_sugerida': cantidad,
+                'costo_unitario': fila['precio_costo'],
+                'valor_estimado': valor,
+            }
+        )
+    # "Sin proveedor" al final.
+    return sorted(grupos.values(), key=lambda grupo: (grupo['proveedor_id'] is None, grupo['proveedor_nombre']))
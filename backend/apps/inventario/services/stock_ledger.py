@@ -0,0 +1,242 @@
+"""Registro masivo de movimientos de inventario.
+
+Reemplaza el patrón "un ``MovimientoInventario.objects.create`` por línea"
+(que dispara el signal ``actualizar_stock_producto`` y un ``Producto.save()``
+con SELECT previo) por dos consultas fijas por lote: un único
+``UPDATE ... SET stock = stock + delta ... RETURNING stock`` y el ``bulk_create``
+de movimientos (más el ajuste aditivo del resumen por categoría cuando cambia).
+El delta se aplica en la base de datos, así que no hay lectura-modificación-
+escritura en Python ni ``SELECT ... FOR UPDATE`` previo. Cada movimiento guarda
+además el costo promedio ponderado resultante (una consulta más por lote, con
+las filas ya bloqueadas), del que el Kardex lee la valorización.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Iterable
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.inventario.models import MovimientoInventario, Producto
+from apps.inventario.services.barcode_cache import bump_stock_version
+from apps.inventario.services.inventory_stats import aplicar_contribuciones, contribucion_producto
+
+ObservacionesFn = Callable[[Decimal, Decimal], str]
+
+# Tipos cuyo ``costo_unitario`` es un costo de adquisición; en SALIDA y
+# DEVOLUCION (ventas, anulaciones, notas crédito) guarda el precio de venta.
+COSTED_TYPES = frozenset({'ENTRADA', 'AJUSTE'})
+_COSTO_PROMEDIO_EXP = Decimal('0.0001')
+
+
+class StockInsuficienteError(Exception):
+    """El ajuste dejaría stock negativo en productos que no lo permiten."""
+
+    def __init__(self, producto_ids: list[int]):
+        self.producto_ids = producto_ids
+        super().__init__(f'Stock insuficiente para los productos: {producto_ids}')
+
+
+@dataclass(frozen=True)
+class StockPosting:
+    """Movimiento a registrar; ``cantidad`` es el delta con signo sobre el stock."""
+
+    producto_id: int
+    tipo: str
+    cantidad: Decimal
+    costo_unitario: Decimal
+    referencia: str = ''
+    # Texto fijo o función (stock_anterior, stock_nuevo) -> texto.
+    observaciones: str | ObservacionesFn = ''
+
+
+@dataclass(frozen=True)
+class StockPostingResult:
+    producto_id: int
+    stock_anterior: Decimal
+    stock_nuevo: Decimal
+    movimiento: MovimientoInventario
+
+
+def _apply_stock_deltas(deltas: dict[int, Decimal], *, permitir_negativo: bool) -> dict[int, tuple]:
+    """Suma los deltas en una sola sentencia; devuelve por producto ``(stock, is_active, categoria_id, stock_minimo, precio_costo)``.
+
+    Las filas se bloquean en orden de id dentro de la misma sentencia para que
+    dos lotes concurrentes con productos cruzados no se bloqueen mutuamente.
+    """
+    table = connection.ops.quote_name(Producto._meta.db_table)
+    producto_ids = sorted(deltas)
+    values_sql = ', '.join(['(%s, %s::numeric)'] * len(producto_ids))
+    guard_sql = '' if permitir_negativo else ' AND p.stock + b.delta >= 0'
+    params: list = []
+    for producto_id in producto_ids:
+        params.extend([producto_id, deltas[producto_id]])
+    params.append(timezone.now())
+    sql = f"""
+        WITH v(id, delta) AS (VALUES {values_sql}),
+        b AS (
+            SELECT p.id, v.delta FROM {table} p JOIN v ON v.id = p.id
+            ORDER BY p.id FOR UPDATE OF p
+        )
+        UPDATE {table} AS p
+        SET stock = p.stock + b.delta, updated_at = %s
+        FROM b
+        WHERE p.id = b.id{guard_sql}
+        RETURNING p.id, p.stock, p.is_active, p.categoria_id, p.stock_minimo, p.precio_costo
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def siguiente_costo_promedio(
+    costo_previo: Decimal,
+    *,
+    tipo: str,
+    cantidad: Decimal,
+    stock_anterior: Decimal,
+    costo_unitario: Decimal | None,
+) -> Decimal:
+    """Costo promedio ponderado tras el movimiento; sólo las entradas con costo lo cambian."""
+    costo = Decimal(costo_previo or 0)
+    if tipo in COSTED_TYPES and cantidad > 0 and costo_unitario:
+        previo = max(Decimal(stock_anterior or 0), Decimal('0'))
+        costo = (previo * costo + cantidad * Decimal(costo_unitario)) / (previo + cantidad)
+    return costo.quantize(_COSTO_PROMEDIO_EXP)
+
+
+def costos_promedio_vigentes(producto_ids: Iterable[int]) -> dict[int, Decimal]:
+    """Último costo promedio registrado por producto; sin movimientos parte de ``precio_costo``.
+
+    Se llama con las filas de producto ya bloqueadas, así que el último
+    movimiento no cambia hasta el commit.
+    """
+    producto_ids = set(producto_ids)
+    costos = dict(
+        MovimientoInventario.objects.filter(producto_id__in=producto_ids, costo_promedio__isnull=False)
+        .order_by('producto_id', '-created_at', '-id')
+        .distinct('producto_id')
+        .values_list('producto_id', 'costo_promedio')
+    )
+    faltantes = producto_ids - set(costos)
+    if faltantes:
+        costos.update(Producto.objects.filter(pk__in=faltantes).values_list('pk', 'precio_costo'))
+    return costos
+
+
+def aplicar_deltas_stock(deltas: dict[int, Decimal], *, permitir_negativo: bool = True) -> dict[int, Decimal]:
+    """Suma los deltas al stock en la base de datos y devuelve el stock resultante por producto.
+
+    Mantiene el resumen por categoría y la caché de códigos; no registra
+    movimientos (eso lo hace ``post_stock_movements``).
+    """
+    deltas = {producto_id: Decimal(delta) for producto_id, delta in deltas.items()}
+    if not deltas:
+        return {}
+    with transaction.atomic():
+        filas = _apply_stock_deltas(deltas, permitir_negativo=permitir_negativo)
+        missing = sorted(set(deltas) - set(filas))
+        if missing:
+            existentes = set(Producto.objects.filter(id__in=missing).values_list('id', flat=True))
+            if existentes:
+                raise StockInsuficienteError(sorted(existentes))
+            raise Producto.DoesNotExist(f'Productos inexistentes: {missing}')
+
+        aplicar_contribuciones(
+            (
+                contribucion_producto(
+                    is_active=is_active,
+                    categoria_id=categoria_id,
+                    stock=stock - deltas[producto_id],
+                    stock_minimo=stock_minimo,
+                    precio_costo=precio_costo,
+                ),
+                contribucion_producto(
+                    is_active=is_active,
+                    categoria_id=categoria_id,
+                    stock=stock,
+                    stock_minimo=stock_minimo,
+                    precio_costo=precio_costo,
+                ),
+            )
+            for producto_id, (stock, is_active, categoria_id, stock_minimo, precio_costo) in filas.items()
+        )
+        bump_stock_version(deltas)
+    return {producto_id: fila[0] for producto_id, fila in filas.items()}
+
+
+def post_stock_movements(
+    postings: Iterable[StockPosting],
+    *,
+    usuario,
+    permitir_negativo: bool = True,
+) -> list[StockPostingResult]:
+    """Registra los movimientos y ajusta el stock en bloque; devuelve antes/después por línea.
+
+    ``stock_anterior``/``stock_nuevo`` se derivan del valor devuelto por el
+    ``UPDATE``, no de una lectura previa. Varias líneas del mismo producto se
+    encadenan en orden, igual que el flujo fila a fila. Con
+    ``permitir_negativo=False`` el lote completo se rechaza con
+    ``StockInsuficienteError`` si algún producto quedaría en negativo.
+    """
+    postings = list(postings)
+    if not postings:
+        return []
+
+    deltas: dict[int, Decimal] = {}
+    for posting in postings:
+        deltas[posting.producto_id] = deltas.get(posting.producto_id, Decimal('0')) + Decimal(posting.cantidad)
+
+    with transaction.atomic():
+        stock_final = aplicar_deltas_stock(deltas, permitir_negativo=permitir_negativo)
+        stock_actual = {producto_id: stock_final[producto_id] - delta for producto_id, delta in deltas.items()}
+        costo_actual = costos_promedio_vigentes(deltas)
+        movimientos: list[MovimientoInventario] = []
+        pares: list[tuple[Decimal, Decimal]] = []
+        for posting in postings:
+            cantidad = Decimal(posting.cantidad)
+            stock_anterior = stock_actual[posting.producto_id]
+            stock_nuevo = stock_anterior + cantidad
+            stock_actual[posting.producto_id] = stock_nuevo
+            costo_promedio = siguiente_costo_promedio(
+                costo_actual[posting.producto_id],
+                tipo=posting.tipo,
+                cantidad=cantidad,
+                stock_anterior=stock_anterior,
+                costo_unitario=posting.costo_unitario,
+            )
+            costo_actual[posting.producto_id] = costo_promedio
+            observaciones = posting.observaciones
+            if callable(observaciones):
+                observaciones = observaciones(stock_anterior, stock_nuevo)
+            movimientos.append(
+                MovimientoInventario(
+                    producto_id=posting.producto_id,
+                    tipo=posting.tipo,
+                    cantidad=cantidad,
+                    stock_anterior=stock_anterior,
+                    stock_nuevo=stock_nuevo,
+                    costo_unitario=posting.costo_unitario,
+                    costo_promedio=costo_promedio,
+                    usuario=usuario,
+                    referencia=posting.referencia,
+                    observaciones=observaciones,
+                )
+            )
+            pares.append((stock_anterior, stock_nuevo))
+
+        # bulk_create no emite post_save: el stock ya quedó ajustado arriba.
+        MovimientoInventario.objects.bulk_create(movimientos)
+
+    return [
+        StockPostingResult(
+            producto_id=posting.producto_id,
+            stock_anterior=stock_anterior,
+            stock_nuevo=stock_nuevo,
+            movimiento=movimiento,
+        )
+        for posting, movimiento, (stock_anterior, stock_nuevo) in zip(postings, movimientos, pares)
+    ]
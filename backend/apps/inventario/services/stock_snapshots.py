@@ -0,0 +1,158 @@
+"""Stock y valoración de inventario a una fecha.
+
+Parte de la foto más reciente de ``SnapshotStockProducto`` (fecha <= la pedida)
+y suma los movimientos entre el cierre de esa foto y el cierre del día pedido.
+Los productos sin foto (o cuando aún no hay ninguna) se reconstruyen hacia atrás
+desde el stock actual restando los movimientos posteriores. En ambos casos son
+unas pocas consultas agrupadas, sin reproducir el historial completo.
+El costo usado es el de la foto (o el ``precio_costo`` actual si no hay foto).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from apps.inventario.models import Categoria, MovimientoInventario, Producto, SnapshotStockProducto
+
+_ZERO = Decimal('0')
+
+
+@dataclass(frozen=True)
+class StockEnFecha:
+    producto_id: int
+    categoria_id: int
+    codigo: str
+    nombre: str
+    stock: Decimal
+    costo_unitario: Decimal
+
+    @property
+    def valor(self) -> Decimal:
+        return self.stock * self.costo_unitario
+
+
+def fin_del_dia(fecha: date) -> datetime:
+    return timezone.make_aware(datetime.combine(fecha, time.max), timezone.get_current_timezone())
+
+
+def _movimientos_por_producto(producto_ids: Iterable[int] | None, **rango) -> dict[int, Decimal]:
+    queryset = MovimientoInventario.objects.filter(**rango)
+    if producto_ids is not None:
+        queryset = queryset.filter(producto_id__in=list(producto_ids))
+    return {
+        row['producto_id']: row['delta']
+        for row in queryset.order_by().values('producto_id').annotate(delta=Sum('cantidad'))
+    }
+
+
+def ultima_fecha_snapshot(fecha: date) -> date | None:
+    return SnapshotStockProducto.objects.filter(fecha__lte=fecha).aggregate(ultima=Max('fecha'))['ultima']
+
+
+def stock_en_fecha(
+    fecha: date,
+    *,
+    producto_ids: Iterable[int] | None = None,
+    categoria_id: int | None = None,
+) -> tuple[list[StockEnFecha], date | None]:
+    """Stock y costo por producto al cierre de ``fecha``; devuelve también la foto base usada."""
+    cierre = fin_del_dia(fecha)
+    productos = Producto.objects.filter(created_at__lte=cierre)
+    if producto_ids is not None:
+        productos = productos.filter(id__in=list(producto_ids))
+    if categoria_id is not None:
+        productos = productos.filter(categoria_id=categoria_id)
+    productos = list(
+        productos.order_by('id').values_list('id', 'categoria_id', 'codigo', 'nombre', 'stock', 'precio_costo')
+    )
+    ids = [row[0] for row in productos]
+    filtro_ids = ids if (producto_ids is not None or categoria_id is not None) else None
+
+    base_fecha = ultima_fecha_snapshot(fecha)
+    base: dict[int, tuple[Decimal, Decimal]] = {}
+    desde_base: dict[int, Decimal] = {}
+    if base_fecha is not None:
+        snapshots = SnapshotStockProducto.objects.filter(fecha=base_fecha)
+        if filtro_ids is not None:
+            snapshots = snapshots.filter(producto_id__in=filtro_ids)
+        base = {
+            producto_id: (stock, costo)
+            for producto_id, stock, costo in snapshots.values_list('producto_id', 'stock', 'costo_unitario')
+        }
+        if base_fecha < fecha:
+            desde_base = _movimientos_por_producto(
+                filtro_ids,
+                created_at__gt=fin_del_dia(base_fecha),
+                created_at__lte=cierre,
+            )
+
+    sin_base = [producto_id for producto_id in ids if producto_id not in base]
+    posteriores = _movimientos_por_producto(sin_base, created_at__gt=cierre) if sin_base else {}
+
+    resultado = []
+    for producto_id, categoria, codigo, nombre, stock_actual, precio_costo in productos:
+        if producto_id in base:
+            stock_base, costo = base[producto_id]
+            stock = stock_base + desde_base.get(producto_id, _ZERO)
+        else:
+            stock = stock_actual - posteriores.get(producto_id, _ZERO)
+            costo = precio_costo
+        resultado.append(
+            StockEnFecha(
+                producto_id=producto_id,
+                categoria_id=categoria,
+                codigo=codigo,
+                nombre=nombre,
+                stock=stock,
+                costo_unitario=costo,
+            )
+        )
+    return resultado, base_fecha
+
+
+def resumen_por_categoria(filas: list[StockEnFecha]) -> list[dict]:
+    nombres = dict(Categoria.objects.filter(id__in={fila.categoria_id for fila in filas}).values_list('id', 'nombre'))
+    acumulado: dict[int, dict] = {}
+    for fila in filas:
+        item = acumulado.setdefault(
+            fila.categoria_id,
+            {
+                'categoria_id': fila.categoria_id,
+                'categoria_nombre': nombres.get(fila.categoria_id, ''),
+                'productos': 0,
+                'stock': _ZERO,
+                'valor_inventario': _ZERO,
+            },
+        )
+        item['productos'] += 1
+        item['stock'] += fila.stock
+        item['valor_inventario'] += fila.valor
+    return sorted(acumulado.values(), key=lambda item: item['categoria_nombre'])
+
+
+def generar_snapshot(fecha: date) -> int:
+    """Crea (o reemplaza) la foto de todos los productos al cierre de ``fecha``; devuelve las filas."""
+    with transaction.atomic():
+        # Se borra antes de calcular para no usar la foto vieja como base de sí misma.
+        SnapshotStockProducto.objects.filter(fecha=fecha).delete()
+        filas, _ = stock_en_fecha(fecha)
+        SnapshotStockProducto.objects.bulk_create(
+            [
+                SnapshotStockProducto(
+                    fecha=fecha,
+                    producto_id=fila.producto_id,
+                    stock=fila.stock,
+                    costo_unitario=fila.costo_unitario,
+                )
+                for fila in filas
+            ],
+            batch_size=1000,
+        )
+    return len(filas)
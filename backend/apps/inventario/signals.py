@@ -1,16 +1,82 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import MovimientoInventario
+from .models import Categoria, MovimientoInventario, Producto, Proveedor
+from .services.barcode_cache import bump_catalog_version, bump_stock_version
+from .services.inventory_stats import (
+    STATS_SOURCE_FIELDS,
+    aplicar_contribuciones,
+    contribucion_de,
+    contribucion_guardada,
+)
+from .services.producto_search import refresh_search_text
+from .services.stock_ledger import aplicar_deltas_stock, costos_promedio_vigentes, siguiente_costo_promedio
+
+STOCK_ONLY_FIELDS = frozenset({'stock', 'updated_at'})
 
 
 @receiver(post_save, sender=MovimientoInventario)
-def actualizar_stock_producto(sender, instance, created, **kwargs):
+def actualizar_stock_producto(sender, instance, created, raw=False, **kwargs):
     """
     Actualiza el stock del producto cuando hay un movimiento.
     Este signal se ejecuta DESPUÉS de guardar el movimiento.
     """
-    if created:
-        # Ya el stock_nuevo se calculó, solo actualizamos el producto
-        producto = instance.producto
-        producto.stock = instance.stock_nuevo
-        producto.save(update_fields=['stock', 'updated_at'], touch_ultima_compra=False)
+    if created and not raw:
+        # Suma la cantidad en la base de datos (``stock = stock + cantidad``):
+        # copiar ``stock_nuevo`` pisaría ventas concurrentes.
+        with transaction.atomic():
+            stock_nuevo = aplicar_deltas_stock({instance.producto_id: instance.cantidad})[instance.producto_id]
+            costo_previo = costos_promedio_vigentes([instance.producto_id])[instance.producto_id]
+            instance.costo_promedio = siguiente_costo_promedio(
+                costo_previo,
+                tipo=instance.tipo,
+                cantidad=instance.cantidad,
+                stock_anterior=stock_nuevo - instance.cantidad,
+                costo_unitario=instance.costo_unitario,
+            )
+            sender.objects.filter(pk=instance.pk).update(costo_promedio=instance.costo_promedio)
+
+
+@receiver(pre_save, sender=Producto)
+def precalcular_texto_busqueda(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Mantiene ``search_text`` al día para el índice de texto completo."""
+    if raw:
+        return
+    if update_fields is not None and not sender.SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    refresh_search_text(instance)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_cache_codigo_producto(sender, instance, **kwargs):
+    """Invalida la caché de ``buscar_por_codigo``; si solo cambió el stock basta con su sello."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and frozenset(update_fields) <= STOCK_ONLY_FIELDS:
+        bump_stock_version([instance.pk])
+        return
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Proveedor)
+@receiver(post_delete, sender=Proveedor)
+def invalidar_cache_codigo_catalogo(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_resumen_inventario(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Aplica al resumen por categoría la diferencia entre la fila previa y la guardada."""
+    previous = instance.__dict__.pop('_stats_previous', None)
+    if raw:
+        return
+    if update_fields is not None and not STATS_SOURCE_FIELDS.intersection(update_fields):
+        return
+    aplicar_contribuciones([(contribucion_de(previous), contribucion_guardada(instance, previous, update_fields))])
+
+
+@receiver(post_delete, sender=Producto)
+def descontar_resumen_inventario(sender, instance, **kwargs):
+    aplicar_contribuciones([(contribucion_de(instance), None)])
@@ -1,10 +1,44 @@
+import threading
+from importlib import import_module
+from io import BytesIO, StringIO
 from decimal import Decimal
 from datetime import timedelta
 
-from django.test import TestCase
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from rest_framework.test import APIClient
 
-from apps.inventario.models import Categoria, MovimientoInventario, Producto, Proveedor
+from apps.core.models import Auditoria, VersionConfiguracion
+from apps.core.services import configuracion_cache
+from apps.inventario.models import (
+    Categoria,
+    MovimientoInventario,
+    Producto,
+    Proveedor,
+    ResumenInventarioCategoria,
+    SnapshotStockProducto,
+    VelocidadVentaProducto,
+)
+from apps.inventario.services import (
+    StockInsuficienteError,
+    StockPosting,
+    aplicar_conteo_fisico,
+    clear_barcode_cache,
+    generar_snapshot,
+    lineas_desde_items,
+    post_stock_movements,
+    reconstruir_estadisticas_inventario,
+    refrescar_velocidades,
+    stock_en_fecha,
+    sugerencias_reorden,
+)
+from apps.inventario.services.barcode_cache import CLAVE_CATALOGO
 from apps.usuarios.models import Usuario
 
 
@@ -46,6 +80,26 @@ class MovimientoInventarioSignalTests(TestCase):
         self.producto.refresh_from_db()
         self.assertEqual(self.producto.stock, Decimal('8'))
 
+    def test_movimiento_suma_cantidad_sin_pisar_venta_concurrente(self):
+        # Venta atómica registrada después de que el movimiento leyó stock 10.
+        post_stock_movements(
+            [StockPosting(producto_id=self.producto.id, tipo='SALIDA', cantidad=Decimal('-3'), costo_unitario=Decimal('100'))],
+            usuario=self.usuario,
+        )
+        MovimientoInventario.objects.create(
+            producto=self.producto,
+            tipo='SALIDA',
+            cantidad=Decimal('-2'),
+            stock_anterior=Decimal('10'),
+            stock_nuevo=Decimal('8'),
+            costo_unitario=Decimal('100'),
+            usuario=self.usuario,
+            referencia='TEST-INV-002',
+        )
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('5'))
+
 
 class ProductoUltimaCompraTests(TestCase):
     def setUp(self):
@@ -156,3 +210,986 @@ class ProductoUltimaCompraTests(TestCase):
         producto.refresh_from_db()
         self.assertEqual(producto.stock, Decimal('12'))
         self.assertEqual(producto.ultima_compra, ultima_compra_inicial)
+
+
+class PostStockMovementsTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='ledger_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.categoria = Categoria.objects.create(nombre='Ledger test')
+        self.productos = [
+            Producto.objects.create(
+                codigo=f'LED-{index:03d}',
+                nombre=f'Producto ledger {index}',
+                categoria=self.categoria,
+                precio_costo=Decimal('100'),
+                precio_venta=Decimal('150'),
+                precio_venta_minimo=Decimal('120'),
+                stock=Decimal('10'),
+                stock_minimo=Decimal('1'),
+                iva_porcentaje=Decimal('19'),
+            )
+            for index in range(5)
+        ]
+
+    def test_lote_usa_consultas_fijas_y_reporta_stock_antes_despues(self):
+        postings = [
+            StockPosting(
+                producto_id=producto.id,
+                tipo='SALIDA',
+                cantidad=Decimal('-3'),
+                costo_unitario=Decimal('100'),
+                referencia='LOTE-1',
+            )
+            for producto in self.productos
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                resultados = post_stock_movements(postings, usuario=self.usuario)
+
+        # UPDATE ... RETURNING e INSERT masivo (más savepoint); el resumen se suma al confirmar.
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 2)
+        self.assertIn('RETURNING', statements[0])
+        self.assertFalse([sql for sql in statements if 'ON CONFLICT' in sql])
+        self.assertEqual(ResumenInventarioCategoria.objects.get(categoria=self.categoria).agotados, 0)
+        self.assertEqual([(r.stock_anterior, r.stock_nuevo) for r in resultados], [(Decimal('10'), Decimal('7'))] * 5)
+        self.assertEqual(
+            set(Producto.objects.filter(id__in=[p.id for p in self.productos]).values_list('stock', flat=True)),
+            {Decimal('7')},
+        )
+        self.assertEqual(MovimientoInventario.objects.filter(referencia='LOTE-1').count(), 5)
+
+    def test_producto_repetido_encadena_stock_y_observaciones_dinamicas(self):
+        producto = self.productos[0]
+        postings = [
+            StockPosting(producto_id=producto.id, tipo='SALIDA', cantidad=Decimal('-6'), costo_unitario=Decimal('100')),
+            StockPosting(
+                producto_id=producto.id,
+                tipo='SALIDA',
+                cantidad=Decimal('-6'),
+                costo_unitario=Decimal('100'),
+                observaciones=lambda anterior, nuevo: f'{anterior} -> {nuevo}',
+            ),
+            StockPosting(producto_id=producto.id, tipo='DEVOLUCION', cantidad=Decimal('1'), costo_unitario=Decimal('100')),
+        ]
+
+        resultados = post_stock_movements(postings, usuario=self.usuario)
+
+        self.assertEqual(
+            [(r.stock_anterior, r.stock_nuevo) for r in resultados],
+            [(Decimal('10'), Decimal('4')), (Decimal('4'), Decimal('-2')), (Decimal('-2'), Decimal('-1'))],
+        )
+        self.assertEqual(resultados[1].movimiento.observaciones, '4.00 -> -2.00')
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, Decimal('-1'))
+        self.assertEqual(
+            list(MovimientoInventario.objects.filter(producto=producto).order_by('id').values_list('stock_nuevo', flat=True)),
+            [Decimal('4'), Decimal('-2'), Decimal('-1')],
+        )
+
+    def test_sin_permitir_negativo_rechaza_el_lote_completo(self):
+        postings = [
+            StockPosting(producto_id=self.productos[0].id, tipo='SALIDA', cantidad=Decimal('-2'), costo_unitario=Decimal('100')),
+            StockPosting(producto_id=self.productos[1].id, tipo='SALIDA', cantidad=Decimal('-11'), costo_unitario=Decimal('100')),
+        ]
+
+        with self.assertRaises(StockInsuficienteError) as ctx:
+            post_stock_movements(postings, usuario=self.usuario, permitir_negativo=False)
+
+        self.assertEqual(ctx.exception.producto_ids, [self.productos[1].id])
+        self.assertEqual(
+            set(Producto.objects.filter(id__in=[p.id for p in self.productos[:2]]).values_list('stock', flat=True)),
+            {Decimal('10')},
+        )
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+
+
+class BuscarPorCodigoCacheTests(TestCase):
+    def setUp(self):
+        clear_barcode_cache()
+        self.usuario = Usuario.objects.create_user(
+            username='scanner_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.categoria = Categoria.objects.create(nombre='Scanner test')
+        self.producto = Producto.objects.create(
+            codigo='SCAN-001',
+            nombre='Producto escaneado',
+            categoria=self.categoria,
+            precio_costo=Decimal('100'),
+            precio_venta=Decimal('150'),
+            precio_venta_minimo=Decimal('120'),
+            stock=Decimal('10'),
+            stock_minimo=Decimal('8'),
+            iva_porcentaje=Decimal('19'),
+        )
+        self.url = '/api/productos/buscar_por_codigo/'
+
+    def _buscar(self):
+        response = self.client.get(self.url, {'codigo': 'SCAN-001'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _queries_producto(self, ctx):
+        return [q['sql'] for q in ctx.captured_queries if '"productos"' in q['sql']]
+
+    def test_escaneo_repetido_no_consulta_productos(self):
+        self._buscar()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._buscar()
+
+        self.assertEqual(self._queries_producto(ctx), [])
+        self.assertEqual(data['codigo'], 'SCAN-001')
+        self.assertEqual(data['stock'], '10.00')
+
+    def test_movimiento_superpone_stock_fresco_sin_reserializar(self):
+        self._buscar()
+        post_stock_movements(
+            [StockPosting(producto_id=self.producto.id, tipo='SALIDA', cantidad=Decimal('-3'), costo_unitario=Decimal('100'))],
+            usuario=self.usuario,
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._buscar()
+
+        self.assertEqual(len(self._queries_producto(ctx)), 1)
+        self.assertEqual(data['stock'], '7.00')
+        self.assertTrue(data['stock_bajo'])
+        self.assertEqual(data['valor_inventario'], '700.00')
+
+    def test_cambios_de_catalogo_invalidan_el_payload(self):
+        self._buscar()
+        self.categoria.nombre = 'Scanner renombrada'
+        self.categoria.save()
+        self.assertEqual(self._buscar()['categoria_nombre'], 'Scanner renombrada')
+
+        self.producto.is_active = False
+        self.producto.save()
+        self.assertFalse(self._buscar()['encontrado'])
+
+    def test_cambio_de_catalogo_en_otro_proceso_se_detecta_por_version(self):
+        self.assertEqual(self._buscar()['precio_venta'], '150.00')
+        # Simula otro worker: cambia la fila y sube el sello sin pasar por las signals de este proceso.
+        Producto.objects.filter(pk=self.producto.pk).update(precio_venta=Decimal('175'))
+        VersionConfiguracion.objects.filter(clave=CLAVE_CATALOGO).update(version=999)
+
+        configuracion_cache._checked_at = float('-inf')
+        self.assertEqual(self._buscar()['precio_venta'], '175.00')
+
+
+
+class ProductoBusquedaTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='busqueda_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.categoria = Categoria.objects.create(nombre='Búsqueda test')
+        self.bujia_ngk = self._producto('NGK-C7', 'Bujía NGK C7HSA', descripcion='Encendido para motor 125')
+        self.bujia_champion = self._producto('CH-001', 'Bujia Champion', descripcion='Encendido')
+        self.filtro = self._producto('FIL-001', 'Filtro de aceite', descripcion='Compatible con bujía larga')
+
+    def _producto(self, codigo, nombre, descripcion=''):
+        return Producto.objects.create(
+            codigo=codigo,
+            nombre=nombre,
+            descripcion=descripcion,
+            categoria=self.categoria,
+            precio_costo=Decimal('100'),
+            precio_venta=Decimal('150'),
+            precio_venta_minimo=Decimal('120'),
+            stock=Decimal('10'),
+            stock_minimo=Decimal('1'),
+            iva_porcentaje=Decimal('19'),
+        )
+
+    def _buscar(self, q, **params):
+        response = self.client.get('/api/productos/buscar/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['codigo'] for item in response.data]
+
+    def test_busqueda_ignora_tildes_y_prioriza_prefijo_de_nombre(self):
+        resultados = self._buscar('bujia')
+
+        self.assertEqual(set(resultados[:2]), {'NGK-C7', 'CH-001'})
+        self.assertEqual(resultados[2:], ['FIL-001'])
+
+    def test_busqueda_por_prefijo_y_codigo_compacto(self):
+        self.assertEqual(self._buscar('buj ngk'), ['NGK-C7'])
+        self.assertEqual(self._buscar('ngkc7'), ['NGK-C7'])
+        self.assertEqual(self._buscar('fil-001'), ['FIL-001'])
+
+    def test_limite_acota_resultados_y_termino_vacio_no_consulta(self):
+        self.assertEqual(len(self._buscar('bujia', limit=1)), 1)
+        self.assertEqual(self._buscar('  -- '), [])
+
+    def test_actualizar_nombre_con_update_fields_reindexa(self):
+        self.filtro.nombre = 'Filtro de gasolina'
+        self.filtro.save(update_fields=['nombre', 'updated_at'])
+
+        self.filtro.refresh_from_db()
+        self.assertIn('gasolina', self.filtro.search_text)
+        self.assertEqual(self._buscar('gasol'), ['FIL-001'])
+
+    def test_busqueda_solo_por_prefijo_de_palabra(self):
+        # Sin trigramas: ni subcadenas internas ni coincidencias aproximadas.
+        self.assertEqual(self._buscar('ujia'), [])
+        self.assertEqual(self._buscar('bujai'), [])
+        self.assertEqual(set(self._buscar('encend')), {'NGK-C7', 'CH-001'})
+        self.assertEqual(self._buscar('c7h'), ['NGK-C7'])
+
+    def test_backfill_de_la_migracion_reconstruye_search_text(self):
+        migracion = import_module('apps.inventario.migrations.0009_producto_search_text')
+        Producto.objects.update(search_text='')
+        self.assertEqual(self._buscar('bujia'), [])
+
+        migracion.backfill_search_text(django_apps, None)
+
+        self.bujia_ngk.refresh_from_db()
+        self.assertEqual(self.bujia_ngk.search_text, 'ngk c7 ngkc7 bujia ngk c7hsa encendido para motor 125')
+        self.assertEqual(self._buscar('ngkc7'), ['NGK-C7'])
+
+    def test_listado_search_usa_busqueda_por_relevancia(self):
+        response = self.client.get('/api/productos/', {'search': 'fil'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['codigo'] for item in response.data['results']], ['FIL-001'])
+
+        response = self.client.get('/api/productos/', {'search': 'bujia', 'ordering': '-nombre'})
+        self.assertEqual(
+            [item['codigo'] for item in response.data['results']],
+            ['FIL-001', 'NGK-C7', 'CH-001'],
+        )
+
+
+
+class ResumenInventarioTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='resumen_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.motor = Categoria.objects.create(nombre='Motor')
+        self.frenos = Categoria.objects.create(nombre='Frenos')
+
+    def _producto(self, codigo, categoria, stock, stock_minimo='2', precio_costo='100'):
+        return Producto.objects.create(
+            codigo=codigo,
+            nombre=f'Producto {codigo}',
+            categoria=categoria,
+            precio_costo=Decimal(precio_costo),
+            precio_venta=Decimal('150'),
+            precio_venta_minimo=Decimal('120'),
+            stock=Decimal(stock),
+            stock_minimo=Decimal(stock_minimo),
+            iva_porcentaje=Decimal('19'),
+        )
+
+    def _snapshot(self):
+        return {
+            fila.categoria_id: (fila.total_productos, fila.stock_bajo, fila.agotados, fila.valor_inventario)
+            for fila in ResumenInventarioCategoria.objects.filter(total_productos__gt=0)
+        }
+
+    def test_mantenimiento_incremental_coincide_con_reconstruccion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            piston = self._producto('RES-1', self.motor, '10')
+            biela = self._producto('RES-2', self.motor, '1')
+            pastilla = self._producto('RES-3', self.frenos, '0', precio_costo='50')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post_stock_movements(
+                [
+                    StockPosting(producto_id=piston.id, tipo='SALIDA', cantidad=Decimal('-9'), costo_unitario=Decimal('100')),
+                    StockPosting(producto_id=pastilla.id, tipo='ENTRADA', cantidad=Decimal('4'), costo_unitario=Decimal('50')),
+                ],
+                usuario=self.usuario,
+            )
+            MovimientoInventario.objects.create(
+                producto=biela,
+                tipo='SALIDA',
+                cantidad=Decimal('-1'),
+                stock_anterior=Decimal('1'),
+                stock_nuevo=Decimal('0'),
+                costo_unitario=Decimal('100'),
+                usuario=self.usuario,
+            )
+            biela.refresh_from_db()
+            biela.categoria = self.frenos
+            biela.stock_minimo = Decimal('0')
+            biela.save()
+            pastilla.refresh_from_db()
+            pastilla.precio_costo = Decimal('60')
+            pastilla.save(update_fields=['precio_costo', 'updated_at'])
+            piston.refresh_from_db()
+            piston.soft_delete()
+
+        incremental = self._snapshot()
+        reconstruir_estadisticas_inventario()
+        self.assertEqual(incremental, self._snapshot())
+        self.assertEqual(
+            incremental,
+            {self.frenos.id: (2, 1, 1, Decimal('240.00'))},
+        )
+
+    def test_resumen_se_actualiza_al_confirmar_la_venta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            filtro = self._producto('RES-7', self.motor, '5')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post_stock_movements(
+                [StockPosting(producto_id=filtro.id, tipo='SALIDA', cantidad=Decimal('-5'), costo_unitario=Decimal('100'))],
+                usuario=self.usuario,
+            )
+            # Dentro de la transacción la fila de la categoría no se toca.
+            self.assertEqual(self._snapshot(), {self.motor.id: (1, 0, 0, Decimal('500.00'))})
+
+        self.assertEqual(self._snapshot(), {self.motor.id: (1, 1, 1, Decimal('0.00'))})
+
+    def test_valor_con_decimales_no_acumula_redondeo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            aceite = self._producto('RES-8', self.motor, '1.35', precio_costo='10.05')
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                post_stock_movements(
+                    [StockPosting(producto_id=aceite.id, tipo='SALIDA', cantidad=Decimal('-0.15'), costo_unitario=Decimal('10.05'))],
+                    usuario=self.usuario,
+                )
+
+        incremental = self._snapshot()
+        reconstruir_estadisticas_inventario()
+        self.assertEqual(incremental, self._snapshot())
+        # 10.05 * 0.90 = 9.045 -> 9.05, igual que ROUND() en la reconstrucción.
+        self.assertEqual(incremental, {self.motor.id: (1, 1, 0, Decimal('9.05'))})
+
+    def test_endpoint_lee_solo_el_resumen_y_desglosa_por_categoria(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._producto('RES-4', self.motor, '10')
+            self._producto('RES-5', self.motor, '0')
+            self._producto('RES-6', self.frenos, '1', precio_costo='20')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/productos/estadisticas/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "productos"' in q['sql']])
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['stock_bajo'], 2)
+        self.assertEqual(response.data['agotados'], 1)
+        self.assertEqual(response.data['valor_inventario'], Decimal('1020.00'))
+        self.assertEqual(
+            [(fila['categoria_nombre'], fila['total']) for fila in response.data['por_categoria']],
+            [('Frenos', 1), ('Motor', 2)],
+        )
+
+
+
+class CatalogoListadoConteoTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='catalogo_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.contador = 0
+
+    def _crear_categoria_y_proveedor(self, nombre, productos, inactivos=0):
+        categoria = Categoria.objects.create(nombre=f'Categoria {nombre}')
+        proveedor = Proveedor.objects.create(nombre=f'Proveedor {nombre}')
+        for activo, cantidad in ((True, productos), (False, inactivos)):
+            for _ in range(cantidad):
+                self.contador += 1
+                Producto.objects.create(
+                    codigo=f'CAT-{self.contador:03d}',
+                    nombre=f'Producto catalogo {self.contador}',
+                    categoria=categoria,
+                    proveedor=proveedor,
+                    precio_costo=Decimal('100'),
+                    precio_venta=Decimal('150'),
+                    precio_venta_minimo=Decimal('120'),
+                    stock=Decimal('1'),
+                    iva_porcentaje=Decimal('19'),
+                    is_active=activo,
+                )
+
+    def _listar(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_listados_usan_conteo_anotado_con_consultas_constantes(self):
+        self._crear_categoria_y_proveedor('A', productos=2, inactivos=1)
+        iniciales = {url: self._listar(url)[1] for url in ('/api/categorias/', '/api/proveedores/')}
+
+        for indice in range(4):
+            self._crear_categoria_y_proveedor(f'B{indice}', productos=indice)
+
+        for url, campo in (('/api/categorias/', 'Categoria A'), ('/api/proveedores/', 'Proveedor A')):
+            response, consultas = self._listar(url)
+            # COUNT de paginación + SELECT anotado, sin importar cuántas filas haya.
+            self.assertEqual(consultas, iniciales[url])
+            self.assertEqual(consultas, 2)
+            totales = {item['nombre']: item['total_productos'] for item in response.data['results']}
+            self.assertEqual(totales[campo], 2)
+            self.assertEqual(totales[campo.replace(' A', ' B3')], 3)
+
+
+
+class KardexTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='kardex_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        categoria = Categoria.objects.create(nombre='Kardex test')
+        self.producto = Producto.objects.create(
+            codigo='KAR-001',
+            nombre='Producto kardex',
+            categoria=categoria,
+            precio_costo=Decimal('100'),
+            precio_venta=Decimal('150'),
+            precio_venta_minimo=Decimal('120'),
+            stock=Decimal('10'),
+            stock_minimo=Decimal('1'),
+            iva_porcentaje=Decimal('19'),
+        )
+        for cantidad in ('-2', '5', '-1', '-3', '4'):
+            post_stock_movements(
+                [
+                    StockPosting(
+                        producto_id=self.producto.id,
+                        tipo='ENTRADA' if Decimal(cantidad) > 0 else 'SALIDA',
+                        cantidad=Decimal(cantidad),
+                        costo_unitario=Decimal('100'),
+                        referencia=f'KAR {cantidad}',
+                    )
+                ],
+                usuario=self.usuario,
+            )
+
+    def test_kardex_pagina_por_cursor_con_saldo_y_valor(self):
+        url = '/api/movimientos/kardex/'
+        response = self.client.get(url, {'producto_id': self.producto.id, 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+
+        lineas = list(response.data['results'])
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            lineas.extend(response.data['results'])
+
+        self.assertEqual([linea['saldo'] for linea in lineas], ['8.00', '13.00', '12.00', '9.00', '13.00'])
+        self.assertEqual(lineas[0]['valor_movimiento'], '-200.00')
+        self.assertEqual(lineas[-1]['saldo_valorizado'], '1300.00')
+        self.assertEqual(lineas[-1]['usuario_nombre'], 'kardex_user')
+
+    def test_kardex_valoriza_a_costo_promedio_y_no_al_precio_de_venta(self):
+        producto = Producto.objects.create(
+            codigo='KAR-002',
+            nombre='Producto kardex promedio',
+            categoria=self.producto.categoria,
+            precio_costo=Decimal('100'),
+            precio_venta=Decimal('150'),
+            precio_venta_minimo=Decimal('120'),
+            stock=Decimal('0'),
+            stock_minimo=Decimal('1'),
+            iva_porcentaje=Decimal('19'),
+        )
+        # Compra 10 a 100, venta de 4 (costo_unitario = precio de venta 150), compra 6 a 120.
+        for tipo, cantidad, costo in (('ENTRADA', '10', '100'), ('SALIDA', '-4', '150'), ('ENTRADA', '6', '120')):
+            post_stock_movements(
+                [
+                    StockPosting(
+                        producto_id=producto.id,
+                        tipo=tipo,
+                        cantidad=Decimal(cantidad),
+                        costo_unitario=Decimal(costo),
+                        referencia=f'KAR {tipo} {cantidad}',
+                    )
+                ],
+                usuario=self.usuario,
+            )
+
+        self.assertEqual(
+            list(producto.movimientos.order_by('created_at', 'id').values_list('costo_promedio', flat=True)),
+            [Decimal('100.0000'), Decimal('100.0000'), Decimal('110.0000')],
+        )
+
+        response = self.client.get('/api/movimientos/kardex/', {'producto_id': producto.id, 'page_size': 1})
+        lineas = list(response.data['results'])
+        consultas_por_pagina = []
+        while response.data['next']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(response.data['next'])
+            consultas_por_pagina.append(len(queries))
+            lineas.extend(response.data['results'])
+
+        # La valorización sale de cada fila: una página profunda no recorre el historial previo.
+        self.assertEqual(len(set(consultas_por_pagina)), 1)
+        self.assertEqual([linea['valor_movimiento'] for linea in lineas], ['1000.00', '-400.00', '720.00'])
+        self.assertEqual([linea['saldo_valorizado'] for linea in lineas], ['1000.00', '600.00', '1320.00'])
+        self.assertEqual(lineas[-1]['costo_promedio'], '110.00')
+
+        response = self.client.get('/api/movimientos/kardex/exportar/', {'producto_id': producto.id})
+        filas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(filas[2].split(',')[6:10], ['-400.00', '10.00', '6.00', '600.00'])
+
+    def test_kardex_filtra_rango_y_valida_parametros(self):
+        manana = (timezone.localdate() + timedelta(days=1)).isoformat()
+        response = self.client.get('/api/movimientos/kardex/', {'producto_id': self.producto.id, 'fecha_inicio': manana})
+        self.assertEqual(response.data['results'], [])
+
+        self.assertEqual(self.client.get('/api/movimientos/kardex/').status_code, 400)
+        response = self.client.get('/api/movimientos/kardex/', {'producto_id': self.producto.id, 'fecha_fin': '17/10/2026'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_exporta_csv_en_streaming_y_xlsx(self):
+        params = {'producto_id': self.producto.id}
+        response = self.client.get('/api/movimientos/kardex/exportar/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lineas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lineas), 6)
+        self.assertTrue(lineas[0].startswith('Fecha,Tipo,Referencia'))
+        self.assertIn('KAR -2', lineas[1])
+
+        response = self.client.get('/api/movimientos/kardex/exportar/', {**params, 'formato': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        filas = list(workbook['Kardex'].iter_rows(values_only=True))
+        self.assertEqual(len(filas), 6)
+        self.assertEqual(filas[-1][8], 13)
+
+    def test_listado_general_usa_cursor(self):
+        response = self.client.get('/api/movimientos/', {'page_size': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class StockSnapshotTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='snapshot_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.hoy = timezone.localdate()
+        self.categoria = Categoria.objects.create(nombre='Snapshot A')
+        otra = Categoria.objects.create(nombre='Snapshot B')
+        self.producto = self._crear('SNP-001', self.categoria, stock='10', costo='100')
+        self.otro = self._crear('SNP-002', otra, stock='4', costo='50')
+        Producto.objects.filter(pk__in=[self.producto.pk, self.otro.pk]).update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+        # Movimientos del producto hace 10, 5 y 1 días: +5, -3, -2 (stock actual 10).
+        for dias, cantidad in ((10, '5'), (5, '-3'), (1, '-2')):
+            self._mover(self.producto, cantidad, dias)
+
+    def _crear(self, codigo, categoria, *, stock, costo):
+        return Producto.objects.create(
+            codigo=codigo,
+            nombre=f'Producto {codigo}',
+            categoria=categoria,
+            precio_costo=Decimal(costo),
+            precio_venta=Decimal(costo) * 2,
+            precio_venta_minimo=Decimal(costo),
+            stock=Decimal(stock),
+            stock_minimo=Decimal('1'),
+            iva_porcentaje=Decimal('19'),
+        )
+
+    def _mover(self, producto, cantidad, dias):
+        resultado = post_stock_movements(
+            [
+                StockPosting(
+                    producto_id=producto.id,
+                    tipo='ENTRADA' if Decimal(cantidad) > 0 else 'SALIDA',
+                    cantidad=Decimal(cantidad),
+                    costo_unitario=producto.precio_costo,
+                )
+            ],
+            usuario=self.usuario,
+        )
+        MovimientoInventario.objects.filter(pk=resultado[0].movimiento.pk).update(
+            created_at=timezone.now() - timedelta(days=dias)
+        )
+
+    def _stock(self, fecha, producto):
+        filas, _ = stock_en_fecha(fecha, producto_ids=[producto.id])
+        return filas[0].stock
+
+    def test_reconstruye_hacia_atras_sin_snapshots(self):
+        self.assertEqual(self._stock(self.hoy, self.producto), Decimal('10'))
+        self.assertEqual(self._stock(self.hoy - timedelta(days=2), self.producto), Decimal('12'))
+        self.assertEqual(self._stock(self.hoy - timedelta(days=7), self.producto), Decimal('15'))
+        self.assertEqual(self._stock(self.hoy - timedelta(days=12), self.producto), Decimal('10'))
+
+    def test_snapshot_mas_movimientos_coincide_con_reconstruccion(self):
+        esperado = {dias: self._stock(self.hoy - timedelta(days=dias), self.producto) for dias in (0, 2, 4, 7)}
+        generar_snapshot(self.hoy - timedelta(days=7))
+        for dias, stock in esperado.items():
+            self.assertEqual(self._stock(self.hoy - timedelta(days=dias), self.producto), stock)
+        _, base_fecha = stock_en_fecha(self.hoy - timedelta(days=2))
+        self.assertEqual(base_fecha, self.hoy - timedelta(days=7))
+
+        # Si la foto difiere, manda la foto: sólo se suman los movimientos posteriores.
+        SnapshotStockProducto.objects.filter(producto=self.producto).update(stock=Decimal('100'))
+        self.assertEqual(self._stock(self.hoy - timedelta(days=2), self.producto), Decimal('97'))
+
+    def test_regenerar_snapshot_es_idempotente(self):
+        fecha = self.hoy - timedelta(days=4)
+        self.assertEqual(generar_snapshot(fecha), 2)
+        self.assertEqual(generar_snapshot(fecha), 2)
+        self.assertEqual(SnapshotStockProducto.objects.filter(fecha=fecha).count(), 2)
+        self.assertEqual(
+            SnapshotStockProducto.objects.get(fecha=fecha, producto=self.producto).stock,
+            Decimal('12'),
+        )
+
+    def test_comando_genera_rango_de_fechas(self):
+        desde = self.hoy - timedelta(days=3)
+        call_command(
+            'generar_snapshots_stock',
+            desde=desde.isoformat(),
+            hasta=(self.hoy - timedelta(days=1)).isoformat(),
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            sorted(set(SnapshotStockProducto.objects.values_list('fecha', flat=True))),
+            [desde, desde + timedelta(days=1), desde + timedelta(days=2)],
+        )
+
+    def test_endpoint_valoriza_por_categoria(self):
+        generar_snapshot(self.hoy - timedelta(days=7))
+        fecha = self.hoy - timedelta(days=2)
+        response = self.client.get('/api/productos/stock_historico/', {'fecha': fecha.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['snapshot_base'], self.hoy - timedelta(days=7))
+        por_categoria = {fila['categoria_id']: fila for fila in response.data['por_categoria']}
+        self.assertEqual(por_categoria[self.categoria.id]['stock'], Decimal('12'))
+        self.assertEqual(por_categoria[self.categoria.id]['valor_inventario'], Decimal('1200'))
+        self.assertEqual(response.data['valor_inventario'], Decimal('1400'))
+        self.assertNotIn('productos', response.data)
+
+        response = self.client.get(
+            '/api/productos/stock_historico/',
+            {'fecha': fecha.isoformat(), 'categoria_id': self.categoria.id},
+        )
+        self.assertEqual([fila['codigo'] for fila in response.data['productos']], ['SNP-001'])
+
+    def test_endpoint_requiere_fecha_valida(self):
+        response = self.client.get('/api/productos/stock_historico/', {'fecha': '31/12/2025'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConteoFisicoTests(TestCase):
+    url = '/api/productos/conteo_fisico/'
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='conteo_user',
+            password='pass1234',
+            tipo_usuario='ADMIN',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        categoria = Categoria.objects.create(nombre='Conteo test')
+        self.productos = {
+            codigo: Producto.objects.create(
+                codigo=codigo,
+                nombre=f'Producto {codigo}',
+                categoria=categoria,
+                precio_costo=Decimal('10'),
+                precio_venta=Decimal('20'),
+                precio_venta_minimo=Decimal('15'),
+                stock=Decimal(stock),
+                stock_minimo=Decimal('1'),
+                iva_porcentaje=Decimal('19'),
+            )
+            for codigo, stock in (('CNT-1', '10'), ('CNT-2', '5'), ('CNT-3', '7'))
+        }
+
+        Producto.objects.filter(codigo='CNT-2').update(unidad_medida='KG')
+
+    def _stock(self, codigo):
+        return Producto.objects.get(codigo=codigo).stock
+
+    def test_simulacion_reporta_sin_escribir(self):
+        response = self.client.post(
+            self.url,
+            {'dry_run': True, 'items': [{'codigo': 'CNT-1', 'cantidad': 8}, {'codigo': 'CNT-2', 'cantidad': 5}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['aplicado'])
+        self.assertEqual(response.data['resumen']['ajustados'], 1)
+        self.assertEqual(response.data['resumen']['faltante'], Decimal('2'))
+        self.assertEqual(response.data['resumen']['valor_diferencia'], Decimal('-20'))
+        self.assertEqual(self._stock('CNT-1'), Decimal('10'))
+        self.assertFalse(MovimientoInventario.objects.exists())
+        self.assertFalse(Auditoria.objects.exists())
+
+    def test_aplica_ajustes_con_una_auditoria(self):
+        response = self.client.post(
+            self.url,
+            [
+                {'codigo': 'CNT-1', 'cantidad': 8},
+                {'codigo': 'CNT-2', 'cantidad': '6,5'},
+                {'codigo': 'CNT-3', 'cantidad': 7},
+            ],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['aplicado'])
+        self.assertEqual(response.data['resumen']['sin_diferencia'], 1)
+        self.assertEqual(self._stock('CNT-1'), Decimal('8'))
+        self.assertEqual(self._stock('CNT-2'), Decimal('6.5'))
+        movimientos = MovimientoInventario.objects.filter(tipo='AJUSTE', referencia='Conteo físico')
+        self.assertEqual(
+            sorted(movimientos.values_list('cantidad', flat=True)),
+            [Decimal('-2'), Decimal('1.5')],
+        )
+        auditorias = list(Auditoria.objects.all())
+        self.assertEqual(len(auditorias), 1)
+        self.assertTrue(auditorias[0].notas.startswith('Conteo físico: 3 productos, 2 ajustados'))
+
+    def test_con_errores_no_aplica_nada(self):
+        response = self.client.post(
+            self.url,
+            {'items': [{'codigo': 'CNT-1', 'cantidad': 8}, {'codigo': 'NO-EXISTE', 'cantidad': 1}, {'codigo': 'CNT-2'}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error['codigo'], error['error']) for error in response.data['errores']],
+            [('CNT-2', 'Cantidad inválida'), ('NO-EXISTE', 'Producto no encontrado o inactivo')],
+        )
+        self.assertEqual(self._stock('CNT-1'), Decimal('10'))
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_importa_csv_y_xlsx(self):
+        csv_file = SimpleUploadedFile('conteo.csv', 'Código;Cantidad\nCNT-1;4\nCNT-1;3\n'.encode('utf-8'))
+        response = self.client.post(self.url, {'archivo': csv_file}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._stock('CNT-1'), Decimal('7'))
+
+        workbook = Workbook()
+        workbook.active.append(['codigo', 'cantidad'])
+        workbook.active.append(['CNT-3', 2])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        xlsx_file = SimpleUploadedFile('conteo.xlsx', buffer.getvalue())
+        response = self.client.post(self.url, {'archivo': xlsx_file}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._stock('CNT-3'), Decimal('2'))
+
+    def test_sentencias_constantes_por_lineas(self):
+        def contar(items):
+            with CaptureQueriesContext(connection) as ctx:
+                aplicar_conteo_fisico(lineas_desde_items(items), usuario=self.usuario)
+            return len(ctx.captured_queries)
+
+        uno = contar([{'codigo': 'CNT-1', 'cantidad': 1}])
+        tres = contar([{'codigo': codigo, 'cantidad': 2} for codigo in self.productos])
+        self.assertEqual(uno, tres)
+
+
+class ReordenTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='reorden_user',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.categoria = Categoria.objects.create(nombre='Reorden test')
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor reorden')
+        self.rapido = self._crear('REO-1', stock='5', proveedor=self.proveedor)
+        self.lento = self._crear('REO-2', stock='50', proveedor=self.proveedor)
+        self.sin_ventas = self._crear('REO-3', stock='0', stock_minimo='1')
+        self._mover(self.rapido, '-10', dias=2)
+        self._mover(self.rapido, '-20', dias=20)
+        self._mover(self.rapido, '-9', dias=60)
+        self._mover(self.lento, '-3', dias=5)
+        Producto.objects.filter(pk=self.rapido.pk).update(stock=Decimal('5'))
+
+    def _crear(self, codigo, *, stock, stock_minimo='2', proveedor=None):
+        return Producto.objects.create(
+            codigo=codigo,
+            nombre=f'Producto {codigo}',
+            categoria=self.categoria,
+            proveedor=proveedor,
+            precio_costo=Decimal('10'),
+            precio_venta=Decimal('20'),
+            precio_venta_minimo=Decimal('15'),
+            stock=Decimal(stock),
+            stock_minimo=Decimal(stock_minimo),
+            iva_porcentaje=Decimal('19'),
+        )
+
+    def _mover(self, producto, cantidad, *, dias=0, tipo='SALIDA'):
+        resultado = post_stock_movements(
+            [StockPosting(producto_id=producto.id, tipo=tipo, cantidad=Decimal(cantidad), costo_unitario=Decimal('10'))],
+            usuario=self.usuario,
+        )
+        MovimientoInventario.objects.filter(pk=resultado[0].movimiento.pk).update(
+            created_at=timezone.now() - timedelta(days=dias)
+        )
+
+    def _ventanas(self, producto):
+        return VelocidadVentaProducto.objects.filter(producto=producto).values_list(
+            'vendido_7d', 'vendido_30d', 'vendido_90d', 'velocidad_diaria'
+        ).first()
+
+    def test_refresco_calcula_ventanas_moviles(self):
+        self.assertEqual(refrescar_velocidades(), 2)
+        self.assertEqual(
+            self._ventanas(self.rapido),
+            (Decimal('10'), Decimal('30'), Decimal('39'), Decimal('1')),
+        )
+        self.assertEqual(self._ventanas(self.lento)[3], Decimal('0.1'))
+        self.assertIsNone(self._ventanas(self.sin_ventas))
+
+    def test_refresco_incremental_coincide_con_completo(self):
+        refrescar_velocidades()
+        self._mover(self.lento, '-6')
+        self._mover(self.rapido, '4', tipo='DEVOLUCION')
+        self._mover(self.sin_ventas, '-2')
+        refrescar_velocidades()
+        incremental = {p.id: self._ventanas(p) for p in (self.rapido, self.lento, self.sin_ventas)}
+        refrescar_velocidades(completo=True)
+        completo = {p.id: self._ventanas(p) for p in (self.rapido, self.lento, self.sin_ventas)}
+        self.assertEqual(incremental, completo)
+        self.assertEqual(incremental[self.lento.id][1], Decimal('9'))
+        self.assertEqual(incremental[self.rapido.id][1], Decimal('26'))
+
+    def test_ventana_se_desliza_sin_movimientos_nuevos(self):
+        refrescar_velocidades()
+        refrescar_velocidades(ahora=timezone.now() + timedelta(days=100))
+        self.assertEqual(self._ventanas(self.rapido), (Decimal('0'), Decimal('0'), Decimal('0'), Decimal('0')))
+
+    def test_sugerencias_agrupadas_por_proveedor(self):
+        refrescar_velocidades()
+        with CaptureQueriesContext(connection) as ctx:
+            grupos = sugerencias_reorden(dias_entrega=7, dias_cobertura=30)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            [(grupo['proveedor_nombre'], [item['codigo'] for item in grupo['productos']]) for grupo in grupos],
+            [('Proveedor reorden', ['REO-1']), ('Sin proveedor', ['REO-3'])],
+        )
+        rapido = grupos[0]['productos'][0]
+        # Punto de reorden 2 + 1/día * 7; sugerido 9 + 30 - 5.
+        self.assertEqual(rapido['punto_reorden'], Decimal('9'))
+        self.assertEqual(rapido['cantidad_sugerida'], Decimal('34'))
+        self.assertEqual(grupos[0]['valor_estimado'], Decimal('340'))
+        self.assertEqual(grupos[1]['productos'][0]['cantidad_sugerida'], Decimal('1'))
+
+    def test_endpoint_y_filtro_stock_estado(self):
+        refrescar_velocidades()
+        response = self.client.get(
+            '/api/productos/sugerencias_reorden/',
+            {'proveedor_id': self.proveedor.id, 'dias_entrega': 7, 'dias_cobertura': 30},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_productos'], 1)
+        self.assertEqual(response.data['valor_estimado'], Decimal('340'))
+
+        response = self.client.get('/api/productos/', {'stock_estado': 'reorden'})
+        self.assertEqual(
+            sorted(item['codigo'] for item in response.data['results']),
+            ['REO-1', 'REO-3'],
+        )
+
+        response = self.client.get('/api/productos/sugerencias_reorden/', {'dias_entrega': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PostStockMovementsConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='ledger_concurrente',
+            password='pass1234',
+            tipo_usuario='VENDEDOR',
+        )
+        categoria = Categoria.objects.create(nombre='Ledger concurrente')
+        self.productos = [
+            Producto.objects.create(
+                codigo=f'CON-{index:03d}',
+                nombre=f'Producto concurrente {index}',
+                categoria=categoria,
+                precio_costo=Decimal('100'),
+                precio_venta=Decimal('150'),
+                precio_venta_minimo=Decimal('120'),
+                stock=Decimal('100'),
+                stock_minimo=Decimal('1'),
+                iva_porcentaje=Decimal('19'),
+            )
+            for index in range(2)
+        ]
+
+    def test_cajeros_concurrentes_no_pierden_actualizaciones(self):
+        hilos, ventas_por_hilo = 8, 5
+        barrera = threading.Barrier(hilos)
+        errores = []
+
+        def cajero(orden):
+            try:
+                barrera.wait()
+                for _ in range(ventas_por_hilo):
+                    # Líneas en orden cruzado entre hilos para ejercitar el bloqueo ordenado.
+                    productos = self.productos if orden % 2 else list(reversed(self.productos))
+                    post_stock_movements(
+                        [
+                            StockPosting(producto_id=p.id, tipo='SALIDA', cantidad=Decimal('-1'), costo_unitario=Decimal('100'))
+                            for p in productos
+                        ],
+                        usuario=self.usuario,
+                    )
+            except Exception as exc:  # pragma: no cover - se reporta en la aserción
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=cajero, args=(orden,)) for orden in range(hilos)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errores, [])
+        esperado = Decimal('100') - hilos * ventas_por_hilo
+        for producto in self.productos:
+            producto.refresh_from_db()
+            self.assertEqual(producto.stock, esperado)
+            stocks = sorted(
+                MovimientoInventario.objects.filter(producto=producto).values_list('stock_nuevo', flat=True)
+            )
+            # Cada movimiento registra un stock distinto: ninguna venta leyó un valor obsoleto.
+            self.assertEqual(stocks, [esperado + index for index in range(hilos * ventas_por_hilo)])
@@ -1,12 +1,15 @@
+from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from django.db import models
-from django.db.models import F, Sum
+from django.http import FileResponse, StreamingHttpResponse
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Count, Q
 
 from .models import Categoria, Proveedor, Producto, MovimientoInventario, ProductoFavorito
 from .serializers import (
@@ -17,7 +20,48 @@ from .serializers import (
     ProductoCreateUpdateSerializer,
     MovimientoInventarioSerializer,
     ProductoFavoritoSerializer,
+    KardexMovimientoSerializer,
 )
+from .services import (
+    DEFAULT_SEARCH_LIMIT,
+    KARDEX_ORDERING,
+    SEARCH_ORDERING,
+    ConteoFisicoError,
+    StockInsuficienteError,
+    StockPosting,
+    aplicar_conteo_fisico,
+    con_punto_reorden,
+    get_producto_payload_by_codigo,
+    kardex_queryset,
+    leer_archivo_conteo,
+    lineas_desde_items,
+    obtener_estadisticas_inventario,
+    post_stock_movements,
+    resumen_por_categoria,
+    search_productos,
+    search_productos_top,
+    stock_en_fecha,
+    stream_kardex_csv,
+    sugerencias_reorden,
+    write_kardex_xlsx,
+)
+
+
+class ProductoSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` con texto completo de Postgres (índice ``producto_search_gin``)
+    en lugar de ``ILIKE '%term%'`` sobre varias columnas. Va después de
+    ``OrderingFilter``: sin ``?ordering=`` explícito ordena por relevancia.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+        queryset = search_productos(queryset, term)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by(*SEARCH_ORDERING)
 
 
 class CategoriaViewSet(viewsets.ModelViewSet):
@@ -31,7 +75,10 @@ class CategoriaViewSet(viewsets.ModelViewSet):
     partial_update: Actualizar parcialmente
     destroy: Eliminar (soft delete)
     """
-    queryset = Categoria.objects.all()
+    # Conteo anotado: evita un COUNT por fila en el serializer.
+    queryset = Categoria.objects.annotate(
+        total_productos=Count('productos', filter=Q(productos__is_active=True))
+    )
     serializer_class = CategoriaSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -50,7 +97,9 @@ class CategoriaViewSet(viewsets.ModelViewSet):
 
 class ProveedorViewSet(viewsets.ModelViewSet):
     """ViewSet para gestionar proveedores"""
-    queryset = Proveedor.objects.all()
+    queryset = Proveedor.objects.annotate(
+        total_productos=Count('productos', filter=Q(productos__is_active=True))
+    )
     serializer_class = ProveedorSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -70,7 +119,7 @@ class ProveedorViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            proveedor = Proveedor.objects.get(nit=nit, is_active=True)
+            proveedor = self.get_queryset().get(nit=nit, is_active=True)
             serializer = self.get_serializer(proveedor)
             return Response(serializer.data)
         except Proveedor.DoesNotExist:
@@ -87,7 +136,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
     """
     queryset = Producto.objects.filter(is_active=True).select_related('categoria', 'proveedor')
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductoSearchFilter]
     filterset_fields = ['categoria', 'proveedor', 'es_servicio']
     search_fields = ['codigo', 'nombre', 'descripcion']
     ordering_fields = ['nombre', 'precio_venta', 'stock', 'created_at']
@@ -106,6 +155,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 )
             elif normalized == 'ok':
                 queryset = queryset.filter(stock__gt=models.F('stock_minimo'))
+            elif normalized == 'reorden':
+                queryset = con_punto_reorden(queryset).filter(stock__lte=models.F('punto_reorden'))
         return queryset
     
     def get_serializer_class(self):
@@ -122,6 +173,25 @@ class ProductoViewSet(viewsets.ModelViewSet):
         instance.soft_delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """
+        Type-ahead de la caja: mejores coincidencias (prefijo por término, sin tildes).
+        
+        GET /api/productos/buscar/?q=bujia ngk&limit=20
+        """
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        except (TypeError, ValueError):
+            limit = DEFAULT_SEARCH_LIMIT
+        productos = search_productos_top(
+            request.query_params.get('q', ''),
+            limit=limit,
+            queryset=self.get_queryset(),
+        )
+        serializer = ProductoListSerializer(productos, many=True)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def buscar_por_codigo(self, request):
         """
@@ -137,25 +207,21 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            producto = Producto.objects.select_related('categoria', 'proveedor').get(
-                codigo=codigo,
-                is_active=True
-            )
-            serializer = ProductoDetailSerializer(producto)
-            return Response(serializer.data)
-        except Producto.DoesNotExist:
-            # Se retorna 200 para evitar confusión de "ruta 404" cuando en realidad
-            # el endpoint existe y solo no hay coincidencia por código.
-            return Response(
-                {
-                    'encontrado': False,
-                    'codigo': codigo,
-                    'error': 'PRODUCTO_NO_ENCONTRADO',
-                    'detail': f'No existe un producto activo con el código "{codigo}".',
-                },
-                status=status.HTTP_200_OK,
-            )
+        # Caché LRU en proceso: los escaneos repetidos no consultan Postgres.
+        payload = get_producto_payload_by_codigo(codigo)
+        if payload is not None:
+            return Response(payload)
+        # Se retorna 200 para evitar confusión de "ruta 404" cuando en realidad
+        # el endpoint existe y solo no hay coincidencia por código.
+        return Response(
+            {
+                'encontrado': False,
+                'codigo': codigo,
+                'error': 'PRODUCTO_NO_ENCONTRADO',
+                'detail': f'No existe un producto activo con el código "{codigo}".',
+            },
+            status=status.HTTP_200_OK,
+        )
     
     @action(detail=False, methods=['get'])
     def stock_bajo(self, request):
@@ -173,22 +239,84 @@ class ProductoViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
-        """Retorna estadísticas generales del inventario."""
-        queryset = self.get_queryset()
-        total = queryset.count()
-        stock_bajo = queryset.filter(stock__lte=models.F('stock_minimo')).count()
-        agotados = queryset.filter(stock__lte=0).count()
-        valor_inventario = (
-            queryset.aggregate(total=Sum(F('precio_costo') * F('stock')))['total'] or 0
-        )
-        return Response(
-            {
-                'total': total,
-                'stock_bajo': stock_bajo,
-                'agotados': agotados,
-                'valor_inventario': valor_inventario,
+        """
+        Retorna estadísticas generales del inventario y su desglose por categoría.
+        Lee el resumen materializado (ver services.inventory_stats), sin barrer productos.
+        """
+        return Response(obtener_estadisticas_inventario())
+    
+    @action(detail=False, methods=['get'])
+    def sugerencias_reorden(self, request):
+        """
+        Sugerencias de compra por proveedor según velocidad de salida y punto de reorden.
+        
+        GET /api/productos/sugerencias_reorden/?proveedor_id=1&dias_entrega=7&dias_cobertura=30
+        """
+        try:
+            parametros = {
+                nombre: int(request.query_params[nombre])
+                for nombre in ('proveedor_id', 'dias_entrega', 'dias_cobertura')
+                if request.query_params.get(nombre)
             }
-        )
+        except ValueError:
+            return Response(
+                {'error': 'proveedor_id, dias_entrega y dias_cobertura deben ser numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if parametros.get('dias_entrega', 0) < 0 or parametros.get('dias_cobertura', 0) < 0:
+            return Response(
+                {'error': 'Los días no pueden ser negativos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        proveedores = sugerencias_reorden(**parametros)
+        return Response({
+            'total_productos': sum(grupo['total_productos'] for grupo in proveedores),
+            'valor_estimado': sum((grupo['valor_estimado'] for grupo in proveedores), Decimal('0')),
+            'proveedores': proveedores,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def stock_historico(self, request):
+        """
+        Stock y valoración al cierre de una fecha, por categoría y (filtrando) por producto.
+        Parte de la última foto de stock y suma los movimientos posteriores.
+        
+        GET /api/productos/stock_historico/?fecha=2025-12-31&categoria_id=1&producto_id=5
+        """
+        try:
+            fecha = datetime.strptime(request.query_params.get('fecha', ''), '%Y-%m-%d').date()
+            producto_id = request.query_params.get('producto_id')
+            categoria_id = request.query_params.get('categoria_id')
+            filas, base_fecha = stock_en_fecha(
+                fecha,
+                producto_ids=[int(producto_id)] if producto_id else None,
+                categoria_id=int(categoria_id) if categoria_id else None,
+            )
+        except ValueError:
+            return Response(
+                {'error': 'Debe indicar fecha (YYYY-MM-DD); producto_id y categoria_id deben ser numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        data = {
+            'fecha': fecha,
+            'snapshot_base': base_fecha,
+            'total_productos': len(filas),
+            'valor_inventario': sum((fila.valor for fila in filas), Decimal('0')),
+            'por_categoria': resumen_por_categoria(filas),
+        }
+        if producto_id or categoria_id:
+            data['productos'] = [
+                {
+                    'producto_id': fila.producto_id,
+                    'codigo': fila.codigo,
+                    'nombre': fila.nombre,
+                    'stock': fila.stock,
+                    'costo_unitario': fila.costo_unitario,
+                    'valor_inventario': fila.valor,
+                }
+                for fila in filas
+            ]
+        return Response(data)
     
     @action(detail=False, methods=['get'])
     def por_categoria(self, request):
@@ -254,36 +382,96 @@ class ProductoViewSet(viewsets.ModelViewSet):
             )
         
         # Crear movimiento de inventario
-        stock_anterior = producto.stock
-        
         if tipo_movimiento in {'SALIDA', 'BAJA'}:
             cantidad = -abs(cantidad)  # Asegurar que sea negativo
         
-        stock_nuevo = stock_anterior + cantidad
-        
-        if stock_nuevo < 0:
+        # El delta se aplica en la base de datos; el stock negativo se rechaza en la misma sentencia.
+        try:
+            resultado, = post_stock_movements(
+                [
+                    StockPosting(
+                        producto_id=producto.id,
+                        tipo=tipo_movimiento,
+                        cantidad=cantidad,
+                        costo_unitario=costo_unitario,
+                        observaciones=observaciones,
+                    )
+                ],
+                usuario=request.user,
+                permitir_negativo=False,
+            )
+        except StockInsuficienteError:
             return Response(
                 {'error': 'El stock no puede ser negativo'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        producto.stock = resultado.stock_nuevo
+
+        serializer = ProductoDetailSerializer(producto)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def conteo_fisico(self, request):
+        """
+        Ajusta el stock de muchos productos a partir de un conteo físico.
         
-        MovimientoInventario.objects.create(
-            producto=producto,
-            tipo=tipo_movimiento,
-            cantidad=cantidad,
-            stock_anterior=stock_anterior,
-            stock_nuevo=stock_nuevo,
-            costo_unitario=costo_unitario,
+        POST /api/productos/conteo_fisico/
+        Body JSON: {"items": [{"codigo": "ABC", "cantidad": 12}], "dry_run": true, "observaciones": "..."}
+        o multipart con ``archivo`` (.csv/.xlsx con columnas codigo y cantidad).
+        Con ``dry_run`` sólo devuelve la conciliación; con errores no aplica nada.
+        """
+        # Se acepta también un arreglo JSON directo de items.
+        body = {} if isinstance(request.data, list) else request.data
+        dry_run = str(body.get('dry_run', request.query_params.get('dry_run', ''))).lower() in {'1', 'true', 'si', 'sí'}
+        try:
+            archivo = request.FILES.get('archivo')
+            if archivo is not None:
+                lineas = leer_archivo_conteo(archivo)
+            else:
+                lineas = lineas_desde_items(request.data if isinstance(request.data, list) else body.get('items'))
+        except ConteoFisicoError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not lineas:
+            return Response(
+                {'error': 'El conteo no tiene líneas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        informe = aplicar_conteo_fisico(
+            lineas,
             usuario=request.user,
-            observaciones=observaciones
+            dry_run=dry_run,
+            observaciones=body.get('observaciones', ''),
         )
-        
-        # Actualizar stock del producto
-        producto.stock = stock_nuevo
-        producto.save(update_fields=['stock', 'updated_at'], touch_ultima_compra=False)
-        
-        serializer = ProductoDetailSerializer(producto)
-        return Response(serializer.data)
+        if not dry_run and not informe['aplicado']:
+            return Response(informe, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response(informe)
+        # Un solo registro de auditoría para todo el conteo (ninguno en simulación).
+        response.omitir_auditoria = dry_run
+        resumen = informe['resumen']
+        response.auditoria_notas = (
+            f"Conteo físico: {resumen['productos']} productos, {resumen['ajustados']} ajustados "
+            f"(sobrante {resumen['sobrante']}, faltante {resumen['faltante']}, "
+            f"valor diferencia {resumen['valor_diferencia']})"
+        )
+        return response
+
+
+class MovimientoCursorPagination(CursorPagination):
+    """Paginación por cursor: sin OFFSET, costo constante en páginas profundas."""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KardexCursorPagination(MovimientoCursorPagination):
+    ordering = KARDEX_ORDERING
+
+    def get_ordering(self, request, queryset, view):
+        # Orden cronológico fijo: ignora el OrderingFilter del viewset.
+        return self.ordering
 
 
 class MovimientoInventarioViewSet(viewsets.ReadOnlyModelViewSet):
@@ -296,29 +484,85 @@ class MovimientoInventarioViewSet(viewsets.ReadOnlyModelViewSet):
     ).all()
     serializer_class = MovimientoInventarioSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MovimientoCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['producto', 'tipo', 'usuario']
     search_fields = ['producto__codigo', 'producto__nombre', 'referencia']
     ordering_fields = ['created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
     
+    def _kardex_queryset(self, request):
+        """Devuelve ``(queryset, None)`` o ``(None, Response de error)``."""
+        producto_id = request.query_params.get('producto_id', None)
+        if not producto_id:
+            return None, Response(
+                {'error': 'Debe proporcionar el parámetro producto_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            queryset = kardex_queryset(
+                int(producto_id),
+                fecha_inicio=request.query_params.get('fecha_inicio'),
+                fecha_fin=request.query_params.get('fecha_fin'),
+            )
+        except ValueError:
+            return None, Response(
+                {'error': 'producto_id debe ser numérico y las fechas con formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return queryset, None
+
     @action(detail=False, methods=['get'])
-    def por_producto(self, request):
+    def kardex(self, request):
         """
-        Retorna movimientos de un producto específico.
+        Kardex de un producto con saldo y costo valorizado, paginado por cursor.
         
-        GET /api/movimientos/por_producto/?producto_id=1
+        GET /api/movimientos/kardex/?producto_id=1&fecha_inicio=2026-01-01&fecha_fin=2026-01-31
         """
-        producto_id = request.query_params.get('producto_id', None)
-        if not producto_id:
+        queryset, error = self._kardex_queryset(request)
+        if error:
+            return error
+        paginator = KardexCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = KardexMovimientoSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='kardex/exportar')
+    def kardex_exportar(self, request):
+        """
+        Exporta el Kardex de un producto (CSV en streaming o XLSX).
+        
+        GET /api/movimientos/kardex/exportar/?producto_id=1&formato=xlsx&fecha_inicio=...&fecha_fin=...
+        """
+        queryset, error = self._kardex_queryset(request)
+        if error:
+            return error
+        formato = (request.query_params.get('formato') or 'csv').strip().lower()
+        filename = f"kardex_{request.query_params['producto_id']}"
+        if formato == 'xlsx':
+            return FileResponse(
+                write_kardex_xlsx(queryset),
+                as_attachment=True,
+                filename=f'{filename}.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        if formato != 'csv':
             return Response(
-                {'error': 'Debe proporcionar el parámetro producto_id'},
+                {'error': 'formato debe ser csv o xlsx'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        response = StreamingHttpResponse(stream_kardex_csv(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def por_producto(self, request):
+        """
+        Movimientos de un producto específico (alias de ``kardex``, paginado por cursor).
         
-        movimientos = self.get_queryset().filter(producto_id=producto_id)
-        serializer = self.get_serializer(movimientos, many=True)
-        return Response(serializer.data)
+        GET /api/movimientos/por_producto/?producto_id=1
+        """
+        return self.kardex(request)
 
 
 class ProductoFavoritoViewSet(viewsets.ModelViewSet):
@@ -175,6 +175,26 @@ class OrdenTallerAgregarRepuestoTests(TestCase):
         self.assertEqual(movimiento.stock_nuevo, Decimal('-2.00'))
         self.assertEqual(movimiento.cantidad, Decimal('-2.00'))
 
+    def test_agregar_repuesto_existente_acumula_cantidad_y_subtotal(self):
+        OrdenRepuesto.objects.create(
+            orden=self.orden,
+            producto=self.producto,
+            cantidad=Decimal('1.00'),
+            precio_unitario=Decimal('2000.00'),
+        )
+
+        response = self.client.post(
+            f'/api/ordenes-taller/{self.orden.id}/agregar_repuesto/',
+            {'producto': self.producto.id, 'cantidad': '2'},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        repuesto = OrdenRepuesto.objects.get(orden=self.orden, producto=self.producto)
+        self.assertEqual(repuesto.cantidad, Decimal('3.00'))
+        self.assertEqual(repuesto.precio_unitario, Decimal('3000.00'))
+        self.assertEqual(repuesto.subtotal, Decimal('9000.00'))
+
     def test_agregar_repuesto_rechaza_cantidad_no_positiva(self):
         response = self.client.post(
             f'/api/ordenes-taller/{self.orden.id}/agregar_repuesto/',
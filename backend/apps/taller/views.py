@@ -1,6 +1,6 @@
 from decimal import Decimal, InvalidOperation
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import F, Sum
 from django.utils import timezone
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
@@ -8,7 +8,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 
-from apps.inventario.models import MovimientoInventario, Producto
+from apps.inventario.models import Producto
+from apps.inventario.services import StockPosting, post_stock_movements
 from apps.ventas.models import DetalleVenta, Venta
 from apps.ventas.services.calculo_venta import recalcular_totales_venta
 from .models import Mecanico, Moto, OrdenTaller, OrdenRepuesto
@@ -159,7 +160,7 @@ class OrdenTallerViewSet(viewsets.ModelViewSet):
 
         with transaction.atomic():
             try:
-                producto = Producto.objects.select_for_update().get(pk=producto_id, is_active=True)
+                producto = Producto.objects.get(pk=producto_id, is_active=True)
             except Producto.DoesNotExist:
                 return Response({'error': 'Producto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -180,28 +181,32 @@ class OrdenTallerViewSet(viewsets.ModelViewSet):
                 }
             )
             if not created:
-                repuesto.cantidad += cantidad
-                repuesto.precio_unitario = producto.precio_venta
-                repuesto.save()
+                # Incremento atómico en BD: sin lock del producto, un read-modify-write
+                # en Python perdería cantidades con adiciones concurrentes.
+                OrdenRepuesto.objects.filter(pk=repuesto.pk).update(
+                    cantidad=F('cantidad') + cantidad,
+                    precio_unitario=producto.precio_venta,
+                    subtotal=(F('cantidad') + cantidad) * producto.precio_venta,
+                    updated_at=timezone.now(),
+                )
 
             if not producto.es_servicio:
-                stock_anterior = producto.stock
-                cantidad_movimiento = -abs(cantidad)
-                stock_nuevo = stock_anterior + cantidad_movimiento
-                stock_actual = stock_nuevo
-                stock_negativo = stock_nuevo < 0
-
-                MovimientoInventario.objects.create(
-                    producto=producto,
-                    tipo='SALIDA',
-                    cantidad=cantidad_movimiento,
-                    stock_anterior=stock_anterior,
-                    stock_nuevo=stock_nuevo,
-                    costo_unitario=producto.precio_costo,
+                resultado, = post_stock_movements(
+                    [
+                        StockPosting(
+                            producto_id=producto.id,
+                            tipo='SALIDA',
+                            cantidad=-abs(cantidad),
+                            costo_unitario=producto.precio_costo,
+                            referencia=f"Orden taller #{orden.id}",
+                            observaciones="Salida por orden de taller",
+                        )
+                    ],
                     usuario=request.user,
-                    referencia=f"Orden taller #{orden.id}",
-                    observaciones="Salida por orden de taller"
                 )
+                stock_anterior = resultado.stock_anterior
+                stock_actual = resultado.stock_nuevo
+                stock_negativo = stock_actual < 0
 
         serializer = OrdenTallerSerializer(orden)
         response_data = {
@@ -231,28 +236,21 @@ class OrdenTallerViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Debe indicar repuesto_id o producto'}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            productos_ids = [repuesto.producto_id for repuesto in repuestos if not repuesto.producto.es_servicio]
-            productos = {
-                producto.id: producto
-                for producto in Producto.objects.select_for_update().filter(id__in=productos_ids)
-            }
-            for repuesto in repuestos:
-                producto = productos.get(repuesto.producto_id) or repuesto.producto
-                if producto.es_servicio:
-                    continue
-                stock_anterior = producto.stock
-                stock_nuevo = stock_anterior + repuesto.cantidad
-                MovimientoInventario.objects.create(
-                    producto=producto,
-                    tipo='DEVOLUCION',
-                    cantidad=repuesto.cantidad,
-                    stock_anterior=stock_anterior,
-                    stock_nuevo=stock_nuevo,
-                    costo_unitario=producto.precio_costo,
-                    usuario=request.user,
-                    referencia=f"Orden taller #{orden.id}",
-                    observaciones="Devolución por retiro de repuesto"
-                )
+            post_stock_movements(
+                [
+                    StockPosting(
+                        producto_id=repuesto.producto_id,
+                        tipo='DEVOLUCION',
+                        cantidad=repuesto.cantidad,
+                        costo_unitario=repuesto.producto.precio_costo,
+                        referencia=f"Orden taller #{orden.id}",
+                        observaciones="Devolución por retiro de repuesto",
+                    )
+                    for repuesto in repuestos
+                    if not repuesto.producto.es_servicio
+                ],
+                usuario=request.user,
+            )
             repuestos.delete()
 
         serializer = OrdenTallerSerializer(orden)
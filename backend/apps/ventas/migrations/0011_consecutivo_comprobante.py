@@ -0,0 +1,92 @@
+# Generated by Django 5.1.5 on 2026-10-17 03:58
+
+import re
+
+from django.db import migrations, models
+
+# Copia congelada de `apps.ventas.services.consecutivos.sembrar_consecutivos` a
+# la fecha de esta migración: el backfill no debe cambiar si ese servicio evoluciona.
+NUMERO_RE = re.compile(r"^(.+)-(\d+)$")
+
+
+def seed_consecutivos(apps, schema_editor):
+    Venta = apps.get_model("ventas", "Venta")
+    ConsecutivoComprobante = apps.get_model("ventas", "ConsecutivoComprobante")
+    maximos = {}
+    numeros = Venta.objects.exclude(numero_comprobante__isnull=True).values_list(
+        "tipo_comprobante", "numero_comprobante"
+    )
+    for tipo_comprobante, numero_comprobante in numeros.iterator(chunk_size=5000):
+        match = NUMERO_RE.match(numero_comprobante or "")
+        if not match:
+            continue
+        clave = (tipo_comprobante, match.group(1))
+        maximos[clave] = max(maximos.get(clave, 0), int(match.group(2)))
+    for (tipo_comprobante, prefijo), ultimo in maximos.items():
+        consecutivo, creado = ConsecutivoComprobante.objects.get_or_create(
+            tipo_comprobante=tipo_comprobante,
+            prefijo=prefijo,
+            defaults={"ultimo_numero": ultimo},
+        )
+        if not creado and consecutivo.ultimo_numero < ultimo:
+            consecutivo.ultimo_numero = ultimo
+            consecutivo.save(update_fields=["ultimo_numero", "updated_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ventas", "0010_alter_venta_efectivo_recibido_alter_venta_cambio"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConsecutivoComprobante",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo_comprobante",
+                    models.CharField(
+                        choices=[
+                            ("COTIZACION", "Cotización"),
+                            ("REMISION", "Remisión"),
+                            ("FACTURA", "Factura"),
+                        ],
+                        max_length=20,
+                        verbose_name="Tipo de comprobante",
+                    ),
+                ),
+                ("prefijo", models.CharField(max_length=50, verbose_name="Prefijo")),
+                (
+                    "ultimo_numero",
+                    models.BigIntegerField(verbose_name="Último número asignado"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Fecha de actualización"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Consecutivo de comprobante",
+                "verbose_name_plural": "Consecutivos de comprobante",
+                "db_table": "consecutivos_comprobante",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tipo_comprobante", "prefijo"),
+                        name="uq_consecutivo_tipo_prefijo",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(seed_consecutivos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+# Copia congelada de `apps.ventas.services.consecutivos.sincronizar_consecutivos_configuracion`
+# a la fecha de esta migración: el backfill no debe cambiar si ese servicio evoluciona.
+def seed_desde_configuracion(apps, schema_editor):
+    configuracion = (
+        apps.get_model("core", "ConfiguracionFacturacion")
+        .objects.order_by("-id")
+        .first()
+    )
+    if configuracion is None:
+        return
+    ConsecutivoComprobante = apps.get_model("ventas", "ConsecutivoComprobante")
+    for tipo_comprobante, prefijo, siguiente in (
+        (
+            "COTIZACION",
+            configuracion.prefijo_cotizacion or "COT",
+            configuracion.numero_cotizacion,
+        ),
+        (
+            "REMISION",
+            configuracion.prefijo_remision or "REM",
+            configuracion.numero_remision,
+        ),
+    ):
+        # Nunca retrocede: evita repetir números ya emitidos.
+        ultimo = int(siguiente or 1) - 1
+        consecutivo, creado = ConsecutivoComprobante.objects.get_or_create(
+            tipo_comprobante=tipo_comprobante,
+            prefijo=prefijo.strip(),
+            defaults={"ultimo_numero": ultimo},
+        )
+        if not creado and consecutivo.ultimo_numero < ultimo:
+            consecutivo.ultimo_numero = ultimo
+            consecutivo.save(update_fields=["ultimo_numero", "updated_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "core",
+            "0019_alter_configuracionfacturacion_factus_documento_soporte_document_code_and_more",
+        ),
+        ("ventas", "0011_consecutivo_comprobante"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_desde_configuracion, migrations.RunPython.noop),
+    ]
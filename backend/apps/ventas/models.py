@@ -421,6 +421,41 @@ class Venta(BaseModel):
         return factura
 
 
+class ConsecutivoComprobante(models.Model):
+    """
+    Último número local asignado por (tipo de comprobante, prefijo).
+    Se incrementa con bloqueo de fila al numerar una venta (ver
+    services.consecutivos); reemplaza el MAX con regex sobre ``ventas``.
+    """
+    tipo_comprobante = models.CharField(
+        max_length=20,
+        choices=Venta.TIPO_COMPROBANTE,
+        verbose_name='Tipo de comprobante'
+    )
+    prefijo = models.CharField(
+        max_length=50,
+        verbose_name='Prefijo'
+    )
+    ultimo_numero = models.BigIntegerField(
+        verbose_name='Último número asignado'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de actualización'
+    )
+
+    class Meta:
+        db_table = 'consecutivos_comprobante'
+        verbose_name = 'Consecutivo de comprobante'
+        verbose_name_plural = 'Consecutivos de comprobante'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo_comprobante', 'prefijo'], name='uq_consecutivo_tipo_prefijo'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo_comprobante} {self.prefijo}: {self.ultimo_numero}"
+
+
 class DetalleVenta(BaseModel):
     """Detalle de productos/servicios en una venta"""
     venta = models.ForeignKey(
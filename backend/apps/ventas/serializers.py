@@ -10,20 +10,21 @@ from .models import (
 )
 from apps.usuarios.models import Usuario
 from apps.ventas.services.calculo_venta import calcular_detalle_venta, recalcular_totales_venta
-from apps.facturacion.models import RangoNumeracionDIAN
-from apps.facturacion.services.document_print_context import build_document_print_context
+from apps.facturacion.services.document_print_context import RangoNumeracionResolver, build_document_print_context
 from apps.facturacion.services.public_invoice_url import has_documental_inconsistency, resolve_public_invoice_url
 
 
-def _build_factura_electronica_data(venta):
+def get_range_resolver(context) -> RangoNumeracionResolver:
+    """Resolver de rangos compartido por todas las filas de una misma serialización."""
+    return context.setdefault('range_resolver', RangoNumeracionResolver())
+
+
+def _build_factura_electronica_data(venta, range_resolver=None):
     factura = getattr(venta, 'factura_electronica_factus', None)
-    pending_range = (
-        RangoNumeracionDIAN.objects.filter(document_code='FACTURA_VENTA', is_selected_local=True)
-        .order_by('-created_at')
-        .first()
-    )
     if not factura:
         return None
+    range_resolver = range_resolver or RangoNumeracionResolver()
+    pending_range = range_resolver.selected('FACTURA_VENTA')
     response_json = factura.response_json if isinstance(factura.response_json, dict) else {}
     final_fields = response_json.get('final_fields', {}) if isinstance(response_json.get('final_fields', {}), dict) else {}
     response_data = response_json.get('data', {}) if isinstance(response_json.get('data', {}), dict) else {}
@@ -32,7 +33,11 @@ def _build_factura_electronica_data(venta):
     public_url = resolve_public_invoice_url(factura)
     documento_inconsistente = has_documental_inconsistency(factura)
     numbering_info = factura.numbering_resolution_info
-    print_context = build_document_print_context(factura, pending_range=pending_range)
+    print_context = build_document_print_context(
+        factura,
+        pending_range=pending_range,
+        range_resolver=range_resolver,
+    )
     return {
         'id': factura.id,
         'venta_id': factura.venta_id,
@@ -88,8 +93,11 @@ class ClienteSerializer(serializers.ModelSerializer):
         }
     
     def get_total_compras(self, obj):
-        """Total de ventas del cliente"""
-        return obj.ventas.filter(estado='COBRADA').count()
+        """Total de ventas del cliente (anotado por el viewset)."""
+        total = getattr(obj, 'total_compras', None)
+        if total is None:
+            return obj.ventas.filter(estado='COBRADA').count()
+        return total
     
     def validate_numero_documento(self, value):
         """Valida que el documento sea único"""
@@ -193,7 +201,7 @@ class VentaListSerializer(serializers.ModelSerializer):
         return factura.estado_electronico
 
     def get_factura_electronica(self, obj):
-        return _build_factura_electronica_data(obj)
+        return _build_factura_electronica_data(obj, get_range_resolver(self.context))
 
 
 class VentaDetailSerializer(serializers.ModelSerializer):
@@ -259,7 +267,7 @@ class VentaDetailSerializer(serializers.ModelSerializer):
         return factura.estado_electronico
 
     def get_factura_electronica(self, obj):
-        return _build_factura_electronica_data(obj)
+        return _build_factura_electronica_data(obj, get_range_resolver(self.context))
 
 
 class VentaCreateSerializer(serializers.ModelSerializer):
@@ -8,6 +8,7 @@ from .cerrar_venta import (
     registrar_salida_inventario,
     validar_para_facturar_en_caja,
 )
+from .consecutivos import sembrar_consecutivos, siguiente_numero_comprobante
 from .cuentas_del_dia import build_cuentas_del_dia_summary, get_cuentas_del_dia_queryset
 from .enviar_venta_a_caja import enviar_venta_a_caja
 
@@ -23,5 +24,7 @@ __all__ = [
     'recalcular_totales_venta',
     'estado_electronico_ui',
     'registrar_salida_inventario',
+    'sembrar_consecutivos',
+    'siguiente_numero_comprobante',
     'validar_para_facturar_en_caja',
 ]
@@ -26,27 +26,23 @@ def debe_revertir_inventario(venta):
 
 
 def revertir_inventario_venta_anulada(venta, user, descripcion=''):
-    from apps.inventario.models import MovimientoInventario, Producto
+    from apps.inventario.services import StockPosting, post_stock_movements
 
     detalles = [detalle for detalle in venta.detalles.all() if detalle.afecto_inventario]
-    productos = {p.id: p for p in Producto.objects.select_for_update().filter(id__in=[d.producto_id for d in detalles])}
-    for detalle in detalles:
-        producto = productos.get(detalle.producto_id) or detalle.producto
-        stock_anterior = producto.stock
-        stock_nuevo = stock_anterior + detalle.cantidad
-        MovimientoInventario.objects.create(
-            producto=producto,
-            tipo='DEVOLUCION',
-            cantidad=detalle.cantidad,
-            stock_anterior=stock_anterior,
-            stock_nuevo=stock_nuevo,
-            costo_unitario=detalle.precio_unitario,
-            usuario=user,
-            referencia=f'Anulación {venta.numero_comprobante}',
-            observaciones=f'Devolución por anulación: {descripcion}',
-        )
-        producto.stock = stock_nuevo
-        producto.save(update_fields=['stock', 'updated_at'])
+    post_stock_movements(
+        [
+            StockPosting(
+                producto_id=detalle.producto_id,
+                tipo='DEVOLUCION',
+                cantidad=detalle.cantidad,
+                costo_unitario=detalle.precio_unitario,
+                referencia=f'Anulación {venta.numero_comprobante}',
+                observaciones=f'Devolución por anulación: {descripcion}',
+            )
+            for detalle in detalles
+        ],
+        usuario=user,
+    )
 
 
 def _registrar_anulacion_local(venta, user, *, motivo, descripcion, devuelve_inventario):
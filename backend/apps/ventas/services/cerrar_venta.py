@@ -47,40 +47,35 @@ def registrar_salida_inventario(venta, user, detalles=None):
     if venta.inventario_ya_afectado:
         return
 
-    from apps.inventario.models import MovimientoInventario, Producto
+    from apps.inventario.services import StockPosting, post_stock_movements
 
     detalles = detalles or list(venta.detalles.select_related('producto'))
-    productos_ids = [detalle.producto_id for detalle in detalles if detalle.afecto_inventario]
-    productos = {
-        producto.id: producto
-        for producto in Producto.objects.select_for_update().filter(id__in=productos_ids)
-    } if productos_ids else {}
-
-    movimientos_creados = 0
-    for detalle in detalles:
-        if not detalle.afecto_inventario:
-            continue
-        producto = productos.get(detalle.producto_id) or detalle.producto
-        stock_anterior = producto.stock
-        stock_nuevo = stock_anterior - detalle.cantidad
-        observaciones = 'Facturación en caja'
+    referencia = venta.numero_comprobante or f'VENTA-{venta.id}'
+
+    def observaciones(stock_anterior, stock_nuevo):
         if stock_nuevo < 0:
-            observaciones = (
+            return (
                 f'Facturación en caja con stock negativo permitido '
                 f'({stock_anterior} -> {stock_nuevo})'
             )
-        MovimientoInventario.objects.create(
-            producto=producto,
-            tipo='SALIDA',
-            cantidad=-abs(detalle.cantidad),
-            stock_anterior=stock_anterior,
-            stock_nuevo=stock_nuevo,
-            costo_unitario=detalle.precio_unitario,
-            usuario=user,
-            referencia=venta.numero_comprobante or f'VENTA-{venta.id}',
-            observaciones=observaciones,
-        )
-        movimientos_creados += 1
+        return 'Facturación en caja'
+
+    resultados = post_stock_movements(
+        [
+            StockPosting(
+                producto_id=detalle.producto_id,
+                tipo='SALIDA',
+                cantidad=-abs(detalle.cantidad),
+                costo_unitario=detalle.precio_unitario,
+                referencia=referencia,
+                observaciones=observaciones,
+            )
+            for detalle in detalles
+            if detalle.afecto_inventario
+        ],
+        usuario=user,
+    )
+    movimientos_creados = len(resultados)
 
     if movimientos_creados > 0:
         venta.inventario_ya_afectado = True
@@ -0,0 +1,117 @@
+"""Numeración local de comprobantes con tabla de consecutivos.
+
+``ConsecutivoComprobante`` guarda el último número por (tipo, prefijo). Asignar
+uno es un solo ``UPDATE ... RETURNING`` sobre esa fila: el bloqueo de fila
+serializa a los concurrentes y, dentro de la transacción que guarda la venta,
+un rollback devuelve el número (sin huecos). El recorrido con regex sobre
+``ventas`` (``Venta.obtener_siguiente_numero``) sólo se usa para sembrar un
+par nuevo o re-sincronizar si el número ya existe (p. ej. tras una importación).
+"""
+
+from __future__ import annotations
+
+import re
+
+from django.db import connection
+from django.utils import timezone
+
+from apps.ventas.models import ConsecutivoComprobante, Venta
+
+_NUMERO_RE = re.compile(r'^(.+)-(\d+)$')
+
+
+def _tabla() -> str:
+    return connection.ops.quote_name(ConsecutivoComprobante._meta.db_table)
+
+
+def _incrementar(tipo_comprobante: str, prefijo: str) -> int | None:
+    sql = f"""
+        UPDATE {_tabla()}
+        SET ultimo_numero = ultimo_numero + 1, updated_at = %s
+        WHERE tipo_comprobante = %s AND prefijo = %s
+        RETURNING ultimo_numero
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [timezone.now(), tipo_comprobante, prefijo])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _sincronizar(tipo_comprobante: str, prefijo: str, siguiente: int) -> int:
+    """Reserva ``max(actual + 1, siguiente)``; crea la fila si no existe."""
+    sql = f"""
+        INSERT INTO {_tabla()} AS c (tipo_comprobante, prefijo, ultimo_numero, updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (tipo_comprobante, prefijo) DO UPDATE SET
+            ultimo_numero = GREATEST(c.ultimo_numero + 1, EXCLUDED.ultimo_numero),
+            updated_at = EXCLUDED.updated_at
+        RETURNING ultimo_numero
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tipo_comprobante, prefijo, siguiente, timezone.now()])
+        return cursor.fetchone()[0]
+
+
+def elevar_consecutivo(tipo_comprobante: str, prefijo: str, ultimo_numero: int, consecutivo_model=ConsecutivoComprobante) -> None:
+    """Garantiza ``ultimo_numero`` como mínimo (nunca retrocede: evita repetir números ya emitidos)."""
+    tabla = connection.ops.quote_name(consecutivo_model._meta.db_table)
+    sql = f"""
+        INSERT INTO {tabla} AS c (tipo_comprobante, prefijo, ultimo_numero, updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (tipo_comprobante, prefijo) DO UPDATE SET
+            ultimo_numero = GREATEST(c.ultimo_numero, EXCLUDED.ultimo_numero),
+            updated_at = EXCLUDED.updated_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tipo_comprobante, prefijo, ultimo_numero, timezone.now()])
+
+
+def sincronizar_consecutivos_configuracion(configuracion, consecutivo_model=ConsecutivoComprobante) -> None:
+    """Lleva a los contadores el "siguiente número" de cotización/remisión fijado en la configuración."""
+    for tipo_comprobante, prefijo, siguiente in (
+        ('COTIZACION', configuracion.prefijo_cotizacion or 'COT', configuracion.numero_cotizacion),
+        ('REMISION', configuracion.prefijo_remision or 'REM', configuracion.numero_remision),
+    ):
+        elevar_consecutivo(tipo_comprobante, prefijo.strip(), int(siguiente or 1) - 1, consecutivo_model)
+
+
+def ultimos_consecutivos_cotizacion_remision() -> dict[tuple[str, str], int]:
+    """Último número por (tipo, prefijo) de cotizaciones y remisiones, en una consulta."""
+    filas = ConsecutivoComprobante.objects.filter(tipo_comprobante__in=('COTIZACION', 'REMISION')).values_list(
+        'tipo_comprobante', 'prefijo', 'ultimo_numero'
+    )
+    return {(tipo_comprobante, prefijo): ultimo_numero for tipo_comprobante, prefijo, ultimo_numero in filas}
+
+
+def siguiente_numero_comprobante(tipo_comprobante: str, prefijo: str, base: int) -> int:
+    """Reserva el siguiente número local para ``prefijo``; ``base`` es el primero si no hay historial."""
+    numero = _incrementar(tipo_comprobante, prefijo)
+    # Verificación por índice único: cubre números cargados por fuera del contador.
+    while numero is None or Venta.objects.filter(numero_comprobante=f'{prefijo}-{numero}').exists():
+        siguiente = Venta.obtener_siguiente_numero(tipo_comprobante, None, prefijo, base)
+        numero = _sincronizar(tipo_comprobante, prefijo, siguiente)
+    return numero
+
+
+def sembrar_consecutivos(venta_model=Venta, consecutivo_model=ConsecutivoComprobante) -> int:
+    """Crea o eleva los contadores al máximo actual de cada (tipo, prefijo); devuelve los pares."""
+    maximos: dict[tuple[str, str], int] = {}
+    numeros = venta_model.objects.exclude(numero_comprobante__isnull=True).values_list(
+        'tipo_comprobante', 'numero_comprobante'
+    )
+    for tipo_comprobante, numero_comprobante in numeros.iterator(chunk_size=5000):
+        match = _NUMERO_RE.match(numero_comprobante or '')
+        if not match:
+            continue
+        clave = (tipo_comprobante, match.group(1))
+        maximos[clave] = max(maximos.get(clave, 0), int(match.group(2)))
+    for (tipo_comprobante, prefijo), ultimo in maximos.items():
+        consecutivo, creado = consecutivo_model.objects.get_or_create(
+            tipo_comprobante=tipo_comprobante,
+            prefijo=prefijo,
+            defaults={'ultimo_numero': ultimo},
+        )
+        if not creado and consecutivo.ultimo_numero < ultimo:
+            consecutivo.ultimo_numero = ultimo
+            consecutivo.save(update_fields=['ultimo_numero', 'updated_at'])
+    return len(maximos)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, time
 from decimal import Decimal
 
-from django.db.models import Count, Prefetch, Q, QuerySet, Sum
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Prefetch, Q, QuerySet, Sum
 from django.utils import timezone
 
 from apps.ventas.models import DetalleVenta, Venta
@@ -116,70 +116,174 @@ def _decimal_to_str(value: Decimal) -> str:
     return f"{(value or Decimal('0')).quantize(Decimal('0.01'))}"
 
 
-def _normalize_iva_label(detalle: DetalleVenta) -> str:
-    producto = getattr(detalle, 'producto', None)
-    if detalle.iva_porcentaje == 0 or (producto and getattr(producto, 'iva_exento', False)):
+def _normalize_iva_label(iva_porcentaje: Decimal, iva_exento: bool) -> str:
+    if iva_porcentaje == 0 or iva_exento:
         return 'E'
-    iva = detalle.iva_porcentaje.quantize(Decimal('0.01'))
+    iva = iva_porcentaje.quantize(Decimal('0.01'))
     if iva == iva.to_integral_value():
         return str(int(iva))
     return format(iva.normalize(), 'f').rstrip('0').rstrip('.')
 
 
-def build_cuentas_del_dia_ticket_summary(fecha_inicio: str | None, fecha_fin: str | None, tipo_comprobante: str, *, base_queryset: QuerySet[Venta] | None = None) -> dict:
-    ventas_base = base_queryset or Venta.objects.all()
-    inicio_dt, fin_dt = _parse_local_date_range(fecha_inicio, fecha_fin)
+def _medio_pago_label(medio_pago: str) -> str:
+    return (dict(Venta.MEDIO_PAGO).get(medio_pago) or medio_pago or '').upper()
 
-    ventas_tipo = ventas_base.filter(tipo_comprobante=tipo_comprobante)
-    if inicio_dt:
-        ventas_tipo = ventas_tipo.filter(fecha__gte=inicio_dt)
-    if fin_dt:
-        ventas_tipo = ventas_tipo.filter(fecha__lte=fin_dt)
 
-    ventas_validas = ventas_tipo.filter(estado__in=VALID_STATES_MONEY)
+def _categoria_label(nombre: str | None) -> str:
+    return (nombre or 'SIN CATEGORÍA').upper()
+
+
+def _empty_breakdowns() -> dict:
+    return {
+        'resumen_iva': {},
+        'resumen_categorias': {},
+        'total_desc': Decimal('0'),
+        'medios': {},
+        'total_facturado': Decimal('0'),
+        'total_documentos': 0,
+        'anuladas': 0,
+    }
+
+
+def _add_iva_bucket(resumen_iva: dict, label: str, *, compra: Decimal, base: Decimal, descuento: Decimal) -> None:
+    bucket = resumen_iva.setdefault(label, {
+        'tipo': label, 'compra': Decimal('0'), 'base': Decimal('0'), 'iva': Decimal('0'), 'descuento': Decimal('0')
+    })
+    bucket['compra'] += compra
+    bucket['base'] += base
+    bucket['iva'] += (compra - base)
+    bucket['descuento'] -= descuento
+
+
+def _add_medio(medios: dict, medio: str, *, cantidad: int, facturado: Decimal) -> None:
+    item = medios.setdefault(medio, {'cantidad': 0, 'medio_pago': medio, 'facturado': Decimal('0')})
+    item['cantidad'] += cantidad
+    item['facturado'] += facturado
+
+
+def _aggregate_ticket_sql(ventas_tipo: QuerySet[Venta]) -> dict:
+    """Desgloses de la tirilla con agregados agrupados en SQL (una consulta por tabla)."""
+    # Los caller suelen pasar un queryset con prefetch de detalles; no aplica a `values()`.
+    ventas_tipo = ventas_tipo.prefetch_related(None)
+    valida = Q(estado__in=VALID_STATES_MONEY)
+    result = _empty_breakdowns()
+
+    por_medio = (
+        ventas_tipo.order_by()
+        .values('medio_pago')
+        .annotate(
+            cantidad=Count('id', filter=valida),
+            facturado=Sum('total', filter=valida),
+            anuladas=Count('id', filter=Q(estado='ANULADA')),
+        )
+    )
+    for row in por_medio:
+        result['anuladas'] += row['anuladas']
+        if not row['cantidad']:
+            continue
+        result['total_documentos'] += row['cantidad']
+        result['total_facturado'] += row['facturado'] or Decimal('0')
+        _add_medio(
+            result['medios'],
+            _medio_pago_label(row['medio_pago']),
+            cantidad=row['cantidad'],
+            facturado=row['facturado'] or Decimal('0'),
+        )
+
+    por_grupo = (
+        DetalleVenta.objects.filter(venta__in=ventas_tipo.filter(valida).values('pk'))
+        .order_by()
+        .values('iva_porcentaje', 'producto__iva_exento', 'producto__categoria__nombre')
+        .annotate(
+            compra=Sum('total'),
+            base=Sum('subtotal'),
+            descuento=Sum(
+                ExpressionWrapper(
+                    F('cantidad') * F('descuento_unitario'),
+                    output_field=DecimalField(max_digits=24, decimal_places=4),
+                )
+            ),
+        )
+    )
+    for row in por_grupo:
+        descuento = row['descuento'] or Decimal('0')
+        _add_iva_bucket(
+            result['resumen_iva'],
+            _normalize_iva_label(row['iva_porcentaje'], row['producto__iva_exento']),
+            compra=row['compra'],
+            base=row['base'],
+            descuento=descuento,
+        )
+        result['total_desc'] -= descuento
+        categoria = _categoria_label(row['producto__categoria__nombre'])
+        result['resumen_categorias'][categoria] = result['resumen_categorias'].get(categoria, Decimal('0')) + row['compra']
+    return result
+
 
-    resumen_iva = {}
-    resumen_categorias = {}
-    total_desc = Decimal('0')
+def _aggregate_ticket_python(ventas_tipo: QuerySet[Venta]) -> dict:
+    """Ruta de referencia: recorre ventas y detalles en Python (equivalente a la SQL)."""
+    result = _empty_breakdowns()
+    ventas_validas = ventas_tipo.filter(estado__in=VALID_STATES_MONEY)
     for venta in ventas_validas:
         for detalle in venta.detalles.all():
-            label = _normalize_iva_label(detalle)
-            bucket = resumen_iva.setdefault(label, {
-                'tipo': label, 'compra': Decimal('0'), 'base': Decimal('0'), 'iva': Decimal('0'), 'descuento': Decimal('0')
-            })
-            bucket['compra'] += detalle.total
-            bucket['base'] += detalle.subtotal
-            bucket['iva'] += (detalle.total - detalle.subtotal)
             descuento = (detalle.cantidad or Decimal('0')) * (detalle.descuento_unitario or Decimal('0'))
-            if descuento:
-                bucket['descuento'] -= descuento
-                total_desc -= descuento
+            _add_iva_bucket(
+                result['resumen_iva'],
+                _normalize_iva_label(detalle.iva_porcentaje, detalle.producto.iva_exento),
+                compra=detalle.total,
+                base=detalle.subtotal,
+                descuento=descuento,
+            )
+            result['total_desc'] -= descuento
+            categoria = _categoria_label(detalle.producto.categoria.nombre)
+            result['resumen_categorias'][categoria] = result['resumen_categorias'].get(categoria, Decimal('0')) + detalle.total
+        _add_medio(result['medios'], _medio_pago_label(venta.medio_pago), cantidad=1, facturado=venta.total)
+        result['total_facturado'] += venta.total
+        result['total_documentos'] += 1
+    result['anuladas'] = ventas_tipo.filter(estado='ANULADA').count()
+    return result
+
+
+def build_cuentas_del_dia_ticket_summary(
+    fecha_inicio: str | None,
+    fecha_fin: str | None,
+    tipo_comprobante: str,
+    *,
+    base_queryset: QuerySet[Venta] | None = None,
+    in_python: bool = False,
+) -> dict:
+    """Resumen de tirilla por tipo de comprobante.
 
-            categoria = ((getattr(detalle.producto, 'categoria', None) and detalle.producto.categoria.nombre) or 'SIN CATEGORÍA').upper()
-            resumen_categorias[categoria] = resumen_categorias.get(categoria, Decimal('0')) + detalle.total
+    Por defecto los desgloses (IVA, categorías, descuentos, medios de pago) salen
+    de agregados agrupados en SQL; ``in_python`` usa la ruta fila a fila de referencia.
+    """
+    ventas_base = base_queryset if base_queryset is not None else Venta.objects.all()
+    inicio_dt, fin_dt = _parse_local_date_range(fecha_inicio, fecha_fin)
 
-    total_facturado = ventas_validas.aggregate(total=Sum('total')).get('total') or Decimal('0')
-    total_documentos = ventas_validas.count()
+    ventas_tipo = ventas_base.filter(tipo_comprobante=tipo_comprobante)
+    if inicio_dt:
+        ventas_tipo = ventas_tipo.filter(fecha__gte=inicio_dt)
+    if fin_dt:
+        ventas_tipo = ventas_tipo.filter(fecha__lte=fin_dt)
+
+    aggregated = _aggregate_ticket_python(ventas_tipo) if in_python else _aggregate_ticket_sql(ventas_tipo)
+    resumen_iva = aggregated['resumen_iva']
+    resumen_categorias = aggregated['resumen_categorias']
+    medios = aggregated['medios']
+    total_documentos = aggregated['total_documentos']
 
     totales_iva = {
         'compra': sum((v['compra'] for v in resumen_iva.values()), Decimal('0')),
         'base': sum((v['base'] for v in resumen_iva.values()), Decimal('0')),
         'iva': sum((v['iva'] for v in resumen_iva.values()), Decimal('0')),
-        'descuento': total_desc,
+        'descuento': aggregated['total_desc'],
     }
 
     estados = [
-        {'estado': 'ANULADAS', 'cantidad': ventas_tipo.filter(estado='ANULADA').count()},
+        {'estado': 'ANULADAS', 'cantidad': aggregated['anuladas']},
         {'estado': 'FACTURADAS', 'cantidad': total_documentos},
     ]
 
-    medios = {}
-    for venta in ventas_validas:
-        medio = (venta.get_medio_pago_display() or venta.medio_pago or '').upper()
-        item = medios.setdefault(medio, {'cantidad': 0, 'medio_pago': medio, 'facturado': Decimal('0')})
-        item['cantidad'] += 1
-        item['facturado'] += venta.total
-
     return {
         'tipo_comprobante': tipo_comprobante,
         'documento_label': 'Facturas' if tipo_comprobante == 'FACTURA' else 'Remisiones',
@@ -187,7 +291,7 @@ def build_cuentas_del_dia_ticket_summary(fecha_inicio: str | None, fecha_fin: st
         'fecha_inicio': fecha_inicio,
         'fecha_fin': fecha_fin,
         'total_documentos': total_documentos,
-        'total_facturado': _decimal_to_str(total_facturado),
+        'total_facturado': _decimal_to_str(aggregated['total_facturado']),
         'resumen_iva': [
             {k: (_decimal_to_str(vv) if isinstance(vv, Decimal) else vv) for k, vv in row.items()}
             for row in sorted(resumen_iva.values(), key=lambda x: (x['tipo'] == 'E', x['tipo']))
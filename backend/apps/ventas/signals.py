@@ -1,9 +1,9 @@
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from django.db import transaction
-from django.utils import timezone
 from apps.core.models import ConfiguracionFacturacion
+from apps.core.services.configuracion_cache import get_numeracion_local
 from .models import Venta, DetalleVenta, AuditoriaDescuento
+from .services.consecutivos import sincronizar_consecutivos_configuracion, siguiente_numero_comprobante
 
 
 @receiver(pre_save, sender=Venta)
@@ -12,30 +12,26 @@ def generar_numero_comprobante(sender, instance, **kwargs):
     if not instance.numero_comprobante:
         if instance.tipo_comprobante == 'FACTURA' and instance.estado != 'COBRADA':
             return
-        fecha = timezone.now()
-        config = ConfiguracionFacturacion.objects.order_by('-id').first()
-        prefijo = {
-            'COTIZACION': (getattr(config, 'prefijo_cotizacion', None) or 'COT').strip(),
-            'REMISION': (getattr(config, 'prefijo_remision', None) or 'REM').strip(),
-            'FACTURA': 'FAC',
+        # Prefijos desde la caché de configuración; el número sale del consecutivo de cada (tipo, prefijo).
+        numeracion = get_numeracion_local()
+        prefijo, base = {
+            'COTIZACION': (numeracion.prefijo_cotizacion, numeracion.numero_cotizacion or 150000),
+            'REMISION': (numeracion.prefijo_remision, numeracion.numero_remision or 150000),
+            'FACTURA': ('FAC', 100000),
         }[instance.tipo_comprobante]
-        base = 100000 if instance.tipo_comprobante == 'FACTURA' else 150000
-        if instance.tipo_comprobante in {'COTIZACION', 'REMISION'} and config:
-            with transaction.atomic():
-                locked = ConfiguracionFacturacion.objects.select_for_update().get(pk=config.pk)
-                if instance.tipo_comprobante == 'REMISION':
-                    nuevo_num = int(locked.numero_remision or 1)
-                    locked.numero_remision = nuevo_num + 1
-                    locked.save(update_fields=['numero_remision'])
-                else:
-                    nuevo_num = int(getattr(locked, 'numero_cotizacion', 1) or 1)
-                    locked.numero_cotizacion = nuevo_num + 1
-                    locked.save(update_fields=['numero_cotizacion'])
-        else:
-            nuevo_num = Venta.obtener_siguiente_numero(instance.tipo_comprobante, fecha, prefijo, base)
+        nuevo_num = siguiente_numero_comprobante(instance.tipo_comprobante, prefijo, base)
         instance.numero_comprobante = f"{prefijo}-{nuevo_num}"
 
 
+@receiver(post_save, sender=ConfiguracionFacturacion)
+def sincronizar_consecutivos(sender, instance, update_fields=None, **kwargs):
+    """Aplica a los consecutivos los números/prefijos de cotización y remisión editados en la configuración."""
+    campos = {'prefijo_cotizacion', 'numero_cotizacion', 'prefijo_remision', 'numero_remision'}
+    if update_fields is not None and not campos.intersection(update_fields):
+        return
+    sincronizar_consecutivos_configuracion(instance)
+
+
 @receiver(post_save, sender=Venta)
 def registrar_auditoria_descuento(sender, instance, created, **kwargs):
     """Registra auditoría si hay descuento aplicado"""
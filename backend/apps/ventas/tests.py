@@ -1,16 +1,26 @@
+import threading
 from decimal import Decimal
+from importlib import import_module
 from unittest.mock import patch, MagicMock
-from django.db import DataError
-from django.test import TestCase
+from django.apps import apps as django_apps
+from django.db import DataError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APIClient
 
+from apps.core.models import ConfiguracionFacturacion
+from apps.core.serializers import ConfiguracionFacturacionSerializer
+from apps.core.services.configuracion_cache import clear_configuracion_cache
 from apps.inventario.models import Categoria, Producto, Proveedor, MovimientoInventario
 from apps.usuarios.models import Usuario
-from apps.facturacion.models import FacturaElectronica
-from apps.ventas.models import Cliente, Venta, DetalleVenta
+from apps.facturacion.models import FacturaElectronica, RangoNumeracionDIAN
+from apps.facturacion.services.document_print_context import _find_matching_range, RangoNumeracionResolver
+from apps.ventas.models import Cliente, ConsecutivoComprobante, Venta, DetalleVenta
+from apps.ventas.serializers import VentaListSerializer
 from apps.ventas.views import _factus_http_status_and_code, _registrar_salida_inventario
 from apps.ventas.services.cerrar_venta import build_pos_ticket_payload, cerrar_venta_local
+from apps.ventas.services.consecutivos import sembrar_consecutivos, siguiente_numero_comprobante
 from apps.ventas.services.cuentas_del_dia import build_cuentas_del_dia_ticket_summary
 from apps.ventas.services.enviar_venta_a_caja import enviar_venta_a_caja
 
@@ -207,6 +217,53 @@ class CuentasDiaTicketSummaryTests(TestCase):
         venta.refresh_from_db()
         self.assertTrue(venta.inventario_ya_afectado)
 
+    def test_agregados_sql_coinciden_con_ruta_python(self):
+        bebidas = Categoria.objects.create(nombre='bebidas')
+        producto_5 = Producto.objects.create(
+            codigo='IV-5', nombre='Prod 5%', categoria=bebidas, proveedor=self.producto_gravado.proveedor,
+            precio_costo=Decimal('10'), precio_venta=Decimal('20'), precio_venta_minimo=Decimal('20'),
+            stock=10, stock_minimo=1, iva_porcentaje=Decimal('5'), iva_exento=False
+        )
+        lineas = [
+            (self.producto_gravado, Decimal('2'), Decimal('10'), Decimal('19'), Decimal('180'), Decimal('214.20')),
+            (self.producto_exento, Decimal('1'), Decimal('0'), Decimal('0'), Decimal('100'), Decimal('100')),
+            (producto_5, Decimal('3'), Decimal('1.5'), Decimal('5'), Decimal('55.50'), Decimal('58.28')),
+        ]
+        for tipo, estado, medio in [
+            ('FACTURA', 'COBRADA', 'EFECTIVO'),
+            ('FACTURA', 'FACTURADA', 'TRANSFERENCIA'),
+            ('FACTURA', 'COBRADA', 'EFECTIVO'),
+            ('FACTURA', 'ANULADA', 'TARJETA'),
+            ('REMISION', 'COBRADA', 'CREDITO'),
+            ('REMISION', 'BORRADOR', 'EFECTIVO'),
+        ]:
+            venta = Venta.objects.create(
+                tipo_comprobante=tipo, cliente=self.cliente, vendedor=self.user, subtotal=Decimal('335.50'),
+                descuento_porcentaje=Decimal('0'), descuento_valor=Decimal('0'), iva=Decimal('36.98'),
+                total=Decimal('372.48'), medio_pago=medio, efectivo_recibido=Decimal('372.48'),
+                cambio=Decimal('0'), estado=estado,
+            )
+            for producto, cantidad, descuento, iva, subtotal, total in lineas:
+                DetalleVenta.objects.create(
+                    venta=venta, producto=producto, cantidad=cantidad, precio_unitario=Decimal('100'),
+                    descuento_unitario=descuento, iva_porcentaje=iva, subtotal=subtotal, total=total,
+                )
+
+        base_queryset = Venta.objects.select_related('cliente').prefetch_related('detalles__producto__categoria')
+        for tipo in ('FACTURA', 'REMISION'):
+            with CaptureQueriesContext(connection) as queries:
+                sql = build_cuentas_del_dia_ticket_summary(None, None, tipo, base_queryset=base_queryset)
+            self.assertEqual(len(queries), 2)
+            python = build_cuentas_del_dia_ticket_summary(None, None, tipo, base_queryset=base_queryset, in_python=True)
+            self.assertEqual(sql, python)
+
+        factura = build_cuentas_del_dia_ticket_summary(None, None, 'FACTURA')
+        self.assertEqual(factura['total_documentos'], 3)
+        self.assertEqual(factura['resumen_estados'][0], {'estado': 'ANULADAS', 'cantidad': 1})
+        self.assertEqual([row['tipo'] for row in factura['resumen_iva']], ['19', '5', 'E'])
+        self.assertEqual([row['categoria'] for row in factura['resumen_categorias']], ['ACEITES', 'BEBIDAS'])
+        self.assertEqual(factura['totales_iva']['descuento'], '-73.50')
+
     def test_reintento_registro_salida_no_duplica_movimientos(self):
         venta = Venta.objects.create(
             tipo_comprobante='FACTURA',
@@ -2089,3 +2146,291 @@ class CuentasDelDiaEstadisticasTests(TestCase):
         self.assertEqual(response.data['total_facturas'], 1)
         self.assertEqual(response.data['total_remisiones'], 0)
         self.assertEqual(response.data['total_ventas'], 1)
+
+
+class VentaSerializerRangoResolverTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='usuario-rangos', password='pass1234')
+        self.cliente = Cliente.objects.create(tipo_documento='CC', numero_documento='22001', nombre='Cliente rangos')
+        self.rango = RangoNumeracionDIAN.objects.create(
+            factus_range_id=77,
+            document_code='FACTURA_VENTA',
+            is_selected_local=True,
+            prefijo='SETP',
+            desde=1,
+            hasta=5000,
+            resolucion='18760000001',
+            consecutivo_actual=10,
+        )
+        RangoNumeracionDIAN.objects.create(
+            environment='PRODUCTION',
+            document_code='FACTURA_VENTA',
+            prefijo='FE',
+            desde=1,
+            hasta=100,
+            resolucion='18760000002',
+            consecutivo_actual=1,
+        )
+        self.contador = 0
+
+    def _crear_factura(self, **factura_kwargs):
+        self.contador += 1
+        venta = Venta.objects.create(
+            tipo_comprobante='FACTURA',
+            cliente=self.cliente,
+            vendedor=self.usuario,
+            subtotal=Decimal('1000'),
+            descuento_porcentaje=Decimal('0'),
+            descuento_valor=Decimal('0'),
+            iva=Decimal('0'),
+            total=Decimal('1000'),
+            medio_pago='EFECTIVO',
+            efectivo_recibido=Decimal('1000'),
+            cambio=Decimal('0'),
+            estado='FACTURADA',
+            numero_comprobante=f'SETP{self.contador}',
+        )
+        return FacturaElectronica.objects.create(
+            venta=venta,
+            cufe=f'CUFE-RANGO-{self.contador}',
+            number=f'SETP{self.contador}',
+            reference_code=f'REF-RANGO-{self.contador}',
+            estado_electronico='ACEPTADA',
+            response_json={},
+            **factura_kwargs,
+        )
+
+    def _queries_listado(self) -> int:
+        ventas = Venta.objects.select_related('cliente', 'vendedor', 'factura_electronica_factus')
+        with CaptureQueriesContext(connection) as queries:
+            VentaListSerializer(ventas, many=True).data
+        return len(queries)
+
+    def test_listado_hace_consultas_fijas_de_rangos(self):
+        self._crear_factura(factus_numbering_range_id=77)
+        self._crear_factura(factus_number_prefix='FE', factus_resolution_number='18760000002')
+        con_dos = self._queries_listado()
+        for _ in range(4):
+            self._crear_factura(factus_numbering_range_id=77)
+        self.assertEqual(self._queries_listado(), con_dos)
+
+    def test_resolver_coincide_con_busqueda_por_fila(self):
+        facturas = [
+            self._crear_factura(factus_numbering_range_id=77),
+            self._crear_factura(factus_number_prefix='FE', factus_resolution_number='18760000002'),
+            self._crear_factura(factus_numbering_range_id=999),
+        ]
+        resolver = RangoNumeracionResolver()
+        for factura in facturas:
+            self.assertEqual(resolver.match(factura), _find_matching_range(factura))
+        self.assertEqual(resolver.selected('FACTURA_VENTA'), self.rango)
+
+
+class ClienteListadoConteoTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='usuario-clientes', password='pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+        self.contador = 0
+
+    def _crear_cliente_con_ventas(self, documento, cobradas, borradores=0):
+        cliente = Cliente.objects.create(tipo_documento='CC', numero_documento=documento, nombre=f'Cliente {documento}')
+        for estado, cantidad in (('COBRADA', cobradas), ('BORRADOR', borradores)):
+            for _ in range(cantidad):
+                self.contador += 1
+                Venta.objects.create(
+                    tipo_comprobante='REMISION',
+                    cliente=cliente,
+                    vendedor=self.usuario,
+                    subtotal=Decimal('1000'),
+                    descuento_porcentaje=Decimal('0'),
+                    descuento_valor=Decimal('0'),
+                    iva=Decimal('0'),
+                    total=Decimal('1000'),
+                    medio_pago='EFECTIVO',
+                    efectivo_recibido=Decimal('1000'),
+                    cambio=Decimal('0'),
+                    estado=estado,
+                    numero_comprobante=f'REM-CLI-{self.contador}',
+                )
+        return cliente
+
+    def _listar(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/clientes/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_listado_usa_conteo_anotado_con_consultas_constantes(self):
+        self._crear_cliente_con_ventas('31001', cobradas=2, borradores=1)
+        _, consultas_iniciales = self._listar()
+
+        for indice in range(5):
+            self._crear_cliente_con_ventas(f'3110{indice}', cobradas=indice)
+        response, consultas = self._listar()
+
+        self.assertEqual(consultas, consultas_iniciales)
+        # COUNT de paginación + SELECT anotado.
+        self.assertEqual(consultas, 2)
+        totales = {item['numero_documento']: item['total_compras'] for item in response.data['results']}
+        self.assertEqual(totales['31001'], 2)
+        self.assertEqual(totales['31104'], 4)
+
+
+class ConsecutivoComprobanteMixin:
+    def _crear_usuario_y_cliente(self):
+        self.usuario = Usuario.objects.create_user(
+            username='consecutivos',
+            password='pass1234',
+            tipo_usuario='ADMIN',
+        )
+        self.cliente = Cliente.objects.create(
+            tipo_documento='CC',
+            numero_documento='41001',
+            nombre='Cliente consecutivos',
+        )
+
+    def _factura_cobrada(self, numero_comprobante=None):
+        return self._crear_comprobante('FACTURA', numero_comprobante)
+
+    def _crear_comprobante(self, tipo_comprobante, numero_comprobante=None):
+        return Venta.objects.create(
+            tipo_comprobante=tipo_comprobante,
+            cliente=self.cliente,
+            vendedor=self.usuario,
+            subtotal=Decimal('1000'),
+            descuento_porcentaje=Decimal('0'),
+            descuento_valor=Decimal('0'),
+            iva=Decimal('0'),
+            total=Decimal('1000'),
+            medio_pago='EFECTIVO',
+            efectivo_recibido=Decimal('1000'),
+            cambio=Decimal('0'),
+            estado='COBRADA',
+            numero_comprobante=numero_comprobante,
+        )
+
+
+class ConsecutivoComprobanteTests(ConsecutivoComprobanteMixin, TestCase):
+    def setUp(self):
+        self._crear_usuario_y_cliente()
+
+    def test_numera_desde_la_base_y_luego_sin_recorrer_ventas(self):
+        self.assertEqual(self._factura_cobrada().numero_comprobante, 'FAC-100000')
+        with CaptureQueriesContext(connection) as ctx:
+            factura = self._factura_cobrada()
+        self.assertEqual(factura.numero_comprobante, 'FAC-100001')
+        self.assertFalse([query for query in ctx.captured_queries if '~' in query['sql']])
+        self.assertEqual(
+            ConsecutivoComprobante.objects.get(tipo_comprobante='FACTURA', prefijo='FAC').ultimo_numero,
+            100001,
+        )
+
+    def test_siembra_desde_el_maximo_existente(self):
+        self._factura_cobrada('FAC-100050')
+        self._factura_cobrada('FAC-LEGACY-7')
+        self.assertEqual(sembrar_consecutivos(), 2)
+        self.assertEqual(self._factura_cobrada().numero_comprobante, 'FAC-100051')
+
+    def test_backfill_de_la_migracion_siembra_desde_el_maximo(self):
+        migracion = import_module('apps.ventas.migrations.0011_consecutivo_comprobante')
+        self._factura_cobrada('FAC-100050')
+        ConsecutivoComprobante.objects.filter(tipo_comprobante='FACTURA', prefijo='FAC').update(ultimo_numero=10)
+
+        migracion.seed_consecutivos(django_apps, None)
+
+        self.assertEqual(
+            ConsecutivoComprobante.objects.get(tipo_comprobante='FACTURA', prefijo='FAC').ultimo_numero,
+            100050,
+        )
+
+    def test_resincroniza_si_el_numero_ya_existe(self):
+        self._factura_cobrada()
+        # Número cargado por fuera del contador (p. ej. importación).
+        self._factura_cobrada('FAC-100001')
+        self._factura_cobrada('FAC-100002')
+        self.assertEqual(self._factura_cobrada().numero_comprobante, 'FAC-100003')
+        self.assertEqual(siguiente_numero_comprobante('FACTURA', 'FAC', 100000), 100004)
+
+
+class NumeracionCotizacionRemisionTests(ConsecutivoComprobanteMixin, TestCase):
+    def setUp(self):
+        clear_configuracion_cache()
+        self._crear_usuario_y_cliente()
+
+    def test_sin_configuracion_usa_prefijos_y_base_por_defecto(self):
+        self.assertEqual(self._crear_comprobante('REMISION').numero_comprobante, 'REM-150000')
+        self.assertEqual(self._crear_comprobante('COTIZACION').numero_comprobante, 'COT-150000')
+
+    def test_numera_sin_bloquear_ni_releer_la_configuracion(self):
+        ConfiguracionFacturacion.objects.create(prefijo_remision='RMX', numero_remision=10)
+        self.assertEqual(self._crear_comprobante('REMISION').numero_comprobante, 'RMX-10')
+        with CaptureQueriesContext(connection) as ctx:
+            remision = self._crear_comprobante('REMISION')
+        self.assertEqual(remision.numero_comprobante, 'RMX-11')
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('configuracion_facturacion', sql)
+        self.assertNotIn('FOR UPDATE', sql)
+
+    def test_editar_configuracion_mueve_el_consecutivo_sin_retroceder(self):
+        configuracion = ConfiguracionFacturacion.objects.create(prefijo_cotizacion='CTZ', numero_cotizacion=1)
+        self._crear_comprobante('COTIZACION')
+        configuracion.numero_cotizacion = 50
+        configuracion.save(update_fields=['numero_cotizacion'])
+        self.assertEqual(self._crear_comprobante('COTIZACION').numero_comprobante, 'CTZ-50')
+        configuracion.numero_cotizacion = 5
+        configuracion.save(update_fields=['numero_cotizacion'])
+        self.assertEqual(self._crear_comprobante('COTIZACION').numero_comprobante, 'CTZ-51')
+
+        configuracion.prefijo_cotizacion = 'CT2'
+        configuracion.save(update_fields=['prefijo_cotizacion'])
+        self.assertEqual(self._crear_comprobante('COTIZACION').numero_comprobante, 'CT2-5')
+        self.assertEqual(ConfiguracionFacturacionSerializer(configuracion).data['numero_cotizacion'], 6)
+
+    def test_serializar_configuraciones_lee_los_consecutivos_una_vez(self):
+        configuraciones = [
+            ConfiguracionFacturacion.objects.create(prefijo_cotizacion='CTA', numero_cotizacion=1),
+            ConfiguracionFacturacion.objects.create(prefijo_cotizacion='CTB', numero_cotizacion=1),
+        ]
+        self._crear_comprobante('COTIZACION')
+        with CaptureQueriesContext(connection) as ctx:
+            data = ConfiguracionFacturacionSerializer(configuraciones, many=True).data
+        self.assertEqual(len([q for q in ctx.captured_queries if 'consecutivos_comprobante' in q['sql']]), 1)
+        self.assertEqual([item['numero_cotizacion'] for item in data], [1, 2])
+
+        with self.assertNumQueries(0):
+            data = ConfiguracionFacturacionSerializer(
+                configuraciones[0], context={'consecutivos': {('COTIZACION', 'CTA'): 40}}
+            ).data
+        self.assertEqual(data['numero_cotizacion'], 41)
+
+
+class ConsecutivoComprobanteConcurrencyTests(ConsecutivoComprobanteMixin, TransactionTestCase):
+    def setUp(self):
+        self._crear_usuario_y_cliente()
+        self._factura_cobrada()
+
+    def test_cajas_concurrentes_no_repiten_numero(self):
+        hilos, facturas_por_hilo = 6, 4
+        barrera = threading.Barrier(hilos)
+        errores = []
+
+        def caja():
+            try:
+                barrera.wait()
+                for _ in range(facturas_por_hilo):
+                    self._factura_cobrada()
+            except Exception as exc:  # pragma: no cover - se reporta en la aserción
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=caja) for _ in range(hilos)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errores, [])
+        numeros = sorted(Venta.objects.values_list('numero_comprobante', flat=True))
+        self.assertEqual(numeros, [f'FAC-{100000 + offset}' for offset in range(hilos * facturas_por_hilo + 1)])
@@ -19,6 +19,7 @@ from apps.facturacion.services import (
     FactusAuthError,
     FactusValidationError,
 )
+from apps.facturacion.services.document_print_context import RangoNumeracionResolver
 from apps.ventas.services import (
     anular_venta,
     build_cuentas_del_dia_summary,
@@ -135,7 +136,10 @@ def _electronic_outcome(estado_electronico: str | None) -> str:
 
 class ClienteViewSet(viewsets.ModelViewSet):
     """ViewSet para gestionar clientes"""
-    queryset = Cliente.objects.all()
+    # Conteo anotado: evita un COUNT por fila en el serializer.
+    queryset = Cliente.objects.annotate(
+        total_compras=Count('ventas', filter=Q(ventas__estado='COBRADA'))
+    )
     serializer_class = ClienteSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -159,7 +163,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            cliente = Cliente.objects.get(numero_documento=documento, is_active=True)
+            cliente = self.get_queryset().get(numero_documento=documento, is_active=True)
             serializer = self.get_serializer(cliente)
             return Response(serializer.data)
         except Cliente.DoesNotExist:
@@ -663,15 +667,17 @@ class VentaViewSet(viewsets.ModelViewSet):
 
         stats['facturas_por_usuario'] = facturas_por_usuario
         stats['remisiones_por_usuario'] = remisiones_por_usuario
+        # Un solo resolver de rangos para ambos detalles: consultas fijas sin importar las filas.
+        serializer_context = {'request': request, 'range_resolver': RangoNumeracionResolver()}
         stats['facturas_detalle'] = VentaListSerializer(
             ventas.filter(tipo_comprobante='FACTURA').order_by('-fecha', '-id'),
             many=True,
-            context={'request': request},
+            context=serializer_context,
         ).data
         stats['remisiones_detalle'] = VentaListSerializer(
             ventas.filter(tipo_comprobante='REMISION').order_by('-fecha', '-id'),
             many=True,
-            context={'request': request},
+            context=serializer_context,
         ).data
         
         return Response(stats)
@@ -46,6 +46,7 @@ factura_notas_credito_parcial = FacturaElectronicaViewSet.as_view({'post': 'nota
 factura_notas_credito_total = FacturaElectronicaViewSet.as_view({'post': 'notas_credito_total'})
 nota_credito_detail = NotasCreditoViewSet.as_view({'get': 'retrieve', 'delete': 'destroy'})
 nota_credito_sync = NotasCreditoViewSet.as_view({'post': 'sincronizar'})
+nota_credito_estado = NotasCreditoViewSet.as_view({'get': 'estado'})
 nota_credito_estado_remoto = NotasCreditoViewSet.as_view({'get': 'estado_remoto'})
 nota_credito_retry_sync = NotasCreditoViewSet.as_view({'post': 'reintentar_conciliacion'})
 nota_credito_pdf = NotasCreditoViewSet.as_view({'get': 'pdf_by_id'})
@@ -114,6 +115,7 @@ urlpatterns = [
     path('api/facturacion/facturas/<int:pk>/notas-credito/total/', factura_notas_credito_total, name='factura-nota-credito-total'),
     path('api/notas-credito/<int:pk>/', nota_credito_detail, name='nota-credito-detail'),
     path('api/notas-credito/<int:pk>/sincronizar/', nota_credito_sync, name='nota-credito-sync'),
+    path('api/notas-credito/<int:pk>/estado/', nota_credito_estado, name='nota-credito-estado'),
     path('api/notas-credito/<int:pk>/estado-remoto/', nota_credito_estado_remoto, name='nota-credito-estado-remoto'),
     path('api/notas-credito/<int:pk>/reintentar-conciliacion/', nota_credito_retry_sync, name='nota-credito-reintentar-conciliacion'),
     path('api/notas-credito/<int:pk>/pdf/', nota_credito_pdf, name='nota-credito-pdf'),
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from apps.facturacion.services.queue_drainer import start_queue_drainer  # noqa: E402
+
+start_queue_drainer()
@@ -81,11 +81,21 @@ export interface AjusteStockPayload {
   referencia?: string;
 }
 
+export interface InventarioEstadisticasCategoria {
+  categoria_id: number;
+  categoria_nombre: string;
+  total: number;
+  stock_bajo: number;
+  agotados: number;
+  valor_inventario: string | number;
+}
+
 export interface InventarioEstadisticas {
   total: number;
   stock_bajo: number;
   agotados: number;
   valor_inventario: string | number;
+  por_categoria: InventarioEstadisticasCategoria[];
 }
 
 export interface ProductoFavorito {
@@ -136,6 +146,18 @@ export const inventarioApi = {
     return response.json();
   },
 
+  async buscarProductos(q: string, limit = 20): Promise<ProductoList[]> {
+    const queryParams = new URLSearchParams({ q, limit: limit.toString() });
+    const response = await authFetch(`${API_URL}/productos/buscar/?${queryParams}`, {
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) throw new Error('Error al buscar productos');
+    return response.json();
+  },
+
   async getProducto(id: number): Promise<Producto> {
     const response = await authFetch(`${API_URL}/productos/${id}/`, {
       headers: {
@@ -3,19 +3,29 @@ import FacturasTable from '../components/FacturasTable';
 import { facturacionApi, type FacturaElectronica } from '../services/facturacionApi';
 import { useNotification } from '../../../contexts/NotificationContext';
 
+const navButtonClasses =
+  'rounded-md border border-slate-200 px-3 py-1 text-sm font-semibold text-slate-600 transition hover:bg-slate-50 disabled:opacity-50';
+
 export default function FacturasElectronicasPage() {
   const [facturas, setFacturas] = useState<FacturaElectronica[]>([]);
   const [loading, setLoading] = useState(false);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [previousCursor, setPreviousCursor] = useState<string | null>(null);
   const { showNotification } = useNotification();
 
   useEffect(() => {
     const cargarFacturas = async () => {
       setLoading(true);
       try {
-        const data = await facturacionApi.getFacturas();
-        setFacturas(data);
+        const page = await facturacionApi.getFacturasPage({ cursor });
+        setFacturas(page.results);
+        setNextCursor(page.nextCursor);
+        setPreviousCursor(page.previousCursor);
       } catch {
         setFacturas([]);
+        setNextCursor(null);
+        setPreviousCursor(null);
         showNotification({
           message: 'No fue posible cargar las facturas electrónicas.',
           type: 'error',
@@ -26,7 +36,7 @@ export default function FacturasElectronicasPage() {
     };
 
     cargarFacturas();
-  }, [showNotification]);
+  }, [cursor, showNotification]);
 
   return (
     <div className="space-y-4 px-6 py-6">
@@ -38,6 +48,27 @@ export default function FacturasElectronicasPage() {
       </div>
 
       <FacturasTable facturas={facturas} loading={loading} />
+
+      {(previousCursor || nextCursor) && (
+        <div className="flex items-center justify-center gap-2">
+          <button
+            type="button"
+            disabled={loading || !previousCursor}
+            onClick={() => setCursor(previousCursor)}
+            className={navButtonClasses}
+          >
+            Anterior
+          </button>
+          <button
+            type="button"
+            disabled={loading || !nextCursor}
+            onClick={() => setCursor(nextCursor)}
+            className={navButtonClasses}
+          >
+            Siguiente
+          </button>
+        </div>
+      )}
     </div>
   );
 }
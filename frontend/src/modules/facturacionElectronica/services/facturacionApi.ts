@@ -1,4 +1,5 @@
 import apiClient from '../../../api/client';
+import type { CursorPaginatedResponse } from '../../../types';
 
 export type EstadoDian =
   | 'ACEPTADA'
@@ -28,6 +29,7 @@ export interface FacturaElectronica {
   codigo_error?: string;
   observaciones?: string;
   bill_errors?: string[];
+  bill_errors_count?: number;
   public_url?: string;
   factus_public_url?: string;
   qr_factus?: string;
@@ -82,10 +84,47 @@ const crearArchivoDescargable = (blob: Blob, fileName: string) => {
   window.URL.revokeObjectURL(url);
 };
 
+export interface FacturasPage<T = FacturaElectronica> {
+  results: T[];
+  nextCursor: string | null;
+  previousCursor: string | null;
+}
+
+// El listado usa CursorPagination: `next`/`previous` son URLs con el parámetro `cursor`.
+export const cursorFromUrl = (url: string | null) => {
+  if (!url) return null;
+  try {
+    return new URL(url, window.location.origin).searchParams.get('cursor');
+  } catch {
+    return null;
+  }
+};
+
+export const toFacturasPage = <T,>(payload: CursorPaginatedResponse<T> | T[]): FacturasPage<T> =>
+  Array.isArray(payload)
+    ? { results: payload, nextCursor: null, previousCursor: null }
+    : {
+        results: payload.results ?? [],
+        nextCursor: cursorFromUrl(payload.next),
+        previousCursor: cursorFromUrl(payload.previous),
+      };
+
 export const facturacionApi = {
-  async getFacturas() {
-    const response = await apiClient.get<FacturaElectronica[]>('/facturas-electronicas/');
-    return response.data;
+  async getFacturasPage(params?: { cursor?: string | null; estado_electronico?: string; page_size?: number }) {
+    const response = await apiClient.get<CursorPaginatedResponse<FacturaElectronica> | FacturaElectronica[]>(
+      '/facturas-electronicas/',
+      { params: { ...params, cursor: params?.cursor || undefined } }
+    );
+    return toFacturasPage(response.data);
+  },
+
+  async getFacturas(params?: { venta_id?: string; estado_electronico?: string; page_size?: number }) {
+    const response = await apiClient.get<{ results?: FacturaElectronica[] } | FacturaElectronica[]>(
+      '/facturas-electronicas/',
+      { params }
+    );
+    const payload = response.data;
+    return Array.isArray(payload) ? payload : (payload.results ?? []);
   },
 
   async getEstadoFactura(numero: string) {
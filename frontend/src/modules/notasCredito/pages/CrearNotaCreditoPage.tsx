@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useCallback, useEffect, useMemo, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useNotification } from '../../../contexts/NotificationContext';
 import { notasCreditoApi, type CrearNotaCreditoPayload, type NotaCredito } from '../services/notasCreditoApi';
@@ -106,6 +106,7 @@ export default function CrearNotaCreditoPage() {
   const [loading, setLoading] = useState(false);
   const [loadingFacturas, setLoadingFacturas] = useState(false);
   const [facturas, setFacturas] = useState<FacturaOption[]>([]);
+  const [facturasNextCursor, setFacturasNextCursor] = useState<string | null>(null);
   const [notasExistentes, setNotasExistentes] = useState<NotaCredito[]>([]);
   const [busquedaFactura, setBusquedaFactura] = useState('');
   const [facturaSeleccionadaId, setFacturaSeleccionadaId] = useState<number | null>(null);
@@ -116,36 +117,35 @@ export default function CrearNotaCreditoPage() {
   const [observaciones, setObservaciones] = useState('');
   const [rangoNotaCreditoActivo, setRangoNotaCreditoActivo] = useState<FacturacionRango | null>(null);
 
-  useEffect(() => {
-    const loadInitialData = async () => {
+  const loadFacturas = useCallback(
+    async (cursor: string | null) => {
       setLoadingFacturas(true);
       try {
-        const [facturasResp, notasResp] = await Promise.all([
-          notasCreditoApi.getFacturasElectronicas(),
-          notasCreditoApi.getNotasCredito(),
-        ]);
-        setFacturas(
-          facturasResp.map((f) => ({
-            id: f.id,
-            ventaId: Number(f.venta_id || 0),
-            numero: f.numero,
-            cliente: f.cliente,
-            fecha: f.fecha,
-            total: Number(f.total || 0),
-            cufe: f.cufe,
-            estado: String(f.estado_electronico || f.estado || 'PENDIENTE_REINTENTO'),
-          })),
-        );
-        setNotasExistentes(notasResp);
+        const page = await notasCreditoApi.getFacturasElectronicas(cursor);
+        const nuevas = page.results.map((f) => ({
+          id: f.id,
+          ventaId: Number(f.venta_id || 0),
+          numero: f.numero,
+          cliente: f.cliente,
+          fecha: f.fecha,
+          total: Number(f.total || 0),
+          cufe: f.cufe,
+          estado: String(f.estado_electronico || f.estado || 'PENDIENTE_REINTENTO'),
+        }));
+        setFacturas((prev) => (cursor ? [...prev, ...nuevas] : nuevas));
+        setFacturasNextCursor(page.nextCursor);
       } catch {
         showNotification({ message: 'No fue posible cargar facturas origen.', type: 'error', durationMs: 2500 });
       } finally {
         setLoadingFacturas(false);
       }
-    };
+    },
+    [showNotification],
+  );
 
-    loadInitialData();
-  }, [showNotification]);
+  useEffect(() => {
+    loadFacturas(null);
+  }, [loadFacturas]);
 
   useEffect(() => {
     configuracionAPI
@@ -200,9 +200,13 @@ export default function CrearNotaCreditoPage() {
     }
     setLoading(true);
     try {
-      const venta = await notasCreditoApi.getVenta(factura.ventaId);
+      const [venta, notasFactura] = await Promise.all([
+        notasCreditoApi.getVenta(factura.ventaId),
+        notasCreditoApi.getNotasCreditoFactura(factura.id),
+      ]);
+      setNotasExistentes(notasFactura);
       const acumulado = new Map<number, number>();
-      notasExistentes.forEach((nota) => {
+      notasFactura.forEach((nota) => {
         const aplica =
           nota.factura_asociada === factura.numero &&
           ['ACEPTADA', 'EN_PROCESO', 'PENDIENTE_ENVIO', 'CONFLICTO_FACTUS'].includes((nota.estado_local || '').toUpperCase());
@@ -237,6 +241,7 @@ export default function CrearNotaCreditoPage() {
       setLineas(editable);
     } catch {
       setLineas([]);
+      setNotasExistentes([]);
       showNotification({
         message: 'No fue posible cargar productos de la factura origen.',
         type: 'error',
@@ -250,6 +255,7 @@ export default function CrearNotaCreditoPage() {
   const handleSelectFactura = (id: number) => {
     setFacturaSeleccionadaId(id);
     setLineas([]);
+    setNotasExistentes([]);
     const factura = facturas.find((item) => item.id === id);
     if (factura) loadVentaLines(factura);
   };
@@ -466,7 +472,7 @@ export default function CrearNotaCreditoPage() {
               className="mb-3 w-full rounded-md border border-slate-300 px-3 py-2 text-sm"
             />
             <div className="max-h-60 overflow-auto rounded-md border border-slate-200">
-              {loadingFacturas ? (
+              {loadingFacturas && facturas.length === 0 ? (
                 <p className="p-4 text-sm text-slate-500">Cargando facturas…</p>
               ) : (
                 facturasFiltradas.map((factura) => (
@@ -487,6 +493,16 @@ export default function CrearNotaCreditoPage() {
                 ))
               )}
             </div>
+            {facturasNextCursor && (
+              <button
+                type="button"
+                disabled={loadingFacturas}
+                onClick={() => loadFacturas(facturasNextCursor)}
+                className="mt-2 rounded-md border border-slate-200 px-3 py-1 text-sm font-semibold text-slate-600 hover:bg-slate-50 disabled:opacity-50"
+              >
+                {loadingFacturas ? 'Cargando facturas…' : 'Cargar facturas anteriores'}
+              </button>
+            )}
 
             {facturaSeleccionada && (
               <div className="mt-4 rounded-lg border border-blue-100 bg-blue-50 p-4">
@@ -1,33 +1,40 @@
 import { useCallback, useEffect, useRef, useState } from 'react';
 import { Link } from 'react-router-dom';
+import Pagination from '../../../components/Pagination';
 import { useNotification } from '../../../contexts/NotificationContext';
 import NotasCreditoTable from '../components/NotasCreditoTable';
 import { notasCreditoApi, type NotaCredito } from '../services/notasCreditoApi';
 
+// Tamaño de página del listado paginado de `/notas-credito/` (PAGE_SIZE de DRF).
+const PAGE_SIZE = 50;
+
 export default function NotasCreditoPage() {
   const [notasCredito, setNotasCredito] = useState<NotaCredito[]>([]);
   const [loading, setLoading] = useState(false);
-  const loadedOnceRef = useRef(false);
+  const [page, setPage] = useState(1);
+  const [totalPages, setTotalPages] = useState(1);
+  const loadedPageRef = useRef<number | null>(null);
   const { showNotification } = useNotification();
 
   const cargarNotasCredito = useCallback(async () => {
     setLoading(true);
     try {
-      const data = await notasCreditoApi.getNotasCredito();
-      setNotasCredito(data);
+      const data = await notasCreditoApi.getNotasCredito({ page });
+      setNotasCredito(data.results);
+      setTotalPages(Math.max(1, Math.ceil(data.count / PAGE_SIZE)));
     } catch {
       setNotasCredito([]);
       showNotification({ message: 'No fue posible cargar las notas crédito.', type: 'error' });
     } finally {
       setLoading(false);
     }
-  }, [showNotification]);
+  }, [page, showNotification]);
 
   useEffect(() => {
-    if (loadedOnceRef.current) return;
-    loadedOnceRef.current = true;
+    if (loadedPageRef.current === page) return;
+    loadedPageRef.current = page;
     cargarNotasCredito();
-  }, [cargarNotasCredito]);
+  }, [cargarNotasCredito, page]);
 
   return (
     <div className="space-y-4 px-6 py-6">
@@ -45,6 +52,8 @@ export default function NotasCreditoPage() {
       </div>
 
       <NotasCreditoTable notasCredito={notasCredito} loading={loading} onRefresh={cargarNotasCredito} />
+
+      {totalPages > 1 && <Pagination page={page} totalPages={totalPages} onPageChange={setPage} />}
     </div>
   );
 }
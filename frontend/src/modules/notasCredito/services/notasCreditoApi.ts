@@ -1,4 +1,6 @@
 import apiClient from '../../../api/client';
+import type { CursorPaginatedResponse, PaginatedResponse } from '../../../types';
+import { toFacturasPage } from '../../facturacionElectronica/services/facturacionApi';
 
 export type EstadoDian =
   | 'ACEPTADA'
@@ -52,6 +54,8 @@ export interface NotaCredito {
   mensaje_error?: string;
   synchronized_at?: string;
   last_sync_at?: string;
+  sync_age_seconds?: number | null;
+  next_sync_at?: string | null;
   last_remote_error?: string;
   remote_identifier?: string;
   sync_metadata?: Record<string, unknown>;
@@ -86,27 +90,41 @@ const crearArchivoDescargable = (blob: Blob, fileName: string) => {
   window.URL.revokeObjectURL(url);
 };
 
+interface FacturaElectronicaOption {
+  id: number;
+  venta_id?: number;
+  numero: string;
+  cliente: string;
+  fecha: string;
+  total: number;
+  cufe?: string;
+  estado?: string;
+  estado_electronico?: string;
+}
+
 export const notasCreditoApi = {
-  async getNotasCredito() {
-    const response = await apiClient.get<NotaCredito[]>('/notas-credito/');
-    return response.data;
+  async getNotasCredito(params?: { page?: number; factura_id?: number; estado?: string }): Promise<PaginatedResponse<NotaCredito>> {
+    const response = await apiClient.get<PaginatedResponse<NotaCredito> | NotaCredito[]>('/notas-credito/', { params });
+    const payload = response.data;
+    return Array.isArray(payload) ? { count: payload.length, next: null, previous: null, results: payload } : payload;
   },
 
-  async getFacturasElectronicas() {
-    const response = await apiClient.get<
-      Array<{
-        id: number;
-        venta_id?: number;
-        numero: string;
-        cliente: string;
-        fecha: string;
-        total: number;
-        cufe?: string;
-        estado?: string;
-        estado_electronico?: string;
-      }>
-    >('/facturas-electronicas/');
-    return response.data;
+  // Todas las notas de una factura (recorre todas las páginas): base para calcular saldos acreditables.
+  async getNotasCreditoFactura(facturaId: number) {
+    const notas: NotaCredito[] = [];
+    for (let page = 1; ; page += 1) {
+      const data = await notasCreditoApi.getNotasCredito({ factura_id: facturaId, page });
+      notas.push(...data.results);
+      if (!data.next) return notas;
+    }
+  },
+
+  async getFacturasElectronicas(cursor?: string | null) {
+    const response = await apiClient.get<CursorPaginatedResponse<FacturaElectronicaOption> | FacturaElectronicaOption[]>(
+      '/facturas-electronicas/',
+      { params: { page_size: 200, cursor: cursor || undefined } },
+    );
+    return toFacturasPage(response.data);
   },
 
   async getVenta(ventaId: number) {
@@ -174,7 +174,13 @@ export default function Facturas() {
       }, { signal: controller.signal });
       let facturasElectronicas: FacturaElectronica[] = [];
       try {
-        facturasElectronicas = await facturacionApi.getFacturas();
+        const ventaIds = response.map((venta) => venta.id);
+        if (ventaIds.length > 0) {
+          facturasElectronicas = await facturacionApi.getFacturas({
+            venta_id: ventaIds.join(','),
+            page_size: 200,
+          });
+        }
       } catch (facturaError) {
         console.error('No fue posible cargar el estado electrónico de facturas', facturaError);
       }
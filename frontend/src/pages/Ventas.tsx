@@ -400,9 +400,12 @@ export default function Ventas() {
 
   useEffect(() => {
     if (!mostrarBusqueda) return;
-    inventarioApi
-      .getProductos({ search: busquedaProducto })
-      .then((response) => setProductos(response.results ?? []))
+    const termino = busquedaProducto.trim();
+    const peticion = termino
+      ? inventarioApi.buscarProductos(termino, 50)
+      : inventarioApi.getProductos().then((response) => response.results ?? []);
+    peticion
+      .then(setProductos)
       .catch(() => setProductos([]));
   }, [busquedaProducto, mostrarBusqueda]);
 
@@ -286,6 +286,13 @@ export interface PaginatedResponse<T> {
   results: T[];
 }
 
+// Paginación por cursor (DRF CursorPagination): sin `count`, se navega con `next`/`previous`.
+export interface CursorPaginatedResponse<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 export interface ApiError {
   detail?: string;
   error?: string;